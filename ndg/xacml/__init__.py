@@ -17,8 +17,13 @@ class Config(object):
     @type use_lxml: bool
     @cvar use_lxml: Controls whether lxml.etree should be imported instead of
     etree. lxml is required for XPath expressions with conditions.
+    @type trace: bool
+    @cvar trace: Controls whether policy evaluation logs a DEBUG level trace of
+    each target, rule and policy evaluated.  Off by default so that the
+    evaluation path makes no logging calls, independent of the log level set.
     """
     use_lxml = None
+    trace = False
 
 def importElementTree():
     """Imports ElementTree or the lxml ElementTree API depending on the
@@ -0,0 +1,16 @@
+"""NDG XACML benchmark package - measures policy parsing, PDP construction,
+decision latency, batch throughput and memory use for the policy corpora
+bundled with the tests and for synthetic policies scaled to large numbers of
+rules and request attributes.  Run with
+
+python -m ndg.xacml.bench --help
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
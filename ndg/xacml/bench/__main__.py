@@ -0,0 +1,18 @@
+"""NDG XACML benchmark command line entry point
+
+python -m ndg.xacml.bench --help
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+from ndg.xacml.bench.runner import main
+
+
+if __name__ == "__main__":
+    main()
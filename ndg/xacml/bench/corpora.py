@@ -0,0 +1,324 @@
+"""NDG XACML benchmark policy corpora and the requests made against them
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import os
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml.core import Identifiers
+from ndg.xacml.core.attribute import Attribute
+from ndg.xacml.core.attributevalue import (AttributeValue,
+                                           AttributeValueClassFactory)
+from ndg.xacml.core.attributedesignator import SubjectAttributeDesignator
+from ndg.xacml.core.policybase import PolicyBase
+from ndg.xacml.core.targetindex import TargetIndex
+from ndg.xacml.core.functions.v1.equal import EqualBase
+from ndg.xacml.core.functions.v1.regexp_match import RegexpMatchBase
+from ndg.xacml.core.context.environment import Environment
+from ndg.xacml.core.context.request import Request
+from ndg.xacml.core.context.subject import Subject
+from ndg.xacml.core.context.resource import Resource
+from ndg.xacml.core.context.action import Action
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+from ndg.xacml.finder.defaultfinder import getDefaultPolicyFinder
+
+
+class RequestFactory(object):
+    """Create request contexts from attribute values
+
+    @cvar SUBJECT_ID_ATTRIBUTE_ID: attribute ID for the subject identifier
+    @type SUBJECT_ID_ATTRIBUTE_ID: string
+    @cvar SUBJECT_ID: subject identifier set in each request
+    @type SUBJECT_ID: string
+    @cvar DEFAULT_ACTION: action for requests where none is given
+    @type DEFAULT_ACTION: string
+    """
+    SUBJECT_ID_ATTRIBUTE_ID = Identifiers.Subject.SUBJECT_ID
+    SUBJECT_ID = 'https://benchmark.user.somewhere.ac.uk'
+    DEFAULT_ACTION = 'read'
+
+    attributeValueClassFactory = AttributeValueClassFactory()
+
+    @classmethod
+    def createAttribute(cls, attributeId, dataType, value):
+        """Create a request attribute with a single value
+
+        @param attributeId: attribute ID
+        @type attributeId: string
+        @param dataType: attribute data type URI
+        @type dataType: string
+        @param value: attribute value
+        @type value: any supported by the data type
+        @return: attribute
+        @rtype: ndg.xacml.core.attribute.Attribute
+        """
+        attribute = Attribute()
+        attribute.attributeId = attributeId
+        attribute.dataType = dataType
+        attribute.attributeValues.append(
+                        cls.attributeValueClassFactory(dataType)(value))
+        return attribute
+
+    @classmethod
+    def createRequest(cls, resourceId, subjectAttributes=(),
+                      action=DEFAULT_ACTION):
+        """Create a request context
+
+        @param resourceId: resource ID
+        @type resourceId: string
+        @param subjectAttributes: tuples of attribute ID, data type and value
+        for the attributes of the subject
+        @type subjectAttributes: iterable
+        @param action: action ID
+        @type action: string
+        @return: request context
+        @rtype: ndg.xacml.core.context.request.Request
+        """
+        request = Request()
+
+        subject = Subject()
+        subject.attributes.append(cls.createAttribute(
+                                            cls.SUBJECT_ID_ATTRIBUTE_ID,
+                                            AttributeValue.STRING_TYPE_URI,
+                                            cls.SUBJECT_ID))
+        for attributeId, dataType, value in subjectAttributes:
+            subject.attributes.append(cls.createAttribute(attributeId,
+                                                          dataType,
+                                                          value))
+        request.subjects.append(subject)
+
+        resource = Resource()
+        resource.attributes.append(cls.createAttribute(
+                                            Identifiers.Resource.RESOURCE_ID,
+                                            AttributeValue.ANY_TYPE_URI,
+                                            resourceId))
+        request.resources.append(resource)
+
+        request.action = Action()
+        request.action.attributes.append(cls.createAttribute(
+                                            Identifiers.Action.ACTION_ID,
+                                            AttributeValue.STRING_TYPE_URI,
+                                            action))
+        request.environment = Environment()
+
+        return request
+
+
+class Corpus(object):
+    """Policy corpus to benchmark - a policy or policy set document and the
+    requests to make against it
+
+    @ivar __name: name of the corpus
+    @type __name: string
+    @ivar __filePath: path of the root policy or policy set document
+    @type __filePath: string / NoneType
+    """
+    __slots__ = ('__name', '__filePath')
+
+    def __init__(self, name, filePath=None):
+        """@param name: name of the corpus
+        @type name: string
+        @param filePath: path of the root policy or policy set document
+        @type filePath: string
+        """
+        self.__name = name
+        self.__filePath = filePath
+
+    @property
+    def name(self):
+        """@return: name of the corpus
+        @rtype: string
+        """
+        return self.__name
+
+    @property
+    def filePath(self):
+        """@return: path of the root policy or policy set document
+        @rtype: string / NoneType
+        """
+        return self.__filePath
+
+    @filePath.setter
+    def filePath(self, value):
+        """@param value: path of the root policy or policy set document
+        @type value: string
+        @raise TypeError: incorrect input type
+        """
+        if not isinstance(value, str):
+            raise TypeError('Expecting %r type for "filePath"; got %r' %
+                            (str, type(value)))
+        self.__filePath = value
+
+    def getParameters(self):
+        """@return: parameters describing the corpus to record with results
+        @rtype: dict
+        """
+        return {'filePath': self.__filePath}
+
+    def prepare(self):
+        """Prepare the corpus documents before loading.  Derived classes
+        generating documents override this.
+        """
+
+    def cleanup(self):
+        """Remove anything created by prepare"""
+
+    def loadPolicy(self):
+        """Parse the corpus documents
+
+        @return: root policy or policy set
+        @rtype: ndg.xacml.core.policybase.PolicyBase
+        """
+        return PolicyBase.fromSource(self.__filePath, ReaderFactory,
+                                     getDefaultPolicyFinder(self.__filePath))
+
+    def createRequests(self, policy, nRequests):
+        """Create requests for the policy from the values of the resource ID
+        and subject equal and regular expression matches it contains.
+        Regular expressions are converted to resource IDs from their literal
+        prefixes.  Requests cycle through the combinations of resource IDs and
+        subject attributes so that both permitted and denied requests are
+        made.
+
+        @param policy: policy or policy set loaded from the corpus
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        @param nRequests: number of requests to create
+        @type nRequests: int
+        @return: request contexts
+        @rtype: list
+        """
+        resourceIds = ['http://localhost/']
+        subjectAttributes = [()]
+        actions = [RequestFactory.DEFAULT_ACTION]
+        for match in self.getMatches(policy):
+            designator = match.attributeDesignator
+            if designator is None or match.attributeValue is None:
+                continue
+
+            value = match.attributeValue.value
+            if not isinstance(value, str):
+                continue
+
+            if designator.attributeId == Identifiers.Resource.RESOURCE_ID:
+                if isinstance(match.function, RegexpMatchBase):
+                    prefixes = TargetIndex.getRegexpPrefixes(value)
+                    if prefixes is not None:
+                        resourceIds.append(prefixes[0] + 'benchmark/data.nc')
+
+                elif isinstance(match.function, EqualBase):
+                    resourceIds.append(value)
+
+            elif designator.attributeId == Identifiers.Action.ACTION_ID:
+                actions.append(value)
+
+            elif (isinstance(match.function, EqualBase) and
+                  isinstance(designator, SubjectAttributeDesignator)):
+                subjectAttributes.append(((designator.attributeId,
+                                           designator.dataType,
+                                           value),))
+
+        resourceIds = sorted(set(resourceIds))
+        subjectAttributes = sorted(set(subjectAttributes))
+        actions = sorted(set(actions))
+
+        requests = []
+        nResourceIds = len(resourceIds)
+        for i in range(nRequests):
+            # Step through the subject attributes and actions at different
+            # rates so that different combinations are made
+            j = i // nResourceIds
+            requests.append(RequestFactory.createRequest(
+                            resourceIds[i % nResourceIds],
+                            subjectAttributes=subjectAttributes[
+                                                j % len(subjectAttributes)],
+                            action=actions[(j // len(subjectAttributes)) %
+                                           len(actions)]))
+        return requests
+
+    @classmethod
+    def getMatches(cls, policy):
+        """Get all the target matches in a policy or policy set
+
+        @param policy: policy or policy set
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        @return: matches
+        @rtype: generator
+        """
+        targets = [policy.target]
+        if hasattr(policy, 'policies'):
+            for childPolicy in policy.policies:
+                for match in cls.getMatches(childPolicy):
+                    yield match
+        else:
+            targets.extend([rule.target for rule in policy.rules])
+
+        for target in targets:
+            if target is None:
+                continue
+
+            for attrName in target.CHILD_ATTRS:
+                for targetChild in getattr(target, attrName):
+                    for match in targetChild.matches:
+                        yield match
+
+
+class EsgfCorpus(Corpus):
+    """ESGF policy corpus.  The policy uses the custom group/role attribute
+    value type and functions defined in the test package which are
+    registered by prepare.
+    """
+    __slots__ = ()
+
+    def prepare(self):
+        """Register the group/role attribute value type, its reader and
+        functions"""
+        from ndg.xacml.core.functions import functionMap
+        from ndg.xacml.parsers.etree.attributevaluereader import \
+                                                    DataTypeReaderClassFactory
+        from ndg.xacml.test import (GroupRoleAttributeValue, GroupRoleBag,
+                                    GroupRoleAtLeastOneMemberOf,
+                                    ETreeGroupRoleDataTypeReader)
+
+        AttributeValueClassFactory.addClass(
+                                        GroupRoleAttributeValue.IDENTIFIER,
+                                        GroupRoleAttributeValue)
+        DataTypeReaderClassFactory.addReader(
+                                        GroupRoleAttributeValue.IDENTIFIER,
+                                        ETreeGroupRoleDataTypeReader)
+        functionMap['urn:grouprole-bag'] = GroupRoleBag
+        functionMap['urn:grouprole-at-least-one-member-of'
+                    ] = GroupRoleAtLeastOneMemberOf
+
+
+def _getTestFilePath(*args):
+    """@return: path of a file within the test package
+    @rtype: string
+    """
+    from ndg.xacml.test import THIS_DIR
+    return os.path.join(THIS_DIR, *args)
+
+
+def getBundledCorpora():
+    """Get the realistic policy corpora bundled with the test package
+
+    @return: corpora keyed by name
+    @rtype: dict
+    """
+    return dict([(name, corpusClass(name, _getTestFilePath(*filePath)))
+                 for name, corpusClass, filePath in (
+        ('cmip5_policyset', Corpus, ('cmip5_policyset',
+                                     'cmip5-policyset.xml')),
+        ('faam_policyset', Corpus, ('faam_policyset',
+                                    'policy_faam_policyset.xml')),
+        ('eo_policyset', Corpus, ('eo_policyset', 'eo_policyset.xml')),
+        ('policy_cmip5', Corpus, ('policy_cmip5.xml',)),
+        ('esgf1', EsgfCorpus, ('esgf1.xml',))
+    )])
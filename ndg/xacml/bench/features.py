@@ -0,0 +1,357 @@
+"""NDG XACML feature benchmarks - compare timings with PDP features switched
+off and on for the bundled policy corpora.  Run with
+
+python -m ndg.xacml.bench.features --help
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml import Config
+from ndg.xacml.core.context.pdp import PDP
+from ndg.xacml.core.snapshot import PolicySnapshotError
+from ndg.xacml.bench.corpora import getBundledCorpora
+
+
+class FeatureBenchmark(object):
+    """Base class for benchmarks comparing timings with a PDP feature
+    switched off and on.  Derived classes set NAME and COLUMNS and implement
+    runCorpus.
+
+    @cvar NAME: name of the benchmark on the command line
+    @type NAME: string
+    @cvar COLUMNS: tuples of result key, column heading and scale factor
+    for each column of the results table
+    @type COLUMNS: tuple
+    @cvar DEFAULT_N_REQUESTS: default number of requests to make for each
+    corpus
+    @type DEFAULT_N_REQUESTS: int
+    @cvar DEFAULT_N_REPEATS: default number of times to repeat timings
+    @type DEFAULT_N_REPEATS: int
+
+    @ivar __nRequests: number of requests to make for each corpus
+    @type __nRequests: int
+    @ivar __nRepeats: number of times to repeat timings, the fastest is
+    taken
+    @type __nRepeats: int
+    """
+    NAME = None
+    COLUMNS = ()
+    DEFAULT_N_REQUESTS = 100
+    DEFAULT_N_REPEATS = 5
+
+    __slots__ = ('__nRequests', '__nRepeats')
+
+    def __init__(self, nRequests=DEFAULT_N_REQUESTS,
+                 nRepeats=DEFAULT_N_REPEATS):
+        """@param nRequests: number of requests to make for each corpus
+        @type nRequests: int
+        @param nRepeats: number of times to repeat timings, the fastest is
+        taken
+        @type nRepeats: int
+        @raise ValueError: invalid input value
+        """
+        for name, value in (('nRequests', nRequests),
+                            ('nRepeats', nRepeats)):
+            if not isinstance(value, int):
+                raise TypeError('Expecting %r type for "%s"; got %r' %
+                                (int, name, type(value)))
+            if value < 1:
+                raise ValueError('Expecting "%s" of at least 1; got %r' %
+                                 (name, value))
+
+        self.__nRequests = nRequests
+        self.__nRepeats = nRepeats
+
+    @property
+    def nRequests(self):
+        """@return: number of requests to make for each corpus
+        @rtype: int
+        """
+        return self.__nRequests
+
+    @property
+    def nRepeats(self):
+        """@return: number of times to repeat timings
+        @rtype: int
+        """
+        return self.__nRepeats
+
+    def timeMin(self, func):
+        """Time a function taking the fastest of the repeats
+
+        @param func: function to time, called with no arguments
+        @type func: callable
+        @return: time in seconds
+        @rtype: float
+        """
+        elapsed = []
+        for i in range(self.__nRepeats):
+            startTime = time.perf_counter()
+            func()
+            elapsed.append(time.perf_counter() - startTime)
+
+        return min(elapsed)
+
+    def timeDecisions(self, pdp, requests):
+        """Time decisions for requests
+
+        @param pdp: PDP making the decisions
+        @type pdp: ndg.xacml.core.context.pdp.PDP
+        @param requests: requests to make
+        @type requests: list
+        @return: time per decision in seconds
+        @rtype: float
+        """
+        def evaluate():
+            for request in requests:
+                pdp.evaluate(request)
+
+        return self.timeMin(evaluate) / len(requests)
+
+    def run(self, corpora):
+        """Run the benchmark for each corpus
+
+        @param corpora: corpora to benchmark
+        @type corpora: iterable
+        @return: results for each corpus
+        @rtype: list
+        """
+        results = []
+        for corpus in corpora:
+            log.info('Benchmarking %s for corpus %r', self.__class__.NAME,
+                     corpus.name)
+            corpus.prepare()
+            try:
+                result = {'corpus': corpus.name}
+                result.update(self.runCorpus(corpus))
+            finally:
+                corpus.cleanup()
+
+            results.append(result)
+
+        return results
+
+    def runCorpus(self, corpus):
+        """Run the benchmark for a corpus which has been prepared
+
+        @param corpus: corpus to benchmark
+        @type corpus: ndg.xacml.bench.corpora.Corpus
+        @return: results keyed by the keys in COLUMNS
+        @rtype: dict
+        """
+        raise NotImplementedError()
+
+    @classmethod
+    def formatResults(cls, results):
+        """Format results as a table
+
+        @param results: results returned by run
+        @type results: list
+        @return: table
+        @rtype: string
+        """
+        columns = cls.COLUMNS
+        header = '%-20s' % 'Corpus' + ''.join([' %16s' % heading
+                                              for key, heading, scale
+                                              in columns])
+        lines = [header, '-'*len(header)]
+        for result in results:
+            values = []
+            for key, heading, scale in columns:
+                value = result.get(key)
+                values.append(' %16s' % ('-' if value is None
+                                         else '%.2f' % (value*scale)))
+            lines.append('%-20s' % result['corpus'] + ''.join(values))
+
+        return '\n'.join(lines)
+
+
+class ShortCircuitMatchingBenchmark(FeatureBenchmark):
+    """Time decisions with and without short circuit target matching - see
+    ndg.xacml.core.context.pdp.PDP.shortCircuitMatching
+    """
+    NAME = 'short-circuit'
+    COLUMNS = (
+        ('time', 'Time/us', 1e6),
+        ('shortCircuitTime', 'SC time/us', 1e6)
+    )
+
+    __slots__ = ()
+
+    def runCorpus(self, corpus):
+        """Time decisions for a corpus with and without short circuit
+        matching
+
+        @param corpus: corpus to benchmark
+        @type corpus: ndg.xacml.bench.corpora.Corpus
+        @return: time per decision in seconds without and with short circuit
+        matching
+        @rtype: dict
+        """
+        policy = corpus.loadPolicy()
+        requests = corpus.createRequests(policy, self.nRequests)
+        return {
+            'time': self.timeDecisions(PDP(policy=policy), requests),
+            'shortCircuitTime': self.timeDecisions(
+                            PDP(policy=policy, shortCircuitMatching=True),
+                            requests)
+        }
+
+
+class EvaluationTraceBenchmark(FeatureBenchmark):
+    """Time decisions with the evaluation trace switched off and with it
+    switched on but filtered out by the log level - see 
+    ndg.xacml.Config.trace
+
+    @cvar LOGGER_NAME: name of the logger the trace is written to
+    @type LOGGER_NAME: string
+    """
+    NAME = 'trace'
+    COLUMNS = (
+        ('time', 'Time/us', 1e6),
+        ('traceTime', 'Trace time/us', 1e6)
+    )
+    LOGGER_NAME = 'ndg.xacml.core'
+
+    __slots__ = ()
+
+    def runCorpus(self, corpus):
+        """Time decisions for a corpus with the trace switched off and on
+
+        @param corpus: corpus to benchmark
+        @type corpus: ndg.xacml.bench.corpora.Corpus
+        @return: time per decision in seconds with the trace switched off 
+        and on
+        @rtype: dict
+        """
+        policy = corpus.loadPolicy()
+        requests = corpus.createRequests(policy, self.nRequests)
+        pdp = PDP(policy=policy)
+
+        logger = logging.getLogger(self.__class__.LOGGER_NAME)
+        savedLevel = logger.level
+        savedTrace = Config.trace
+        logger.setLevel(logging.INFO)
+        try:
+            result = {}
+            for trace, key in ((False, 'time'), (True, 'traceTime')):
+                Config.trace = trace
+                result[key] = self.timeDecisions(pdp, requests)
+        finally:
+            Config.trace = savedTrace
+            logger.setLevel(savedLevel)
+
+        return result
+
+
+class SnapshotLoadBenchmark(FeatureBenchmark):
+    """Time creating a PDP from the policy XML and from a policy snapshot - 
+    see ndg.xacml.core.context.pdp.PDP.fromSnapshot.  Snapshot results are
+    omitted for corpora with policies which can't be saved in a snapshot.
+    """
+    NAME = 'snapshot'
+    COLUMNS = (
+        ('loadTime', 'XML load/ms', 1e3),
+        ('snapshotLoadTime', 'Snapshot load/ms', 1e3),
+        ('snapshotSize', 'Snapshot/KiB', 1/1024.)
+    )
+
+    __slots__ = ()
+
+    def runCorpus(self, corpus):
+        """Time loading a corpus from XML and from a snapshot
+
+        @param corpus: corpus to benchmark
+        @type corpus: ndg.xacml.bench.corpora.Corpus
+        @return: load time in seconds from XML and from the snapshot and the
+        snapshot size in bytes
+        @rtype: dict
+        """
+        result = {
+            'loadTime': self.timeMin(lambda: PDP(policy=corpus.loadPolicy()))
+        }
+        tmpDir = tempfile.mkdtemp()
+        try:
+            filePath = os.path.join(tmpDir, 'policy.snapshot')
+            try:
+                PDP(policy=corpus.loadPolicy()).saveSnapshot(filePath)
+            except PolicySnapshotError as e:
+                log.info('No snapshot for corpus %r: %s', corpus.name, e)
+                return result
+
+            result['snapshotLoadTime'] = self.timeMin(
+                                            lambda: PDP.fromSnapshot(filePath))
+            result['snapshotSize'] = os.path.getsize(filePath)
+        finally:
+            shutil.rmtree(tmpDir)
+
+        return result
+
+
+FEATURE_BENCHMARKS = dict([(benchmarkClass.NAME, benchmarkClass)
+                           for benchmarkClass in (
+                                ShortCircuitMatchingBenchmark,
+                                EvaluationTraceBenchmark,
+                                SnapshotLoadBenchmark
+                           )])
+
+
+def main(args=sys.argv[1:]):
+    """Run a feature benchmark from the command line
+
+    @param args: command line arguments
+    @type args: list
+    @return: results for each corpus
+    @rtype: list
+    """
+    bundledCorpora = getBundledCorpora()
+    parser = argparse.ArgumentParser(
+        prog='python -m ndg.xacml.bench.features',
+        description='Compare timings with PDP features switched off and on '
+                    'for the bundled policy corpora')
+    parser.add_argument('feature', choices=sorted(FEATURE_BENCHMARKS.keys()),
+                        help='feature to benchmark')
+    parser.add_argument('-c', '--corpus', action='append',
+                        choices=sorted(bundledCorpora.keys()),
+                        help='bundled corpus to benchmark - may be repeated.  '
+                             'Defaults to all of them')
+    parser.add_argument('-n', '--requests', type=int,
+                        default=FeatureBenchmark.DEFAULT_N_REQUESTS,
+                        help='number of requests to make for each corpus '
+                             '(default: %(default)s)')
+    parser.add_argument('--repeat', type=int,
+                        default=FeatureBenchmark.DEFAULT_N_REPEATS,
+                        help='number of times to repeat timings taking the '
+                             'fastest (default: %(default)s)')
+    options = parser.parse_args(args)
+
+    corpusNames = options.corpus or sorted(bundledCorpora.keys())
+    benchmarkClass = FEATURE_BENCHMARKS[options.feature]
+    try:
+        benchmark = benchmarkClass(nRequests=options.requests,
+                                   nRepeats=options.repeat)
+    except ValueError as e:
+        parser.error(str(e))
+
+    results = benchmark.run([bundledCorpora[name] for name in corpusNames])
+    print(benchmarkClass.formatResults(results))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,602 @@
+"""NDG XACML synthetic policy and request generator for scaling studies
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import re
+import random
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml.core import Identifiers
+from ndg.xacml.core.attributevalue import (AttributeValue,
+                                           AttributeValueClassFactory)
+from ndg.xacml.core.attributedesignator import (SubjectAttributeDesignator,
+                                                ResourceAttributeDesignator)
+from ndg.xacml.core.policy import Policy
+from ndg.xacml.core.policyset import PolicySet
+from ndg.xacml.core.target import Target
+from ndg.xacml.core.resource import Resource, ResourceMatch
+from ndg.xacml.core.subject import Subject, SubjectMatch
+from ndg.xacml.core.rule import Rule, Effect
+from ndg.xacml.core.condition import Condition
+from ndg.xacml.core.apply import Apply
+from ndg.xacml.parsers.etree.writer import PolicyWriter
+from ndg.xacml.bench.corpora import RequestFactory
+
+
+class PolicyGenerator(object):
+    """Generate policy trees and streams of requests against them through
+    the policy object API.  The tree is a hierarchy of policy sets of the
+    given depth and fan-out with policies at the leaves.  Each policy set and
+    policy has a target restricting it to the resources beneath its part of
+    the resource ID hierarchy.  Rules are spread across the policies: each
+    permits access to a dataset for subjects with given roles and is one of
+    the kinds of FUNCTION_KINDS, chosen at random in the proportions given:
+
+     - equal: anyURI-equal resource match on a dataset file and string-equal
+     subject role match
+     - regexp: anyURI-regexp-match resource match on a dataset and
+     string-equal subject role match
+     - at-least-one-member-of: anyURI-regexp-match resource match on a
+     dataset and a condition that the subject has at least one of a bag of
+     roles
+
+    Each policy ends with a rule denying access to anything not permitted.
+    Policy sets and policies combine with permit-overrides so that a request
+    permitted by any rule is permitted.
+
+    Requests are hits - permitted by a rule - or misses in the proportion
+    set.  Misses are for the resources of rules but subjects with roles no
+    rule grants.  Policies and request streams are deterministic for a given
+    seed.
+
+    @cvar FUNCTION_KINDS: kinds of rule which may be generated
+    @type FUNCTION_KINDS: tuple
+    @cvar DEFAULT_FUNCTION_MIX: default proportions of each kind of rule
+    @type DEFAULT_FUNCTION_MIX: dict
+    @cvar RULES_PER_ROLE: number of rules for each role granted
+    @type RULES_PER_ROLE: int
+    @cvar BASE_RESOURCE_ID: resource ID for the root of the generated tree
+    @type BASE_RESOURCE_ID: string
+    @cvar ID_PREFIX: prefix for policy set, policy and rule IDs
+    @type ID_PREFIX: string
+    @cvar ROLE_ATTRIBUTE_ID: attribute ID for subject roles
+    @type ROLE_ATTRIBUTE_ID: string
+    @cvar ROLE_TMPL: template for the roles granted by rules
+    @type ROLE_TMPL: string
+    @cvar UNASSIGNED_ROLE_TMPL: template for roles which no rule grants
+    @type UNASSIGNED_ROLE_TMPL: string
+    @cvar POLICY_COMBINING_ALG_ID: policy combining algorithm for generated
+    policy sets
+    @type POLICY_COMBINING_ALG_ID: string
+    @cvar RULE_COMBINING_ALG_ID: rule combining algorithm for generated
+    policies
+    @type RULE_COMBINING_ALG_ID: string
+    @cvar FUNCTION_NS_PREFIXES: function URN prefixes
+    @type FUNCTION_NS_PREFIXES: tuple
+
+    @ivar __nRules: number of rules
+    @type __nRules: int
+    @ivar __depth: number of levels of policy sets above the policies
+    @type __depth: int
+    @ivar __fanOut: number of children of each policy set
+    @type __fanOut: int
+    @ivar __functionMix: relative proportions of each kind of rule
+    @type __functionMix: dict
+    @ivar __attributeCardinality: number of roles in each request and in
+    each bag of roles in rule conditions
+    @type __attributeCardinality: int
+    @ivar __hitFraction: fraction of requests permitted by a rule
+    @type __hitFraction: float
+    @ivar __seed: seed for random choices
+    @type __seed: int
+    @ivar __ruleSpecs: kind, policy index and roles for each rule
+    @type __ruleSpecs: tuple / NoneType
+    """
+    FUNCTION_KINDS = ('equal', 'regexp', 'at-least-one-member-of')
+    DEFAULT_FUNCTION_MIX = {
+        'equal': 0.2,
+        'regexp': 0.6,
+        'at-least-one-member-of': 0.2
+    }
+    RULES_PER_ROLE = 10
+    BASE_RESOURCE_ID = 'http://localhost/generated/'
+    ID_PREFIX = 'urn:ndg:xacml:bench:generated:'
+    ROLE_ATTRIBUTE_ID = 'urn:ndg:security:authz:1.0:attr'
+    ROLE_TMPL = 'role%d'
+    UNASSIGNED_ROLE_TMPL = 'unassigned-role%d'
+    POLICY_COMBINING_ALG_ID = ('urn:oasis:names:tc:xacml:1.0:'
+                               'policy-combining-algorithm:permit-overrides')
+    RULE_COMBINING_ALG_ID = ('urn:oasis:names:tc:xacml:1.0:'
+                             'rule-combining-algorithm:permit-overrides')
+    FUNCTION_NS_PREFIXES = ('urn:oasis:names:tc:xacml:1.0:function:',
+                            'urn:oasis:names:tc:xacml:2.0:function:')
+
+    attributeValueClassFactory = AttributeValueClassFactory()
+
+    __slots__ = (
+        '__nRules',
+        '__depth',
+        '__fanOut',
+        '__functionMix',
+        '__attributeCardinality',
+        '__hitFraction',
+        '__seed',
+        '__ruleSpecs'
+    )
+
+    def __init__(self, nRules, depth=0, fanOut=2, functionMix=None,
+                 attributeCardinality=1, hitFraction=0.5, seed=0):
+        """@param nRules: number of rules
+        @type nRules: int
+        @param depth: number of levels of policy sets above the policies.  If
+        zero the root is a policy.
+        @type depth: int
+        @param fanOut: number of children of each policy set
+        @type fanOut: int
+        @param functionMix: relative proportions of each kind of rule keyed
+        by the names in FUNCTION_KINDS.  Defaults to DEFAULT_FUNCTION_MIX
+        @type functionMix: dict / NoneType
+        @param attributeCardinality: number of roles in each request and in
+        each bag of roles in rule conditions
+        @type attributeCardinality: int
+        @param hitFraction: fraction of requests permitted by a rule
+        @type hitFraction: float
+        @param seed: seed for random choices
+        @type seed: int
+        @raise TypeError: incorrect input type
+        @raise ValueError: invalid input value
+        """
+        for name, value, minValue in (('nRules', nRules, 1),
+                                      ('depth', depth, 0),
+                                      ('fanOut', fanOut, 1),
+                                      ('attributeCardinality',
+                                       attributeCardinality, 1)):
+            if not isinstance(value, int):
+                raise TypeError('Expecting %r type for "%s"; got %r' %
+                                (int, name, type(value)))
+            if value < minValue:
+                raise ValueError('Expecting "%s" of at least %d; got %r' %
+                                 (name, minValue, value))
+
+        if not 0. <= hitFraction <= 1.:
+            raise ValueError('Expecting "hitFraction" between 0 and 1; got '
+                             '%r' % hitFraction)
+
+        if functionMix is None:
+            functionMix = self.__class__.DEFAULT_FUNCTION_MIX
+
+        for kind, weight in functionMix.items():
+            if kind not in self.__class__.FUNCTION_KINDS:
+                raise ValueError('Expecting "functionMix" kinds from %r; got '
+                                 '%r' % (self.__class__.FUNCTION_KINDS, kind))
+            if weight < 0.:
+                raise ValueError('Expecting "functionMix" weights of at '
+                                 'least zero; got %r for %r' % (weight, kind))
+
+        if sum(functionMix.values()) <= 0.:
+            raise ValueError('Expecting a "functionMix" weight greater than '
+                             'zero')
+
+        self.__nRules = nRules
+        self.__depth = depth
+        self.__fanOut = fanOut
+        self.__functionMix = dict(functionMix)
+        self.__attributeCardinality = attributeCardinality
+        self.__hitFraction = float(hitFraction)
+        self.__seed = seed
+        self.__ruleSpecs = None
+
+    @classmethod
+    def parseFunctionMix(cls, text):
+        """Parse function mix proportions from a string of the form
+        equal=1,regexp=3,at-least-one-member-of=1
+
+        @param text: function mix
+        @type text: string
+        @return: relative proportions of each kind of rule
+        @rtype: dict
+        @raise ValueError: invalid format
+        """
+        functionMix = {}
+        for item in text.split(','):
+            kind, sep, weight = item.partition('=')
+            if not sep:
+                raise ValueError('Expecting function mix items of the form '
+                                 '<kind>=<weight>; got %r' % item)
+            functionMix[kind.strip()] = float(weight)
+
+        return functionMix
+
+    @property
+    def nRules(self):
+        """@return: number of rules
+        @rtype: int
+        """
+        return self.__nRules
+
+    @property
+    def depth(self):
+        """@return: number of levels of policy sets above the policies
+        @rtype: int
+        """
+        return self.__depth
+
+    @property
+    def fanOut(self):
+        """@return: number of children of each policy set
+        @rtype: int
+        """
+        return self.__fanOut
+
+    @property
+    def functionMix(self):
+        """@return: relative proportions of each kind of rule
+        @rtype: dict
+        """
+        return dict(self.__functionMix)
+
+    @property
+    def attributeCardinality(self):
+        """@return: number of roles in each request and in each bag of roles
+        in rule conditions
+        @rtype: int
+        """
+        return self.__attributeCardinality
+
+    @property
+    def hitFraction(self):
+        """@return: fraction of requests permitted by a rule
+        @rtype: float
+        """
+        return self.__hitFraction
+
+    @property
+    def seed(self):
+        """@return: seed for random choices
+        @rtype: int
+        """
+        return self.__seed
+
+    @property
+    def nPolicies(self):
+        """@return: number of policies at the leaves of the tree
+        @rtype: int
+        """
+        return self.__fanOut**self.__depth
+
+    @property
+    def nRoles(self):
+        """@return: number of distinct roles granted by rules
+        @rtype: int
+        """
+        return max(1, self.__nRules // self.__class__.RULES_PER_ROLE)
+
+    def getParameters(self):
+        """@return: generation parameters to record with results
+        @rtype: dict
+        """
+        return {
+            'nRules': self.__nRules,
+            'depth': self.__depth,
+            'fanOut': self.__fanOut,
+            'functionMix': self.functionMix,
+            'attributeCardinality': self.__attributeCardinality,
+            'hitFraction': self.__hitFraction,
+            'seed': self.__seed
+        }
+
+    def _getRuleSpecs(self):
+        """Choose the kind, policy and roles for each rule
+
+        @return: tuples of rule kind, index of the policy containing the rule
+        and the indices of the roles it grants
+        @rtype: tuple
+        """
+        if self.__ruleSpecs is not None:
+            return self.__ruleSpecs
+
+        rand = random.Random(self.__seed)
+        kinds = [kind for kind in self.__class__.FUNCTION_KINDS
+                 if self.__functionMix.get(kind, 0.) > 0.]
+        weights = [self.__functionMix[kind] for kind in kinds]
+        nPolicies = self.nPolicies
+        nRoles = self.nRoles
+        nBagRoles = min(self.__attributeCardinality, nRoles)
+
+        ruleSpecs = []
+        for i in range(self.__nRules):
+            kind = rand.choices(kinds, weights=weights)[0]
+            if kind == 'at-least-one-member-of':
+                roles = tuple(rand.sample(range(nRoles), nBagRoles))
+            else:
+                roles = (rand.randrange(nRoles),)
+
+            ruleSpecs.append((kind, i % nPolicies, roles))
+
+        self.__ruleSpecs = tuple(ruleSpecs)
+        return self.__ruleSpecs
+
+    def _getPath(self, indices):
+        """@return: resource ID path for a node given the indices of it and
+        its ancestors within their parents
+        @rtype: string
+        """
+        return ''.join(['n%d/' % i for i in indices])
+
+    def _getPolicyPath(self, policyIndex):
+        """@return: resource ID path of a policy given its index among the
+        policies at the leaves of the tree
+        @rtype: string
+        """
+        indices = []
+        for level in range(self.__depth):
+            policyIndex, i = divmod(policyIndex, self.__fanOut)
+            indices.insert(0, i)
+        return self._getPath(indices)
+
+    def _getDatasetResourceId(self, ruleIndex):
+        """@return: resource ID of the dataset a rule applies to
+        @rtype: string
+        """
+        kind, policyIndex, roles = self._getRuleSpecs()[ruleIndex]
+        return '%s%sdataset%d/' % (self.__class__.BASE_RESOURCE_ID,
+                                   self._getPolicyPath(policyIndex),
+                                   ruleIndex)
+
+    def _getFunctionId(self, name):
+        """@return: function URN for a function name
+        @rtype: string
+        """
+        # XACML 2.0 functions include the regular expression matches on
+        # anyURI
+        if name.startswith('anyURI-regexp'):
+            return self.__class__.FUNCTION_NS_PREFIXES[1] + name
+        return self.__class__.FUNCTION_NS_PREFIXES[0] + name
+
+    def _createAttributeValue(self, dataType, value):
+        return self.__class__.attributeValueClassFactory(dataType)(value)
+
+    def _createMatch(self, matchClass, designatorClass, functionName,
+                     attributeId, dataType, value):
+        """Create a target match
+
+        @return: match
+        @rtype: ndg.xacml.core.match.MatchBase
+        """
+        match = matchClass()
+        match.matchId = self._getFunctionId(functionName)
+        match.attributeValue = self._createAttributeValue(dataType, value)
+        match.attributeDesignator = designatorClass()
+        match.attributeDesignator.attributeId = attributeId
+        match.attributeDesignator.dataType = dataType
+        return match
+
+    def _createResourceTarget(self, resourceIdPrefix):
+        """Create a target for the resources with IDs starting with a prefix
+
+        @param resourceIdPrefix: resource ID prefix
+        @type resourceIdPrefix: string
+        @return: target
+        @rtype: ndg.xacml.core.target.Target
+        """
+        target = Target()
+        resource = Resource()
+        resource.matches.append(self._createMatch(
+                                    ResourceMatch,
+                                    ResourceAttributeDesignator,
+                                    'anyURI-regexp-match',
+                                    Identifiers.Resource.RESOURCE_ID,
+                                    AttributeValue.ANY_TYPE_URI,
+                                    '^' + re.escape(resourceIdPrefix)))
+        target.resources.append(resource)
+        return target
+
+    def _createRule(self, ruleIndex):
+        """Create a rule
+
+        @param ruleIndex: index of the rule
+        @type ruleIndex: int
+        @return: rule
+        @rtype: ndg.xacml.core.rule.Rule
+        """
+        cls = self.__class__
+        kind, policyIndex, roles = self._getRuleSpecs()[ruleIndex]
+        datasetResourceId = self._getDatasetResourceId(ruleIndex)
+
+        rule = Rule()
+        rule.id = '%srule%d' % (cls.ID_PREFIX, ruleIndex)
+        rule.effect = Effect.PERMIT
+
+        if kind == 'equal':
+            rule.target = Target()
+            resource = Resource()
+            resource.matches.append(self._createMatch(
+                                    ResourceMatch,
+                                    ResourceAttributeDesignator,
+                                    'anyURI-equal',
+                                    Identifiers.Resource.RESOURCE_ID,
+                                    AttributeValue.ANY_TYPE_URI,
+                                    datasetResourceId + 'data.nc'))
+            rule.target.resources.append(resource)
+        else:
+            rule.target = self._createResourceTarget(datasetResourceId)
+
+        if kind == 'at-least-one-member-of':
+            designator = SubjectAttributeDesignator()
+            designator.attributeId = cls.ROLE_ATTRIBUTE_ID
+            designator.dataType = AttributeValue.STRING_TYPE_URI
+
+            roleBag = Apply()
+            roleBag.functionId = self._getFunctionId('string-bag')
+            roleBag.expressions.extend([
+                    self._createAttributeValue(AttributeValue.STRING_TYPE_URI,
+                                               cls.ROLE_TMPL % role)
+                    for role in roles])
+
+            atLeastOneMemberOf = Apply()
+            atLeastOneMemberOf.functionId = self._getFunctionId(
+                                            'string-at-least-one-member-of')
+            atLeastOneMemberOf.expressions.append(designator)
+            atLeastOneMemberOf.expressions.append(roleBag)
+
+            rule.condition = Condition()
+            rule.condition.expression = atLeastOneMemberOf
+        else:
+            subject = Subject()
+            subject.matches.append(self._createMatch(
+                                    SubjectMatch,
+                                    SubjectAttributeDesignator,
+                                    'string-equal',
+                                    cls.ROLE_ATTRIBUTE_ID,
+                                    AttributeValue.STRING_TYPE_URI,
+                                    cls.ROLE_TMPL % roles[0]))
+            rule.target.subjects.append(subject)
+
+        return rule
+
+    def _createPolicy(self, policyIndex, ruleIndices):
+        """Create a policy
+
+        @param policyIndex: index of the policy among the leaves of the tree
+        @type policyIndex: int
+        @param ruleIndices: indices of the rules in the policy
+        @type ruleIndices: list
+        @return: policy
+        @rtype: ndg.xacml.core.policy.Policy
+        """
+        cls = self.__class__
+        path = self._getPolicyPath(policyIndex)
+
+        policy = Policy()
+        policy.policyId = '%spolicy:%s' % (cls.ID_PREFIX,
+                                           path.rstrip('/') or 'root')
+        policy.ruleCombiningAlgId = cls.RULE_COMBINING_ALG_ID
+        policy.target = self._createResourceTarget(cls.BASE_RESOURCE_ID +
+                                                   path)
+        for ruleIndex in ruleIndices:
+            policy.rules.append(self._createRule(ruleIndex))
+
+        # Deny anything not permitted
+        rule = Rule()
+        rule.id = '%sdeny-rule:%s' % (cls.ID_PREFIX, path.rstrip('/') or
+                                      'root')
+        rule.effect = Effect.DENY
+        policy.rules.append(rule)
+
+        return policy
+
+    def _createNode(self, indices, policyRuleIndices):
+        """Create a policy set or, at the leaves of the tree, a policy
+
+        @param indices: indices of the node and its ancestors within their
+        parents
+        @type indices: list
+        @param policyRuleIndices: rule indices for each policy
+        @type policyRuleIndices: list
+        @return: policy set or policy
+        @rtype: ndg.xacml.core.policybase.PolicyBase
+        """
+        cls = self.__class__
+        if len(indices) == self.__depth:
+            policyIndex = 0
+            for i in indices:
+                policyIndex = policyIndex*self.__fanOut + i
+            return self._createPolicy(policyIndex,
+                                      policyRuleIndices[policyIndex])
+
+        path = self._getPath(indices)
+        policySet = PolicySet()
+        policySet.policySetId = '%spolicyset:%s' % (cls.ID_PREFIX,
+                                                    path.rstrip('/') or 'root')
+        policySet.policyCombiningAlgId = cls.POLICY_COMBINING_ALG_ID
+        policySet.target = self._createResourceTarget(cls.BASE_RESOURCE_ID +
+                                                      path)
+        for i in range(self.__fanOut):
+            policySet.policies.append(self._createNode(indices + [i],
+                                                       policyRuleIndices))
+        return policySet
+
+    def createPolicy(self):
+        """Generate the policy tree
+
+        @return: root policy set or, if the depth is zero, policy
+        @rtype: ndg.xacml.core.policybase.PolicyBase
+        """
+        policyRuleIndices = [[] for i in range(self.nPolicies)]
+        for ruleIndex, (kind, policyIndex, roles) in enumerate(
+                                                        self._getRuleSpecs()):
+            policyRuleIndices[policyIndex].append(ruleIndex)
+
+        return self._createNode([], policyRuleIndices)
+
+    def write(self, dest):
+        """Generate the policy tree and write it as an XML document
+
+        @param dest: file path or binary stream to write to
+        @type dest: string / file like object
+        """
+        PolicyWriter.write(self.createPolicy(), dest)
+
+    def iterRequests(self, nRequests):
+        """Generate a stream of requests.  The stream is the same for each
+        call.
+
+        @param nRequests: number of requests
+        @type nRequests: int
+        @return: generator of tuples of request context and a flag set to
+        True if the request is permitted by a rule
+        @rtype: generator
+        """
+        cls = self.__class__
+        rand = random.Random(self.__seed + 1)
+        ruleSpecs = self._getRuleSpecs()
+        nRoles = self.nRoles
+        cardinality = self.__attributeCardinality
+
+        for i in range(nRequests):
+            ruleIndex = rand.randrange(len(ruleSpecs))
+            kind, policyIndex, roles = ruleSpecs[ruleIndex]
+
+            resourceId = self._getDatasetResourceId(ruleIndex)
+            if kind == 'equal':
+                resourceId += 'data.nc'
+            else:
+                resourceId += 'file%d.nc' % rand.randrange(1000)
+
+            isHit = rand.random() < self.__hitFraction
+            if isHit:
+                # One of the roles granted by the rule plus others at random
+                subjectRoles = [cls.ROLE_TMPL % rand.choice(roles)] + [
+                                cls.ROLE_TMPL % rand.randrange(nRoles)
+                                for j in range(cardinality - 1)]
+                rand.shuffle(subjectRoles)
+            else:
+                subjectRoles = [cls.UNASSIGNED_ROLE_TMPL % rand.randrange(
+                                                                    nRoles)
+                                for j in range(cardinality)]
+
+            request = RequestFactory.createRequest(
+                            resourceId,
+                            subjectAttributes=[(cls.ROLE_ATTRIBUTE_ID,
+                                                AttributeValue.STRING_TYPE_URI,
+                                                role)
+                                               for role in subjectRoles])
+            yield request, isHit
+
+    def createRequests(self, nRequests):
+        """Generate a list of requests
+
+        @param nRequests: number of requests
+        @type nRequests: int
+        @return: request contexts
+        @rtype: list
+        """
+        return [request for request, isHit in self.iterRequests(nRequests)]
@@ -0,0 +1,433 @@
+"""NDG XACML benchmark runner - times policy loading and decisions for each
+corpus and reports the results as a table or JSON document
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import argparse
+import gc
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml.core.context.pdp import PDP, CompiledPDP
+from ndg.xacml.bench.corpora import getBundledCorpora
+from ndg.xacml.bench.synthetic import SyntheticCorpus
+from ndg.xacml.bench.generator import PolicyGenerator
+
+
+class BenchmarkRunner(object):
+    """Run benchmarks for policy corpora.  For each corpus the following are
+    measured:
+
+     - parse time: time to read the policy documents - the minimum over a
+     number of repeats
+     - construction time: time to create each type of PDP from the parsed
+     policy
+     - decision latency: percentiles of the time for individual decisions
+     - batch throughput: decisions per second evaluating requests in batches
+     - peak memory: peak memory allocated loading the policy, creating the PDP
+     and making a batch of decisions, measured in a separate pass as tracing
+     allocations slows evaluation
+
+    @cvar FORMAT_VERSION: version of the results document format
+    @type FORMAT_VERSION: int
+    @cvar PDP_CLASSES: PDP classes to benchmark
+    @type PDP_CLASSES: tuple
+    @cvar PERCENTILES: latency percentiles to report
+    @type PERCENTILES: tuple
+    @cvar DEFAULT_N_DECISIONS: default number of decisions to time
+    @type DEFAULT_N_DECISIONS: int
+    @cvar DEFAULT_BATCH_SIZE: default number of requests in each batch
+    @type DEFAULT_BATCH_SIZE: int
+    @cvar DEFAULT_N_REPEATS: default number of times to parse each corpus
+    @type DEFAULT_N_REPEATS: int
+    @cvar DEFAULT_N_WARMUP: default number of decisions made before timing
+    @type DEFAULT_N_WARMUP: int
+
+    @ivar __nDecisions: number of decisions to time for each PDP
+    @type __nDecisions: int
+    @ivar __batchSize: number of requests in each batch
+    @type __batchSize: int
+    @ivar __nRepeats: number of times to parse each corpus
+    @type __nRepeats: int
+    @ivar __nWarmup: number of decisions made before timing
+    @type __nWarmup: int
+    @ivar __measureMemory: set to False to skip the peak memory measurement
+    @type __measureMemory: bool
+    """
+    FORMAT_VERSION = 1
+    PDP_CLASSES = (PDP, CompiledPDP)
+    PERCENTILES = (50, 90, 99)
+    DEFAULT_N_DECISIONS = 1000
+    DEFAULT_BATCH_SIZE = 100
+    DEFAULT_N_REPEATS = 3
+    DEFAULT_N_WARMUP = 10
+
+    __slots__ = (
+        '__nDecisions',
+        '__batchSize',
+        '__nRepeats',
+        '__nWarmup',
+        '__measureMemory'
+    )
+
+    def __init__(self,
+                 nDecisions=DEFAULT_N_DECISIONS,
+                 batchSize=DEFAULT_BATCH_SIZE,
+                 nRepeats=DEFAULT_N_REPEATS,
+                 nWarmup=DEFAULT_N_WARMUP,
+                 measureMemory=True):
+        """@param nDecisions: number of decisions to time for each PDP
+        @type nDecisions: int
+        @param batchSize: number of requests in each batch
+        @type batchSize: int
+        @param nRepeats: number of times to parse each corpus
+        @type nRepeats: int
+        @param nWarmup: number of decisions made before timing
+        @type nWarmup: int
+        @param measureMemory: set to False to skip the peak memory
+        measurement
+        @type measureMemory: bool
+        @raise ValueError: invalid input value
+        """
+        for name, value, minValue in (('nDecisions', nDecisions, 1),
+                                      ('batchSize', batchSize, 1),
+                                      ('nRepeats', nRepeats, 1),
+                                      ('nWarmup', nWarmup, 0)):
+            if not isinstance(value, int):
+                raise TypeError('Expecting %r type for "%s"; got %r' %
+                                (int, name, type(value)))
+            if value < minValue:
+                raise ValueError('Expecting "%s" of at least %d; got %r' %
+                                 (name, minValue, value))
+
+        self.__nDecisions = nDecisions
+        self.__batchSize = batchSize
+        self.__nRepeats = nRepeats
+        self.__nWarmup = nWarmup
+        self.__measureMemory = bool(measureMemory)
+
+    def getParameters(self):
+        """@return: benchmark parameters to record with results
+        @rtype: dict
+        """
+        return {
+            'nDecisions': self.__nDecisions,
+            'batchSize': self.__batchSize,
+            'nRepeats': self.__nRepeats,
+            'nWarmup': self.__nWarmup
+        }
+
+    @staticmethod
+    def getPercentile(sortedValues, percentile):
+        """Get a percentile using the nearest rank method
+
+        @param sortedValues: values in ascending order
+        @type sortedValues: list
+        @param percentile: percentile between 0 and 100
+        @type percentile: int / float
+        @return: value at the percentile
+        @rtype: float
+        """
+        rank = int(math.ceil(percentile/100. * len(sortedValues)))
+        return sortedValues[max(rank, 1) - 1]
+
+    def run(self, corpora):
+        """Run the benchmarks for each corpus
+
+        @param corpora: corpora to benchmark
+        @type corpora: iterable
+        @return: results document with an entry in its results list for each
+        corpus and PDP class
+        @rtype: dict
+        """
+        results = []
+        for corpus in corpora:
+            log.info('Benchmarking corpus %r', corpus.name)
+            results.extend(self.runCorpus(corpus))
+
+        return {
+            'formatVersion': self.__class__.FORMAT_VERSION,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'parameters': self.getParameters(),
+            'results': results
+        }
+
+    def runCorpus(self, corpus):
+        """Run the benchmarks for a corpus
+
+        @param corpus: corpus to benchmark
+        @type corpus: ndg.xacml.bench.corpora.Corpus
+        @return: results for each PDP class
+        @rtype: list
+        """
+        corpus.prepare()
+        try:
+            parseTimes = []
+            for i in range(self.__nRepeats):
+                startTime = time.perf_counter()
+                policy = corpus.loadPolicy()
+                parseTimes.append(time.perf_counter() - startTime)
+
+            requests = corpus.createRequests(policy, self.__nDecisions)
+
+            results = []
+            for pdpClass in self.__class__.PDP_CLASSES:
+                result = {
+                    'corpus': corpus.name,
+                    'corpusParameters': corpus.getParameters(),
+                    'pdp': pdpClass.__name__,
+                    'parseTime': min(parseTimes)
+                }
+                result.update(self._timeDecisions(pdpClass, policy,
+                                                  requests))
+                if self.__measureMemory:
+                    result['peakMemory'] = self._measurePeakMemory(
+                                                        corpus, pdpClass,
+                                                        requests)
+                results.append(result)
+
+            return results
+        finally:
+            corpus.cleanup()
+
+    def _timeDecisions(self, pdpClass, policy, requests):
+        """Time PDP construction and decisions
+
+        @param pdpClass: PDP class
+        @type pdpClass: type
+        @param policy: policy or policy set
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        @param requests: requests to make
+        @type requests: list
+        @return: results
+        @rtype: dict
+        """
+        startTime = time.perf_counter()
+        pdp = pdpClass(policy=policy)
+        constructionTime = time.perf_counter() - startTime
+
+        for request in requests[:self.__nWarmup]:
+            pdp.evaluate(request)
+
+        latencies = []
+        decisionCounts = {}
+        gcEnabled = gc.isenabled()
+        gc.disable()
+        try:
+            for request in requests:
+                startTime = time.perf_counter()
+                response = pdp.evaluate(request)
+                latencies.append(time.perf_counter() - startTime)
+
+                decision = str(response.results[0].decision)
+                decisionCounts[decision] = decisionCounts.get(decision, 0) + 1
+
+            batchSize = self.__batchSize
+            startTime = time.perf_counter()
+            for i in range(0, len(requests), batchSize):
+                pdp.evaluateMany(requests[i:i + batchSize])
+            batchTime = time.perf_counter() - startTime
+        finally:
+            if gcEnabled:
+                gc.enable()
+
+        latencies.sort()
+        latency = dict([('p%d' % percentile,
+                         self.getPercentile(latencies, percentile))
+                        for percentile in self.__class__.PERCENTILES])
+        latency['mean'] = sum(latencies)/len(latencies)
+        latency['max'] = latencies[-1]
+
+        return {
+            'constructionTime': constructionTime,
+            'latency': latency,
+            'throughput': len(requests)/batchTime if batchTime > 0 else None,
+            'decisions': decisionCounts
+        }
+
+    def _measurePeakMemory(self, corpus, pdpClass, requests):
+        """Measure the peak memory allocated loading the policy, creating the
+        PDP and making a batch of decisions
+
+        @param corpus: corpus
+        @type corpus: ndg.xacml.bench.corpora.Corpus
+        @param pdpClass: PDP class
+        @type pdpClass: type
+        @param requests: requests to make
+        @type requests: list
+        @return: peak memory allocated in bytes
+        @rtype: int
+        """
+        gc.collect()
+        wasTracing = tracemalloc.is_tracing()
+        if wasTracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            pdp = pdpClass(policy=corpus.loadPolicy())
+            pdp.evaluateMany(requests[:self.__batchSize])
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            if not wasTracing:
+                tracemalloc.stop()
+
+        return peak - baseline
+
+    @staticmethod
+    def formatResults(resultsDoc):
+        """Format results as a table
+
+        @param resultsDoc: results document returned by run
+        @type resultsDoc: dict
+        @return: table
+        @rtype: string
+        """
+        header = ('%-36s %-12s %10s %10s %10s %10s %10s %12s %10s' %
+                  ('Corpus', 'PDP', 'Parse/ms', 'Build/ms', 'p50/us',
+                   'p90/us', 'p99/us', 'Decisions/s', 'Peak/KiB'))
+        lines = [header, '-'*len(header)]
+        for result in resultsDoc['results']:
+            latency = result['latency']
+            throughput = result['throughput']
+            peakMemory = result.get('peakMemory')
+            lines.append('%-36s %-12s %10.2f %10.2f %10.1f %10.1f %10.1f '
+                         '%12s %10s' % (
+                result['corpus'],
+                result['pdp'],
+                result['parseTime']*1e3,
+                result['constructionTime']*1e3,
+                latency['p50']*1e6,
+                latency['p90']*1e6,
+                latency['p99']*1e6,
+                '-' if throughput is None else '%.0f' % throughput,
+                '-' if peakMemory is None else '%.0f' % (peakMemory/1024.)))
+
+        return '\n'.join(lines)
+
+
+def main(args=sys.argv[1:]):
+    """Run benchmarks from the command line
+
+    @param args: command line arguments
+    @type args: list
+    @return: results document
+    @rtype: dict
+    """
+    bundledCorpora = getBundledCorpora()
+    parser = argparse.ArgumentParser(
+        prog='python -m ndg.xacml.bench',
+        description='Benchmark policy parsing, PDP construction, decision '
+                    'latency, batch throughput and peak memory for the '
+                    'bundled policy corpora and synthetic policies')
+    parser.add_argument('-c', '--corpus', action='append',
+                        choices=sorted(bundledCorpora.keys()),
+                        help='bundled corpus to benchmark - may be repeated.  '
+                             'Defaults to all of them unless synthetic '
+                             'corpora are set')
+    parser.add_argument('-r', '--synthetic-rules', type=int, action='append',
+                        default=[], metavar='N',
+                        help='benchmark a synthetic policy with N rules - '
+                             'may be repeated e.g. -r 100 -r 10000')
+    parser.add_argument('-a', '--synthetic-attributes', type=int, default=10,
+                        metavar='N',
+                        help='number of subject attributes in synthetic '
+                             'requests (default: %(default)s)')
+    parser.add_argument('--depth', type=int, metavar='N',
+                        help='levels of policy sets above the policies in '
+                             'synthetic policies (default: 0 - a single '
+                             'policy)')
+    parser.add_argument('--fan-out', type=int, metavar='N',
+                        help='number of children of each policy set in '
+                             'synthetic policies (default: 2)')
+    parser.add_argument('--function-mix', metavar='MIX',
+                        type=PolicyGenerator.parseFunctionMix,
+                        help='proportions of each kind of rule in synthetic '
+                             'policies e.g. equal=1,regexp=3,'
+                             'at-least-one-member-of=1 (default: regexp=1)')
+    parser.add_argument('--hit-fraction', type=float, metavar='F',
+                        help='fraction of synthetic requests permitted by a '
+                             'rule (default: %s)' %
+                             (1. - SyntheticCorpus.MISS_FRACTION))
+    parser.add_argument('-s', '--seed', type=int, default=0,
+                        help='seed for synthetic policies and requests '
+                             '(default: %(default)s)')
+    parser.add_argument('-n', '--decisions', type=int,
+                        default=BenchmarkRunner.DEFAULT_N_DECISIONS,
+                        help='number of decisions to time (default: '
+                             '%(default)s)')
+    parser.add_argument('-b', '--batch-size', type=int,
+                        default=BenchmarkRunner.DEFAULT_BATCH_SIZE,
+                        help='number of requests in each batch (default: '
+                             '%(default)s)')
+    parser.add_argument('--repeat', type=int,
+                        default=BenchmarkRunner.DEFAULT_N_REPEATS,
+                        help='number of times to parse each corpus taking '
+                             'the fastest (default: %(default)s)')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip the peak memory measurement')
+    parser.add_argument('-o', '--json', metavar='FILE',
+                        help='write results as JSON to FILE or - for '
+                             'standard output')
+    options = parser.parse_args(args)
+
+    corpora = []
+    corpusNames = options.corpus
+    if corpusNames is None and len(options.synthetic_rules) == 0:
+        corpusNames = sorted(bundledCorpora.keys())
+
+    for name in corpusNames or ():
+        corpora.append(bundledCorpora[name])
+
+    generatorKw = {}
+    for name, keyword in (('depth', 'depth'),
+                          ('fan_out', 'fanOut'),
+                          ('function_mix', 'functionMix'),
+                          ('hit_fraction', 'hitFraction')):
+        value = getattr(options, name)
+        if value is not None:
+            generatorKw[keyword] = value
+
+    try:
+        for nRules in options.synthetic_rules:
+            corpora.append(SyntheticCorpus(
+                                    nRules,
+                                    nAttributes=options.synthetic_attributes,
+                                    seed=options.seed,
+                                    **generatorKw))
+
+        runner = BenchmarkRunner(nDecisions=options.decisions,
+                                 batchSize=options.batch_size,
+                                 nRepeats=options.repeat,
+                                 measureMemory=not options.no_memory)
+        resultsDoc = runner.run(corpora)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if options.json == '-':
+        json.dump(resultsDoc, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    else:
+        print(BenchmarkRunner.formatResults(resultsDoc))
+        if options.json is not None:
+            with open(options.json, 'w') as jsonFile:
+                json.dump(resultsDoc, jsonFile, indent=2, sort_keys=True)
+
+    return resultsDoc
@@ -0,0 +1,158 @@
+"""NDG XACML benchmark synthetic corpora - policies scaled to large numbers of
+rules and requests scaled to large numbers of subject attributes
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import os
+import shutil
+import tempfile
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml.bench.corpora import Corpus
+from ndg.xacml.bench.generator import PolicyGenerator
+
+
+class SyntheticCorpus(Corpus):
+    """Corpus of a generated policy with a given number of rules.  Each rule
+    permits access to a dataset for subjects with one of the roles.  Requests
+    have a given number of subject attributes and are for datasets chosen at
+    random, some of which subjects have no role granting access to.
+    Generation is by a PolicyGenerator and is deterministic for a given seed.
+
+    The policy is written to a temporary file by prepare so that the time to
+    parse it can be measured in the same way as for the bundled corpora.
+
+    @cvar DEFAULT_FUNCTION_MIX: default proportions of each kind of rule.
+    Rules match resources by regular expression unless set otherwise.
+    @type DEFAULT_FUNCTION_MIX: dict
+    @cvar MISS_FRACTION: fraction of requests which no rule permits
+    @type MISS_FRACTION: float
+
+    @ivar __nAttributes: number of subject attributes in each request
+    @type __nAttributes: int
+    @ivar __generator: generator for the policy and requests
+    @type __generator: ndg.xacml.bench.generator.PolicyGenerator
+    @ivar __tmpDir: temporary directory holding the generated policy file
+    @type __tmpDir: string / NoneType
+    """
+    DEFAULT_FUNCTION_MIX = {'regexp': 1.}
+    MISS_FRACTION = 0.2
+
+    __slots__ = ('__nAttributes', '__generator', '__tmpDir')
+
+    def __init__(self, nRules, nAttributes=1, seed=0, name=None,
+                 **generatorKw):
+        """@param nRules: number of rules in the generated policy
+        @type nRules: int
+        @param nAttributes: number of subject attributes in each request
+        @type nAttributes: int
+        @param seed: seed for random choices
+        @type seed: int
+        @param name: name of the corpus.  Defaults to one derived from the
+        number of rules and attributes
+        @type name: string
+        @param generatorKw: further PolicyGenerator keywords setting the
+        depth, fan-out, function mix or hit fraction
+        @type generatorKw: dict
+        @raise ValueError: invalid number of rules or attributes
+        """
+        if nRules < 1:
+            raise ValueError('Expecting "nRules" greater than zero; got %r' %
+                             nRules)
+        if nAttributes < 1:
+            raise ValueError('Expecting "nAttributes" greater than zero; got '
+                             '%r' % nAttributes)
+
+        if name is None:
+            name = 'synthetic-%drules-%dattrs' % (nRules, nAttributes)
+
+        generatorKw.setdefault('functionMix',
+                               self.__class__.DEFAULT_FUNCTION_MIX)
+        generatorKw.setdefault('hitFraction',
+                               1. - self.__class__.MISS_FRACTION)
+
+        super(SyntheticCorpus, self).__init__(name)
+        self.__nAttributes = nAttributes
+        self.__generator = PolicyGenerator(nRules,
+                                           attributeCardinality=nAttributes,
+                                           seed=seed,
+                                           **generatorKw)
+        self.__tmpDir = None
+
+    @property
+    def nRules(self):
+        """@return: number of rules in the generated policy
+        @rtype: int
+        """
+        return self.__generator.nRules
+
+    @property
+    def nAttributes(self):
+        """@return: number of subject attributes in each request
+        @rtype: int
+        """
+        return self.__nAttributes
+
+    @property
+    def nRoles(self):
+        """@return: number of distinct roles in the generated policy
+        @rtype: int
+        """
+        return self.__generator.nRoles
+
+    @property
+    def generator(self):
+        """@return: generator for the policy and requests
+        @rtype: ndg.xacml.bench.generator.PolicyGenerator
+        """
+        return self.__generator
+
+    def getParameters(self):
+        """@return: parameters describing the corpus to record with results
+        @rtype: dict
+        """
+        parameters = self.__generator.getParameters()
+        parameters['nAttributes'] = parameters.pop('attributeCardinality')
+        return parameters
+
+    def prepare(self):
+        """Generate the policy and write it to a temporary file"""
+        self.cleanup()
+        self.__tmpDir = tempfile.mkdtemp(prefix='ndg-xacml-bench-')
+        self.filePath = os.path.join(self.__tmpDir, 'synthetic-policy.xml')
+        self.__generator.write(self.filePath)
+
+    def cleanup(self):
+        """Remove the generated policy file"""
+        if self.__tmpDir is not None:
+            shutil.rmtree(self.__tmpDir, ignore_errors=True)
+            self.__tmpDir = None
+
+    def createPolicy(self):
+        """Generate the policy
+
+        @return: root policy set or, for a depth of zero, policy
+        @rtype: ndg.xacml.core.policybase.PolicyBase
+        """
+        return self.__generator.createPolicy()
+
+    def createRequests(self, policy, nRequests):
+        """Generate requests for datasets chosen at random.  Each request has
+        the number of subject role attributes set for the corpus.
+
+        @param policy: policy loaded from the corpus
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        @param nRequests: number of requests to create
+        @type nRequests: int
+        @return: request contexts
+        @rtype: list
+        """
+        return self.__generator.createRequests(nRequests)
@@ -14,6 +14,7 @@ from ndg.xacml.core.expression import Expression
 from ndg.xacml.core.functions import (FunctionMap, functionMap,
                                       UnsupportedStdFunctionError,
                                       UnsupportedFunctionError)
+from ndg.xacml.core.functions.v1.regexp_match import RegexpMatchBase
 
 
 class Apply(Expression):
@@ -36,6 +37,10 @@ class Apply(Expression):
     @type __loadFunctionFromId: bool
     @ivar __expressions: list of expressions contained in the Apply statement
     @type __expressions: ndg.xacml.utils.TypedList
+    @ivar __compiledPattern: constant attribute value pattern expression, its
+    value and the regular expression compiled from it when the function is a
+    regular expression match function
+    @type __compiledPattern: tuple / NoneType
     """
     ELEMENT_LOCAL_NAME = 'Apply'
     FUNCTION_ID_ATTRIB_NAME = 'FunctionId'
@@ -45,7 +50,8 @@ class Apply(Expression):
         '__function', 
         '__functionMap',
         '__loadFunctionFromId',
-        '__expressions'
+        '__expressions',
+        '__compiledPattern'
     )
     
     def __init__(self):
@@ -56,6 +62,7 @@ class Apply(Expression):
         self.__functionMap = functionMap
         self.__loadFunctionFromId = True
         self.__expressions = TypedList(Expression)
+        self.__compiledPattern = None
       
     @property
     def loadFunctionFromId(self):
@@ -140,6 +147,9 @@ class Apply(Expression):
                                            self.functionId) 
             
         self.__function = functionClass()
+        
+        # Any pattern compiled for the previous function no longer applies
+        self.compilePattern()
     
     @property
     def functionMap(self):
@@ -181,6 +191,21 @@ class Apply(Expression):
         """
         return self.__expressions 
     
+    def compilePattern(self):
+        """Compile the pattern for a regular expression match function in 
+        advance of evaluation where it is given by a constant attribute value.
+        Readers call this once the expressions have been read.  Call it again
+        if the expressions are replaced.  It is called automatically when the
+        function is set.
+        """
+        self.__compiledPattern = None
+        if (isinstance(self.__function, RegexpMatchBase) and 
+            len(self.__expressions) == 2):
+            pat = self.__expressions[0]
+            compiledRegex = self.__function.compilePattern(pat)
+            if compiledRegex is not None:
+                self.__compiledPattern = (pat, pat.value, compiledRegex)
+    
     def evaluate(self, context):
         """Evaluate a given <Apply> statement in a rule condition
         
@@ -191,6 +216,19 @@ class Apply(Expression):
         @rtype: AttributeValue/NoneType
         """ 
         
+        compiledPattern = self.__compiledPattern
+        if compiledPattern is not None:
+            pat, pattern, compiledRegex = compiledPattern
+            expressions = self.__expressions
+            
+            # Check the pattern hasn't been changed since it was compiled
+            if (len(expressions) == 2 and 
+                expressions[0] is pat and 
+                pat.value is pattern):
+                return self.__function.evaluateCompiled(
+                                        compiledRegex,
+                                        expressions[1].evaluate(context))
+            
         # Marshal inputs
         funcInputs = [None]*len(self.expressions)
 
@@ -9,12 +9,13 @@ __contact__ = "Philip.Kershaw@stfc.ac.uk"
 __license__ = "BSD - see LICENSE file in top-level directory"
 __contact__ = "Philip.Kershaw@stfc.ac.uk"
 __revision__ = "$Id$"
-from ndg.xacml.utils import TypedList
+from ndg.xacml.utils import (TypedList, ChangeCountedTypedList, 
+                             ChangeCountedInterface)
 from ndg.xacml.core import XacmlCoreBase
 from ndg.xacml.core.attributevalue import AttributeValue
 
 
-class Attribute(XacmlCoreBase):
+class Attribute(XacmlCoreBase, ChangeCountedInterface):
     """XACML Attribute type
     
     @cvar ELEMENT_LOCAL_NAME: XML local name for this element
@@ -30,13 +31,16 @@ class Attribute(XacmlCoreBase):
     @type ISSUER_ATTRIB_NAME: string
     
     @ivar __attributeValues: list of attribute values 
-    @type __attributeValues: ndg.xacml.utils.TypedList
+    @type __attributeValues: ndg.xacml.utils.ChangeCountedTypedList
     @ivar __dataType: data type for this attribute
     @type __dataType: basestring / NoneType
     @ivar __attributeId: identifier for attribute
     @type __attributeId: basestring / NoneType
     @ivar __issuer: issuer id of this attribute
     @type __issuer: basestring / NoneType
+    @ivar __changeCounter: counter of the request context this attribute 
+    belongs to for recording changes
+    @type __changeCounter: ndg.xacml.utils.ChangeCounter / NoneType
     """
     ELEMENT_LOCAL_NAME = 'Attribute'
     ATTRIBUTE_VALUE_ELEMENT_LOCAL_NAME = 'AttributeValue'
@@ -44,27 +48,45 @@ class Attribute(XacmlCoreBase):
     ATTRIBUTE_ID_ATTRIB_NAME = 'AttributeId'
     ISSUER_ATTRIB_NAME = 'Issuer'
     
-    __slots__ = ('__attributeValues', '__dataType', '__attributeId', '__issuer')
+    __slots__ = ('__attributeValues', '__dataType', '__attributeId', '__issuer',
+                 '__changeCounter')
     
     def __init__(self):
         super(Attribute, self).__init__()
-        self.__attributeValues = TypedList(AttributeValue)
+        self.__attributeValues = ChangeCountedTypedList(AttributeValue)
         self.__dataType = None
         self.__attributeId = None
         self.__issuer = None
+        self.__changeCounter = None
+
+    def _setChangeCounter(self, changeCounter):
+        """Set the counter to record changes to this attribute and its values
+        in
+
+        @param changeCounter: counter or None to stop recording changes
+        @type changeCounter: ndg.xacml.utils.ChangeCounter / NoneType
+        """
+        self.__changeCounter = changeCounter
+        self.__attributeValues.changeCounter = changeCounter
+
+    def _changed(self):
+        """Record a change in the change counter if one is set"""
+        if self.__changeCounter is not None:
+            self.__changeCounter.increment()
 
     @property
     def attributeValues(self):
         """Get attribute values
         
         @return: list of attribute values
-        @rtype: ndg.xacml.utils.TypedList
+        @rtype: ndg.xacml.utils.ChangeCountedTypedList
         """
         return self.__attributeValues
      
     @attributeValues.setter
     def attributeValues(self, value):
-        """Set attribute values
+        """Set attribute values.  A TypedList is copied into a 
+        ChangeCountedTypedList so that changes to the values are tracked.
         
         @param value: list of attribute values 
         @type value: ndg.xacml.utils.TypedList
@@ -73,8 +95,13 @@ class Attribute(XacmlCoreBase):
         if not isinstance(value, TypedList):
             raise TypeError('Expecting %r type for "attributeValues" '
                             'attribute; got %r' % (TypedList, type(value)))
+        
+        if not isinstance(value, ChangeCountedTypedList):
+            value = ChangeCountedTypedList(value.elementType, value)
             
+        value.changeCounter = self.__changeCounter
         self.__attributeValues = value
+        self._changed()
                    
     def _get_dataType(self):
         """Get data type
@@ -93,7 +120,8 @@ class Attribute(XacmlCoreBase):
             raise TypeError('Expecting %r type for "dataType" '
                             'attribute; got %r' % (str, type(value)))
             
-        self.__dataType = value   
+        self.__dataType = value
+        self._changed()
 
     dataType = property(_get_dataType, _set_dataType, None, 
                         "Attribute data type") 
@@ -117,7 +145,8 @@ class Attribute(XacmlCoreBase):
             raise TypeError('Expecting %r type for "attributeId" '
                             'attribute; got %r' % (str, type(value)))
             
-        self.__attributeId = value  
+        self.__attributeId = value
+        self._changed()
         
     @property
     def issuer(self):
@@ -139,6 +168,7 @@ class Attribute(XacmlCoreBase):
                             'attribute; got %r' % (str, type(value)))
             
         self.__issuer = value
+        self._changed()
 
     def __getstate__(self):
         '''Enable pickling
@@ -12,6 +12,7 @@ __revision__ = "$Id$"
 import logging
 log = logging.getLogger(__name__)
 
+from ndg.xacml import Config
 from ndg.xacml.utils import TypedList
 from ndg.xacml.core.expression import Expression
 from ndg.xacml.core.attributevalue import (AttributeValue, 
@@ -136,6 +137,58 @@ class AttributeDesignator(Expression):
         @rtype: ndg.xacml.core.attributevalue.AttributeValueClassFactory
         """
         return self.__attributeValueFactory 
+
+    def _getIndexedAttributeValueBag(self, context, category):
+        """Get the bag of attribute values matching this designator from the
+        request context attribute index for the given category
+        
+        @param context: the request context
+        @type context: ndg.xacml.core.context.request.Request
+        @param category: request context category to search - subjects,
+        resources, action or environment
+        @type category: basestring
+        @return: attribute values shared with other callers - must not be
+        modified
+        @rtype: ndg.xacml.utils.TypedList
+        """
+        dataType = self.dataType
+        attributeIndex = context.getAttributeIndex(category)
+        return attributeIndex.getAttributeValueBag(
+                                            self.attributeId,
+                                            dataType,
+                                            self.issuer,
+                                            self.attributeValueFactory(dataType))
+        
+    def _checkMustBePresent(self, attributeValueBag):
+        """Check that the bag of attribute values is not empty if the
+        "MustBePresent" flag is set
+        
+        @param attributeValueBag: attribute values for this designator
+        @type attributeValueBag: ndg.xacml.utils.TypedList
+        @raise MissingAttributeError: "MustBePresent" is set and there are no
+        attribute values
+        """
+        if len(attributeValueBag) == 0 and self.mustBePresent:
+            raise MissingAttributeError('"MustBePresent" is set for %r but no '
+                                        'match for attributeId=%r, dataType=%r '
+                                        'and issuer=%r' % 
+                                        (self.__class__.__name__,
+                                         self.attributeId,
+                                         self.dataType,
+                                         self.issuer)) 
+        
+    def mayRaiseError(self, context):
+        """Check whether evaluating this designator for the given request 
+        context may raise an error.  Evaluation may be skipped if its result 
+        is not needed only where this returns False.  Derived classes should
+        override - this implementation returns True.
+        
+        @param context: the request context
+        @type context: ndg.xacml.core.context.request.Request
+        @return: True if an error may be raised
+        @rtype: bool
+        """
+        return True
                            
         
 class SubjectAttributeDesignator(AttributeDesignator):
@@ -159,13 +212,23 @@ class SubjectAttributeDesignator(AttributeDesignator):
             raise TypeError('Expecting %r type for context input; got %r' %
                             (Request, type(context)))
         
+        if Config.trace:
+            log.debug("In SubjectAttributeDesignator for attribute %r", 
+                      self.attributeId)
+        
+        if context.ctxHandler is None:
+            # No Policy Information Point to query: the attribute values are
+            # taken from the request context alone
+            attributeValueBag = self._getIndexedAttributeValueBag(context,
+                                                                  'subjects')
+            self._checkMustBePresent(attributeValueBag)
+            return attributeValueBag
+        
         dataType = self.dataType
         attributeValueBag = TypedList(self.attributeValueFactory(dataType))
         attributeId = self.attributeId
         issuer = self.issuer
         
-        log.debug("In SubjectAttributeDesignator for attribute %r", attributeId)
-        
         if issuer is not None:
             _issuerMatch = lambda _issuer: issuer == _issuer
         else:
@@ -185,14 +248,17 @@ class SubjectAttributeDesignator(AttributeDesignator):
                 # Try querying the Policy Information Point via the Context 
                 # Handler to see if values for the attribute specified in this 
                 # designator can be retrieved externally. If retrieved, they're 
-                # added to the bag.
-                log.debug("Making query to PIP for additional subject "
-                          "attributes to satify match")
+                # added to the bag.  Results are held by the request so that
+                # the query is made once per subject for each request.
+                if Config.trace:
+                    log.debug("Making query to PIP for additional subject "
+                              "attributes to satify match")
                 
-                attributeValues = context.ctxHandler.pipQuery(context, self)
+                attributeValues = context.queryPIP(subject, self)
                 if attributeValues is not None:
-                    log.debug("PIP retrieved additional subject attributes: %r",
-                              attributeValues)
+                    if Config.trace:
+                        log.debug("PIP retrieved additional subject "
+                                  "attributes: %r", attributeValues)
                     
                     # Weed out any duplicates
                     if len(attributeValueBag) > 0:
@@ -204,16 +270,25 @@ class SubjectAttributeDesignator(AttributeDesignator):
                         
                     attributeValueBag.extend(filtAttributeValues)
                     
-        if len(attributeValueBag) == 0 and self.mustBePresent:
-            raise MissingAttributeError('"MustBePresent" is set for %r but no '
-                                        'match for attributeId=%r, dataType=%r '
-                                        'and issuer=%r' % 
-                                        (self.__class__.__name__,
-                                         self.attributeId,
-                                         self.dataType,
-                                         self.issuer)) 
+        self._checkMustBePresent(attributeValueBag)
                         
         return attributeValueBag
+
+    def mayRaiseError(self, context):
+        """Check whether evaluating this designator for the given request 
+        context may raise an error.  This is so if "MustBePresent" is set, if
+        a context handler is set so that the PIP may be queried or if evaluate
+        is overridden in a derived class.
+        
+        @param context: the request context
+        @type context: ndg.xacml.core.context.request.Request
+        @return: True if an error may be raised
+        @rtype: bool
+        """
+        return (type(self).evaluate is not
+                SubjectAttributeDesignator.evaluate or
+                self.mustBePresent or
+                context.ctxHandler is not None)
         
         
 class ResourceAttributeDesignator(AttributeDesignator):
@@ -237,36 +312,25 @@ class ResourceAttributeDesignator(AttributeDesignator):
             raise TypeError('Expecting %r type for context input; got %r' %
                             (Request, type(context)))
         
-        dataType = self.dataType
-        attributeValueBag = TypedList(self.attributeValueFactory(dataType))
-        attributeId = self.attributeId
-        issuer = self.issuer
-        
-        if issuer is not None:
-            _issuerMatch = lambda _issuer: issuer == _issuer
-        else:
-            _issuerMatch = lambda _issuer: True
-        
-        _attributeMatch = lambda attr: (attr.attributeId == attributeId and 
-                                        attr.dataType == dataType and
-                                        _issuerMatch(attr.issuer))
-                    
-        for resource in context.resources:
-            for attr in resource.attributes:
-                if _attributeMatch(attr):
-                    attributeValueBag.extend([i for i in attr.attributeValues
-                                              if i.dataType == dataType])
-                    
-        if len(attributeValueBag) == 0 and self.mustBePresent:
-            raise MissingAttributeError('"MustBePresent" is set for %r but no '
-                                        'match for attributeId=%r, dataType=%r '
-                                        'and issuer=%r' % 
-                                        (self.__class__.__name__,
-                                         self.attributeId,
-                                         self.dataType,
-                                         self.issuer)) 
+        attributeValueBag = self._getIndexedAttributeValueBag(context, 
+                                                              'resources')
+        self._checkMustBePresent(attributeValueBag)
                         
         return attributeValueBag
+
+    def mayRaiseError(self, context):
+        """Check whether evaluating this designator for the given request 
+        context may raise an error.  This is so if "MustBePresent" is set or
+        if evaluate is overridden in a derived class.
+        
+        @param context: the request context
+        @type context: ndg.xacml.core.context.request.Request
+        @return: True if an error may be raised
+        @rtype: bool
+        """
+        return (type(self).evaluate is not
+                ResourceAttributeDesignator.evaluate or
+                self.mustBePresent)
     
         
 class ActionAttributeDesignator(AttributeDesignator):
@@ -290,36 +354,27 @@ class ActionAttributeDesignator(AttributeDesignator):
             raise TypeError('Expecting %r type for context input; got %r' %
                             (Request, type(context)))
         
-        dataType = self.dataType
-        attributeValueBag = TypedList(self.attributeValueFactory(dataType))
-        attributeId = self.attributeId
-        issuer = self.issuer
-        action = context.action
-        
-        if issuer is not None:
-            _issuerMatch = lambda _issuer: issuer == _issuer
-        else:
-            _issuerMatch = lambda _issuer: True
-        
-        _attributeMatch = lambda attr: (attr.attributeId == attributeId and 
-                                        attr.dataType == dataType and
-                                        _issuerMatch(attr.issuer))
-                    
-        for attr in action.attributes:
-            if _attributeMatch(attr):
-                attributeValueBag.extend([i for i in attr.attributeValues
-                                          if i.dataType == dataType])
-                    
-        if len(attributeValueBag) == 0 and self.mustBePresent:
-            raise MissingAttributeError('"MustBePresent" is set for %r but no '
-                                        'match for attributeId=%r, dataType=%r '
-                                        'and issuer=%r' % 
-                                        (self.__class__.__name__,
-                                         self.attributeId,
-                                         self.dataType,
-                                         self.issuer)) 
+        attributeValueBag = self._getIndexedAttributeValueBag(context, 
+                                                              'action')
+        self._checkMustBePresent(attributeValueBag)
                         
-        return attributeValueBag    
+        return attributeValueBag
+
+    def mayRaiseError(self, context):
+        """Check whether evaluating this designator for the given request 
+        context may raise an error.  This is so if "MustBePresent" is set, if
+        the request has no action or if evaluate is overridden in a derived 
+        class.
+        
+        @param context: the request context
+        @type context: ndg.xacml.core.context.request.Request
+        @return: True if an error may be raised
+        @rtype: bool
+        """
+        return (type(self).evaluate is not
+                ActionAttributeDesignator.evaluate or
+                self.mustBePresent or
+                context.action is None)
     
     
 class EnvironmentAttributeDesignator(AttributeDesignator):
@@ -344,33 +399,24 @@ class EnvironmentAttributeDesignator(AttributeDesignator):
             raise TypeError('Expecting %r type for context input; got %r' %
                             (Request, type(context)))
         
-        dataType = self.dataType
-        attributeValueBag = TypedList(self.attributeValueFactory(dataType))
-        attributeId = self.attributeId
-        issuer = self.issuer
-        environment = context.environment
-        
-        if issuer is not None:
-            _issuerMatch = lambda _issuer: issuer == _issuer
-        else:
-            _issuerMatch = lambda _issuer: True   
-        
-        _attributeMatch = lambda attr: (attr.attributeId == attributeId and 
-                                        attr.dataType == dataType and
-                                        _issuerMatch(attr.issuer))
-                 
-        for attr in environment.attributes:
-            if _attributeMatch(attr):
-                attributeValueBag.extend([i for i in attr.attributeValues
-                                          if i.dataType == dataType])
-                    
-        if len(attributeValueBag) == 0 and self.mustBePresent:
-            raise MissingAttributeError('"MustBePresent" is set for %r but no '
-                                        'match for attributeId=%r, dataType=%r '
-                                        'and issuer=%r' % 
-                                        (self.__class__.__name__,
-                                         self.attributeId,
-                                         self.dataType,
-                                         self.issuer)) 
+        attributeValueBag = self._getIndexedAttributeValueBag(context, 
+                                                              'environment')
+        self._checkMustBePresent(attributeValueBag)
                         
-        return attributeValueBag
\ No newline at end of file
+        return attributeValueBag
+
+    def mayRaiseError(self, context):
+        """Check whether evaluating this designator for the given request 
+        context may raise an error.  This is so if "MustBePresent" is set, if
+        the request has no environment or if evaluate is overridden in a 
+        derived class.
+        
+        @param context: the request context
+        @type context: ndg.xacml.core.context.request.Request
+        @return: True if an error may be raised
+        @rtype: bool
+        """
+        return (type(self).evaluate is not
+                EnvironmentAttributeDesignator.evaluate or
+                self.mustBePresent or
+                context.environment is None)
\ No newline at end of file
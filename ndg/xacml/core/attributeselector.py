@@ -12,6 +12,7 @@ __revision__ = "$Id$"
 import logging
 log = logging.getLogger(__name__)
 
+from ndg.xacml import Config
 from ndg.xacml.core.attributevalue import AttributeValueClassFactory
 from ndg.xacml.core.context.exceptions import MissingAttributeError
 from ndg.xacml.core.context.request import Request
@@ -118,7 +119,9 @@ class AttributeSelector(Expression):
             raise TypeError('Expecting %r type for context input; got %r' %
                             (Request, type(context)))
         
-        log.debug("In AttributeSelector for path %r", self.requestContextPath)
+        if Config.trace:
+            log.debug("In AttributeSelector for path %r", 
+                      self.requestContextPath)
 
         if not context.attributeSelector:
             raise ValueError('Attribute selector not set in Request object.')
@@ -0,0 +1,972 @@
+"""NDG XACML policy compiler - converts a parsed policy or policy set into a
+flat plan of closures for faster evaluation
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import time
+import traceback
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml.utils import TypedList
+from ndg.xacml.core.policybase import PolicyBase
+from ndg.xacml.core.policy import Policy
+from ndg.xacml.core.policyset import PolicySet
+from ndg.xacml.core.rule import Rule, Effect
+from ndg.xacml.core.target import Target
+from ndg.xacml.core.match import MatchBase
+from ndg.xacml.core.condition import Condition
+from ndg.xacml.core.apply import Apply
+from ndg.xacml.core.attributevalue import (AttributeValue,
+                                           AttributeValueClassFactory)
+from ndg.xacml.core.attributedesignator import (SubjectAttributeDesignator,
+                                                ResourceAttributeDesignator,
+                                                ActionAttributeDesignator,
+                                                EnvironmentAttributeDesignator)
+from ndg.xacml.core.rule_combining_alg import (DenyOverridesRuleCombiningAlg,
+                                               PermitOverridesRuleCombiningAlg,
+                                               FirstApplicableRuleCombiningAlg)
+from ndg.xacml.core.policy_combining_alg import (
+                                            DenyOverridesPolicyCombiningAlg,
+                                            PermitOverridesPolicyCombiningAlg,
+                                            FirstApplicablePolicyCombiningAlg)
+from ndg.xacml.core.functions.v1.equal import EqualBase
+from ndg.xacml.core.functions.v1.regexp_match import RegexpMatchBase
+from ndg.xacml.core.regexpautomaton import RegexpMatchAutomaton
+from ndg.xacml.core.context.request import Request
+from ndg.xacml.core.context.response import Response
+from ndg.xacml.core.context.result import Result, Decision
+from ndg.xacml.core.context.exceptions import MissingAttributeError
+
+_PERMIT = Decision.PERMIT
+_DENY = Decision.DENY
+_INDETERMINATE = Decision.INDETERMINATE
+_NOT_APPLICABLE = Decision.NOT_APPLICABLE
+
+# Map decision strings to the Decision singletons so that decisions returned
+# by nodes which could not be compiled can be compared by identity
+_DECISIONS = Decision.INSTANCES
+
+
+def _combineRulesDenyOverrides(rules, context):
+    """Compiled form of DenyOverridesRuleCombiningAlg.evaluate
+
+    @param rules: tuples of compiled rule and its effect string
+    @type rules: tuple
+    @param context: request context
+    @type context: ndg.xacml.core.context.request.Request
+    @return: decision
+    @rtype: ndg.xacml.core.context.result.Decision
+    """
+    atLeastOneError = False
+    potentialDeny = False
+    atLeastOnePermit = False
+
+    for evaluateRule, effect in rules:
+        decision = evaluateRule(context)
+        if decision is _DENY:
+            return _DENY
+
+        if decision is _PERMIT:
+            atLeastOnePermit = True
+
+        elif decision is _INDETERMINATE:
+            atLeastOneError = True
+            if effect == Effect.DENY_STR:
+                potentialDeny = True
+
+    if potentialDeny:
+        return _INDETERMINATE
+
+    elif atLeastOnePermit:
+        return _PERMIT
+
+    elif atLeastOneError:
+        return _INDETERMINATE
+    else:
+        return _NOT_APPLICABLE
+
+
+def _combineRulesPermitOverrides(rules, context):
+    """Compiled form of PermitOverridesRuleCombiningAlg.evaluate
+
+    @param rules: tuples of compiled rule and its effect string
+    @type rules: tuple
+    @param context: request context
+    @type context: ndg.xacml.core.context.request.Request
+    @return: decision
+    @rtype: ndg.xacml.core.context.result.Decision
+    """
+    atLeastOneError = False
+    potentialPermit = False
+    atLeastOneDeny = False
+
+    for evaluateRule, effect in rules:
+        decision = evaluateRule(context)
+        if decision is _PERMIT:
+            return _PERMIT
+
+        if decision is _DENY:
+            atLeastOneDeny = True
+
+        elif decision is _INDETERMINATE:
+            atLeastOneError = True
+            if effect == Effect.PERMIT_STR:
+                potentialPermit = True
+
+    if potentialPermit:
+        return _INDETERMINATE
+
+    if atLeastOneDeny:
+        return _DENY
+
+    if atLeastOneError:
+        return _INDETERMINATE
+
+    return _NOT_APPLICABLE
+
+
+def _combineRulesFirstApplicable(rules, context):
+    """Compiled form of FirstApplicableRuleCombiningAlg.evaluate
+
+    @param rules: tuples of compiled rule and its effect string
+    @type rules: tuple
+    @param context: request context
+    @type context: ndg.xacml.core.context.request.Request
+    @return: decision
+    @rtype: ndg.xacml.core.context.result.Decision
+    """
+    for evaluateRule, effect in rules:
+        decision = evaluateRule(context)
+        if decision is not _NOT_APPLICABLE:
+            return decision
+
+    return _NOT_APPLICABLE
+
+
+def _combinePoliciesDenyOverrides(policies, context):
+    """Compiled form of DenyOverridesPolicyCombiningAlg.evaluate
+
+    @param policies: compiled policies and / or policy sets
+    @type policies: tuple
+    @param context: request context
+    @type context: ndg.xacml.core.context.request.Request
+    @return: decision
+    @rtype: ndg.xacml.core.context.result.Decision
+    """
+    atLeastOnePermit = False
+
+    for evaluatePolicy in policies:
+        decision = evaluatePolicy(context)
+        if decision is _DENY or decision is _INDETERMINATE:
+            return _DENY
+
+        if decision is _PERMIT:
+            atLeastOnePermit = True
+
+    if atLeastOnePermit:
+        return _PERMIT
+
+    return _NOT_APPLICABLE
+
+
+def _combinePoliciesPermitOverrides(policies, context):
+    """Compiled form of PermitOverridesPolicyCombiningAlg.evaluate
+
+    @param policies: compiled policies and / or policy sets
+    @type policies: tuple
+    @param context: request context
+    @type context: ndg.xacml.core.context.request.Request
+    @return: decision
+    @rtype: ndg.xacml.core.context.result.Decision
+    """
+    atLeastOneError = False
+    atLeastOneDeny = False
+
+    for evaluatePolicy in policies:
+        decision = evaluatePolicy(context)
+        if decision is _PERMIT:
+            return _PERMIT
+
+        if decision is _DENY:
+            atLeastOneDeny = True
+
+        elif decision is _INDETERMINATE:
+            atLeastOneError = True
+
+    if atLeastOneDeny:
+        return _DENY
+
+    if atLeastOneError:
+        return _INDETERMINATE
+
+    return _NOT_APPLICABLE
+
+
+def _combinePoliciesFirstApplicable(policies, context):
+    """Compiled form of FirstApplicablePolicyCombiningAlg.evaluate
+
+    @param policies: compiled policies and / or policy sets
+    @type policies: tuple
+    @param context: request context
+    @type context: ndg.xacml.core.context.request.Request
+    @return: decision
+    @rtype: ndg.xacml.core.context.result.Decision
+    """
+    for evaluatePolicy in policies:
+        decision = evaluatePolicy(context)
+        if decision is not _NOT_APPLICABLE:
+            return decision
+
+    return _NOT_APPLICABLE
+
+
+class CompiledPolicy(object):
+    """Immutable evaluation plan for a policy or policy set created by
+    PolicyCompiler.  The plan is a snapshot of the policy at the time of
+    compilation: if the policy is subsequently modified it must be recompiled.
+
+    @ivar __policy: policy or policy set from which the plan was compiled
+    @type __policy: ndg.xacml.core.policybase.PolicyBase
+    @ivar __evaluate: compiled evaluation function for the root policy
+    @type __evaluate: callable
+    @ivar __nFallbacks: number of nodes which could not be compiled and so are
+    evaluated by calling their evaluate method
+    @type __nFallbacks: int
+    @ivar __regexpMatchAutomata: automata combining the regular expression
+    match patterns for each attribute designated
+    @type __regexpMatchAutomata: tuple
+    """
+    __slots__ = ('__policy', '__evaluate', '__nFallbacks',
+                 '__regexpMatchAutomata')
+
+    def __init__(self, policy, evaluate, nFallbacks=0,
+                 regexpMatchAutomata=()):
+        """@param policy: policy or policy set the plan was compiled from
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        @param evaluate: compiled evaluation function for the root policy
+        @type evaluate: callable
+        @param nFallbacks: number of nodes which could not be compiled
+        @type nFallbacks: int
+        @param regexpMatchAutomata: automata combining the regular expression
+        match patterns for each attribute designated
+        @type regexpMatchAutomata: tuple
+        """
+        self.__policy = policy
+        self.__evaluate = evaluate
+        self.__nFallbacks = nFallbacks
+        self.__regexpMatchAutomata = tuple(regexpMatchAutomata)
+
+    @property
+    def policy(self):
+        """@return: policy or policy set the plan was compiled from
+        @rtype: ndg.xacml.core.policybase.PolicyBase
+        """
+        return self.__policy
+
+    @property
+    def nFallbacks(self):
+        """@return: number of nodes which could not be compiled and are
+        evaluated by calling their evaluate method
+        @rtype: int
+        """
+        return self.__nFallbacks
+
+    @property
+    def regexpMatchAutomata(self):
+        """@return: automata combining the regular expression match patterns
+        for each attribute designated
+        @rtype: tuple
+        """
+        return self.__regexpMatchAutomata
+
+    def evaluate(self, context):
+        """Evaluate the decision for the given request context
+
+        @param context: XACML request context
+        @type context: ndg.xacml.core.context.request.Request
+        @return: access control decision
+        @rtype: ndg.xacml.core.context.result.Decision
+        """
+        if not isinstance(context, Request):
+            # Leave it to the policy to report the error
+            return self.__policy.evaluate(context)
+
+        return self.__evaluate(context)
+
+    def evaluateResponse(self, request):
+        """Make an access control decision for the given request returning a
+        response object
+
+        @param request: XACML request context
+        @type request: ndg.xacml.core.context.request.Request
+        @return: XACML response instance
+        @rtype: ndg.xacml.core.context.response.Response
+        """
+        response = Response()
+        result = Result.createInitialised(decision=Decision.NOT_APPLICABLE)
+        response.results.append(result)
+        result.decision = self.evaluate(request)
+
+        return response
+
+
+class PolicyCompiler(object):
+    """Compile a policy or policy set into a CompiledPolicy.  Each node of the
+    policy tree is converted into a closure with functions resolved,
+    attribute look-up keys and match constants extracted and type checks
+    which can be made at compile time removed from the evaluation path.
+
+    Regular expression matches on the same attribute throughout the policy
+    are combined into a single RegexpMatchAutomaton so that a request
+    attribute value is scanned once for all of them.
+
+    Nodes which can't be compiled - for example custom combining algorithms,
+    attribute selectors or subclasses overriding evaluate - are wrapped so
+    that their own evaluate method is called.  Decisions are the same as
+    those from evaluating the policy object tree directly.
+
+    Policies with order independent rule combining algorithms are compiled
+    to evaluate their rules in the order learnt at runtime where the PDP 
+    sets an AdaptiveRuleOrder for them in the request context.
+
+    @cvar RULE_COMBINING_ALGS: mapping of rule combining algorithm classes to
+    their compiled equivalents
+    @type RULE_COMBINING_ALGS: dict
+    @cvar POLICY_COMBINING_ALGS: mapping of policy combining algorithm classes
+    to their compiled equivalents
+    @type POLICY_COMBINING_ALGS: dict
+    @cvar DESIGNATOR_CATEGORIES: mapping of attribute designator classes to
+    the request context attribute index categories they apply to
+    @type DESIGNATOR_CATEGORIES: dict
+
+    @ivar __nFallbacks: count of nodes not compiled for the current compilation
+    @type __nFallbacks: int
+    @ivar __regexpMatchAutomata: regular expression match automata for the
+    current compilation keyed by attribute designator class, ID, data type
+    and issuer
+    @type __regexpMatchAutomata: dict
+    """
+    RULE_COMBINING_ALGS = {
+        DenyOverridesRuleCombiningAlg: _combineRulesDenyOverrides,
+        PermitOverridesRuleCombiningAlg: _combineRulesPermitOverrides,
+        FirstApplicableRuleCombiningAlg: _combineRulesFirstApplicable
+    }
+    POLICY_COMBINING_ALGS = {
+        DenyOverridesPolicyCombiningAlg: _combinePoliciesDenyOverrides,
+        PermitOverridesPolicyCombiningAlg: _combinePoliciesPermitOverrides,
+        FirstApplicablePolicyCombiningAlg: _combinePoliciesFirstApplicable
+    }
+    DESIGNATOR_CATEGORIES = {
+        SubjectAttributeDesignator: 'subjects',
+        ResourceAttributeDesignator: 'resources',
+        ActionAttributeDesignator: 'action',
+        EnvironmentAttributeDesignator: 'environment'
+    }
+
+    __slots__ = ('__nFallbacks', '__regexpMatchAutomata')
+
+    def __init__(self):
+        self.__nFallbacks = 0
+        self.__regexpMatchAutomata = {}
+
+    def compile(self, policy):
+        """Compile a policy or policy set
+
+        @param policy: policy or policy set
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        @return: evaluation plan for the policy
+        @rtype: ndg.xacml.core.compiler.CompiledPolicy
+        @raise TypeError: incorrect input type
+        """
+        if not isinstance(policy, PolicyBase):
+            raise TypeError('Expecting %r derived type for "policy" input; got '
+                            '%r instead' % (PolicyBase, type(policy)))
+
+        self.__nFallbacks = 0
+        self.__regexpMatchAutomata = {}
+        evaluate = self._compilePolicyBase(policy)
+
+        regexpMatchAutomata = list(self.__regexpMatchAutomata.values())
+        for automaton in regexpMatchAutomata:
+            automaton.build()
+
+        log.debug('Compiled %s %r with %d node(s) not compiled and %d '
+                  'regular expression match pattern(s) combined',
+                  policy.ELEMENT_LOCAL_NAME, policy.ident, self.__nFallbacks,
+                  sum([len(automaton) for automaton in regexpMatchAutomata]))
+
+        return CompiledPolicy(policy, evaluate, nFallbacks=self.__nFallbacks,
+                              regexpMatchAutomata=regexpMatchAutomata)
+
+    def _fallback(self, node):
+        """Return the evaluate method of a node which can't be compiled
+
+        @param node: policy tree node
+        @type node: any with an evaluate method
+        @return: evaluate method of the node
+        @rtype: callable
+        """
+        self.__nFallbacks += 1
+        return node.evaluate
+
+    def _fallbackDecision(self, node):
+        """Return a function calling the evaluate method of a policy, policy
+        set or rule which can't be compiled, converting its result to a
+        Decision singleton
+
+        @param node: policy, policy set or rule
+        @type node: ndg.xacml.core.policybase.PolicyBase /
+        ndg.xacml.core.rule.Rule
+        @return: evaluation function
+        @rtype: callable
+        """
+        evaluateNode = self._fallback(node)
+
+        def evaluateDecision(context):
+            return _DECISIONS[evaluateNode(context).value]
+
+        return evaluateDecision
+
+    def _compilePolicyBase(self, policy):
+        """Compile a policy or policy set
+
+        @param policy: policy or policy set
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        @return: evaluation function
+        @rtype: callable
+        """
+        policyClass = type(policy)
+        if policyClass.evaluate is not PolicyBase.evaluate:
+            return self._fallbackDecision(policy)
+
+        if (isinstance(policy, PolicySet) and
+            policyClass.evaluateCombiningAlgorithm is
+                PolicySet.evaluateCombiningAlgorithm):
+            combine = self._compilePolicySetCombiningAlgorithm(policy)
+
+        elif (isinstance(policy, Policy) and
+              policyClass.evaluateCombiningAlgorithm is
+                Policy.evaluateCombiningAlgorithm):
+            combine = self._compilePolicyCombiningAlgorithm(policy)
+        else:
+            combine = None
+
+        if combine is None:
+            return self._fallbackDecision(policy)
+
+        matchTarget = self._compileTarget(policy.target)
+        elementName = policy.ELEMENT_LOCAL_NAME
+        ident = policy.ident
+
+        def evaluatePolicy(context):
+            try:
+                if matchTarget is not None and not matchTarget(context):
+                    return _NOT_APPLICABLE
+
+                return combine(context)
+
+            except Exception as e:
+                if context.logEvaluationErrors:
+                    log.error('Error occurred evaluating %s %r, returning '
+                              'Indeterminate result to caller: %s',
+                              elementName, ident, traceback.format_exc())
+                if context.metricsSink is not None:
+                    context.metricsSink.recordIndeterminate(type(e).__name__)
+                return _INDETERMINATE
+
+        return evaluatePolicy
+
+    def _compilePolicySetCombiningAlgorithm(self, policySet):
+        """Compile the policy combining algorithm and children of a policy set
+
+        @param policySet: policy set
+        @type policySet: ndg.xacml.core.policyset.PolicySet
+        @return: combining function or None if it can't be compiled
+        @rtype: callable / NoneType
+        """
+        combinePolicies = self.__class__.POLICY_COMBINING_ALGS.get(
+                                                type(policySet.policyCombiningAlg))
+        if combinePolicies is None:
+            return None
+
+        policies = tuple(policySet.policies)
+        compiledPolicies = tuple([self._compilePolicyBase(policy)
+                                  for policy in policies])
+
+        targetIndex = policySet.targetIndex
+        if (targetIndex is None or
+            not isinstance(policySet.policyCombiningAlg,
+                           PolicySet.TARGET_INDEXABLE_POLICY_COMBINING_ALGS) or
+            not targetIndex.isValidFor(policies)):
+
+            def combine(context):
+                return combinePolicies(compiledPolicies, context)
+
+            return combine
+
+        # Use the target index to select the children to evaluate
+        indexedPolicies = targetIndex.policies
+        compiledPolicyMap = dict(zip(map(id, indexedPolicies),
+                                     compiledPolicies))
+        getCandidates = targetIndex.getCandidates
+
+        def combineWithIndex(context):
+            candidates = getCandidates(indexedPolicies, context)
+            return combinePolicies([compiledPolicyMap[id(policy)]
+                                    for policy in candidates], context)
+
+        return combineWithIndex
+
+    def _compilePolicyCombiningAlgorithm(self, policy):
+        """Compile the rule combining algorithm and rules of a policy
+
+        @param policy: policy
+        @type policy: ndg.xacml.core.policy.Policy
+        @return: combining function or None if it can't be compiled
+        @rtype: callable / NoneType
+        """
+        combineRules = self.__class__.RULE_COMBINING_ALGS.get(
+                                                    type(policy.ruleCombiningAlg))
+        if combineRules is None:
+            return None
+
+        # The combining algorithms refer to the rule effect for rules
+        # evaluating to Indeterminate
+        for rule in policy.rules:
+            if not isinstance(rule.effect, Effect):
+                return None
+
+        compiledRules = tuple([(self._compileRule(rule), rule.effect.value)
+                               for rule in policy.rules])
+
+        if (len(compiledRules) > 1 and 
+            policy.ruleCombiningAlg.ORDER_INDEPENDENT):
+            return self._compileAdaptiveRuleOrder(
+                                compiledRules, combineRules, id(policy),
+                                policy.ruleCombiningAlg.OVERRIDING_DECISION)
+
+        def combine(context):
+            return combineRules(compiledRules, context)
+
+        return combine
+
+    @staticmethod
+    def _compileAdaptiveRuleOrder(compiledRules, combineRules, policyKey,
+                                  overridingDecision):
+        """Compile an order independent rule combining algorithm evaluating
+        rules in the adaptive rule order set for the policy in the request
+        context, if any, as for 
+        ndg.xacml.core.ruleorder.AdaptiveRuleOrder.evaluate
+
+        @param compiledRules: tuples of compiled rule and its effect string
+        @type compiledRules: tuple
+        @param combineRules: compiled rule combining algorithm
+        @type combineRules: callable
+        @param policyKey: key for the policy's adaptive rule order - the 
+        policy object ID
+        @type policyKey: int
+        @param overridingDecision: decision which stops the rule combining
+        algorithm
+        @type overridingDecision: ndg.xacml.core.context.result.Decision
+        @return: combining function
+        @rtype: callable
+        """
+        nRules = len(compiledRules)
+
+        def combineWithOrder(context):
+            adaptiveRuleOrders = context.adaptiveRuleOrders
+            if adaptiveRuleOrders is None:
+                return combineRules(compiledRules, context)
+
+            adaptiveRuleOrder = adaptiveRuleOrders.get(policyKey)
+            if adaptiveRuleOrder is None:
+                return combineRules(compiledRules, context)
+
+            if adaptiveRuleOrder.isSampleDue():
+                decisions = []
+                costs = []
+                for evaluateRule, effect in compiledRules:
+                    startTime = time.perf_counter()
+                    decision = evaluateRule(context)
+                    costs.append(time.perf_counter() - startTime)
+                    decisions.append(decision)
+
+                adaptiveRuleOrder.recordSample(decisions, costs,
+                                               overridingDecision)
+                return combineRules(
+                        [(lambda context, decision=decision: decision, effect)
+                         for decision, (evaluateRule, effect) in zip(
+                                                    decisions, compiledRules)],
+                        context)
+
+            order = adaptiveRuleOrder.getOrder(nRules)
+            if order is None:
+                return combineRules(compiledRules, context)
+
+            return combineRules((compiledRules[i] for i in order), context)
+
+        return combineWithOrder
+
+    def _compileRule(self, rule):
+        """Compile a rule
+
+        @param rule: rule
+        @type rule: ndg.xacml.core.rule.Rule
+        @return: evaluation function
+        @rtype: callable
+        """
+        if type(rule).evaluate is not Rule.evaluate:
+            return self._fallbackDecision(rule)
+
+        matchTarget = self._compileTarget(rule.target)
+        evaluateCondition = self._compileCondition(rule.condition)
+        effectDecision = _DECISIONS[rule.effect.value]
+        ruleId = rule.id
+
+        def evaluateRule(context):
+            try:
+                if matchTarget is not None and not matchTarget(context):
+                    return _NOT_APPLICABLE
+
+                if evaluateCondition is not None and not evaluateCondition(
+                                                                    context):
+                    return _NOT_APPLICABLE
+
+                return effectDecision
+
+            except Exception as e:
+                if context.logEvaluationErrors:
+                    log.error('Error occurred evaluating rule %r, returning '
+                              'Indeterminate result to caller: %s',
+                              ruleId, traceback.format_exc())
+                if context.metricsSink is not None:
+                    context.metricsSink.recordIndeterminate(type(e).__name__)
+                return _INDETERMINATE
+
+        return evaluateRule
+
+    def _compileTarget(self, target):
+        """Compile a target.  As for Target.match, all matches are evaluated
+        so that any error is reported even if the overall result is already
+        known, unless short circuit matching is enabled for the request and
+        the remaining matches can't raise an error
+
+        @param target: target or None
+        @type target: ndg.xacml.core.target.Target / NoneType
+        @return: match function or None if there is no target
+        @rtype: callable / NoneType
+        """
+        if target is None:
+            return None
+
+        if type(target).match is not Target.match:
+            return self._fallbackMatch(target)
+
+        # Each section is paired with a key for sharing its result between
+        # requests in a batch, or None if the result depends on the resources
+        sections = []
+        for attrName in target.CHILD_ATTRS:
+            targetSection = getattr(target, attrName)
+            if len(targetSection) == 0:
+                continue
+
+            if target.isSectionIndependentOfResources(attrName):
+                matchResultKey = (id(target), attrName)
+            else:
+                matchResultKey = None
+
+            # Matches are paired with their compiled functions so that they
+            # can be checked for possible errors before being skipped
+            sections.append((matchResultKey, tuple([
+                tuple([(self._compileMatch(match), match)
+                       for match in targetChild.matches])
+                for targetChild in targetSection])))
+
+        sections = tuple(sections)
+        if len(sections) == 0:
+            return None
+
+        def matchTarget(context):
+            matchResultCache = context.matchResultCache
+            shortCircuit = context.shortCircuitMatching
+            status = True
+            for i, (matchResultKey, section) in enumerate(sections):
+                if matchResultCache is not None and matchResultKey is not None:
+                    sectionStatus = matchResultCache.get(matchResultKey)
+                    if sectionStatus is not None:
+                        if not sectionStatus:
+                            status = False
+                        continue
+
+                sectionStatus = False
+                for j, matches in enumerate(section):
+                    childStatus = True
+                    for k, (evaluateMatch, match) in enumerate(matches):
+                        if not evaluateMatch(context):
+                            childStatus = False
+                            if shortCircuit and not _mayRaiseError(
+                                                (matches[k + 1:],), context):
+                                break
+
+                    if childStatus:
+                        sectionStatus = True
+                        if shortCircuit and not _mayRaiseError(
+                                                    section[j + 1:], context):
+                            break
+
+                if matchResultCache is not None and matchResultKey is not None:
+                    matchResultCache[matchResultKey] = sectionStatus
+
+                if not sectionStatus:
+                    status = False
+                    if shortCircuit and not _mayRaiseError(
+                                        [matches
+                                         for _, section in sections[i + 1:]
+                                         for matches in section],
+                                        context):
+                        return False
+
+            return status
+
+        def _mayRaiseError(section, context):
+            for matches in section:
+                for _, match in matches:
+                    if match.mayRaiseError(context):
+                        return True
+            return False
+
+        return matchTarget
+
+    def _fallbackMatch(self, target):
+        """Return the match method of a target which can't be compiled
+
+        @param target: target
+        @type target: ndg.xacml.core.target.Target
+        @return: match method
+        @rtype: callable
+        """
+        self.__nFallbacks += 1
+        return target.match
+
+    def _getRegexpMatchAutomaton(self, designator):
+        """Get the automaton combining the regular expression match patterns
+        for an attribute designator, creating it if it doesn't exist
+
+        @param designator: attribute designator
+        @type designator: ndg.xacml.core.attributedesignator.AttributeDesignator
+        @return: automaton for the designated attribute
+        @rtype: ndg.xacml.core.regexpautomaton.RegexpMatchAutomaton
+        """
+        key = (type(designator), designator.attributeId, designator.dataType,
+               designator.issuer)
+        automaton = self.__regexpMatchAutomata.get(key)
+        if automaton is None:
+            automaton = RegexpMatchAutomaton()
+            self.__regexpMatchAutomata[key] = automaton
+
+        return automaton
+
+    def _compileMatch(self, match):
+        """Compile a target match.  Where the types of the match value and
+        designated request values are guaranteed to be those expected by the
+        match function, equal and regular expression matches on strings are
+        unboxed and made directly.  Regular expression patterns are added to
+        the automaton for the designated attribute and the match tests
+        whether the pattern is in the set matched by each value.
+
+        @param match: subject, resource, action or environment match
+        @type match: ndg.xacml.core.match.MatchBase
+        @return: match function
+        @rtype: callable
+        """
+        designator = match.attributeDesignator
+        function = match.function
+        if (type(match).evaluate is not MatchBase.evaluate or
+            designator is None or
+            match.attributeSelector is not None or
+            function is None):
+            return self._fallback(match)
+
+        evaluateDesignator = self._compileDesignator(designator)
+        matchAttributeValue = match.attributeValue
+        functionType = getattr(function.__class__, 'TYPE', None)
+        valueClass = AttributeValueClassFactory()(designator.dataType)
+
+        isTypeSafe = (functionType is not None and
+                      valueClass is not None and
+                      issubclass(valueClass, functionType) and
+                      isinstance(matchAttributeValue, functionType) and
+                      issubclass(functionType.TYPE, str))
+
+        if isTypeSafe and isinstance(function, EqualBase):
+            matchValue = matchAttributeValue.value
+
+            def evaluateEqualMatch(context):
+                for requestAttributeValue in evaluateDesignator(context):
+                    if requestAttributeValue.value == matchValue:
+                        return True
+                return False
+
+            return evaluateEqualMatch
+
+        if isTypeSafe and isinstance(function, RegexpMatchBase):
+            compiledPattern = match.compiledPattern
+            if compiledPattern is not None:
+                automaton = self._getRegexpMatchAutomaton(designator)
+                patternIndex = automaton.addPattern(compiledPattern)
+                matchPatterns = automaton.match
+
+                def evaluateRegexpMatch(context):
+                    for requestAttributeValue in evaluateDesignator(context):
+                        if patternIndex in matchPatterns(
+                                                requestAttributeValue.value):
+                            return True
+                    return False
+
+                return evaluateRegexpMatch
+
+        evaluateFunction = function.evaluate
+        isFunctionErrorFree = match.isFunctionErrorFree()
+
+        def evaluateFunctionMatch(context):
+            if context.shortCircuitMatching and isFunctionErrorFree:
+                for requestAttributeValue in evaluateDesignator(context):
+                    if evaluateFunction(matchAttributeValue,
+                                        requestAttributeValue):
+                        return True
+                return False
+
+            # Evaluate for every value so that any error is raised
+            return any([evaluateFunction(matchAttributeValue,
+                                         requestAttributeValue)
+                        for requestAttributeValue in evaluateDesignator(context)
+                        ])
+
+        return evaluateFunctionMatch
+
+    def _compileDesignator(self, designator):
+        """Compile an attribute designator
+
+        @param designator: attribute designator
+        @type designator: ndg.xacml.core.attributedesignator.AttributeDesignator
+        @return: function returning a bag of attribute values
+        @rtype: callable
+        """
+        designatorClass = type(designator)
+        category = self.__class__.DESIGNATOR_CATEGORIES.get(designatorClass)
+        dataType = designator.dataType
+        valueClass = AttributeValueClassFactory()(dataType)
+        if category is None or valueClass is None:
+            return self._fallback(designator)
+
+        attributeId = designator.attributeId
+        issuer = designator.issuer
+        mustBePresent = designator.mustBePresent
+        queryPIP = designatorClass is SubjectAttributeDesignator
+
+        def evaluateDesignator(context):
+            if not queryPIP or context.ctxHandler is None:
+                attributeValueBag = context.getAttributeIndex(
+                                        category).getAttributeValueBag(
+                                            attributeId,
+                                            dataType,
+                                            issuer,
+                                            valueClass)
+            else:
+                attributeValueBag = _getSubjectAttributeValueBag(context)
+
+            if len(attributeValueBag) == 0 and mustBePresent:
+                raise MissingAttributeError('"MustBePresent" is set for %r but '
+                                            'no match for attributeId=%r, '
+                                            'dataType=%r and issuer=%r' %
+                                            (designatorClass.__name__,
+                                             attributeId,
+                                             dataType,
+                                             issuer))
+
+            return attributeValueBag
+
+        def _getSubjectAttributeValueBag(context):
+            # Subject attributes from the request context are supplemented
+            # with any found by querying the Policy Information Point
+            attributeValueBag = TypedList(valueClass)
+            for requestChild in context.subjects:
+                for attr in requestChild.attributes:
+                    if (attr.attributeId == attributeId and
+                        attr.dataType == dataType and
+                        (issuer is None or attr.issuer == issuer)):
+                        attributeValueBag.extend([
+                                        i for i in attr.attributeValues
+                                        if i.dataType == dataType])
+
+                if context.ctxHandler is not None:
+                    attributeValues = context.queryPIP(requestChild,
+                                                       designator)
+                    if attributeValues is not None:
+                        # Weed out any duplicates
+                        if len(attributeValueBag) > 0:
+                            attributeValues = [
+                                            attrVal
+                                            for attrVal in attributeValues
+                                            if attrVal not in attributeValueBag]
+
+                        attributeValueBag.extend(attributeValues)
+
+            return attributeValueBag
+
+        return evaluateDesignator
+
+    def _compileCondition(self, condition):
+        """Compile a rule condition
+
+        @param condition: condition or None
+        @type condition: ndg.xacml.core.condition.Condition / NoneType
+        @return: condition function or None if there is no condition
+        @rtype: callable / NoneType
+        """
+        if condition is None:
+            return None
+
+        if (type(condition).evaluate is not Condition.evaluate or
+            condition.expression is None):
+            return self._fallback(condition)
+
+        return self._compileExpression(condition.expression)
+
+    def _compileExpression(self, expression):
+        """Compile an expression within a condition
+
+        @param expression: apply, attribute value, designator or other
+        expression
+        @type expression: ndg.xacml.core.expression.Expression
+        @return: expression function
+        @rtype: callable
+        """
+        expressionClass = type(expression)
+        if expressionClass.evaluate is AttributeValue.evaluate:
+            return lambda context: expression
+
+        if expressionClass in self.__class__.DESIGNATOR_CATEGORIES:
+            return self._compileDesignator(expression)
+
+        if (expressionClass.evaluate is not Apply.evaluate or
+            expression.function is None):
+            return self._fallback(expression)
+
+        evaluateFunction = expression.function.evaluate
+        evaluateArgs = tuple([self._compileExpression(subExpression)
+                              for subExpression in expression.expressions])
+
+        def evaluateApply(context):
+            return evaluateFunction(*[evaluateArg(context)
+                                      for evaluateArg in evaluateArgs])
+
+        return evaluateApply
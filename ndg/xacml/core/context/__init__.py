@@ -10,7 +10,7 @@ __contact__ = "Philip.Kershaw@stfc.ac.uk"
 __license__ = "BSD - see LICENSE file in top-level directory"
 __contact__ = "Philip.Kershaw@stfc.ac.uk"
 __revision__ = "$Id$"
-from ndg.xacml.utils import TypedList
+from ndg.xacml.utils import ChangeCountedTypedList, ChangeCountedInterface
 from ndg.xacml.core import XacmlCoreBase
 from ndg.xacml.core.attribute import Attribute
 
@@ -59,28 +59,36 @@ class XacmlContextBase(XacmlCoreBase):
         for attr, val in list(attrDict.items()):
             setattr(self, attr, val)
 
-class RequestChildBase(XacmlContextBase):
+class RequestChildBase(XacmlContextBase, ChangeCountedInterface):
     """Base class for XACML Context Subject, Resource, Action and Environment
     types
     
     @ivar __attributes: XACML Context subject attributes
-    @type __attributes: ndg.xacml.utils.TypedList
+    @type __attributes: ndg.xacml.utils.ChangeCountedTypedList
     """
     __slots__ = ('__attributes', )
     
     def __init__(self):
         """Initialise attribute list"""
         super(RequestChildBase, self).__init__()
-        self.__attributes = TypedList(Attribute)
+        self.__attributes = ChangeCountedTypedList(Attribute)
         
     @property
     def attributes(self):
         """
         @return: XACML Context subject attributes
-        @rtype: ndg.xacml.utils.TypedList
+        @rtype: ndg.xacml.utils.ChangeCountedTypedList
         """
         return self.__attributes
 
+    def _setChangeCounter(self, changeCounter):
+        """Set the counter to record changes to the attributes in
+        
+        @param changeCounter: counter or None to stop recording changes
+        @type changeCounter: ndg.xacml.utils.ChangeCounter / NoneType
+        """
+        self.__attributes.changeCounter = changeCounter
+
     def __getstate__(self):
         '''Enable pickling
         
@@ -0,0 +1,359 @@
+"""NDG XACML asynchronous Policy Decision Point - evaluates requests on an
+asyncio event loop awaiting Policy Information Point queries
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import asyncio
+import time
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml import Config
+from ndg.xacml.core.context.pdpinterface import PDPInterface
+from ndg.xacml.core.context.pdp import PDP
+from ndg.xacml.core.context.handlerinterface import (CtxHandlerInterface,
+                                                     AsyncCtxHandlerInterface)
+from ndg.xacml.core.context.response import Response
+
+
+class PIPQueryPending(BaseException):
+    """Raised by PIPQueryRecorder to stop evaluating a request at a query 
+    with no result available.  It derives from BaseException rather than 
+    Exception so that it isn't handled as an error evaluating a rule or 
+    policy.
+    
+    @ivar __designator: designator queried
+    @type __designator: ndg.xacml.core.expression.Expression derived type
+    """
+    def __init__(self, designator):
+        """@param designator: designator queried
+        @type designator: ndg.xacml.core.expression.Expression derived type
+        """
+        super(PIPQueryPending, self).__init__(designator)
+        self.__designator = designator
+        
+    @property
+    def designator(self):
+        """@return: designator queried
+        @rtype: ndg.xacml.core.expression.Expression derived type
+        """
+        return self.__designator
+
+
+class PIPQueryRecorder(CtxHandlerInterface):
+    """Context handler set in a request while it is evaluated by AsyncPDP.
+    Queries are answered from the results of earlier asynchronous queries
+    where available.  Otherwise PIPQueryPending is raised so that the query
+    can be made asynchronously before the request is evaluated again.  
+    Results are keyed by designator attribute ID, data type and issuer as for
+    the results held by the request: the subject isn't part of the key as 
+    queries are made for the request as a whole.
+
+    @ivar __results: query results or exceptions raised keyed by designator
+    attribute ID, data type and issuer
+    @type __results: dict
+    """
+    __slots__ = ('__results',)
+
+    def __init__(self):
+        self.__results = {}
+
+    @staticmethod
+    def getKey(designator):
+        """Make the key for the result of a query
+
+        @param designator: designator queried
+        @type designator: ndg.xacml.core.expression.Expression derived type
+        @return: key
+        @rtype: tuple
+        """
+        return (designator.attributeId, designator.dataType, designator.issuer)
+
+    def handlePEPRequest(self, pepRequest):
+        """Not supported - this handler is only set in requests by AsyncPDP
+        during evaluation
+
+        @raise TypeError: always raised
+        """
+        raise TypeError('%r only answers Policy Information Point queries '
+                        'for AsyncPDP during evaluation: handle PEP requests '
+                        'with an AsyncCtxHandlerInterface derived context '
+                        'handler' % self.__class__.__name__)
+
+    def pipQuery(self, request, designator):
+        """Get the result of an earlier asynchronous query for this designator
+
+        @param request: request context
+        @type request: ndg.xacml.core.context.request.Request
+        @param designator: designator requiring additional attribute
+        information
+        @type designator: ndg.xacml.core.expression.Expression derived type
+        @return: attribute values or None if there are none
+        @rtype: list / NoneType
+        @raise PIPQueryPending: no query has been made for this designator
+        @raise Exception: exception raised by the asynchronous query
+        """
+        key = self.getKey(designator)
+        if key not in self.__results:
+            raise PIPQueryPending(designator)
+            
+        result = self.__results[key]
+        if isinstance(result, Exception):
+            raise result
+        
+        return result
+
+    def setResult(self, designator, result):
+        """Set the result of a query
+
+        @param designator: designator queried
+        @type designator: ndg.xacml.core.expression.Expression derived type
+        @param result: attribute values, None or exception raised by the query
+        @type result: list / NoneType / Exception
+        """
+        self.__results[self.getKey(designator)] = result
+
+
+class AsyncPDP(PDPInterface):
+    """Policy Decision Point for use on an asyncio event loop.  Requests with a
+    context handler implementing AsyncCtxHandlerInterface are evaluated in
+    rounds.  In each round the request is evaluated by the wrapped PDP using
+    the results of the PIP queries made so far.  Evaluation stops at the 
+    first query with no result, which is then made and awaited before the 
+    request is evaluated again.  These rounds only find the queries needed: 
+    the decision, any errors and rule evaluation samples aren't recorded in
+    the PDP's metrics sink and adaptive rule orders, and errors aren't 
+    logged.  Once a round needs no more queries, the request is evaluated by
+    the wrapped PDP as normal and its response returned.  If the PDP 
+    prefetches PIP queries, queries for all the designators it prefetches 
+    are made concurrently first and the request evaluated as normal 
+    straight away.
+    
+    The queries made and the decisions are the same as evaluating with a 
+    synchronous context handler backed by the same PIP, provided PIP results
+    for a request don't vary between queries.  Results are held by the 
+    request and shared with other requests via the context handler's PIP 
+    cache as for synchronous queries.
+
+    Other requests are evaluated directly by the wrapped PDP.  A request must
+    not be evaluated concurrently with itself as its context handler is
+    swapped during evaluation.
+
+    @ivar __pdp: PDP making the decisions
+    @type __pdp: ndg.xacml.core.context.pdp.PDP
+    """
+    __slots__ = ('__pdp',)
+
+    def __init__(self, pdp=None):
+        """
+        @param pdp: PDP making the decisions, may be omitted and set later
+        @type pdp: ndg.xacml.core.context.pdp.PDP / NoneType
+        """
+        self.__pdp = None
+        if pdp is not None:
+            self.pdp = pdp
+
+    @classmethod
+    def fromPolicySource(cls, source, readerFactory, finder=None):
+        """Create a new instance with a given policy
+
+        @param source: source for policy
+        @type source: type (dependent on the reader set, it could be for example
+        a file path string, file object, XML element instance)
+        @param readerFactory: reader factory returns the reader to use to read
+        this policy
+        @type readerFactory: ndg.xacml.parsers.AbstractReader derived type
+        @param finder: policy finder
+        @type finder: ndg.xacml.finder.PolicyFinderBase subclass
+        @return: new instance
+        @rtype: ndg.xacml.core.context.asyncpdp.AsyncPDP
+        """
+        return cls(pdp=PDP.fromPolicySource(source, readerFactory,
+                                            finder=finder))
+
+    @property
+    def pdp(self):
+        """Get PDP
+        @return: PDP making the decisions
+        @rtype: ndg.xacml.core.context.pdp.PDP
+        """
+        return self.__pdp
+
+    @pdp.setter
+    def pdp(self, value):
+        """Set PDP
+        @param value: PDP making the decisions
+        @type value: ndg.xacml.core.context.pdp.PDP
+        @raise TypeError: incorrect input type
+        """
+        if not isinstance(value, PDP):
+            raise TypeError('Expecting %r derived type for "pdp" input; got '
+                            '%r instead' % (PDP, type(value)))
+        self.__pdp = value
+
+    async def evaluate(self, request):
+        """Make an access control decision for the given request
+
+        @param request: XACML request context
+        @type request: ndg.xacml.core.context.request.Request
+        @return: XACML response instance
+        @rtype: ndg.xacml.core.context.response.Response
+        """
+        ctxHandler = request.ctxHandler
+        if not isinstance(ctxHandler, AsyncCtxHandlerInterface):
+            return self.__pdp.evaluate(request)
+
+        pipQueryRecorder = PIPQueryRecorder()
+        request.ctxHandler = pipQueryRecorder
+        try:
+            isFinalRound = self.__pdp.prefetchPIPQueries
+            if isFinalRound:
+                await self._queryPIP(request, ctxHandler, pipQueryRecorder,
+                                     self.__pdp.pipQueryDesignators)
+            while True:
+                try:
+                    if isFinalRound:
+                        return self.__pdp.evaluate(request)
+                    
+                    self._evaluateRound(request)
+                    
+                    # All the queries needed have been made: evaluate again
+                    # recording the decision
+                    isFinalRound = True
+                    
+                except PIPQueryPending as e:
+                    await self._queryPIP(request, ctxHandler, 
+                                         pipQueryRecorder, [e.designator])
+        finally:
+            request.ctxHandler = ctxHandler
+
+    def _evaluateRound(self, request):
+        """Evaluate a request to find the PIP queries it needs without 
+        recording the decision or any errors
+
+        @param request: XACML request context with a PIPQueryRecorder set
+        @type request: ndg.xacml.core.context.request.Request
+        @raise PIPQueryPending: a query is needed with no result available
+        """
+        metricsSink = request.metricsSink
+        logEvaluationErrors = request.logEvaluationErrors
+        request.metricsSink = None
+        request.logEvaluationErrors = False
+        try:
+            # Bypass PDP.evaluate as it records the decision and sets the
+            # adaptive rule orders in the request
+            self.__pdp._evaluateResponse(request)
+        finally:
+            request.metricsSink = metricsSink
+            request.logEvaluationErrors = logEvaluationErrors
+
+    async def _queryPIP(self, request, ctxHandler, pipQueryRecorder, 
+                        designators):
+        """Make PIP queries concurrently for the given designators.  Results
+        are held by the request, put in the context handler's PIP cache and 
+        set in the recorder.  Queries with results already held by the 
+        request or in the PIP cache aren't made.
+
+        @param request: XACML request context with the recorder set
+        @type request: ndg.xacml.core.context.request.Request
+        @param ctxHandler: context handler to query
+        @type ctxHandler: 
+        ndg.xacml.core.context.handlerinterface.AsyncCtxHandlerInterface
+        @param pipQueryRecorder: recorder set in the request
+        @type pipQueryRecorder: PIPQueryRecorder
+        @param designators: designators requiring additional attribute values
+        @type designators: iterable
+        """
+        pipCache = ctxHandler.pipCache
+        pendingQueries = request.getPendingPIPQueries(designators, 
+                                                      pipCache=pipCache)
+        if len(pendingQueries) == 0:
+            return
+
+        metricsSink = request.metricsSink
+        if metricsSink is None:
+            metricsSink = self.__pdp.metricsSink
+
+        if Config.trace:
+            log.debug("Making %d asynchronous PIP queries", 
+                      len(pendingQueries))
+        results = await asyncio.gather(*[
+                        self._asyncPipQuery(ctxHandler, request, designator,
+                                            metricsSink)
+                        for designator, _ in pendingQueries.values()],
+                        return_exceptions=True)
+
+        completedQueries = {}
+        completedResults = []
+        for (key, pendingQuery), result in zip(pendingQueries.items(),
+                                               results):
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    # Cancellation or exit
+                    raise result
+            else:
+                completedQueries[key] = pendingQuery
+                completedResults.append(result)
+
+            pipQueryRecorder.setResult(pendingQuery[0], result)
+
+        request.setPIPQueryResults(completedQueries, completedResults, 
+                                   pipCache=pipCache)
+
+    @staticmethod
+    async def _asyncPipQuery(ctxHandler, request, designator, metricsSink):
+        """Make a PIP query recording the call in the metrics sink if one is
+        set
+
+        @param ctxHandler: context handler to query
+        @type ctxHandler: 
+        ndg.xacml.core.context.handlerinterface.AsyncCtxHandlerInterface
+        @param request: XACML request context
+        @type request: ndg.xacml.core.context.request.Request
+        @param designator: designator requiring additional attribute values
+        @type designator: 
+        ndg.xacml.core.attributedesignator.AttributeDesignator
+        @param metricsSink: metrics sink or None
+        @type metricsSink: 
+        ndg.xacml.core.context.metrics.MetricsSinkInterface / NoneType
+        @return: attribute values or None
+        @rtype: list / NoneType
+        """
+        if metricsSink is None:
+            return await ctxHandler.asyncPipQuery(request, designator)
+
+        startTime = time.perf_counter()
+        try:
+            result = await ctxHandler.asyncPipQuery(request, designator)
+
+        except Exception as e:
+            metricsSink.recordPIPCall(time.perf_counter() - startTime, 1,
+                                      errorType=type(e).__name__)
+            raise
+
+        metricsSink.recordPIPCall(time.perf_counter() - startTime, 1)
+        return result
+
+    async def evaluateMany(self, requests):
+        """Make access control decisions for a batch of requests evaluating
+        them concurrently
+
+        @param requests: XACML request contexts
+        @type requests: iterable
+        @return: XACML response with one result for each request in order
+        @rtype: ndg.xacml.core.context.response.Response
+        """
+        responses = await asyncio.gather(*[self.evaluate(request)
+                                           for request in requests])
+        response = Response()
+        for requestResponse in responses:
+            response.results.extend(requestResponse.results)
+
+        return response
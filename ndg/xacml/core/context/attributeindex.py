@@ -0,0 +1,86 @@
+"""NDG XACML request context attribute index - look up of request attribute
+values by attribute ID, data type and issuer for attribute designators
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml.utils import TypedList
+
+
+class AttributeIndex(object):
+    """Index of the attributes of one category of request context children -
+    the subjects, resources, action or environment.  Attributes are grouped by
+    attribute ID and data type when the index is made.  Bags of attribute
+    values are made on demand and held so that subsequent look ups for the
+    same attribute ID, data type and issuer return the same bag.  Bags are
+    shared between callers and so must not be modified.
+
+    @ivar __attributes: attributes keyed by attribute ID and data type in
+    request order
+    @type __attributes: dict
+    @ivar __bags: attribute value bags keyed by attribute ID, data type and
+    issuer
+    @type __bags: dict
+    """
+    __slots__ = ('__attributes', '__bags')
+
+    def __init__(self, requestChildren):
+        """@param requestChildren: request subjects, resources, action or
+        environment to index
+        @type requestChildren: iterable
+        """
+        self.__bags = {}
+        self.__attributes = {}
+        for requestChild in requestChildren:
+            for attribute in requestChild.attributes:
+                key = (attribute.attributeId, attribute.dataType)
+                self.__attributes.setdefault(key, []).append(attribute)
+
+    def __len__(self):
+        """@return: number of distinct attribute ID and data type combinations
+        in the index
+        @rtype: int
+        """
+        return len(self.__attributes)
+
+    def getAttributeValueBag(self, attributeId, dataType, issuer, valueClass):
+        """Get the values of the attributes with the given ID and data type
+        and, if set, issuer.  Values which aren't of the given data type are
+        omitted as for the attribute designators.
+
+        @param attributeId: attribute ID
+        @type attributeId: basestring
+        @param dataType: attribute data type
+        @type dataType: basestring
+        @param issuer: attribute issuer or None to match any issuer
+        @type issuer: basestring / NoneType
+        @param valueClass: attribute value type for the data type
+        @type valueClass: type
+        @return: bag of attribute values shared with other callers
+        @rtype: ndg.xacml.utils.TypedList
+        @raise TypeError: value in the request context doesn't match the
+        attribute value type
+        """
+        key = (attributeId, dataType, issuer)
+        attributeValueBag = self.__bags.get(key)
+        if (attributeValueBag is not None and
+            attributeValueBag.elementType is valueClass):
+            return attributeValueBag
+
+        attributeValueBag = TypedList(valueClass)
+        for attribute in self.__attributes.get((attributeId, dataType), ()):
+            if issuer is None or attribute.issuer == issuer:
+                attributeValueBag.extend([i for i in attribute.attributeValues
+                                          if i.dataType == dataType])
+
+        self.__bags[key] = attributeValueBag
+        return attributeValueBag
@@ -0,0 +1,358 @@
+"""NDG XACML PDP decision cache - bounded LRU cache with expiry of access
+control decisions keyed on a canonical fingerprint of the request context
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import time
+import threading
+from collections import OrderedDict
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml.core import Identifiers
+from ndg.xacml.core.context.result import Decision
+
+
+class DecisionCache(object):
+    """Bounded cache of PDP decisions.  Entries are evicted least recently used
+    first once the maximum size is reached and expire after a fixed time to
+    live.
+
+    Requests are keyed on a canonical fingerprint of the attributes of their
+    subjects, resources, action and environment so that requests with the
+    same content share an entry regardless of the order of their attributes.
+    Requests for which the decision may vary for the same content are not
+    cached: those with a context handler, which may query a Policy Information
+    Point; those with resource content, which may be the subject of attribute
+    selectors; and those with volatile environment attributes such as the
+    current time.
+
+    @cvar DEFAULT_MAX_SIZE: default maximum number of entries
+    @type DEFAULT_MAX_SIZE: int
+    @cvar DEFAULT_TTL: default time to live for entries in seconds
+    @type DEFAULT_TTL: float
+    @cvar VOLATILE_ENVIRONMENT_ATTRIBUTE_IDS: environment attribute IDs whose
+    presence in a request prevents it from being cached
+    @type VOLATILE_ENVIRONMENT_ATTRIBUTE_IDS: tuple
+    @cvar CACHEABLE_DECISIONS: decision values which may be cached.  Excludes
+    Indeterminate as this may result from a transient error.
+    @type CACHEABLE_DECISIONS: tuple
+
+    @ivar __maxSize: maximum number of entries
+    @type __maxSize: int
+    @ivar __ttl: time to live for entries in seconds or None for no expiry
+    @type __ttl: float / NoneType
+    @ivar __timer: function returning the current time in seconds
+    @type __timer: callable
+    @ivar __entries: cache entries - tuples of decision and expiry time keyed
+    by request fingerprint and held in least recently used order
+    @type __entries: collections.OrderedDict
+    @ivar __lock: lock for access to the entries and counters
+    @type __lock: threading.Lock
+    @ivar __hits: number of cache hits
+    @type __hits: int
+    @ivar __misses: number of cache misses
+    @type __misses: int
+    @ivar __evictions: number of entries evicted to make space for new ones
+    @type __evictions: int
+    @ivar __expirations: number of entries removed because they had expired
+    @type __expirations: int
+    @ivar __bypasses: number of requests which were not cacheable
+    @type __bypasses: int
+    @ivar __invalidations: number of entries removed by clearing the cache
+    @type __invalidations: int
+    @ivar __generation: number of times the cache has been cleared.  Decisions
+    evaluated before the cache was last cleared are not cached.
+    @type __generation: int
+    """
+    DEFAULT_MAX_SIZE = 1024
+    DEFAULT_TTL = 300.
+    VOLATILE_ENVIRONMENT_ATTRIBUTE_IDS = (
+        Identifiers.Environment.CURRENT_TIME,
+        Identifiers.Environment.CURRENT_DATE,
+        Identifiers.Environment.CURRENT_DATETIME
+    )
+    CACHEABLE_DECISIONS = (
+        Decision.PERMIT_STR,
+        Decision.DENY_STR,
+        Decision.NOT_APPLICABLE_STR
+    )
+
+    __slots__ = (
+        '__maxSize',
+        '__ttl',
+        '__timer',
+        '__entries',
+        '__lock',
+        '__hits',
+        '__misses',
+        '__evictions',
+        '__expirations',
+        '__bypasses',
+        '__invalidations',
+        '__generation'
+    )
+
+    def __init__(self, maxSize=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL,
+                 timer=time.monotonic):
+        """@param maxSize: maximum number of entries
+        @type maxSize: int
+        @param ttl: time to live for entries in seconds, set to None for no
+        expiry
+        @type ttl: float / int / NoneType
+        @param timer: function returning the current time in seconds
+        @type timer: callable
+        @raise TypeError: incorrect input type
+        @raise ValueError: invalid input value
+        """
+        if not isinstance(maxSize, int):
+            raise TypeError('Expecting %r type for "maxSize"; got %r' %
+                            (int, type(maxSize)))
+        if maxSize < 1:
+            raise ValueError('Expecting "maxSize" greater than zero; got %r' %
+                             maxSize)
+
+        if ttl is not None:
+            if not isinstance(ttl, (float, int)):
+                raise TypeError('Expecting float or int type for "ttl"; got '
+                                '%r' % type(ttl))
+            if ttl <= 0:
+                raise ValueError('Expecting "ttl" greater than zero; got %r' %
+                                 ttl)
+
+        self.__maxSize = maxSize
+        self.__ttl = ttl
+        self.__timer = timer
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__expirations = 0
+        self.__bypasses = 0
+        self.__invalidations = 0
+        self.__generation = 0
+
+    @property
+    def maxSize(self):
+        """@return: maximum number of entries
+        @rtype: int
+        """
+        return self.__maxSize
+
+    @property
+    def ttl(self):
+        """@return: time to live for entries in seconds
+        @rtype: float / int / NoneType
+        """
+        return self.__ttl
+
+    @property
+    def hits(self):
+        """@return: number of cache hits
+        @rtype: int
+        """
+        return self.__hits
+
+    @property
+    def misses(self):
+        """@return: number of cache misses
+        @rtype: int
+        """
+        return self.__misses
+
+    @property
+    def evictions(self):
+        """@return: number of entries evicted to make space for new ones
+        @rtype: int
+        """
+        return self.__evictions
+
+    @property
+    def expirations(self):
+        """@return: number of entries removed because they had expired
+        @rtype: int
+        """
+        return self.__expirations
+
+    @property
+    def bypasses(self):
+        """@return: number of requests which could not be cached
+        @rtype: int
+        """
+        return self.__bypasses
+
+    @property
+    def invalidations(self):
+        """@return: number of entries removed by clearing the cache
+        @rtype: int
+        """
+        return self.__invalidations
+
+    @property
+    def generation(self):
+        """@return: number of times the cache has been cleared.  Pass the
+        value read before evaluating a decision to put.
+        @rtype: int
+        """
+        return self.__generation
+
+    def __len__(self):
+        """@return: number of entries held
+        @rtype: int
+        """
+        return len(self.__entries)
+
+    @classmethod
+    def getRequestFingerprint(cls, request):
+        """Make a canonical, hashable fingerprint of a request context from
+        the attributes of its subjects, resources, action and environment
+
+        @param request: request context
+        @type request: ndg.xacml.core.context.request.Request
+        @return: fingerprint or None if the request can't be cached
+        @rtype: tuple / NoneType
+        """
+        if request.ctxHandler is not None:
+            return None
+
+        for resource in request.resources:
+            if resource.resourceContent is not None:
+                return None
+
+        environment = request.environment
+        if environment is not None:
+            for attribute in environment.attributes:
+                if (attribute.attributeId in
+                    cls.VOLATILE_ENVIRONMENT_ATTRIBUTE_IDS):
+                    return None
+
+        try:
+            fingerprint = (
+                tuple(sorted([(subject.subjectCategory,
+                               cls.getAttributesFingerprint(subject))
+                              for subject in request.subjects], key=repr)),
+                tuple(sorted([cls.getAttributesFingerprint(resource)
+                              for resource in request.resources], key=repr)),
+                cls.getAttributesFingerprint(request.action),
+                cls.getAttributesFingerprint(environment)
+            )
+            hash(fingerprint)
+
+        except TypeError:
+            # Unhashable attribute value
+            return None
+
+        return fingerprint
+
+    @staticmethod
+    def getAttributesFingerprint(requestChild):
+        """Make a canonical fingerprint of the attributes of a subject,
+        resource, action or environment
+
+        @param requestChild: request subject, resource, action or environment
+        @type requestChild: ndg.xacml.core.context.RequestChildBase / NoneType
+        @return: fingerprint
+        @rtype: tuple / NoneType
+        """
+        if requestChild is None:
+            return None
+
+        return tuple(sorted([
+            (attribute.attributeId,
+             attribute.dataType,
+             attribute.issuer,
+             tuple([(attributeValue.dataType, attributeValue.value)
+                    for attributeValue in attribute.attributeValues]))
+            for attribute in requestChild.attributes], key=repr))
+
+    def get(self, fingerprint):
+        """Get the cached decision for a request fingerprint
+
+        @param fingerprint: request fingerprint
+        @type fingerprint: tuple
+        @return: cached decision or None if there is no valid entry
+        @rtype: ndg.xacml.core.context.result.Decision / NoneType
+        """
+        with self.__lock:
+            entry = self.__entries.get(fingerprint)
+            if entry is None:
+                self.__misses += 1
+                return None
+
+            decision, expiryTime = entry
+            if expiryTime is not None and self.__timer() >= expiryTime:
+                del self.__entries[fingerprint]
+                self.__expirations += 1
+                self.__misses += 1
+                return None
+
+            self.__entries.move_to_end(fingerprint)
+            self.__hits += 1
+            return decision
+
+    def put(self, fingerprint, decision, generation=None):
+        """Cache a decision for a request fingerprint.  Indeterminate decisions
+        are not cached.
+
+        @param fingerprint: request fingerprint
+        @type fingerprint: tuple
+        @param decision: decision to cache
+        @type decision: ndg.xacml.core.context.result.Decision
+        @param generation: cache generation read before the decision was
+        evaluated.  If the cache has been cleared since, the decision may be
+        for a policy which has been replaced and is not cached.
+        @type generation: int / NoneType
+        @return: True if the decision was cached
+        @rtype: bool
+        """
+        if decision.value not in self.__class__.CACHEABLE_DECISIONS:
+            return False
+
+        with self.__lock:
+            if generation is not None and generation != self.__generation:
+                return False
+
+            if self.__ttl is None:
+                expiryTime = None
+            else:
+                expiryTime = self.__timer() + self.__ttl
+
+            self.__entries[fingerprint] = (decision, expiryTime)
+            self.__entries.move_to_end(fingerprint)
+
+            while len(self.__entries) > self.__maxSize:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+        return True
+
+    def recordBypass(self):
+        """Count a request which could not be cached"""
+        with self.__lock:
+            self.__bypasses += 1
+
+    def clear(self):
+        """Remove all entries.  Counters are not reset."""
+        with self.__lock:
+            self.__invalidations += len(self.__entries)
+            self.__generation += 1
+            self.__entries.clear()
+
+    def resetCounters(self):
+        """Reset the hit, miss, eviction, expiration, bypass and invalidation
+        counters"""
+        with self.__lock:
+            self.__hits = 0
+            self.__misses = 0
+            self.__evictions = 0
+            self.__expirations = 0
+            self.__bypasses = 0
+            self.__invalidations = 0
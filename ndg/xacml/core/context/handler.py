@@ -9,24 +9,30 @@ __contact__ = "Philip.Kershaw@stfc.ac.uk"
 __license__ = "BSD - see LICENSE file in top-level directory"
 __contact__ = "Philip.Kershaw@stfc.ac.uk"
 __revision__ = "$Id$"
-from ndg.xacml.core.context.handlerinterface import CtxHandlerInterface
+from ndg.xacml.core.context.handlerinterface import (CtxHandlerInterface,
+                                                     AsyncCtxHandlerInterface)
 from ndg.xacml.core.context.pdpinterface import PDPInterface
-from ndg.xacml.core.context.pipinterface import PIPInterface
+from ndg.xacml.core.context.pipinterface import (PIPInterface, 
+                                                 AsyncPIPInterface)
+from ndg.xacml.core.context.pipcache import PIPCache
     
 
 class CtxHandlerBase(CtxHandlerInterface):
     """Base class for Context handlers - extends Context handler interface to 
-    include Policy Decision Point and Policy Information Point references
+    include Policy Decision Point and Policy Information Point references and
+    an optional cache of Policy Information Point query results
     """
     
     __slots__ = (
         '__pip',
         '__pdp', 
+        '__pipCache',
     )
       
     def __init__(self):
         self.__pip = None
         self.__pdp = None
+        self.__pipCache = None
         
     def _getPip(self):
         return self.__pip
@@ -53,3 +59,132 @@ class CtxHandlerBase(CtxHandlerInterface):
         self.__pdp = value
 
     pdp = property(_getPdp, _setPdp, None, "Policy Decision Point")
+          
+    def _getPipCache(self):
+        return self.__pipCache
+
+    def _setPipCache(self, value):
+        if value is not None and not isinstance(value, PIPCache):
+            raise TypeError('Expecting %r type for "pipCache" attribute; got '
+                            '%r instead' % 
+                            (PIPCache, value))
+            
+        self.__pipCache = value
+
+    pipCache = property(_getPipCache, _setPipCache, None, 
+                        "Cache of Policy Information Point query results "
+                        "shared between requests")
+       
+    def pipQuery(self, request, designator):
+        """Query the Policy Information Point if one is set
+        
+        @param request: request context
+        @type request: ndg.xacml.core.context.request.Request
+        @param designator: designator requiring additional attribute 
+        information
+        @type designator: ndg.xacml.core.expression.Expression derived type
+        @return: attribute values or None if the PIP returned no values
+        @rtype: list / NoneType
+        """
+        if self.__pip is None:
+            return []
+        
+        return self.__pip.attributeQuery(request, designator)
+       
+    def pipQueryMany(self, request, designators):
+        """Query the Policy Information Point for several designators at once.
+        If pipQuery has not been overridden, the PIP is queried in a single 
+        call to its attributeQueryMany.  Otherwise, pipQuery is called for 
+        each designator in turn.
+        
+        @param request: request context
+        @type request: ndg.xacml.core.context.request.Request
+        @param designators: designators requiring additional attribute 
+        information
+        @type designators: list
+        @return: attribute values or None for each designator in order
+        @rtype: list
+        """
+        if (self.__pip is None or 
+            type(self).pipQuery is not CtxHandlerBase.pipQuery):
+            return super(CtxHandlerBase, self).pipQueryMany(request, 
+                                                            designators)
+            
+        return self.__pip.attributeQueryMany(request, designators)
+
+
+class AsyncCtxHandlerBase(AsyncCtxHandlerInterface):
+    """Base class for asynchronous Context handlers - extends the interface to 
+    include Policy Decision Point and asynchronous Policy Information Point 
+    references and an optional cache of Policy Information Point query results
+    """
+    
+    __slots__ = (
+        '__pip',
+        '__pdp', 
+        '__pipCache',
+    )
+      
+    def __init__(self):
+        self.__pip = None
+        self.__pdp = None
+        self.__pipCache = None
+        
+    def _getPip(self):
+        return self.__pip
+
+    def _setPip(self, value):
+        if not isinstance(value, AsyncPIPInterface):
+            raise TypeError('Expecting %r type for "pip" attribute; got %r '
+                            'instead' % 
+                            (AsyncPIPInterface, value))
+            
+        self.__pip = value
+
+    pip = property(_getPip, _setPip, None, 
+                   "Asynchronous Policy Information Point")
+          
+    def _getPdp(self):
+        return self.__pdp
+
+    def _setPdp(self, value):
+        if not isinstance(value, PDPInterface):
+            raise TypeError('Expecting %r type for "pdp" attribute; got %r '
+                            'instead' % 
+                            (PDPInterface, value))
+            
+        self.__pdp = value
+
+    pdp = property(_getPdp, _setPdp, None, "Policy Decision Point")
+          
+    def _getPipCache(self):
+        return self.__pipCache
+
+    def _setPipCache(self, value):
+        if value is not None and not isinstance(value, PIPCache):
+            raise TypeError('Expecting %r type for "pipCache" attribute; got '
+                            '%r instead' % 
+                            (PIPCache, value))
+            
+        self.__pipCache = value
+
+    pipCache = property(_getPipCache, _setPipCache, None, 
+                        "Cache of Policy Information Point query results "
+                        "shared between requests")
+       
+    async def asyncPipQuery(self, request, designator):
+        """Query the Policy Information Point if one is set
+        
+        @param request: request context
+        @type request: ndg.xacml.core.context.request.Request
+        @param designator: designator requiring additional attribute 
+        information
+        @type designator: ndg.xacml.core.expression.Expression derived type
+        @return: attribute values or None if there is no PIP or it returned
+        no values
+        @rtype: list / NoneType
+        """
+        if self.__pip is None:
+            return None
+        
+        return await self.__pip.attributeQuery(request, designator)
@@ -27,6 +27,15 @@ class CtxHandlerInterface(object, metaclass=ABCMeta):
         @rtype: None
         """
         raise NotImplementedError() 
+    
+    @property
+    def pipCache(self):
+        """Get cache of Policy Information Point query results shared between
+        requests.  None by default - derived classes may override.
+        @return: PIP cache or None if results aren't cached
+        @rtype: ndg.xacml.core.context.pipcache.PIPCache / NoneType
+        """
+        return None
        
     def pipQuery(self, request, designator):
         """Query a Policy Information Point to retrieve the attribute values
@@ -44,3 +53,67 @@ class CtxHandlerInterface(object, metaclass=ABCMeta):
         @rtype: list
         """
         return []
+       
+    def pipQueryMany(self, request, designators):
+        """Query a Policy Information Point to retrieve the attribute values
+        for several designators at once.  This default implementation calls
+        pipQuery for each designator in turn.  Derived classes may override it
+        to make the queries in a single round trip.
+        
+        @param request: request context
+        @type request: ndg.xacml.core.context.request.Request
+        @param designators: designators requiring additional attribute 
+        information
+        @type designators: list
+        @return: attribute values or None for each designator in order
+        @rtype: list
+        """
+        return [self.pipQuery(request, designator) 
+                for designator in designators]
+
+
+class AsyncCtxHandlerInterface(CtxHandlerInterface):
+    """Context Handler interface for use with AsyncPDP.  Policy Information 
+    Point queries are made asynchronously with asyncPipQuery.  The synchronous
+    pipQuery is not available as a blocking query would defeat the purpose of
+    this interface.
+    """
+    __slots__ = ()
+    
+    @abstractmethod
+    async def handlePEPRequest(self, pepRequest):
+        """Handle request from Policy Enforcement Point
+        
+        @param pepRequest: request from PEP, derived class determines its type
+        e.g. SAML AuthzDecisionQuery
+        @type pepRequest: type
+        @return: PEP response - derived class determines type
+        @rtype: None
+        """
+        raise NotImplementedError() 
+       
+    def pipQuery(self, request, designator):
+        """Synchronous queries are not supported - evaluate requests with
+        AsyncPDP
+        
+        @raise NotImplementedError: always raised
+        """
+        raise NotImplementedError('Synchronous Policy Information Point '
+                                  'queries are not supported by %r: evaluate '
+                                  'requests with AsyncPDP' %
+                                  self.__class__.__name__)
+       
+    async def asyncPipQuery(self, request, designator):
+        """Query a Policy Information Point to retrieve the attribute values
+        corresponding to the specified input designator.
+        
+        @param request: request context
+        @type request: ndg.xacml.core.context.request.Request
+        @param designator: designator requiring additional subject attribute 
+        information
+        @type designator: ndg.xacml.core.expression.Expression derived type
+        @return: list of attribute values for subject corresponding to given
+        policy designator
+        @rtype: list
+        """
+        return []
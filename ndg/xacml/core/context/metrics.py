@@ -0,0 +1,526 @@
+"""NDG XACML decision metrics - sink interface, in-memory sink and Prometheus
+text format exporter
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+from abc import ABCMeta, abstractmethod
+from bisect import bisect_left
+import threading
+import logging
+log = logging.getLogger(__name__)
+
+
+class MetricsSinkInterface(object, metaclass=ABCMeta):
+    """Interface for recording metrics from a PDP.  Set a sink in the PDP
+    to record each decision made, errors resulting in Indeterminate results,
+    Policy Information Point calls made via the context handler and policy
+    loads.  Methods are called on the evaluation path so implementations
+    should only update counters.
+    """
+    __slots__ = ()
+
+    @abstractmethod
+    def recordDecision(self, decision, latency):
+        """Record a decision made by the PDP
+
+        @param decision: decision e.g. Permit
+        @type decision: string
+        @param latency: time in seconds taken to make the decision
+        @type latency: float
+        """
+
+    @abstractmethod
+    def recordIndeterminate(self, errorType):
+        """Record an error evaluating a rule, policy or policy set which
+        resulted in an Indeterminate result for it
+
+        @param errorType: name of the exception type raised
+        @type errorType: string
+        """
+
+    @abstractmethod
+    def recordPIPCall(self, latency, nQueries, errorType=None):
+        """Record a call to the Policy Information Point via the context
+        handler
+
+        @param latency: time in seconds taken by the call
+        @type latency: float
+        @param nQueries: number of attribute designators queried
+        @type nQueries: int
+        @param errorType: name of the exception type raised by the call or
+        None if it succeeded
+        @type errorType: string / NoneType
+        """
+
+    @abstractmethod
+    def recordPolicyLoad(self, latency, kind):
+        """Record loading a policy
+
+        @param latency: time in seconds taken to load the policy
+        @type latency: float
+        @param kind: how the policy was loaded - one of 'parse', 'snapshot'
+        or 'reload'
+        @type kind: string
+        """
+
+
+class Histogram(object):
+    """Histogram of observed values with cumulative counts for each bucket
+    upper bound as for a Prometheus histogram
+
+    @ivar __buckets: bucket upper bounds in increasing order
+    @type __buckets: tuple
+    @ivar __counts: number of observations in each bucket, not cumulative,
+    with a final bucket for values above the last upper bound
+    @type __counts: list
+    @ivar __sum: sum of observed values
+    @type __sum: float
+    """
+    __slots__ = ('__buckets', '__counts', '__sum')
+
+    def __init__(self, buckets):
+        """@param buckets: bucket upper bounds in increasing order
+        @type buckets: iterable
+        @raise ValueError: buckets aren't in increasing order
+        """
+        buckets = tuple(buckets)
+        if list(buckets) != sorted(set(buckets)):
+            raise ValueError('Expecting "buckets" in increasing order; got %r'
+                             % (buckets,))
+
+        self.__buckets = buckets
+        self.__counts = [0]*(len(buckets) + 1)
+        self.__sum = 0.
+
+    def observe(self, value):
+        """Add an observation
+
+        @param value: observed value
+        @type value: float
+        """
+        self.__counts[bisect_left(self.__buckets, value)] += 1
+        self.__sum += value
+
+    @property
+    def buckets(self):
+        """@return: bucket upper bounds in increasing order
+        @rtype: tuple
+        """
+        return self.__buckets
+
+    @property
+    def count(self):
+        """@return: number of observations
+        @rtype: int
+        """
+        return sum(self.__counts)
+
+    @property
+    def sum(self):
+        """@return: sum of observed values
+        @rtype: float
+        """
+        return self.__sum
+
+    def getCumulativeCounts(self):
+        """@return: number of observations less than or equal to each bucket
+        upper bound, followed by the total for the implicit +Inf bucket
+        @rtype: list
+        """
+        cumulativeCounts = []
+        total = 0
+        for n in self.__counts:
+            total += n
+            cumulativeCounts.append(total)
+        return cumulativeCounts
+
+    def copy(self):
+        """@return: copy of this histogram
+        @rtype: ndg.xacml.core.context.metrics.Histogram
+        """
+        histogram = self.__class__(self.__buckets)
+        histogram.__counts = list(self.__counts)
+        histogram.__sum = self.__sum
+        return histogram
+
+
+class InMemoryMetricsSink(MetricsSinkInterface):
+    """Metrics sink holding counters and latency histograms in memory.  It
+    may be shared between PDPs and threads.  Counters and histograms are
+    keyed by metric name and a tuple of label name and value pairs.
+
+    @cvar DECISIONS: counter of decisions by decision
+    @type DECISIONS: string
+    @cvar DECISION_LATENCY: histogram of decision latencies
+    @type DECISION_LATENCY: string
+    @cvar INDETERMINATE_ERRORS: counter of errors resulting in Indeterminate
+    results by exception type
+    @type INDETERMINATE_ERRORS: string
+    @cvar PIP_CALLS: counter of Policy Information Point calls
+    @type PIP_CALLS: string
+    @cvar PIP_QUERIES: counter of attribute designators queried by Policy
+    Information Point calls
+    @type PIP_QUERIES: string
+    @cvar PIP_CALL_ERRORS: counter of Policy Information Point calls raising
+    an exception by exception type
+    @type PIP_CALL_ERRORS: string
+    @cvar PIP_CALL_LATENCY: histogram of Policy Information Point call
+    latencies
+    @type PIP_CALL_LATENCY: string
+    @cvar POLICY_LOADS: counter of policy loads by kind
+    @type POLICY_LOADS: string
+    @cvar POLICY_LOAD_LATENCY: histogram of policy load times by kind
+    @type POLICY_LOAD_LATENCY: string
+    @cvar METRICS: type and description of each metric
+    @type METRICS: dict
+    @cvar DEFAULT_LATENCY_BUCKETS: default decision and PIP call latency
+    histogram bucket upper bounds in seconds
+    @type DEFAULT_LATENCY_BUCKETS: tuple
+    @cvar DEFAULT_LOAD_TIME_BUCKETS: default policy load time histogram
+    bucket upper bounds in seconds
+    @type DEFAULT_LOAD_TIME_BUCKETS: tuple
+
+    @ivar __latencyBuckets: decision and PIP call latency histogram bucket
+    upper bounds
+    @type __latencyBuckets: tuple
+    @ivar __loadTimeBuckets: policy load time histogram bucket upper bounds
+    @type __loadTimeBuckets: tuple
+    @ivar __counters: counter values keyed by metric name and labels
+    @type __counters: dict
+    @ivar __histograms: histograms keyed by metric name and labels
+    @type __histograms: dict
+    @ivar __lock: lock for updates
+    @type __lock: threading.Lock
+    """
+    DECISIONS = 'decisions_total'
+    DECISION_LATENCY = 'decision_latency_seconds'
+    INDETERMINATE_ERRORS = 'indeterminate_errors_total'
+    PIP_CALLS = 'pip_calls_total'
+    PIP_QUERIES = 'pip_queries_total'
+    PIP_CALL_ERRORS = 'pip_call_errors_total'
+    PIP_CALL_LATENCY = 'pip_call_latency_seconds'
+    POLICY_LOADS = 'policy_loads_total'
+    POLICY_LOAD_LATENCY = 'policy_load_latency_seconds'
+
+    METRICS = {
+        DECISIONS: ('counter', 'Decisions made by decision'),
+        DECISION_LATENCY: ('histogram', 'Time taken to make decisions'),
+        INDETERMINATE_ERRORS: ('counter', 'Errors evaluating rules, policies '
+                               'and policy sets resulting in Indeterminate '
+                               'results by exception type'),
+        PIP_CALLS: ('counter', 'Policy Information Point calls'),
+        PIP_QUERIES: ('counter', 'Attribute designators queried by Policy '
+                      'Information Point calls'),
+        PIP_CALL_ERRORS: ('counter', 'Policy Information Point calls raising '
+                          'an error by exception type'),
+        PIP_CALL_LATENCY: ('histogram', 'Time taken by Policy Information '
+                           'Point calls'),
+        POLICY_LOADS: ('counter', 'Policies loaded by kind'),
+        POLICY_LOAD_LATENCY: ('histogram', 'Time taken to load policies by '
+                              'kind'),
+    }
+
+    DEFAULT_LATENCY_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3,
+                               2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, .1, .25, .5,
+                               1., 2.5, 5., 10.)
+    DEFAULT_LOAD_TIME_BUCKETS = (1e-3, 5e-3, 1e-2, 5e-2, .1, .5, 1., 5., 10.,
+                                 30., 60.)
+
+    __slots__ = (
+        '__latencyBuckets',
+        '__loadTimeBuckets',
+        '__counters',
+        '__histograms',
+        '__lock'
+    )
+
+    def __init__(self, latencyBuckets=DEFAULT_LATENCY_BUCKETS,
+                 loadTimeBuckets=DEFAULT_LOAD_TIME_BUCKETS):
+        """@param latencyBuckets: decision and PIP call latency histogram
+        bucket upper bounds in seconds
+        @type latencyBuckets: iterable
+        @param loadTimeBuckets: policy load time histogram bucket upper bounds
+        in seconds
+        @type loadTimeBuckets: iterable
+        """
+        self.__latencyBuckets = tuple(latencyBuckets)
+        self.__loadTimeBuckets = tuple(loadTimeBuckets)
+        self.__counters = {}
+        self.__histograms = {}
+        self.__lock = threading.Lock()
+
+        # Check the buckets up front rather than on the first observation
+        Histogram(self.__latencyBuckets)
+        Histogram(self.__loadTimeBuckets)
+
+    def _increment(self, name, labels, value=1):
+        """Increment a counter.  The caller must hold the lock.
+
+        @param name: metric name
+        @type name: string
+        @param labels: label name and value pairs
+        @type labels: tuple
+        @param value: amount to add
+        @type value: int
+        """
+        key = (name, labels)
+        self.__counters[key] = self.__counters.get(key, 0) + value
+
+    def _observe(self, name, labels, buckets, value):
+        """Add an observation to a histogram.  The caller must hold the lock.
+
+        @param name: metric name
+        @type name: string
+        @param labels: label name and value pairs
+        @type labels: tuple
+        @param buckets: bucket upper bounds for a new histogram
+        @type buckets: tuple
+        @param value: observed value
+        @type value: float
+        """
+        key = (name, labels)
+        histogram = self.__histograms.get(key)
+        if histogram is None:
+            histogram = self.__histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def recordDecision(self, decision, latency):
+        """Record a decision made by the PDP
+
+        @param decision: decision e.g. Permit
+        @type decision: string
+        @param latency: time in seconds taken to make the decision
+        @type latency: float
+        """
+        cls = self.__class__
+        with self.__lock:
+            self._increment(cls.DECISIONS, (('decision', decision),))
+            self._observe(cls.DECISION_LATENCY, (), self.__latencyBuckets,
+                          latency)
+
+    def recordIndeterminate(self, errorType):
+        """Record an error resulting in an Indeterminate result
+
+        @param errorType: name of the exception type raised
+        @type errorType: string
+        """
+        with self.__lock:
+            self._increment(self.__class__.INDETERMINATE_ERRORS,
+                            (('error_type', errorType),))
+
+    def recordPIPCall(self, latency, nQueries, errorType=None):
+        """Record a call to the Policy Information Point
+
+        @param latency: time in seconds taken by the call
+        @type latency: float
+        @param nQueries: number of attribute designators queried
+        @type nQueries: int
+        @param errorType: name of the exception type raised by the call or
+        None if it succeeded
+        @type errorType: string / NoneType
+        """
+        cls = self.__class__
+        with self.__lock:
+            self._increment(cls.PIP_CALLS, ())
+            self._increment(cls.PIP_QUERIES, (), nQueries)
+            if errorType is not None:
+                self._increment(cls.PIP_CALL_ERRORS,
+                                (('error_type', errorType),))
+            self._observe(cls.PIP_CALL_LATENCY, (), self.__latencyBuckets,
+                          latency)
+
+    def recordPolicyLoad(self, latency, kind):
+        """Record loading a policy
+
+        @param latency: time in seconds taken to load the policy
+        @type latency: float
+        @param kind: how the policy was loaded - one of 'parse', 'snapshot'
+        or 'reload'
+        @type kind: string
+        """
+        cls = self.__class__
+        labels = (('kind', kind),)
+        with self.__lock:
+            self._increment(cls.POLICY_LOADS, labels)
+            self._observe(cls.POLICY_LOAD_LATENCY, labels,
+                          self.__loadTimeBuckets, latency)
+
+    def getCounter(self, name, **labels):
+        """Get the value of a counter
+
+        @param name: metric name e.g. InMemoryMetricsSink.DECISIONS
+        @type name: string
+        @param labels: label values e.g. decision='Permit'
+        @type labels: dict
+        @return: counter value, zero if nothing has been recorded
+        @rtype: int
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self.__lock:
+            return self.__counters.get(key, 0)
+
+    def getHistogram(self, name, **labels):
+        """Get a copy of a histogram
+
+        @param name: metric name e.g. InMemoryMetricsSink.DECISION_LATENCY
+        @type name: string
+        @param labels: label values e.g. kind='parse'
+        @type labels: dict
+        @return: histogram or None if nothing has been recorded
+        @rtype: ndg.xacml.core.context.metrics.Histogram / NoneType
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self.__lock:
+            histogram = self.__histograms.get(key)
+            if histogram is None:
+                return None
+            return histogram.copy()
+
+    def getSamples(self):
+        """Get a consistent copy of all the counters and histograms
+
+        @return: counter values and histograms, each keyed by metric name and
+        a tuple of label name and value pairs
+        @rtype: tuple
+        """
+        with self.__lock:
+            return (dict(self.__counters),
+                    dict([(key, histogram.copy())
+                          for key, histogram in self.__histograms.items()]))
+
+    def reset(self):
+        """Clear all the counters and histograms"""
+        with self.__lock:
+            self.__counters = {}
+            self.__histograms = {}
+
+
+class PrometheusTextExporter(object):
+    """Format the metrics held by an in-memory sink in the Prometheus text
+    exposition format for serving from an existing HTTP endpoint or writing
+    to a file for a node exporter textfile collector
+
+    @cvar DEFAULT_PREFIX: default prefix for metric names
+    @type DEFAULT_PREFIX: string
+
+    @ivar __prefix: prefix for metric names
+    @type __prefix: string
+    """
+    DEFAULT_PREFIX = 'ndg_xacml_'
+
+    __slots__ = ('__prefix',)
+
+    def __init__(self, prefix=DEFAULT_PREFIX):
+        """@param prefix: prefix for metric names
+        @type prefix: string
+        """
+        if not isinstance(prefix, str):
+            raise TypeError('Expecting %r type for "prefix"; got %r' %
+                            (str, type(prefix)))
+        self.__prefix = prefix
+
+    @property
+    def prefix(self):
+        """@return: prefix for metric names
+        @rtype: string
+        """
+        return self.__prefix
+
+    @staticmethod
+    def _formatLabels(labels):
+        """@return: label set in Prometheus text format
+        @rtype: string
+        """
+        if not labels:
+            return ''
+
+        return '{%s}' % ','.join([
+            '%s="%s"' % (name, str(value).replace('\\', '\\\\').replace(
+                                '"', '\\"').replace('\n', '\\n'))
+            for name, value in labels])
+
+    @staticmethod
+    def _formatValue(value):
+        """@return: sample value in Prometheus text format
+        @rtype: string
+        """
+        if value == float('inf'):
+            return '+Inf'
+        return repr(value)
+
+    def export(self, sink):
+        """Format the metrics held by a sink
+
+        @param sink: in-memory metrics sink
+        @type sink: ndg.xacml.core.context.metrics.InMemoryMetricsSink
+        @return: metrics in Prometheus text format
+        @rtype: string
+        """
+        if not isinstance(sink, InMemoryMetricsSink):
+            raise TypeError('Expecting %r type for "sink"; got %r' %
+                            (InMemoryMetricsSink, type(sink)))
+
+        counters, histograms = sink.getSamples()
+        lines = []
+        for name in sorted(sink.METRICS.keys()):
+            metricType, description = sink.METRICS[name]
+            if metricType == 'counter':
+                samples = sorted([(labels, value)
+                                  for (sampleName, labels), value in
+                                  counters.items() if sampleName == name])
+            else:
+                samples = sorted([(labels, histogram)
+                                  for (sampleName, labels), histogram in
+                                  histograms.items() if sampleName == name],
+                                 key=lambda sample: sample[0])
+            if not samples:
+                continue
+
+            metricName = self.__prefix + name
+            lines.append('# HELP %s %s' % (metricName, description))
+            lines.append('# TYPE %s %s' % (metricName, metricType))
+            for labels, value in samples:
+                if metricType == 'counter':
+                    lines.append('%s%s %d' % (metricName,
+                                              self._formatLabels(labels),
+                                              value))
+                    continue
+
+                upperBounds = value.buckets + (float('inf'),)
+                for upperBound, count in zip(upperBounds,
+                                             value.getCumulativeCounts()):
+                    lines.append('%s_bucket%s %d' % (
+                        metricName,
+                        self._formatLabels(labels + (
+                                    ('le', self._formatValue(upperBound)),)),
+                        count))
+                lines.append('%s_sum%s %s' % (metricName,
+                                              self._formatLabels(labels),
+                                              self._formatValue(value.sum)))
+                lines.append('%s_count%s %d' % (metricName,
+                                                self._formatLabels(labels),
+                                                value.count))
+
+        return ''.join([line + '\n' for line in lines])
+
+    def write(self, sink, dest):
+        """Write the metrics held by a sink in Prometheus text format
+
+        @param sink: in-memory metrics sink
+        @type sink: ndg.xacml.core.context.metrics.InMemoryMetricsSink
+        @param dest: file path or text stream to write to
+        @type dest: string / file like object
+        """
+        text = self.export(sink)
+        if isinstance(dest, str):
+            with open(dest, 'w') as stream:
+                stream.write(text)
+        else:
+            dest.write(text)
@@ -0,0 +1,281 @@
+"""NDG XACML parallel Policy Decision Point - evaluates requests across a pool
+of worker processes each holding their own PDP
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml.core.context.pdpinterface import PDPInterface
+from ndg.xacml.core.context.pdp import PDP
+from ndg.xacml.core.context.requestcodec import RequestCodec
+from ndg.xacml.core.context.response import Response
+
+
+# PDP for the current worker process, set by _initWorker
+_workerPdp = None
+
+# PDPs to be inherited by forked worker processes keyed by ParallelPDP
+# instance
+_forkedPdps = {}
+_forkedPdpKeys = itertools.count()
+
+
+def _initWorker(policySource, readerFactory, forkedPdpKey):
+    """Initialise a worker process loading the policy or taking the PDP
+    inherited from the parent process
+
+    @param policySource: source for policy or None for an inherited PDP
+    @type policySource: basestring / NoneType
+    @param readerFactory: reader factory for the policy
+    @type readerFactory: ndg.xacml.parsers.AbstractReaderFactory derived type
+    @param forkedPdpKey: key for inherited PDP or None to load the policy
+    @type forkedPdpKey: int / NoneType
+    """
+    global _workerPdp
+    if forkedPdpKey is not None:
+        _workerPdp = _forkedPdps[forkedPdpKey]
+    else:
+        _workerPdp = PDP.fromPolicySource(policySource, readerFactory)
+
+
+def _evaluateChunk(encodedRequests):
+    """Evaluate a chunk of encoded requests in a worker process
+
+    @param encodedRequests: requests encoded with RequestCodec
+    @type encodedRequests: tuple
+    @return: results encoded with RequestCodec
+    @rtype: tuple
+    """
+    requests = [RequestCodec.decodeRequest(encodedRequest)
+                for encodedRequest in encodedRequests]
+    response = _workerPdp.evaluateMany(requests)
+    return tuple([RequestCodec.encodeResult(result)
+                  for result in response.results])
+
+
+class ParallelPDP(PDPInterface):
+    """Policy Decision Point which evaluates requests in a pool of worker
+    processes so that evaluation isn't limited to a single interpreter.  Each
+    worker either loads the policy from source once when it starts, or, where
+    processes are started by forking, inherits a PDP already created in this
+    process.
+
+    Requests are passed to the workers in chunks encoded with RequestCodec.
+    The number of chunks submitted and not yet completed is limited so that
+    large or unbounded sequences of requests don't queue without bound.
+    Requests with a context handler set can't be evaluated as the handler
+    can't be passed to the workers.
+
+    @cvar DEFAULT_CHUNK_SIZE: default number of requests sent to a worker at a
+    time
+    @type DEFAULT_CHUNK_SIZE: int
+
+    @ivar __executor: pool of worker processes
+    @type __executor: concurrent.futures.ProcessPoolExecutor
+    @ivar __chunkSize: number of requests sent to a worker at a time
+    @type __chunkSize: int
+    @ivar __maxPendingChunks: maximum number of chunks submitted and not yet
+    completed
+    @type __maxPendingChunks: int
+    @ivar __forkedPdpKey: key for the PDP inherited by the workers or None if
+    the workers load the policy
+    @type __forkedPdpKey: int / NoneType
+    """
+    DEFAULT_CHUNK_SIZE = 64
+
+    __slots__ = (
+        '__executor',
+        '__chunkSize',
+        '__maxPendingChunks',
+        '__forkedPdpKey'
+    )
+
+    def __init__(self, policySource=None, readerFactory=None, pdp=None,
+                 nWorkers=None, chunkSize=DEFAULT_CHUNK_SIZE,
+                 maxPendingChunks=None):
+        """Set either a policy source and reader factory for the workers to
+        load the policy from or a PDP for them to inherit
+
+        @param policySource: source for policy
+        @type policySource: basestring
+        @param readerFactory: reader factory for the policy
+        @type readerFactory: ndg.xacml.parsers.AbstractReaderFactory derived
+        type
+        @param pdp: PDP to be inherited by the workers.  Processes must be
+        started by forking for this option.
+        @type pdp: ndg.xacml.core.context.pdp.PDP
+        @param nWorkers: number of worker processes, defaults to the number of
+        CPUs
+        @type nWorkers: int / NoneType
+        @param chunkSize: number of requests sent to a worker at a time
+        @type chunkSize: int
+        @param maxPendingChunks: maximum number of chunks submitted and not
+        yet completed, defaults to twice the number of workers
+        @type maxPendingChunks: int / NoneType
+        @raise TypeError: incorrect input type
+        @raise ValueError: invalid combination of inputs or input value
+        """
+        if not isinstance(chunkSize, int):
+            raise TypeError('Expecting %r type for "chunkSize"; got %r' %
+                            (int, type(chunkSize)))
+        if chunkSize < 1:
+            raise ValueError('Expecting "chunkSize" greater than zero; got %r'
+                             % chunkSize)
+
+        if nWorkers is None:
+            nWorkers = multiprocessing.cpu_count()
+
+        if maxPendingChunks is None:
+            maxPendingChunks = 2 * nWorkers
+
+        elif not isinstance(maxPendingChunks, int):
+            raise TypeError('Expecting %r type for "maxPendingChunks"; got %r'
+                            % (int, type(maxPendingChunks)))
+        if maxPendingChunks < 1:
+            raise ValueError('Expecting "maxPendingChunks" greater than zero; '
+                             'got %r' % maxPendingChunks)
+
+        self.__chunkSize = chunkSize
+        self.__maxPendingChunks = maxPendingChunks
+        self.__forkedPdpKey = None
+
+        if pdp is not None:
+            if policySource is not None:
+                raise ValueError('Set either "pdp" or "policySource" but not '
+                                 'both')
+            if not isinstance(pdp, PDP):
+                raise TypeError('Expecting %r type for "pdp"; got %r' %
+                                (PDP, type(pdp)))
+            if 'fork' not in multiprocessing.get_all_start_methods():
+                raise ValueError('Worker processes can\'t inherit a PDP as '
+                                 'forking is not supported on this platform')
+
+            self.__forkedPdpKey = next(_forkedPdpKeys)
+            _forkedPdps[self.__forkedPdpKey] = pdp
+            mpContext = multiprocessing.get_context('fork')
+
+        elif policySource is None or readerFactory is None:
+            raise ValueError('Set "policySource" and "readerFactory" or "pdp"')
+        else:
+            mpContext = None
+
+        self.__executor = ProcessPoolExecutor(
+                            max_workers=nWorkers,
+                            mp_context=mpContext,
+                            initializer=_initWorker,
+                            initargs=(policySource,
+                                      readerFactory,
+                                      self.__forkedPdpKey))
+
+    @property
+    def chunkSize(self):
+        """@return: number of requests sent to a worker at a time
+        @rtype: int
+        """
+        return self.__chunkSize
+
+    @property
+    def maxPendingChunks(self):
+        """@return: maximum number of chunks submitted and not yet completed
+        @rtype: int
+        """
+        return self.__maxPendingChunks
+
+    def evaluate(self, request):
+        """Make an access control decision for a request
+
+        @param request: XACML request context
+        @type request: ndg.xacml.core.context.request.Request
+        @return: XACML response instance
+        @rtype: ndg.xacml.core.context.response.Response
+        @raise TypeError: input is not a request context
+        @raise ValueError: request has a context handler set
+        """
+        return self.evaluateMany([request])
+
+    def evaluateMany(self, requests):
+        """Make access control decisions for a batch of requests
+
+        @param requests: XACML request contexts
+        @type requests: iterable
+        @return: XACML response with one result for each request in order
+        @rtype: ndg.xacml.core.context.response.Response
+        @raise TypeError: an input is not a request context
+        @raise ValueError: a request has a context handler set
+        """
+        response = Response()
+        response.results.extend(list(self.iterResults(requests)))
+        return response
+
+    def iterResults(self, requests):
+        """Make access control decisions for a sequence of requests returning
+        results as they become available.  Requests are only read from the
+        input as fast as the workers can take them.
+
+        @param requests: XACML request contexts
+        @type requests: iterable
+        @return: result for each request in order
+        @rtype: generator
+        @raise TypeError: an input is not a request context
+        @raise ValueError: a request has a context handler set
+        """
+        pendingChunks = deque()
+        requests = iter(requests)
+        while True:
+            encodedRequests = tuple([
+                RequestCodec.encodeRequest(request)
+                for request in itertools.islice(requests, self.__chunkSize)])
+            if len(encodedRequests) == 0:
+                break
+
+            if len(pendingChunks) >= self.__maxPendingChunks:
+                # Wait for the oldest chunk to complete before submitting more
+                for result in self._getChunkResults(pendingChunks.popleft()):
+                    yield result
+
+            pendingChunks.append(self.__executor.submit(_evaluateChunk,
+                                                        encodedRequests))
+
+        while pendingChunks:
+            for result in self._getChunkResults(pendingChunks.popleft()):
+                yield result
+
+    @staticmethod
+    def _getChunkResults(future):
+        """Get the results for a chunk of requests submitted to the workers
+
+        @param future: future for the chunk evaluation
+        @type future: concurrent.futures.Future
+        @return: results
+        @rtype: list
+        """
+        return [RequestCodec.decodeResult(encodedResult)
+                for encodedResult in future.result()]
+
+    def shutdown(self, wait=True):
+        """Stop the worker processes
+
+        @param wait: wait for pending requests to complete
+        @type wait: bool
+        """
+        self.__executor.shutdown(wait=wait)
+        if self.__forkedPdpKey is not None:
+            _forkedPdps.pop(self.__forkedPdpKey, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.shutdown()
@@ -9,11 +9,27 @@ __contact__ = "Philip.Kershaw@stfc.ac.uk"
 __license__ = "BSD - see LICENSE file in top-level directory"
 __contact__ = "Philip.Kershaw@stfc.ac.uk"
 __revision__ = "$Id$"
+import time
+import traceback
 import logging
 log = logging.getLogger(__name__)
 
+from ndg.xacml import Config
 from ndg.xacml.core.context.pdpinterface import PDPInterface
+from ndg.xacml.core.context.handlerinterface import AsyncCtxHandlerInterface
 from ndg.xacml.core.policybase import PolicyBase
+from ndg.xacml.core.policy import Policy
+from ndg.xacml.core.policyset import PolicySet
+from ndg.xacml.core.apply import Apply
+from ndg.xacml.core.attributedesignator import SubjectAttributeDesignator
+from ndg.xacml.core.compiler import PolicyCompiler
+from ndg.xacml.core.snapshot import PolicySnapshot
+from ndg.xacml.core.optimiser import PolicyOptimiser
+from ndg.xacml.core.ruleorder import AdaptiveRuleOrder
+from ndg.xacml.core.context.response import Response
+from ndg.xacml.core.context.result import Result
+from ndg.xacml.core.context.decisioncache import DecisionCache
+from ndg.xacml.core.context.metrics import MetricsSinkInterface
 from ndg.xacml.finder.defaultfinder import getDefaultPolicyFinder
 
 
@@ -24,21 +40,97 @@ class PDP(PDPInterface):
     @ivar __policy: policy object for PDP to use to apply access control
     decisions
     @type policy: ndg.xacml.core.policy.Policy / None
+    @ivar __decisionCache: optional cache of decisions for previous requests
+    @type __decisionCache: ndg.xacml.core.context.decisioncache.DecisionCache /
+    None
+    @ivar __prefetchPIPQueries: set to True to query the Policy Information
+    Point for all the attributes the policy may need in a single call before
+    evaluating a request with a context handler
+    @type __prefetchPIPQueries: bool
+    @ivar __pipQueryDesignators: designators in the policy which may query
+    the Policy Information Point, found when first needed
+    @type __pipQueryDesignators: tuple / None
+    @ivar __shortCircuitMatching: set to True to enable short circuit 
+    matching of targets for requests evaluated
+    @type __shortCircuitMatching: bool
+    @ivar __metricsSink: optional sink recording decisions, errors, PIP 
+    calls and policy loads
+    @type __metricsSink: 
+    ndg.xacml.core.context.metrics.MetricsSinkInterface / None
+    @ivar __adaptiveRuleOrdering: set to True to evaluate the rules of 
+    policies with deny overrides and permit overrides rule combining 
+    algorithms in an order learnt at runtime
+    @type __adaptiveRuleOrdering: bool
+    @ivar __adaptiveRuleOrders: rule orders learnt for the policies of this
+    PDP keyed by policy object ID or None if adaptive rule ordering is not
+    enabled
+    @type __adaptiveRuleOrders: dict / None
     """
-    __slots__ = ('__policy',)
-    
-    def __init__(self, policy=None):
+    __slots__ = (
+        '__policy', 
+        '__decisionCache', 
+        '__prefetchPIPQueries', 
+        '__pipQueryDesignators',
+        '__shortCircuitMatching',
+        '__metricsSink',
+        '__adaptiveRuleOrdering',
+        '__adaptiveRuleOrders'
+    )
+
+    def __init__(self, policy=None, decisionCache=None, 
+                 prefetchPIPQueries=False, shortCircuitMatching=False,
+                 metricsSink=None, adaptiveRuleOrdering=False):
         """
         @param policy: policy object for PDP to use to apply access control
         decisions, may be omitted.
         @type policy: ndg.xacml.core.policy.Policy / None
+        @param decisionCache: cache of decisions, may be omitted in which case
+        no caching is made
+        @type decisionCache:
+        ndg.xacml.core.context.decisioncache.DecisionCache / None
+        @param prefetchPIPQueries: set to True to query the Policy Information
+        Point for all the attributes the policy may need in a single call 
+        before evaluating a request with a context handler
+        @type prefetchPIPQueries: bool
+        @param shortCircuitMatching: set to True to stop evaluating targets 
+        once their result is known where the remaining matches can't raise 
+        an error
+        @type shortCircuitMatching: bool
+        @param metricsSink: sink recording decisions, errors, PIP calls and 
+        policy loads, may be omitted in which case no metrics are recorded
+        @type metricsSink: 
+        ndg.xacml.core.context.metrics.MetricsSinkInterface / None
+        @param adaptiveRuleOrdering: set to True to evaluate the rules of 
+        policies with deny overrides and permit overrides rule combining 
+        algorithms in an order learnt at runtime
+        @type adaptiveRuleOrdering: bool
         """
+        self.__metricsSink = None
+        if metricsSink is not None:
+            self.metricsSink = metricsSink
+
+        self.__decisionCache = None
+        if decisionCache is not None:
+            self.decisionCache = decisionCache
+
+        self.__prefetchPIPQueries = False
+        self.prefetchPIPQueries = prefetchPIPQueries
+        self.__pipQueryDesignators = None
+        
+        self.__shortCircuitMatching = False
+        self.shortCircuitMatching = shortCircuitMatching
+
         self.__policy = None
+        self.__adaptiveRuleOrdering = False
+        self.__adaptiveRuleOrders = None
+        self.adaptiveRuleOrdering = adaptiveRuleOrdering
+
         if policy is not None:
             self.policy = policy
         
     @classmethod
-    def fromPolicySource(cls, source, readerFactory, finder=None):
+    def fromPolicySource(cls, source, readerFactory, finder=None, 
+                         metricsSink=None):
         """Create a new PDP instance with a given policy
         @param source: source for policy
         @type source: type (dependent on the reader set, it could be for example
@@ -48,8 +140,14 @@ class PDP(PDPInterface):
         @type readerFactory: ndg.xacml.parsers.AbstractReader derived type
         @param finder: policy finder
         @type finder: ndg.xacml.finder.PolicyFinderBase subclass
+        @param metricsSink: sink recording the policy load and the PDP's 
+        decisions
+        @type metricsSink: 
+        ndg.xacml.core.context.metrics.MetricsSinkInterface / None
         """           
         pdp = cls()
+        if metricsSink is not None:
+            pdp.metricsSink = metricsSink
         if not finder:
             # Set a default policy finder.
             finder = getDefaultPolicyFinder(source)
@@ -67,7 +165,61 @@ class PDP(PDPInterface):
         @param finder: policy finder
         @type finder: ndg.xacml.finder.PolicyFinderBase subclass
         """           
-        self.policy = PolicyBase.fromSource(source, readerFactory, finder)
+        startTime = time.perf_counter()
+        policy = PolicyBase.fromSource(source, readerFactory, finder)
+        if self.__metricsSink is not None:
+            self.__metricsSink.recordPolicyLoad(time.perf_counter() - startTime,
+                                                'parse')
+        self.policy = policy
+
+    @classmethod
+    def fromSnapshot(cls, filePath, metricsSink=None):
+        """Create a new PDP instance with a policy loaded from a snapshot
+        file saved with saveSnapshot.  This avoids parsing the policy XML at
+        start up.
+        @param filePath: snapshot file path
+        @type filePath: string
+        @param metricsSink: sink recording the policy load and the PDP's 
+        decisions
+        @type metricsSink: 
+        ndg.xacml.core.context.metrics.MetricsSinkInterface / None
+        @raise ndg.xacml.core.snapshot.PolicySnapshotError: file is not a
+        policy snapshot or is for a different snapshot format version
+        """
+        pdp = cls()
+        if metricsSink is not None:
+            pdp.metricsSink = metricsSink
+        startTime = time.perf_counter()
+        policy = PolicySnapshot.load(filePath)
+        if metricsSink is not None:
+            metricsSink.recordPolicyLoad(time.perf_counter() - startTime,
+                                         'snapshot')
+        pdp.policy = policy
+        return pdp
+
+    def saveSnapshot(self, filePath):
+        """Save the PDP's policy to a snapshot file for loading with
+        fromSnapshot
+        @param filePath: snapshot file path
+        @type filePath: string
+        @raise ndg.xacml.core.snapshot.PolicySnapshotError: the policy contains
+        custom types which can't be saved
+        """
+        PolicySnapshot.save(self.policy, filePath)
+
+    def optimisePolicy(self, optimiser=None):
+        """Replace the PDP's policy with an optimised copy giving the same
+        decisions
+        @param optimiser: policy optimiser, defaults to PolicyOptimiser
+        @type optimiser: ndg.xacml.core.optimiser.PolicyOptimiser
+        @return: report of the changes made to the policy
+        @rtype: ndg.xacml.core.optimiser.PolicyOptimisationReport
+        """
+        if optimiser is None:
+            optimiser = PolicyOptimiser()
+
+        self.policy = optimiser.optimise(self.policy)
+        return optimiser.report
         
     @property
     def policy(self):
@@ -88,19 +240,528 @@ class PDP(PDPInterface):
             raise TypeError('Expecting %r derived type for "policy" input; got '
                             '%r instead' % (PolicyBase, type(value)))
         self.__policy = value
-                                        
+        self.__pipQueryDesignators = None
+        if self.__adaptiveRuleOrdering:
+            self.__adaptiveRuleOrders = self.createAdaptiveRuleOrders(value)
+
+        # Decisions made with the previous policy are no longer valid
+        if self.__decisionCache is not None:
+            self.__decisionCache.clear()
+
+    @property
+    def decisionCache(self):
+        """Get decision cache
+        @return: cache of decisions or None if caching is not enabled
+        @rtype: ndg.xacml.core.context.decisioncache.DecisionCache / None
+        """
+        return self.__decisionCache
+
+    @decisionCache.setter
+    def decisionCache(self, value):
+        '''Set decision cache
+        @param value: cache of decisions, set to None to disable caching
+        @type value: ndg.xacml.core.context.decisioncache.DecisionCache / None
+        '''
+        if value is not None and not isinstance(value, DecisionCache):
+            raise TypeError('Expecting %r type for "decisionCache" input; got '
+                            '%r instead' % (DecisionCache, type(value)))
+        self.__decisionCache = value
+
+    @property
+    def metricsSink(self):
+        """Get metrics sink
+        @return: sink recording decisions, errors, PIP calls and policy loads
+        or None if metrics are not recorded
+        @rtype: ndg.xacml.core.context.metrics.MetricsSinkInterface / None
+        """
+        return self.__metricsSink
+
+    @metricsSink.setter
+    def metricsSink(self, value):
+        '''Set metrics sink
+        @param value: sink recording decisions, errors, PIP calls and policy
+        loads, set to None to stop recording
+        @type value: ndg.xacml.core.context.metrics.MetricsSinkInterface /
+        None
+        '''
+        if value is not None and not isinstance(value, MetricsSinkInterface):
+            raise TypeError('Expecting %r derived type for "metricsSink" '
+                            'input; got %r instead' % (MetricsSinkInterface,
+                                                       type(value)))
+        self.__metricsSink = value
+
+    @property
+    def prefetchPIPQueries(self):
+        """Get PIP query prefetch setting
+        @return: True if the Policy Information Point is queried for all the
+        attributes the policy may need before evaluating a request with a
+        context handler
+        @rtype: bool
+        """
+        return self.__prefetchPIPQueries
+
+    @prefetchPIPQueries.setter
+    def prefetchPIPQueries(self, value):
+        '''Set PIP query prefetch setting
+        @param value: set to True to query the Policy Information Point for
+        all the attributes the policy may need in a single call before 
+        evaluating a request with a context handler.  This saves round trips
+        to the attribute authority but may query for attributes which the 
+        evaluation of a given request turns out not to need.
+        @type value: bool
+        '''
+        if not isinstance(value, bool):
+            raise TypeError('Expecting %r type for "prefetchPIPQueries" input; '
+                            'got %r instead' % (bool, type(value)))
+        self.__prefetchPIPQueries = value
+
+    @property
+    def shortCircuitMatching(self):
+        """Get short circuit matching setting
+        @return: True if short circuit matching is enabled for requests 
+        evaluated
+        @rtype: bool
+        """
+        return self.__shortCircuitMatching
+
+    @shortCircuitMatching.setter
+    def shortCircuitMatching(self, value):
+        '''Set short circuit matching setting
+        @param value: set to True to stop evaluating targets once their 
+        result is known where the remaining matches can't raise an error.  
+        Decisions are unchanged.  See 
+        ndg.xacml.core.context.request.Request.shortCircuitMatching
+        @type value: bool
+        '''
+        if not isinstance(value, bool):
+            raise TypeError('Expecting %r type for "shortCircuitMatching" '
+                            'input; got %r instead' % (bool, type(value)))
+        self.__shortCircuitMatching = value
+
+    @property
+    def adaptiveRuleOrdering(self):
+        """Get adaptive rule ordering setting
+        @return: True if the rules of policies with deny overrides and permit
+        overrides rule combining algorithms are evaluated in an order learnt 
+        at runtime
+        @rtype: bool
+        """
+        return self.__adaptiveRuleOrdering
+
+    @adaptiveRuleOrdering.setter
+    def adaptiveRuleOrdering(self, value):
+        '''Set adaptive rule ordering setting.  This is applied to the current
+        policy and any policy subsequently set.  Rule orders are held by this
+        PDP and are not shared with other PDPs evaluating the same policy 
+        objects.  Disabling discards the orders learnt.
+        @param value: set to True to evaluate the rules of policies with deny
+        overrides and permit overrides rule combining algorithms in an order
+        learnt at runtime.  Decisions are unchanged.  See 
+        ndg.xacml.core.ruleorder.AdaptiveRuleOrder
+        @type value: bool
+        '''
+        if not isinstance(value, bool):
+            raise TypeError('Expecting %r type for "adaptiveRuleOrdering" '
+                            'input; got %r instead' % (bool, type(value)))
+        if not value:
+            self.__adaptiveRuleOrders = None
+            
+        elif (not self.__adaptiveRuleOrdering and 
+              self.__policy is not None):
+            self.__adaptiveRuleOrders = self.createAdaptiveRuleOrders(
+                                                                self.__policy)
+        self.__adaptiveRuleOrdering = value
+
+    @property
+    def adaptiveRuleOrders(self):
+        """Get the rule orders learnt for the policies of this PDP.  Entries 
+        may be replaced to change the sampling settings for a policy.
+        @return: adaptive rule orders keyed by policy object ID or None if 
+        adaptive rule ordering is not enabled
+        @rtype: dict / None
+        """
+        return self.__adaptiveRuleOrders
+
+    def getAdaptiveRuleOrder(self, policy):
+        """Get the rule order learnt for a policy
+        
+        @param policy: policy evaluated by this PDP
+        @type policy: ndg.xacml.core.policy.Policy
+        @return: adaptive rule order or None if the policy's rules are not
+        reordered
+        @rtype: ndg.xacml.core.ruleorder.AdaptiveRuleOrder / None
+        """
+        if self.__adaptiveRuleOrders is None:
+            return None
+        
+        return self.__adaptiveRuleOrders.get(id(policy))
+
+    @property
+    def pipQueryDesignators(self):
+        """Get the designators in the policy which may query the Policy
+        Information Point
+        @return: designators with distinct attribute ID, data type and issuer
+        @rtype: tuple
+        """
+        if self.__pipQueryDesignators is None:
+            self.__pipQueryDesignators = self.getPIPQueryDesignators(
+                                                                self.policy)
+        return self.__pipQueryDesignators
+
+    def clearPIPQueryDesignators(self):
+        """Clear the designators found in the policy so that they are found
+        again when next needed.  Call this if the policy is modified in place.
+        """
+        self.__pipQueryDesignators = None
+
+    @staticmethod
+    def getPIPQueryDesignators(policy):
+        """Find the designators in a policy or policy set which may query the
+        Policy Information Point via the context handler.  These are the 
+        subject attribute designators in the targets and conditions of the 
+        policy and all the policies, policy sets and rules it contains.
+
+        @param policy: policy or policy set
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        @return: designators with distinct attribute ID, data type and issuer 
+        in the order found
+        @rtype: tuple
+        """
+        designators = {}
+        
+        def _addTargetDesignators(target):
+            if target is None:
+                return
+            
+            for targetSubject in target.subjects:
+                for match in targetSubject.matches:
+                    _addExpressionDesignators(match.attributeDesignator)
+
+        def _addExpressionDesignators(expression):
+            if isinstance(expression, SubjectAttributeDesignator):
+                designators.setdefault((expression.attributeId,
+                                        expression.dataType,
+                                        expression.issuer), expression)
+                
+            elif isinstance(expression, Apply):
+                for subExpression in expression.expressions:
+                    _addExpressionDesignators(subExpression)
+
+        policies = [policy]
+        while policies:
+            policy = policies.pop()
+            _addTargetDesignators(policy.target)
+            if isinstance(policy, PolicySet):
+                # Reverse so that designators are found in document order
+                policies.extend(reversed(policy.policies))
+                
+            elif isinstance(policy, Policy):
+                for rule in policy.rules:
+                    _addTargetDesignators(rule.target)
+                    if rule.condition is not None:
+                        _addExpressionDesignators(rule.condition.expression)
+                                                    
+        return tuple(designators.values())
+
+    @staticmethod
+    def createAdaptiveRuleOrders(policy):
+        """Create adaptive rule orders for a policy and all the policies in a
+        policy set.  Only policies with more than one rule and an order 
+        independent rule combining algorithm are given one.
+
+        @param policy: policy or policy set
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        @return: adaptive rule orders keyed by policy object ID
+        @rtype: dict
+        """
+        adaptiveRuleOrders = {}
+        policies = [policy]
+        while policies:
+            policy = policies.pop()
+            if isinstance(policy, PolicySet):
+                policies.extend(policy.policies)
+                
+            elif (isinstance(policy, Policy) and 
+                  len(policy.rules) > 1 and
+                  getattr(policy.ruleCombiningAlg, 'ORDER_INDEPENDENT', 
+                          False)):
+                adaptiveRuleOrders[id(policy)] = AdaptiveRuleOrder()
+                
+        return adaptiveRuleOrders
+
     def evaluate(self, request):
         """Make an access control decision for the given request based on the
-        single policy provided
+        single policy provided.  If a decision cache is set, the decision is
+        taken from it where possible.  If PIP query prefetching is enabled, the
+        Policy Information Point is queried for all the attributes the policy
+        may need in a single call before requests with a context handler are
+        evaluated.  If short circuit matching is enabled, it is enabled in the
+        request for the duration of the evaluation.  If a metrics sink is set,
+        the decision and its latency are recorded and the sink is set in the
+        request for the duration of the evaluation.  Similarly, if adaptive 
+        rule ordering is enabled, this PDP's rule orders are set in the 
+        request.
+
+        @param request: XACML request context
+        @type request: ndg.xacml.core.context.request.Request
+        @return: XACML response instance
+        @rtype: ndg.xacml.core.context.response.Response
+        @raise TypeError: the request has an asynchronous context handler 
+        set.  Evaluate these requests with 
+        ndg.xacml.core.context.asyncpdp.AsyncPDP.
+        """
+        metricsSink = self.__metricsSink
+        if metricsSink is not None and request.metricsSink is None:
+            request.metricsSink = metricsSink
+            startTime = time.perf_counter()
+            try:
+                response = self.evaluate(request)
+            finally:
+                request.metricsSink = None
+                
+            latency = time.perf_counter() - startTime
+            for result in response.results:
+                metricsSink.recordDecision(str(result.decision), latency)
+            return response
+            
+        if self.__shortCircuitMatching and not request.shortCircuitMatching:
+            request.shortCircuitMatching = True
+            try:
+                return self.evaluate(request)
+            finally:
+                request.shortCircuitMatching = False
+
+        adaptiveRuleOrders = self.__adaptiveRuleOrders
+        if (adaptiveRuleOrders is not None and 
+            request.adaptiveRuleOrders is None):
+            request.adaptiveRuleOrders = adaptiveRuleOrders
+            try:
+                return self.evaluate(request)
+            finally:
+                request.adaptiveRuleOrders = None
+            
+        ctxHandler = request.ctxHandler
+        if ctxHandler is not None:
+            # Synchronous PIP queries would fail for every designator giving
+            # Indeterminate results rather than an error
+            if isinstance(ctxHandler, AsyncCtxHandlerInterface):
+                raise TypeError('Context handler %r set in the request is '
+                                'asynchronous: evaluate the request with '
+                                'AsyncPDP' % type(ctxHandler).__name__)
+                
+            if self.__prefetchPIPQueries:
+                self._prefetchPIPQueries(request)
+            
+        decisionCache = self.__decisionCache
+        if decisionCache is None:
+            return self._evaluateResponse(request)
+
+        fingerprint = decisionCache.getRequestFingerprint(request)
+        if fingerprint is None:
+            decisionCache.recordBypass()
+            return self._evaluateResponse(request)
+
+        # Read the generation first so that a decision made with a policy
+        # replaced during evaluation isn't cached
+        generation = decisionCache.generation
+        decision = decisionCache.get(fingerprint)
+        if decision is not None:
+            response = Response()
+            response.results.append(Result.createInitialised(
+                                                            decision=decision))
+            return response
+
+        response = self._evaluateResponse(request)
+        if len(response.results) == 1:
+            decisionCache.put(fingerprint, response.results[0].decision,
+                              generation=generation)
+
+        return response
+
+    def evaluateMany(self, requests):
+        """Make access control decisions for a batch of requests.  Results of
+        matching the subjects, actions and environments sections of targets
+        are shared between requests in the batch with the same subjects,
+        action and environment so that only the resource dependent parts of
+        targets are matched for each request.  Requests with a context
+        handler set are evaluated individually as Policy Information Point
+        queries may depend on the whole request.
+
+        @param requests: XACML request contexts
+        @type requests: iterable
+        @return: XACML response with one result for each request in order
+        @rtype: ndg.xacml.core.context.response.Response
+        """
+        response = Response()
+        matchResultCaches = {}
+        for request in requests:
+            matchResultCache = None
+            if request.ctxHandler is None:
+                matchResultCacheKey = self._getMatchResultCacheKey(request)
+                if matchResultCacheKey is not None:
+                    matchResultCache = matchResultCaches.setdefault(
+                                                        matchResultCacheKey, {})
+
+            previousMatchResultCache = request.matchResultCache
+            request.matchResultCache = matchResultCache
+            try:
+                response.results.extend(self.evaluate(request).results)
+            finally:
+                request.matchResultCache = previousMatchResultCache
+
+        return response
+
+    @staticmethod
+    def _getMatchResultCacheKey(request):
+        """Make a key for sharing target match results between requests with
+        the same subjects, action and environment
+
+        @param request: XACML request context
+        @type request: ndg.xacml.core.context.request.Request
+        @return: key or None if the request attributes aren't hashable
+        @rtype: tuple / NoneType
+        """
+        try:
+            matchResultCacheKey = (
+                tuple(sorted([(subject.subjectCategory,
+                               DecisionCache.getAttributesFingerprint(subject))
+                              for subject in request.subjects], key=repr)),
+                DecisionCache.getAttributesFingerprint(request.action),
+                DecisionCache.getAttributesFingerprint(request.environment)
+            )
+            hash(matchResultCacheKey)
+
+        except TypeError:
+            return None
+
+        return matchResultCacheKey
+
+    def _prefetchPIPQueries(self, request):
+        """Query the Policy Information Point for all the attributes the 
+        policy may need.  If the query fails, evaluation continues querying 
+        for each attribute as it is needed so that errors are handled as 
+        normal.
+
+        @param request: XACML request context with a context handler
+        @type request: ndg.xacml.core.context.request.Request
+        """
+        try:
+            nQueries = request.queryPIPMany(self.pipQueryDesignators)
+            
+        except Exception:
+            log.warning("Prefetching PIP queries failed, continuing with "
+                        "individual queries: %s", traceback.format_exc())
+            return
         
+        if Config.trace:
+            log.debug("Prefetched %d PIP queries", nQueries)
+
+    def _evaluateResponse(self, request):
+        """Evaluate the policy for the given request
+
         @param request: XACML request context
         @type request: ndg.xacml.core.context.request.Request
         @return: XACML response instance
         @rtype: ndg.xacml.core.context.response.Response
         """
         response = self.policy.evaluateResponse(request)
-        
+
         return response
 
 
+class CompiledPDP(PDP):
+    """Policy Decision Point which evaluates requests using a plan compiled
+    from its policy by PolicyCompiler rather than by walking the policy object
+    tree.  Decisions are the same as for PDP.  The plan is compiled whenever
+    the policy is set: call recompile if the policy object is subsequently
+    modified in place.
+
+    @ivar __compiler: compiler used to create the evaluation plan
+    @type __compiler: ndg.xacml.core.compiler.PolicyCompiler
+    @ivar __compiledPolicy: evaluation plan for the policy
+    @type __compiledPolicy: ndg.xacml.core.compiler.CompiledPolicy / None
+    """
+    __slots__ = ('__compiler', '__compiledPolicy')
+
+    def __init__(self, policy=None, compiler=None, decisionCache=None,
+                 prefetchPIPQueries=False, shortCircuitMatching=False,
+                 metricsSink=None, adaptiveRuleOrdering=False):
+        """
+        @param policy: policy object for PDP to use to apply access control
+        decisions, may be omitted.
+        @type policy: ndg.xacml.core.policy.Policy / None
+        @param compiler: policy compiler, defaults to PolicyCompiler
+        @type compiler: ndg.xacml.core.compiler.PolicyCompiler / None
+        @param decisionCache: cache of decisions, may be omitted in which case
+        no caching is made
+        @type decisionCache:
+        ndg.xacml.core.context.decisioncache.DecisionCache / None
+        @param prefetchPIPQueries: set to True to query the Policy Information
+        Point for all the attributes the policy may need in a single call 
+        before evaluating a request with a context handler
+        @type prefetchPIPQueries: bool
+        @param shortCircuitMatching: set to True to stop evaluating targets 
+        once their result is known where the remaining matches can't raise 
+        an error
+        @type shortCircuitMatching: bool
+        @param metricsSink: sink recording decisions, errors, PIP calls and 
+        policy loads, may be omitted in which case no metrics are recorded
+        @type metricsSink: 
+        ndg.xacml.core.context.metrics.MetricsSinkInterface / None
+        @param adaptiveRuleOrdering: set to True to evaluate the rules of 
+        policies with deny overrides and permit overrides rule combining 
+        algorithms in an order learnt at runtime
+        @type adaptiveRuleOrdering: bool
+        """
+        self.__compiledPolicy = None
+        if compiler is None:
+            self.__compiler = PolicyCompiler()
+        else:
+            self.__compiler = compiler
+
+        super(CompiledPDP, self).__init__(
+                                    policy=policy,
+                                    decisionCache=decisionCache,
+                                    prefetchPIPQueries=prefetchPIPQueries,
+                                    shortCircuitMatching=shortCircuitMatching,
+                                    metricsSink=metricsSink,
+                                    adaptiveRuleOrdering=adaptiveRuleOrdering)
+
+    def _setPolicy(self, value):
+        '''Set policy and compile it
+        @param value: policy object for PDP to use to apply access control
+        decisions
+        @type value: ndg.xacml.core.policy.Policy
+        '''
+        PDP.policy.fset(self, value)
+        self.recompile()
+
+    policy = property(PDP.policy.fget, _setPolicy,
+                      doc="Policy object for PDP to use to apply access "
+                          "control decisions")
+
+
+    @property
+    def compiledPolicy(self):
+        """Get evaluation plan compiled from the policy
+        @return: evaluation plan
+        @rtype: ndg.xacml.core.compiler.CompiledPolicy / None
+        """
+        return self.__compiledPolicy
+
+    def recompile(self):
+        """Compile the evaluation plan from the current policy"""
+        self.__compiledPolicy = self.__compiler.compile(self.policy)
+        self.clearPIPQueryDesignators()
 
+    def _evaluateResponse(self, request):
+        """Evaluate the compiled evaluation plan for the given request
+
+        @param request: XACML request context
+        @type request: ndg.xacml.core.context.request.Request
+        @return: XACML response instance
+        @rtype: ndg.xacml.core.context.response.Response
+        """
+        response = self.__compiledPolicy.evaluateResponse(request)
+
+        return response
@@ -0,0 +1,289 @@
+"""NDG XACML Policy Information Point cache - bounded cache with expiry of PIP
+query results shared between requests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import time
+import threading
+from collections import OrderedDict
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml.core.context.decisioncache import DecisionCache
+
+
+class PIPCache(object):
+    """Cache of the attribute values returned by Policy Information Point
+    queries, shared between requests.  Set it in a context handler to use it.
+
+    Results are keyed on the attributes of the subject the query was made for
+    and the attribute ID, data type and issuer of the designator, so results
+    are assumed to depend only on these.  Queries returning no values are
+    cached too, with a separate time to live, so that repeated queries for
+    attributes an authority doesn't hold are also saved.  Entries are evicted
+    least recently used first once the maximum size is reached.
+
+    @cvar DEFAULT_MAX_SIZE: default maximum number of entries
+    @type DEFAULT_MAX_SIZE: int
+    @cvar DEFAULT_TTL: default time to live in seconds for entries with values
+    @type DEFAULT_TTL: float
+    @cvar DEFAULT_NEGATIVE_TTL: default time to live in seconds for entries
+    with no values
+    @type DEFAULT_NEGATIVE_TTL: float
+
+    @ivar __maxSize: maximum number of entries
+    @type __maxSize: int
+    @ivar __ttl: time to live for entries with values
+    @type __ttl: float
+    @ivar __negativeTtl: time to live for entries with no values, zero to
+    disable negative caching
+    @type __negativeTtl: float
+    @ivar __timer: function returning the current time in seconds
+    @type __timer: callable
+    @ivar __entries: tuples of attribute values and expiry time keyed by
+    query, held in least recently used order
+    @type __entries: collections.OrderedDict
+    @ivar __lock: lock for access to the entries and counters
+    @type __lock: threading.Lock
+    @ivar __hits: number of queries answered with values
+    @type __hits: int
+    @ivar __negativeHits: number of queries answered with no values
+    @type __negativeHits: int
+    @ivar __misses: number of queries not in the cache
+    @type __misses: int
+    @ivar __evictions: number of entries evicted to make space for new ones
+    @type __evictions: int
+    @ivar __expirations: number of entries removed because they had expired
+    @type __expirations: int
+    """
+    DEFAULT_MAX_SIZE = 1024
+    DEFAULT_TTL = 300.
+    DEFAULT_NEGATIVE_TTL = 60.
+
+    __slots__ = (
+        '__maxSize',
+        '__ttl',
+        '__negativeTtl',
+        '__timer',
+        '__entries',
+        '__lock',
+        '__hits',
+        '__negativeHits',
+        '__misses',
+        '__evictions',
+        '__expirations'
+    )
+
+    def __init__(self, maxSize=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL,
+                 negativeTtl=DEFAULT_NEGATIVE_TTL, timer=time.monotonic):
+        """@param maxSize: maximum number of entries
+        @type maxSize: int
+        @param ttl: time to live in seconds for entries with values
+        @type ttl: float / int
+        @param negativeTtl: time to live in seconds for entries with no
+        values, set to zero to disable negative caching
+        @type negativeTtl: float / int
+        @param timer: function returning the current time in seconds
+        @type timer: callable
+        @raise TypeError: incorrect input type
+        @raise ValueError: invalid input value
+        """
+        if not isinstance(maxSize, int):
+            raise TypeError('Expecting %r type for "maxSize"; got %r' %
+                            (int, type(maxSize)))
+        if maxSize < 1:
+            raise ValueError('Expecting "maxSize" greater than zero; got %r' %
+                             maxSize)
+
+        for name, value in (('ttl', ttl), ('negativeTtl', negativeTtl)):
+            if not isinstance(value, (float, int)):
+                raise TypeError('Expecting float or int type for "%s"; got '
+                                '%r' % (name, type(value)))
+        if ttl <= 0:
+            raise ValueError('Expecting "ttl" greater than zero; got %r' % ttl)
+        if negativeTtl < 0:
+            raise ValueError('Expecting "negativeTtl" greater than or equal '
+                             'to zero; got %r' % negativeTtl)
+
+        self.__maxSize = maxSize
+        self.__ttl = ttl
+        self.__negativeTtl = negativeTtl
+        self.__timer = timer
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__negativeHits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__expirations = 0
+
+    @property
+    def maxSize(self):
+        """@return: maximum number of entries
+        @rtype: int
+        """
+        return self.__maxSize
+
+    @property
+    def ttl(self):
+        """@return: time to live in seconds for entries with values
+        @rtype: float / int
+        """
+        return self.__ttl
+
+    @property
+    def negativeTtl(self):
+        """@return: time to live in seconds for entries with no values
+        @rtype: float / int
+        """
+        return self.__negativeTtl
+
+    @property
+    def hits(self):
+        """@return: number of queries answered with values
+        @rtype: int
+        """
+        return self.__hits
+
+    @property
+    def negativeHits(self):
+        """@return: number of queries answered with no values
+        @rtype: int
+        """
+        return self.__negativeHits
+
+    @property
+    def misses(self):
+        """@return: number of queries not in the cache
+        @rtype: int
+        """
+        return self.__misses
+
+    @property
+    def evictions(self):
+        """@return: number of entries evicted to make space for new ones
+        @rtype: int
+        """
+        return self.__evictions
+
+    @property
+    def expirations(self):
+        """@return: number of entries removed because they had expired
+        @rtype: int
+        """
+        return self.__expirations
+
+    @property
+    def queriesSaved(self):
+        """@return: number of PIP queries saved by the cache
+        @rtype: int
+        """
+        return self.__hits + self.__negativeHits
+
+    def __len__(self):
+        """@return: number of entries held
+        @rtype: int
+        """
+        return len(self.__entries)
+
+    @staticmethod
+    def getKey(subject, designator):
+        """Make the key for a query
+
+        @param subject: request subject the query is made for
+        @type subject: ndg.xacml.core.context.subject.Subject
+        @param designator: designator requiring the attribute values
+        @type designator:
+        ndg.xacml.core.attributedesignator.AttributeDesignator
+        @return: key or None if the subject attributes aren't hashable
+        @rtype: tuple / NoneType
+        """
+        key = (subject.subjectCategory,
+               DecisionCache.getAttributesFingerprint(subject),
+               designator.attributeId,
+               designator.dataType,
+               designator.issuer)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+
+        return key
+
+    def get(self, key):
+        """Get the cached attribute values for a query
+
+        @param key: query key
+        @type key: tuple
+        @return: tuple of True and the attribute values if the query is in
+        the cache, or False and None if not
+        @rtype: tuple
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.__misses += 1
+                return False, None
+
+            attributeValues, expiryTime = entry
+            if self.__timer() >= expiryTime:
+                del self.__entries[key]
+                self.__expirations += 1
+                self.__misses += 1
+                return False, None
+
+            self.__entries.move_to_end(key)
+            if attributeValues:
+                self.__hits += 1
+            else:
+                self.__negativeHits += 1
+
+            return True, attributeValues
+
+    def put(self, key, attributeValues):
+        """Cache the attribute values returned for a query
+
+        @param key: query key
+        @type key: tuple
+        @param attributeValues: attribute values or None
+        @type attributeValues: list / NoneType
+        @return: True if the values were cached
+        @rtype: bool
+        """
+        if attributeValues:
+            ttl = self.__ttl
+        else:
+            ttl = self.__negativeTtl
+            if ttl == 0:
+                return False
+
+        with self.__lock:
+            self.__entries[key] = (attributeValues, self.__timer() + ttl)
+            self.__entries.move_to_end(key)
+
+            while len(self.__entries) > self.__maxSize:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+        return True
+
+    def clear(self):
+        """Remove all entries.  Counters are not reset."""
+        with self.__lock:
+            self.__entries.clear()
+
+    def resetCounters(self):
+        """Reset the counters"""
+        with self.__lock:
+            self.__hits = 0
+            self.__negativeHits = 0
+            self.__misses = 0
+            self.__evictions = 0
+            self.__expirations = 0
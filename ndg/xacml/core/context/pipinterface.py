@@ -21,4 +21,43 @@ class PIPInterface(object, metaclass=ABCMeta):
     @abstractmethod
     def attributeQuery(self, context, attributeDesignator):
         """Query this PIP for attributes"""
-        return []
\ No newline at end of file
+        return []
+    
+    def attributeQueryMany(self, context, attributeDesignators):
+        """Query this PIP for the attributes for several designators at once.
+        This default implementation makes a query for each designator in 
+        turn.  Override it where the attribute authority accepts queries for
+        several attributes in a single round trip.
+        
+        @param context: request context
+        @type context: ndg.xacml.core.context.request.Request
+        @param attributeDesignators: designators requiring additional 
+        attribute information
+        @type attributeDesignators: list
+        @return: attribute values or None for each designator in order
+        @rtype: list
+        """
+        return [self.attributeQuery(context, attributeDesignator)
+                for attributeDesignator in attributeDesignators]
+
+class AsyncPIPInterface(object, metaclass=ABCMeta):
+    """Interface class for a Policy Information Point which is queried
+    asynchronously so that a slow attribute authority doesn't block other
+    evaluations sharing the same event loop.  Use with AsyncPDP.
+    """
+    __slots__ = ()
+    
+    @abstractmethod
+    async def attributeQuery(self, context, attributeDesignator):
+        """Query this PIP for attributes
+        
+        @param context: request context
+        @type context: ndg.xacml.core.context.request.Request
+        @param attributeDesignator: designator requiring additional attribute
+        information
+        @type attributeDesignator: 
+        ndg.xacml.core.attributedesignator.AttributeDesignator
+        @return: attribute values or None if none are found
+        @rtype: list / NoneType
+        """
+        return []
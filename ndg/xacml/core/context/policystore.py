@@ -0,0 +1,576 @@
+"""NDG XACML policy store - reloads changed policy documents and swaps the
+rebuilt policy into PDPs
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import os
+import time
+import threading
+import traceback
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml import XacmlError
+from ndg.xacml.core.policybase import PolicyBase
+from ndg.xacml.core.policyset import PolicySet
+from ndg.xacml.core.context.pdp import PDP
+from ndg.xacml.core.context.metrics import MetricsSinkInterface
+from ndg.xacml.finder.defaultfinder import getDefaultPolicyFinder
+from ndg.xacml.finder.urlpolicyfinder import UrlPolicyFinder
+from ndg.xacml.parsers.common import Common
+
+
+class PolicyReloadError(XacmlError):
+    """Error reloading changed policy documents"""
+
+
+class PolicyStore(object):
+    """Holds the policy read from a root policy file and the documents it
+    references, reloading it when they change.  Only the changed documents
+    are parsed again: references to policies in unchanged documents resolve
+    to the objects already read.  The policy sets which contain the replaced
+    policies are copied rather than modified, up to the root, and the new
+    root is swapped into each PDP in a single assignment so that evaluations
+    in progress complete with the previous policy.
+
+    Documents are watched by comparing the modification time and size of
+    their files.  Documents referenced by a URL other than a file URL are
+    not watched.  Call reload to check for changes or start a thread to
+    poll for them.
+
+    @cvar DEFAULT_POLL_INTERVAL: default time in seconds between checks for
+    changes by the watch thread
+    @type DEFAULT_POLL_INTERVAL: float
+    @cvar FILE_SCHEME: file URL scheme prefix
+    @type FILE_SCHEME: string
+
+    @ivar __source: root policy file path
+    @type __source: string
+    @ivar __rootUrl: root policy file URL
+    @type __rootUrl: string
+    @ivar __readerFactory: reader factory for parsing documents
+    @type __readerFactory: ndg.xacml.parsers.AbstractReaderFactory
+    @ivar __finder: policy finder resolving and recording the documents read
+    @type __finder: ndg.xacml.finder.urlpolicyfinder.UrlPolicyFinder
+    @ivar __policy: current root policy or policy set
+    @type __policy: ndg.xacml.core.policybase.PolicyBase
+    @ivar __pdps: PDPs whose policy is replaced on reload
+    @type __pdps: list
+    @ivar __signatures: modification time and size of each watched document
+    file when it was read keyed by document URL
+    @type __signatures: dict
+    @ivar __lock: lock serialising reloads
+    @type __lock: threading.RLock
+    @ivar __watchThread: thread polling for changes or None if not started
+    @type __watchThread: threading.Thread / NoneType
+    @ivar __stopEvent: event set to stop the watch thread
+    @type __stopEvent: threading.Event / NoneType
+    @ivar __reloadCount: number of successful reloads
+    @type __reloadCount: int
+    @ivar __reloadFailureCount: number of reloads which failed
+    @type __reloadFailureCount: int
+    @ivar __lastReloadLatency: time in seconds taken by the last successful
+    reload from detecting changes to swapping the policy into the PDPs
+    @type __lastReloadLatency: float / NoneType
+    @ivar __maxReloadLatency: longest reload time in seconds
+    @type __maxReloadLatency: float
+    @ivar __totalReloadLatency: total time in seconds for successful reloads
+    @type __totalReloadLatency: float
+    @ivar __documentsReparsed: number of documents parsed again by
+    successful reloads
+    @type __documentsReparsed: int
+    @ivar __decisionCacheInvalidations: number of PDP decision cache entries
+    invalidated by reloads
+    @type __decisionCacheInvalidations: int
+    @ivar __metricsSink: optional sink recording the initial load and reloads
+    @type __metricsSink:
+    ndg.xacml.core.context.metrics.MetricsSinkInterface / NoneType
+    """
+    DEFAULT_POLL_INTERVAL = 2.
+    FILE_SCHEME = 'file://'
+
+    __slots__ = (
+        '__source',
+        '__rootUrl',
+        '__readerFactory',
+        '__finder',
+        '__policy',
+        '__pdps',
+        '__signatures',
+        '__lock',
+        '__watchThread',
+        '__stopEvent',
+        '__reloadCount',
+        '__reloadFailureCount',
+        '__lastReloadLatency',
+        '__maxReloadLatency',
+        '__totalReloadLatency',
+        '__documentsReparsed',
+        '__decisionCacheInvalidations',
+        '__metricsSink'
+    )
+
+    def __init__(self, source, readerFactory, pdps=(), finder=None,
+                 metricsSink=None):
+        """Read the policy and set it in the PDPs given
+        @param source: root policy file path
+        @type source: string
+        @param readerFactory: reader factory for parsing documents
+        @type readerFactory: ndg.xacml.parsers.AbstractReaderFactory
+        @param pdps: PDPs whose policy is to be set and replaced on reload
+        @type pdps: iterable
+        @param finder: policy finder, defaults to a UrlPolicyFinder resolving
+        references relative to the root policy file
+        @type finder: ndg.xacml.finder.urlpolicyfinder.UrlPolicyFinder /
+        NoneType
+        @param metricsSink: sink recording the time taken by the initial load
+        and each reload
+        @type metricsSink:
+        ndg.xacml.core.context.metrics.MetricsSinkInterface / NoneType
+        @raise TypeError: incorrect input type
+        """
+        if not isinstance(source, str):
+            raise TypeError('Expecting string type for "source" file path; '
+                            'got %r' % type(source))
+
+        if finder is None:
+            finder = getDefaultPolicyFinder(os.path.abspath(source))
+
+        if not isinstance(finder, UrlPolicyFinder):
+            raise TypeError('Expecting %r derived type for "finder"; got %r' %
+                            (UrlPolicyFinder, type(finder)))
+
+        if (metricsSink is not None and
+            not isinstance(metricsSink, MetricsSinkInterface)):
+            raise TypeError('Expecting %r derived type for "metricsSink"; got '
+                            '%r' % (MetricsSinkInterface, type(metricsSink)))
+
+        self.__source = source
+        self.__rootUrl = self.__class__.FILE_SCHEME + os.path.abspath(source)
+        self.__readerFactory = readerFactory
+        self.__finder = finder
+        self.__pdps = []
+        self.__signatures = {}
+        self.__lock = threading.RLock()
+        self.__watchThread = None
+        self.__stopEvent = None
+
+        self.__reloadCount = 0
+        self.__reloadFailureCount = 0
+        self.__lastReloadLatency = None
+        self.__maxReloadLatency = 0.
+        self.__totalReloadLatency = 0.
+        self.__documentsReparsed = 0
+        self.__decisionCacheInvalidations = 0
+        self.__metricsSink = metricsSink
+
+        signature = self._getSignature(self.__rootUrl)
+        startTime = time.perf_counter()
+        try:
+            self.__policy = self._parseRoot()
+        finally:
+            finder.close()
+
+        if metricsSink is not None:
+            metricsSink.recordPolicyLoad(time.perf_counter() - startTime,
+                                         'parse')
+
+        self.__signatures[self.__rootUrl] = signature
+        self._addSignatures()
+
+        for pdp in pdps:
+            self.addPDP(pdp)
+
+    @property
+    def policy(self):
+        """@return: current root policy or policy set
+        @rtype: ndg.xacml.core.policybase.PolicyBase
+        """
+        return self.__policy
+
+    @property
+    def pdps(self):
+        """@return: PDPs whose policy is replaced on reload
+        @rtype: tuple
+        """
+        return tuple(self.__pdps)
+
+    @property
+    def finder(self):
+        """@return: policy finder resolving and recording the documents read
+        @rtype: ndg.xacml.finder.urlpolicyfinder.UrlPolicyFinder
+        """
+        return self.__finder
+
+    @property
+    def documentUrls(self):
+        """@return: URLs of the root document and the documents read through
+        the policy finder
+        @rtype: tuple
+        """
+        return (self.__rootUrl,) + tuple([
+                                url for url in self.__finder.documentPolicies
+                                if url != self.__rootUrl])
+
+    @property
+    def reloadCount(self):
+        """@return: number of successful reloads
+        @rtype: int
+        """
+        return self.__reloadCount
+
+    @property
+    def reloadFailureCount(self):
+        """@return: number of reloads which failed
+        @rtype: int
+        """
+        return self.__reloadFailureCount
+
+    @property
+    def lastReloadLatency(self):
+        """@return: time in seconds taken by the last successful reload from
+        detecting changes to swapping the policy into the PDPs or None if
+        there has been no reload
+        @rtype: float / NoneType
+        """
+        return self.__lastReloadLatency
+
+    @property
+    def maxReloadLatency(self):
+        """@return: longest reload time in seconds
+        @rtype: float
+        """
+        return self.__maxReloadLatency
+
+    @property
+    def totalReloadLatency(self):
+        """@return: total time in seconds for successful reloads
+        @rtype: float
+        """
+        return self.__totalReloadLatency
+
+    @property
+    def documentsReparsed(self):
+        """@return: number of documents parsed again by successful reloads
+        @rtype: int
+        """
+        return self.__documentsReparsed
+
+    @property
+    def decisionCacheInvalidations(self):
+        """@return: number of PDP decision cache entries invalidated by
+        reloads
+        @rtype: int
+        """
+        return self.__decisionCacheInvalidations
+
+    def addPDP(self, pdp):
+        """Set the current policy in a PDP and replace it on reload
+        @param pdp: PDP
+        @type pdp: ndg.xacml.core.context.pdp.PDP
+        @raise TypeError: incorrect input type
+        """
+        if not isinstance(pdp, PDP):
+            raise TypeError('Expecting %r derived type for "pdp"; got %r' %
+                            (PDP, type(pdp)))
+        with self.__lock:
+            pdp.policy = self.__policy
+            self.__pdps.append(pdp)
+
+    def removePDP(self, pdp):
+        """Stop replacing the policy of a PDP on reload
+        @param pdp: PDP
+        @type pdp: ndg.xacml.core.context.pdp.PDP
+        """
+        with self.__lock:
+            self.__pdps.remove(pdp)
+
+    def getChangedDocuments(self):
+        """@return: URLs of watched documents whose files have changed since
+        they were read
+        @rtype: list
+        """
+        return [url for url, signature in list(self.__signatures.items())
+                if self._getSignature(url) != signature]
+
+    def reload(self):
+        """Parse changed documents again and swap the rebuilt policy into the
+        PDPs.  If reloading fails, the current policy is kept and the changed
+        documents are not tried again until they change again.
+
+        @return: True if the policy was replaced, False if no documents have
+        changed
+        @rtype: bool
+        @raise PolicyReloadError: error parsing a changed document
+        """
+        with self.__lock:
+            changedUrls = self.getChangedDocuments()
+            if not changedUrls:
+                return False
+
+            startTime = time.perf_counter()
+            signatures = dict([(url, self._getSignature(url))
+                               for url in changedUrls])
+            try:
+                policy = self._reparse(changedUrls)
+
+            except Exception as e:
+                self.__reloadFailureCount += 1
+                self.__signatures.update(signatures)
+                raise PolicyReloadError('Error reloading policy documents '
+                                        '%r: %s' % (changedUrls, e))
+
+            self.__policy = policy
+            for pdp in self.__pdps:
+                decisionCache = pdp.decisionCache
+                if decisionCache is None:
+                    pdp.policy = policy
+                else:
+                    nInvalidations = decisionCache.invalidations
+                    pdp.policy = policy
+                    self.__decisionCacheInvalidations += (
+                                decisionCache.invalidations - nInvalidations)
+
+            self.__signatures.update(signatures)
+            self._addSignatures()
+
+            latency = time.perf_counter() - startTime
+            self.__reloadCount += 1
+            self.__lastReloadLatency = latency
+            self.__maxReloadLatency = max(self.__maxReloadLatency, latency)
+            self.__totalReloadLatency += latency
+            self.__documentsReparsed += len(changedUrls)
+            if self.__metricsSink is not None:
+                self.__metricsSink.recordPolicyLoad(latency, 'reload')
+
+            log.debug("Reloaded %d changed policy document(s) in %f s",
+                      len(changedUrls), latency)
+            return True
+
+    def start(self, pollInterval=DEFAULT_POLL_INTERVAL):
+        """Start a thread polling for changed documents and reloading them.
+        Reload errors are logged.
+        @param pollInterval: time in seconds between checks for changes
+        @type pollInterval: float / int
+        """
+        with self.__lock:
+            if self.__watchThread is not None:
+                return
+
+            self.__stopEvent = threading.Event()
+            self.__watchThread = threading.Thread(
+                                        target=self._watch,
+                                        args=(pollInterval, self.__stopEvent),
+                                        name='PolicyStore')
+            self.__watchThread.daemon = True
+            self.__watchThread.start()
+
+    def stop(self):
+        """Stop the thread polling for changed documents"""
+        with self.__lock:
+            watchThread = self.__watchThread
+            if watchThread is None:
+                return
+
+            self.__stopEvent.set()
+            self.__watchThread = None
+            self.__stopEvent = None
+
+        watchThread.join()
+
+    def _watch(self, pollInterval, stopEvent):
+        """Poll for changed documents until stopped
+        @param pollInterval: time in seconds between checks for changes
+        @type pollInterval: float / int
+        @param stopEvent: event set to stop polling
+        @type stopEvent: threading.Event
+        """
+        while not stopEvent.wait(pollInterval):
+            try:
+                self.reload()
+            except Exception:
+                log.error("Reloading policy failed, continuing with the "
+                          "current policy: %s", traceback.format_exc())
+
+    def _getSignature(self, url):
+        """Get the modification time and size of a document file
+        @param url: document URL
+        @type url: string
+        @return: modification time and size or None if the file doesn't exist
+        @rtype: tuple / NoneType
+        """
+        filePath = url[len(self.__class__.FILE_SCHEME):]
+        try:
+            stat = os.stat(filePath)
+        except OSError:
+            return None
+
+        return stat.st_mtime_ns, stat.st_size
+
+    def _addSignatures(self):
+        """Start watching documents read for the first time"""
+        for url in self.__finder.documentPolicies:
+            if (url not in self.__signatures and
+                url.startswith(self.__class__.FILE_SCHEME)):
+                self.__signatures[url] = self._getSignature(url)
+
+    def _parseRoot(self):
+        """Parse the root policy document
+        @return: root policy or policy set
+        @rtype: ndg.xacml.core.policybase.PolicyBase
+        """
+        finder = self.__finder
+        finder.setReader(self.__readerFactory.getReader(PolicyBase))
+        finder.prefetchReferences(self.__source)
+        with open(self.__source, 'rb') as policyFile:
+            policyDoc = policyFile.read()
+
+        return finder.parseDocument(self.__rootUrl, policyDoc, Common(finder))
+
+    def _reparse(self, changedUrls):
+        """Parse changed documents again and rebuild the policy sets
+        containing their policies.  The policy finder is restored if an error
+        occurs.
+        @param changedUrls: URLs of changed documents
+        @type changedUrls: list
+        @return: new root policy or policy set
+        @rtype: ndg.xacml.core.policybase.PolicyBase
+        """
+        finder = self.__finder
+        savedPolicyMap = dict(finder.policyMap)
+        savedPolicySetMap = dict(finder.policySetMap)
+        savedDocumentPolicies = dict([(url, list(policies)) for url, policies in
+                                 finder.documentPolicies.items()])
+        try:
+            oldPolicies = []
+            for url in changedUrls:
+                oldPolicies.extend(finder.removeDocument(url))
+
+            if self.__rootUrl in changedUrls:
+                policy = self._parseRoot()
+            else:
+                policy = self.__policy
+                finder.setReader(self.__readerFactory.getReader(PolicyBase))
+
+            common = Common(finder)
+            for url in changedUrls:
+                # Documents referenced from another changed document may have
+                # been parsed already
+                if url not in finder.documentPolicies:
+                    finder.parseDocument(url, finder.fetcher.fetch(url),
+                                         common)
+
+            replacements = {}
+            for oldPolicy in oldPolicies:
+                if isinstance(oldPolicy, PolicySet):
+                    newPolicy = finder.policySetMap.get(oldPolicy.ident)
+                else:
+                    newPolicy = finder.policyMap.get(oldPolicy.ident)
+
+                replacements[id(oldPolicy)] = newPolicy
+                if (newPolicy is not None and
+                    isinstance(oldPolicy, PolicySet) and
+                    isinstance(newPolicy, PolicySet) and
+                    oldPolicy.targetIndex is not None):
+                    newPolicy.buildTargetIndex(recursive=True)
+
+            rebuilt = {}
+            policy = self._rebuild(policy, replacements, rebuilt)
+
+            # Point the finder at the rebuilt policy sets so that documents
+            # parsed later reference them
+            for policies in finder.documentPolicies.values():
+                policies[:] = [rebuilt.get(id(declaredPolicy), declaredPolicy)
+                               for declaredPolicy in policies]
+            for policyMap in (finder.policyMap, finder.policySetMap):
+                for ident, mappedPolicy in list(policyMap.items()):
+                    policyMap[ident] = rebuilt.get(id(mappedPolicy),
+                                                   mappedPolicy)
+
+        except Exception:
+            finder.policyMap = savedPolicyMap
+            finder.policySetMap = savedPolicySetMap
+            finder.documentPolicies = savedDocumentPolicies
+            raise
+
+        finally:
+            finder.close()
+
+        return policy
+
+    def _rebuild(self, policy, replacements, rebuilt):
+        """Rebuild a policy tree substituting replaced policies and policy
+        sets.  Policy sets containing replaced policies are copied.
+        @param policy: policy or policy set
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        @param replacements: new policies and policy sets keyed by the id of
+        those they replace.  None means the replaced policy is no longer
+        declared.
+        @type replacements: dict
+        @param rebuilt: rebuilt policies and policy sets keyed by the id of
+        the originals
+        @type rebuilt: dict
+        @return: rebuilt policy or policy set
+        @rtype: ndg.xacml.core.policybase.PolicyBase
+        @raise PolicyReloadError: a policy or policy set no longer declared
+        in a changed document is still referenced
+        """
+        newPolicy = rebuilt.get(id(policy))
+        if newPolicy is not None:
+            return newPolicy
+
+        if id(policy) in replacements:
+            newPolicy = replacements[id(policy)]
+            if newPolicy is None:
+                raise PolicyReloadError('%s %r is referenced but is no '
+                                        'longer declared' %
+                                        (policy.ELEMENT_LOCAL_NAME,
+                                         policy.ident))
+
+        elif isinstance(policy, PolicySet):
+            policies = [self._rebuild(childPolicy, replacements, rebuilt)
+                        for childPolicy in policy.policies]
+            newPolicy = policy
+            for childPolicy, newChildPolicy in zip(policy.policies, policies):
+                if newChildPolicy is not childPolicy:
+                    newPolicy = self._copyPolicySet(policy, policies)
+                    break
+        else:
+            newPolicy = policy
+
+        rebuilt[id(policy)] = newPolicy
+        return newPolicy
+
+    @staticmethod
+    def _copyPolicySet(policySet, policies):
+        """Copy a policy set with a new list of child policies
+        @param policySet: policy set
+        @type policySet: ndg.xacml.core.policyset.PolicySet
+        @param policies: child policies and policy sets for the copy
+        @type policies: list
+        @return: copy
+        @rtype: ndg.xacml.core.policyset.PolicySet
+        """
+        newPolicySet = policySet.__class__(
+                policyCombiningAlgFactory=policySet.policyCombiningAlgFactory)
+        newPolicySet.policySetId = policySet.policySetId
+        for attrName in ('version', 'description', 'policySetDefaults',
+                         'target'):
+            value = getattr(policySet, attrName)
+            if value is not None:
+                setattr(newPolicySet, attrName, value)
+
+        newPolicySet.policyCombiningAlgId = policySet.policyCombiningAlgId
+        newPolicySet.policies.extend(policies)
+        newPolicySet.obligations.extend(policySet.obligations)
+        if policySet.targetIndex is not None:
+            newPolicySet.buildTargetIndex(recursive=False)
+
+        return newPolicySet
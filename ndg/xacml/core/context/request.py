@@ -9,16 +9,19 @@ __contact__ = "Philip.Kershaw@stfc.ac.uk"
 __license__ = "BSD - see LICENSE file in top-level directory"
 __contact__ = "Philip.Kershaw@stfc.ac.uk"
 __revision__ = "$Id$"
+import time
 import logging
 log = logging.getLogger(__name__)
 
-from ndg.xacml.utils import TypedList
+from ndg.xacml.utils import ChangeCountedTypedList, ChangeCounter
 from ndg.xacml.core.context import XacmlContextBase
 from ndg.xacml.core.context.subject import Subject
 from ndg.xacml.core.context.resource import Resource
 from ndg.xacml.core.context.action import Action
 from ndg.xacml.core.context.environment import Environment
 from ndg.xacml.core.context.handlerinterface import CtxHandlerInterface
+from ndg.xacml.core.context.attributeindex import AttributeIndex
+from ndg.xacml.core.context.metrics import MetricsSinkInterface
 from ndg.xacml.utils.xpath_selector import XPathSelectorInterface
 
 
@@ -28,11 +31,14 @@ class Request(XacmlContextBase):
     @cvar ELEMENT_LOCAL_NAME: XML local element name, derived classes should
     set
     @type ELEMENT_LOCAL_NAME: string
+    @cvar ATTRIBUTE_INDEX_CATEGORIES: names of the request properties for
+    which attribute indexes can be made
+    @type ATTRIBUTE_INDEX_CATEGORIES: tuple
     
     @ivar __subjects: list of subjects corresponding to this request
-    @type __subjects: ndg.xacml.utils.TypedList
+    @type __subjects: ndg.xacml.utils.ChangeCountedTypedList
     @ivar __resources: list of resources corresponding to this request
-    @type __subjects: ndg.xacml.utils.TypedList
+    @type __subjects: ndg.xacml.utils.ChangeCountedTypedList
     @ivar __action: action for this request 
     @type __action: None / ndg.xacml.core.context.action.Action
     @ivar __environment: environment associated with this request 
@@ -45,6 +51,43 @@ class Request(XacmlContextBase):
     access control decisions
     @type ctxHandler: ndg.xacml.core.context.handler.CtxHandlerInterface / 
     None
+    @ivar __matchResultCache: target match results shared between requests
+    with the same subjects, action and environment
+    @type __matchResultCache: dict / None
+    @ivar __shortCircuitMatching: stop evaluating target matches once the 
+    result is known, where the remaining evaluation can't raise an error
+    @type __shortCircuitMatching: bool
+    @ivar __metricsSink: sink recording errors and PIP calls while the 
+    request is evaluated
+    @type __metricsSink: 
+    ndg.xacml.core.context.metrics.MetricsSinkInterface / None
+    @ivar __adaptiveRuleOrders: rule orders learnt by the PDP for the 
+    policies it evaluates keyed by policy object ID
+    @type __adaptiveRuleOrders: dict / None
+    @ivar __logEvaluationErrors: log errors resulting in Indeterminate 
+    results while the request is evaluated
+    @type __logEvaluationErrors: bool
+    @ivar __pipQueryResults: results of Policy Information Point queries made
+    for this request keyed by subject and designator attribute ID, data type
+    and issuer
+    @type __pipQueryResults: dict
+    @ivar __changeCounter: counter of changes to the subjects, resources, 
+    action and environment of this request and their attributes
+    @type __changeCounter: ndg.xacml.utils.ChangeCounter
+    @ivar __pipQueryResultsChangeCount: value of the change counter for the
+    request contents when the PIP query results were made
+    @type __pipQueryResultsChangeCount: int
+    @ivar __nPIPQueries: number of queries made to the context handler
+    @type __nPIPQueries: int
+    @ivar __nPIPQueriesSaved: number of queries answered from earlier results
+    for this request or the context handler's shared cache
+    @type __nPIPQueriesSaved: int
+    @ivar __attributeIndexes: attribute indexes keyed by category, made on
+    demand
+    @type __attributeIndexes: dict
+    @ivar __attributeIndexChangeCount: value of the change counter for the
+    request contents when the attribute indexes were made
+    @type __attributeIndexChangeCount: int
     """
     __slots__ = (
         '__subjects', 
@@ -53,25 +96,55 @@ class Request(XacmlContextBase):
         '__environment',
         '__ctxHandler',
         '__attributeSelector',
+        '__matchResultCache',
+        '__shortCircuitMatching',
+        '__metricsSink',
+        '__adaptiveRuleOrders',
+        '__logEvaluationErrors',
+        '__changeCounter',
+        '__pipQueryResults',
+        '__pipQueryResultsChangeCount',
+        '__nPIPQueries',
+        '__nPIPQueriesSaved',
+        '__attributeIndexes',
+        '__attributeIndexChangeCount',
     )
     ELEMENT_LOCAL_NAME = 'Request'
+    ATTRIBUTE_INDEX_CATEGORIES = ('subjects', 'resources', 'action', 
+                                  'environment')
     
     def __init__(self):
         super(Request, self).__init__()
         
-        self.__subjects = TypedList(Subject)
-        self.__resources = TypedList(Resource)
+        self.__changeCounter = ChangeCounter()
+        self.__subjects = ChangeCountedTypedList(Subject)
+        self.__subjects.changeCounter = self.__changeCounter
+        self.__resources = ChangeCountedTypedList(Resource)
+        self.__resources.changeCounter = self.__changeCounter
         self.__action = None
         self.__environment = None
         
         self.__ctxHandler = None
         self.__attributeSelector = None
+        self.__matchResultCache = None
+        self.__shortCircuitMatching = False
+        self.__metricsSink = None
+        self.__adaptiveRuleOrders = None
+        self.__logEvaluationErrors = True
+        
+        self.__pipQueryResults = {}
+        self.__pipQueryResultsChangeCount = None
+        self.__nPIPQueries = 0
+        self.__nPIPQueriesSaved = 0
+        
+        self.__attributeIndexes = {}
+        self.__attributeIndexChangeCount = None
                     
     @property
     def subjects(self):
         """Get Request subjects
         @return: list of subjects
-        @rtype: ndg.xacml.utils.TypedList
+        @rtype: ndg.xacml.utils.ChangeCountedTypedList
         """
         return self.__subjects
         
@@ -79,7 +152,7 @@ class Request(XacmlContextBase):
     def resources(self):
         """Get Request resources
         @return: list of resources
-        @rtype: ndg.xacml.utils.TypedList
+        @rtype: ndg.xacml.utils.ChangeCountedTypedList
         """
         return self.__resources
                                     
@@ -101,7 +174,9 @@ class Request(XacmlContextBase):
             raise TypeError('Expecting %r type for request "action" '
                             'attribute; got %r' % (Action, type(value)))
             
+        value._setChangeCounter(self.__changeCounter)
         self.__action = value
+        self.__changeCounter.increment()
                                     
     @property
     def environment(self):
@@ -121,7 +196,19 @@ class Request(XacmlContextBase):
             raise TypeError('Expecting %r type for request "environment" '
                             'attribute; got %r' % (Environment, type(value)))
              
-        self.__environment = value   
+        value._setChangeCounter(self.__changeCounter)
+        self.__environment = value
+        self.__changeCounter.increment()
+
+    @property
+    def changeCounter(self):
+        """Get the counter of changes to the subjects, resources, action and
+        environment of this request and their attributes.  Indexes and PIP 
+        query results held for the request are made again when this changes.
+        @return: change counter
+        @rtype: ndg.xacml.utils.ChangeCounter
+        """
+        return self.__changeCounter
 
     @property
     def ctxHandler(self):
@@ -146,6 +233,9 @@ class Request(XacmlContextBase):
                             '%r' % (CtxHandlerInterface, type(value)))
             
         self.__ctxHandler = value
+        
+        # Results from a different handler may differ
+        self.__pipQueryResults = {}
 
     @property
     def attributeSelector(self):
@@ -170,6 +260,381 @@ class Request(XacmlContextBase):
             
         self.__attributeSelector = value
 
+    @property
+    def matchResultCache(self):
+        """Get cache of target match results.  This is set when evaluating a
+        batch of requests so that the results of matching the subjects, 
+        actions and environments sections of targets can be shared between 
+        requests with the same subjects, action and environment.  Results are
+        keyed by target and section name.  It must only be set for requests
+        with no context handler as Policy Information Point queries may 
+        depend on the whole request.
+        @return: target match results or None if not set
+        @rtype: dict / None
+        """
+        return self.__matchResultCache
+
+    @matchResultCache.setter
+    def matchResultCache(self, value):
+        """Set cache of target match results
+        @param value: target match results or None to disable sharing
+        @type value: dict / None
+        """
+        if value is not None and not isinstance(value, dict):
+            raise TypeError('Expecting %r type for "matchResultCache" '
+                            'attribute; got %r' % (dict, type(value)))
+            
+        self.__matchResultCache = value
+
+    @property
+    def shortCircuitMatching(self):
+        """Get short circuit matching setting.  If True, evaluation of a 
+        target stops as soon as its result is known provided that the matches
+        left unevaluated can't raise an error for this request.  Otherwise, 
+        all the matches are evaluated so that any error is reported as an 
+        Indeterminate result.  Decisions are the same either way.
+        @return: short circuit matching setting
+        @rtype: bool
+        """
+        return self.__shortCircuitMatching
+
+    @shortCircuitMatching.setter
+    def shortCircuitMatching(self, value):
+        """Set short circuit matching setting
+        @param value: set to True to enable short circuit matching
+        @type value: bool
+        """
+        if not isinstance(value, bool):
+            raise TypeError('Expecting %r type for "shortCircuitMatching" '
+                            'attribute; got %r' % (bool, type(value)))
+            
+        self.__shortCircuitMatching = value
+
+    @property
+    def metricsSink(self):
+        """Get metrics sink.  This is set by the PDP while the request is 
+        evaluated so that errors resulting in Indeterminate results and 
+        Policy Information Point calls can be recorded.
+        @return: metrics sink or None if not set
+        @rtype: ndg.xacml.core.context.metrics.MetricsSinkInterface / None
+        """
+        return self.__metricsSink
+
+    @metricsSink.setter
+    def metricsSink(self, value):
+        """Set metrics sink
+        @param value: metrics sink or None to stop recording
+        @type value: ndg.xacml.core.context.metrics.MetricsSinkInterface / 
+        None
+        """
+        if value is not None and not isinstance(value, MetricsSinkInterface):
+            raise TypeError('Expecting %r type for "metricsSink" attribute; '
+                            'got %r' % (MetricsSinkInterface, type(value)))
+            
+        self.__metricsSink = value
+
+    @property
+    def adaptiveRuleOrders(self):
+        """Get adaptive rule orders.  These are set by the PDP while the 
+        request is evaluated so that the rules of policies with order 
+        independent rule combining algorithms are evaluated in the order it
+        has learnt.
+        @return: ndg.xacml.core.ruleorder.AdaptiveRuleOrder instances keyed
+        by policy object ID or None if not set
+        @rtype: dict / None
+        """
+        return self.__adaptiveRuleOrders
+
+    @adaptiveRuleOrders.setter
+    def adaptiveRuleOrders(self, value):
+        """Set adaptive rule orders
+        @param value: adaptive rule orders keyed by policy object ID or None
+        to evaluate rules in the policy order
+        @type value: dict / None
+        """
+        if value is not None and not isinstance(value, dict):
+            raise TypeError('Expecting %r type for "adaptiveRuleOrders" '
+                            'attribute; got %r' % (dict, type(value)))
+            
+        self.__adaptiveRuleOrders = value
+
+    @property
+    def logEvaluationErrors(self):
+        """Get setting for logging errors resulting in Indeterminate results
+        while the request is evaluated.  AsyncPDP switches this off for
+        evaluations made only to find the Policy Information Point queries 
+        needed.
+        @return: True if errors are logged
+        @rtype: bool
+        """
+        return self.__logEvaluationErrors
+
+    @logEvaluationErrors.setter
+    def logEvaluationErrors(self, value):
+        """Set setting for logging errors resulting in Indeterminate results
+        @param value: set to False to stop logging errors
+        @type value: bool
+        """
+        if not isinstance(value, bool):
+            raise TypeError('Expecting %r type for "logEvaluationErrors" '
+                            'attribute; got %r' % (bool, type(value)))
+            
+        self.__logEvaluationErrors = value
+
+    @property
+    def nPIPQueries(self):
+        """@return: number of Policy Information Point queries made to the 
+        context handler for this request
+        @rtype: int
+        """
+        return self.__nPIPQueries
+
+    @property
+    def nPIPQueriesSaved(self):
+        """@return: number of Policy Information Point queries for this 
+        request answered from earlier results or the context handler's cache
+        @rtype: int
+        """
+        return self.__nPIPQueriesSaved
+
+    def queryPIP(self, subject, designator):
+        """Query the Policy Information Point via the context handler for
+        attribute values for the given subject and designator.  Results are 
+        held for the request so that the same query isn't made again, until 
+        the context handler or the request contents change.  If the context 
+        handler has a PIP cache, results are shared with other requests via 
+        the cache.
+        
+        @param subject: request subject the query is made for
+        @type subject: ndg.xacml.core.context.subject.Subject
+        @param designator: designator requiring additional attribute values
+        @type designator: 
+        ndg.xacml.core.attributedesignator.AttributeDesignator
+        @return: attribute values or None if there are none
+        @rtype: list / NoneType
+        """
+        self._checkPIPQueryResults()
+        key = (id(subject), 
+               designator.attributeId, 
+               designator.dataType, 
+               designator.issuer)
+        if key in self.__pipQueryResults:
+            self.__nPIPQueriesSaved += 1
+            return self.__pipQueryResults[key]
+        
+        ctxHandler = self.__ctxHandler
+        pipCache = ctxHandler.pipCache
+        if pipCache is not None:
+            pipCacheKey = pipCache.getKey(subject, designator)
+        else:
+            pipCacheKey = None
+            
+        if pipCacheKey is not None:
+            found, attributeValues = pipCache.get(pipCacheKey)
+            if found:
+                self.__nPIPQueriesSaved += 1
+                self.__pipQueryResults[key] = attributeValues
+                return attributeValues
+            
+        attributeValues = self._callPIP(ctxHandler.pipQuery, designator, 1)
+        self.__nPIPQueries += 1
+        if attributeValues is not None:
+            attributeValues = list(attributeValues)
+            
+        if pipCacheKey is not None:
+            pipCache.put(pipCacheKey, attributeValues)
+        
+        # Querying may have changed the request contents: record the result
+        # for the current contents
+        self._checkPIPQueryResults()
+        self.__pipQueryResults[key] = attributeValues
+        return attributeValues
+
+    def queryPIPMany(self, designators):
+        """Query the Policy Information Point via the context handler for
+        the attribute values for all the given designators in a single call to
+        the handler's pipQueryMany.  Results are held for the request as for
+        queryPIP so that subsequent calls to queryPIP for these designators 
+        are answered without further queries.  Designators with results 
+        already held for every subject, or in the context handler's PIP cache,
+        are not queried again.
+        
+        @param designators: designators requiring additional attribute values
+        @type designators: iterable
+        @return: number of designators queried
+        @rtype: int
+        """
+        ctxHandler = self.__ctxHandler
+        pipCache = ctxHandler.pipCache
+        pendingQueries = self.getPendingPIPQueries(designators, 
+                                                   pipCache=pipCache)
+        if len(pendingQueries) == 0:
+            return 0
+        
+        pendingDesignators = [designator 
+                              for designator, _ in pendingQueries.values()]
+        results = self._callPIP(ctxHandler.pipQueryMany, pendingDesignators,
+                                len(pendingDesignators))
+        self.setPIPQueryResults(pendingQueries, results, pipCache=pipCache)
+        return len(pendingDesignators)
+
+    def getPendingPIPQueries(self, designators, pipCache=None):
+        """Find the Policy Information Point queries needed for the given 
+        designators.  Designators with results already held for every 
+        subject are skipped.  Results found in the PIP cache are held for the
+        request so that they aren't queried.
+        
+        @param designators: designators requiring additional attribute values
+        @type designators: iterable
+        @param pipCache: cache of PIP query results shared between requests
+        @type pipCache: ndg.xacml.core.context.pipcache.PIPCache / NoneType
+        @return: pending queries to pass to setPIPQueryResults, keyed by 
+        designator attribute ID, data type and issuer.  Values are the 
+        designator to query and the keys for its results.
+        @rtype: dict
+        """
+        self._checkPIPQueryResults()
+        
+        # Subjects needing results for each designator with the keys for the
+        # results and the PIP cache
+        pendingQueries = {}
+        for designator in designators:
+            designatorKey = (designator.attributeId, 
+                             designator.dataType, 
+                             designator.issuer)
+            for subject in self.__subjects:
+                key = (id(subject),) + designatorKey
+                if key in self.__pipQueryResults:
+                    continue
+                
+                if pipCache is not None:
+                    pipCacheKey = pipCache.getKey(subject, designator)
+                else:
+                    pipCacheKey = None
+                    
+                if pipCacheKey is not None:
+                    found, attributeValues = pipCache.get(pipCacheKey)
+                    if found:
+                        self.__nPIPQueriesSaved += 1
+                        self.__pipQueryResults[key] = attributeValues
+                        continue
+                
+                pendingQuery = pendingQueries.setdefault(designatorKey, 
+                                                         (designator, []))
+                pendingQuery[1].append((key, pipCacheKey))
+        
+        return pendingQueries
+
+    def setPIPQueryResults(self, pendingQueries, results, pipCache=None):
+        """Hold the results of queries made for pending queries found with 
+        getPendingPIPQueries for the request and put them in the PIP cache
+        
+        @param pendingQueries: pending queries
+        @type pendingQueries: dict
+        @param results: attribute values or None for each pending query in 
+        order
+        @type results: iterable
+        @param pipCache: cache of PIP query results shared between requests
+        @type pipCache: ndg.xacml.core.context.pipcache.PIPCache / NoneType
+        """
+        self.__nPIPQueries += len(pendingQueries)
+        
+        # Querying may have changed the request contents: record the results
+        # for the current contents
+        self._checkPIPQueryResults()
+        for (designator, keys), attributeValues in zip(pendingQueries.values(),
+                                                       results):
+            if attributeValues is not None:
+                attributeValues = list(attributeValues)
+            
+            # Queries are made for the request as a whole so the result 
+            # applies to each subject
+            for key, pipCacheKey in keys:
+                if pipCacheKey is not None:
+                    pipCache.put(pipCacheKey, attributeValues)
+                    
+                self.__pipQueryResults[key] = attributeValues
+
+    def _callPIP(self, pipQueryMethod, designators, nQueries):
+        """Call a context handler PIP query method recording the call in the
+        metrics sink if one is set
+        
+        @param pipQueryMethod: context handler pipQuery or pipQueryMany 
+        method
+        @type pipQueryMethod: callable
+        @param designators: designator or designators to query for
+        @type designators: 
+        ndg.xacml.core.attributedesignator.AttributeDesignator / list
+        @param nQueries: number of designators queried
+        @type nQueries: int
+        @return: result of the query method
+        """
+        metricsSink = self.__metricsSink
+        if metricsSink is None:
+            return pipQueryMethod(self, designators)
+        
+        startTime = time.perf_counter()
+        try:
+            result = pipQueryMethod(self, designators)
+            
+        except Exception as e:
+            metricsSink.recordPIPCall(time.perf_counter() - startTime, 
+                                      nQueries, 
+                                      errorType=type(e).__name__)
+            raise
+        
+        metricsSink.recordPIPCall(time.perf_counter() - startTime, nQueries)
+        return result
+
+    def _checkPIPQueryResults(self):
+        """Clear the PIP query results held if the request contents have
+        changed since they were made.  Only changes recorded in this 
+        request's change counter are taken into account."""
+        changeCount = self.__changeCounter.value
+        if changeCount != self.__pipQueryResultsChangeCount:
+            self.__pipQueryResults = {}
+            self.__pipQueryResultsChangeCount = changeCount
+
+    def getAttributeIndex(self, category):
+        """Get the index of the attributes of the subjects, resources,
+        action or environment of this request.  Indexes are made when first
+        requested and remade after any change to the subjects, resources,
+        action or environment or their attributes.  Changes to the data type
+        of an attribute value after it has been added to an attribute are not
+        tracked.
+        
+        @param category: name of request property to index, one of 
+        ATTRIBUTE_INDEX_CATEGORIES
+        @type category: basestring
+        @return: attribute index
+        @rtype: ndg.xacml.core.context.attributeindex.AttributeIndex
+        @raise ValueError: unrecognised category
+        @raise AttributeError: action or environment requested and it is not 
+        set
+        """
+        changeCount = self.__changeCounter.value
+        if changeCount != self.__attributeIndexChangeCount:
+            self.__attributeIndexes = {}
+            self.__attributeIndexChangeCount = changeCount
+        
+        attributeIndex = self.__attributeIndexes.get(category)
+        if attributeIndex is None:
+            if category in ('subjects', 'resources'):
+                requestChildren = getattr(self, category)
+                
+            elif category in self.__class__.ATTRIBUTE_INDEX_CATEGORIES:
+                requestChildren = (getattr(self, category),)
+            else:
+                raise ValueError('Expecting one of %r for attribute index '
+                                 'category; got %r' % 
+                                 (self.__class__.ATTRIBUTE_INDEX_CATEGORIES,
+                                  category))
+                
+            attributeIndex = AttributeIndex(requestChildren)
+            self.__attributeIndexes[category] = attributeIndex
+            
+        return attributeIndex
+
     def __getstate__(self):
         '''Enable pickling
         
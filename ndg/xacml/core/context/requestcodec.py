@@ -0,0 +1,213 @@
+"""NDG XACML request codec - compact encoding of request contexts and results
+as tuples of built in types for passing between processes
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml.core.attribute import Attribute
+from ndg.xacml.core.attributevalue import AttributeValueClassFactory
+from ndg.xacml.core.context.request import Request
+from ndg.xacml.core.context.subject import Subject
+from ndg.xacml.core.context.resource import Resource
+from ndg.xacml.core.context.action import Action
+from ndg.xacml.core.context.environment import Environment
+from ndg.xacml.core.context.result import Result
+
+
+class RequestCodec(object):
+    """Encode request contexts and results as nested tuples of strings and
+    attribute value native types, and decode them again.  The encoding is
+    much smaller and quicker to pickle than the request object graph and is
+    independent of the object implementation.
+
+    A request is encoded as a tuple of:
+
+     - subjects: tuple of (subject category, attributes) for each subject
+     - resources: tuple of (attributes, resource content) for each resource
+     - action: attributes or None if the action isn't set
+     - environment: attributes or None if the environment isn't set
+     - attribute selector: selector object or None
+
+    and attributes as a tuple of (attribute ID, data type, issuer, values) with
+    values a tuple of (data type, native value) for each attribute value.
+    Resource content and attribute selectors are passed unchanged.  Requests
+    with a context handler can't be encoded as the handler is bound to the
+    process it was created in.
+
+    A result is encoded as a tuple of decision, status code and status
+    message.
+
+    @cvar ATTRIBUTE_VALUE_CLASS_FACTORY: factory for attribute value classes
+    used in decoding
+    @type ATTRIBUTE_VALUE_CLASS_FACTORY:
+    ndg.xacml.core.attributevalue.AttributeValueClassFactory
+    """
+    ATTRIBUTE_VALUE_CLASS_FACTORY = AttributeValueClassFactory()
+
+    @classmethod
+    def encodeRequest(cls, request):
+        """Encode a request context
+
+        @param request: request context
+        @type request: ndg.xacml.core.context.request.Request
+        @return: encoded request
+        @rtype: tuple
+        @raise TypeError: input is not a request context
+        @raise ValueError: request has a context handler set
+        """
+        if not isinstance(request, Request):
+            raise TypeError('Expecting %r type for request; got %r' %
+                            (Request, type(request)))
+
+        if request.ctxHandler is not None:
+            raise ValueError('Requests with a context handler set can\'t be '
+                             'encoded')
+
+        if request.action is None:
+            action = None
+        else:
+            action = cls._encodeAttributes(request.action)
+
+        if request.environment is None:
+            environment = None
+        else:
+            environment = cls._encodeAttributes(request.environment)
+
+        return (
+            tuple([(subject.subjectCategory, cls._encodeAttributes(subject))
+                   for subject in request.subjects]),
+            tuple([(cls._encodeAttributes(resource), resource.resourceContent)
+                   for resource in request.resources]),
+            action,
+            environment,
+            request.attributeSelector
+        )
+
+    @staticmethod
+    def _encodeAttributes(requestChild):
+        """Encode the attributes of a subject, resource, action or environment
+
+        @param requestChild: request subject, resource, action or environment
+        @type requestChild: ndg.xacml.core.context.RequestChildBase
+        @return: encoded attributes
+        @rtype: tuple
+        """
+        return tuple([
+            (attribute.attributeId,
+             attribute.dataType,
+             attribute.issuer,
+             tuple([(attributeValue.dataType, attributeValue.value)
+                    for attributeValue in attribute.attributeValues]))
+            for attribute in requestChild.attributes])
+
+    @classmethod
+    def decodeRequest(cls, encodedRequest):
+        """Decode a request context
+
+        @param encodedRequest: encoded request
+        @type encodedRequest: tuple
+        @return: request context
+        @rtype: ndg.xacml.core.context.request.Request
+        """
+        (encodedSubjects,
+         encodedResources,
+         encodedAction,
+         encodedEnvironment,
+         attributeSelector) = encodedRequest
+
+        request = Request()
+        for subjectCategory, encodedAttributes in encodedSubjects:
+            subject = Subject()
+            if subjectCategory is not None:
+                subject.subjectCategory = subjectCategory
+            cls._decodeAttributes(encodedAttributes, subject)
+            request.subjects.append(subject)
+
+        for encodedAttributes, resourceContent in encodedResources:
+            resource = Resource()
+            resource.resourceContent = resourceContent
+            cls._decodeAttributes(encodedAttributes, resource)
+            request.resources.append(resource)
+
+        if encodedAction is not None:
+            request.action = Action()
+            cls._decodeAttributes(encodedAction, request.action)
+
+        if encodedEnvironment is not None:
+            request.environment = Environment()
+            cls._decodeAttributes(encodedEnvironment, request.environment)
+
+        if attributeSelector is not None:
+            request.attributeSelector = attributeSelector
+
+        return request
+
+    @classmethod
+    def _decodeAttributes(cls, encodedAttributes, requestChild):
+        """Decode attributes adding them to a subject, resource, action or
+        environment
+
+        @param encodedAttributes: encoded attributes
+        @type encodedAttributes: tuple
+        @param requestChild: request subject, resource, action or environment
+        @type requestChild: ndg.xacml.core.context.RequestChildBase
+        """
+        attributes = []
+        for attributeId, dataType, issuer, encodedValues in encodedAttributes:
+            attribute = Attribute()
+            if attributeId is not None:
+                attribute.attributeId = attributeId
+            if dataType is not None:
+                attribute.dataType = dataType
+            if issuer is not None:
+                attribute.issuer = issuer
+
+            attribute.attributeValues.extend([
+                cls.ATTRIBUTE_VALUE_CLASS_FACTORY(valueDataType)(value)
+                for valueDataType, value in encodedValues])
+            attributes.append(attribute)
+
+        requestChild.attributes.extend(attributes)
+
+    @staticmethod
+    def encodeResult(result):
+        """Encode a result
+
+        @param result: result
+        @type result: ndg.xacml.core.context.result.Result
+        @return: encoded result
+        @rtype: tuple
+        """
+        status = result.status
+        if status is None or status.statusCode is None:
+            return (result.decision.value, None, None)
+
+        return (result.decision.value,
+                status.statusCode.value,
+                status.statusMessage)
+
+    @staticmethod
+    def decodeResult(encodedResult):
+        """Decode a result
+
+        @param encodedResult: encoded result
+        @type encodedResult: tuple
+        @return: result
+        @rtype: ndg.xacml.core.context.result.Result
+        """
+        decision, statusCode, statusMessage = encodedResult
+        if statusCode is None:
+            return Result.createInitialised(decision=decision)
+
+        return Result.createInitialised(decision=decision,
+                                        code=statusCode,
+                                        message=statusMessage or '')
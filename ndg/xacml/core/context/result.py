@@ -271,6 +271,10 @@ class Decision(object):
         
     @cvar NOT_APPLICABLE: "NotApplicable" decision type instance
     @type NOT_APPLICABLE: NotApplicableDecision
+    
+    @cvar INSTANCES: read-only decision type instances keyed by decision 
+    string
+    @type INSTANCES: dict
        
     @ivar __value: decision value
     @type __value: string
@@ -307,6 +311,9 @@ class Decision(object):
     # re-assignment later after definition of NotApplicableDecision class
     NOT_APPLICABLE = None
     
+    # Map of decision strings to the above instances - see re-assignment later
+    INSTANCES = None
+    
     __slots__ = ('__value',)
     
     def __init__(self, decision=INDETERMINATE_STR):
@@ -395,37 +402,69 @@ class Decision(object):
         @raise AttributeError: invalid decision string value input
         @raise TypeError: invalid type for input decision value
         """
+        if decision is self:
+            return True
+        
         if isinstance(decision, Decision):
-            # Cast to string
-            value = decision.value
+            # Decision values are validated when set so compare directly
+            return self.__value == decision.value
             
         elif isinstance(decision, str):
             value = decision
             
         else:
             raise TypeError('Expecting string or Decision instance for '
-                            'input decision value; got %r instead' % type(value))
+                            'input decision value; got %r instead' % 
+                            type(decision))
             
         if value not in self.__class__.TYPES:
             raise AttributeError('Permissable decision types are %r; got '
                                  '%r instead' % (Decision.TYPES, value))
             
         return self.__value == value   
+    
+    @classmethod
+    def getInstance(cls, decision):
+        """Get the read-only decision instance - Decision.PERMIT, 
+        Decision.DENY, Decision.INDETERMINATE or Decision.NOT_APPLICABLE - 
+        for a given decision.  These instances can be compared by identity
+        avoiding the overhead of __eq__.
+        
+        @param decision: decision value
+        @type decision: string or ndg.xacml.core.context.result.Decision
+        @return: read-only decision instance
+        @rtype: ndg.xacml.core.context.result.Decision
+        @raise AttributeError: invalid decision string value input
+        """
+        try:
+            return cls.INSTANCES[str(decision)]
+        except KeyError:
+            raise AttributeError('Permissable decision types are %r; got '
+                                 '%r instead' % (Decision.TYPES, decision))
 
 
 class PermitDecision(Decision):
     """Permit authorisation Decision"""
     __slots__ = ()
-
+    
     def __init__(self):
         """Initialise set with Permit value"""
-        super(PermitDecision, self).__init__(Decision.PERMIT_STR)
+        Decision._setValue(self, Decision.PERMIT_STR)
         
-    def _setValue(self):  
+    def __reduce__(self):
+        """Unpickle to the read-only instance so that identity comparisons 
+        hold
+        """
+        return 'Decision.PERMIT'
+        
+    def _setValue(self, value):  
         """Make value read-only
         @raise AttributeError: value can't be set
         """
         raise AttributeError("can't set attribute")
+    
+    value = property(fget=Decision._getValue, fset=_setValue, 
+                     doc="Decision value")
 
 
 class DenyDecision(Decision):
@@ -434,13 +473,22 @@ class DenyDecision(Decision):
     
     def __init__(self):
         """Initialise set with deny value"""
-        super(DenyDecision, self).__init__(Decision.DENY_STR)
+        Decision._setValue(self, Decision.DENY_STR)
+        
+    def __reduce__(self):
+        """Unpickle to the read-only instance so that identity comparisons 
+        hold
+        """
+        return 'Decision.DENY'
         
     def _setValue(self, value):  
         """Make value read-only
         @raise AttributeError: value can't be set
         """
         raise AttributeError("can't set attribute")
+    
+    value = property(fget=Decision._getValue, fset=_setValue, 
+                     doc="Decision value")
 
 
 class IndeterminateDecision(Decision):
@@ -449,13 +497,22 @@ class IndeterminateDecision(Decision):
     
     def __init__(self):
         """Initialise set with indeterminate value"""
-        super(IndeterminateDecision, self).__init__(Decision.INDETERMINATE_STR)
+        Decision._setValue(self, Decision.INDETERMINATE_STR)
+        
+    def __reduce__(self):
+        """Unpickle to the read-only instance so that identity comparisons 
+        hold
+        """
+        return 'Decision.INDETERMINATE'
         
     def _setValue(self, value):  
         """Make value read-only
         @raise AttributeError: value can't be set
         """
         raise AttributeError("can't set attribute")
+    
+    value = property(fget=Decision._getValue, fset=_setValue, 
+                     doc="Decision value")
 
 
 class NotApplicableDecision(Decision):
@@ -464,7 +521,13 @@ class NotApplicableDecision(Decision):
     
     def __init__(self):
         """Initialise set with not applicable value"""
-        super(NotApplicableDecision, self).__init__(Decision.NOT_APPLICABLE_STR)
+        Decision._setValue(self, Decision.NOT_APPLICABLE_STR)
+        
+    def __reduce__(self):
+        """Unpickle to the read-only instance so that identity comparisons 
+        hold
+        """
+        return 'Decision.NOT_APPLICABLE'
         
     def _setValue(self, value):  
         """Make value read-only
@@ -472,12 +535,21 @@ class NotApplicableDecision(Decision):
         """
         raise AttributeError("can't set attribute")
     
+    value = property(fget=Decision._getValue, fset=_setValue, 
+                     doc="Decision value")
+    
     
 # Add instances of each for convenience
 Decision.PERMIT = PermitDecision()
 Decision.DENY = DenyDecision()
 Decision.INDETERMINATE = IndeterminateDecision()
 Decision.NOT_APPLICABLE = NotApplicableDecision()
+Decision.INSTANCES = {
+    Decision.PERMIT_STR: Decision.PERMIT,
+    Decision.DENY_STR: Decision.DENY,
+    Decision.INDETERMINATE_STR: Decision.INDETERMINATE,
+    Decision.NOT_APPLICABLE_STR: Decision.NOT_APPLICABLE
+}
 
 
 class Result(XacmlContextBase):
@@ -9,12 +9,155 @@ __license__ = "BSD - see LICENSE file in top-level directory"
 __contact__ = "Philip.Kershaw@stfc.ac.uk"
 __revision__ = '$Id$'
 import re
+import threading
+import types
+from collections import OrderedDict
 
 from ndg.xacml.core.attributevalue import AttributeValueClassFactory
 from ndg.xacml.core.functions import (AbstractFunction, 
                                       FunctionClassFactoryInterface)
 
 
+class RegexCache(object):
+    """Bounded cache of compiled regular expressions.  Entries are evicted 
+    least recently used first once the maximum size is reached.  It is used 
+    for patterns which are only known at evaluation time such as those 
+    returned by attribute designators and selectors.  Constant patterns in 
+    policies are compiled when they are read instead.
+    
+    @cvar DEFAULT_MAX_SIZE: default maximum number of entries
+    @type DEFAULT_MAX_SIZE: int
+    
+    @ivar __maxSize: maximum number of entries
+    @type __maxSize: int
+    @ivar __entries: compiled regular expressions keyed by pattern and held in
+    least recently used order
+    @type __entries: collections.OrderedDict
+    @ivar __lock: lock for access to the entries and counters
+    @type __lock: threading.Lock
+    @ivar __hits: number of patterns found in the cache
+    @type __hits: int
+    @ivar __misses: number of patterns compiled
+    @type __misses: int
+    @ivar __evictions: number of entries evicted to make space for new ones
+    @type __evictions: int
+    """
+    DEFAULT_MAX_SIZE = 256
+    
+    __slots__ = (
+        '__maxSize',
+        '__entries',
+        '__lock',
+        '__hits',
+        '__misses',
+        '__evictions'
+    )
+    
+    def __init__(self, maxSize=DEFAULT_MAX_SIZE):
+        """@param maxSize: maximum number of entries
+        @type maxSize: int
+        @raise TypeError: incorrect input type
+        @raise ValueError: invalid input value
+        """
+        if not isinstance(maxSize, int):
+            raise TypeError('Expecting %r type for "maxSize"; got %r' %
+                            (int, type(maxSize)))
+        if maxSize < 1:
+            raise ValueError('Expecting "maxSize" greater than zero; got %r' %
+                             maxSize)
+            
+        self.__maxSize = maxSize
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        
+    @property
+    def maxSize(self):
+        """@return: maximum number of entries
+        @rtype: int
+        """
+        return self.__maxSize
+    
+    @property
+    def hits(self):
+        """@return: number of patterns found in the cache
+        @rtype: int
+        """
+        return self.__hits
+    
+    @property
+    def misses(self):
+        """@return: number of patterns compiled
+        @rtype: int
+        """
+        return self.__misses
+    
+    @property
+    def evictions(self):
+        """@return: number of entries evicted to make space for new ones
+        @rtype: int
+        """
+        return self.__evictions
+    
+    def __len__(self):
+        """@return: number of entries held
+        @rtype: int
+        """
+        return len(self.__entries)
+    
+    @property
+    def entries(self):
+        """@return: read-only view of the compiled regular expressions keyed
+        by pattern.  Looking up entries in the view doesn't count as a hit or
+        affect the order of eviction.
+        @rtype: types.MappingProxyType
+        """
+        return types.MappingProxyType(self.__entries)
+    
+    def compile(self, pattern):
+        """Get the compiled regular expression for a pattern, compiling it 
+        if it is not in the cache
+        
+        @param pattern: regular expression pattern
+        @type pattern: basestring
+        @return: compiled regular expression
+        @rtype: re.Pattern
+        @raise re.error: invalid pattern
+        """
+        with self.__lock:
+            compiledRegex = self.__entries.get(pattern)
+            if compiledRegex is not None:
+                self.__entries.move_to_end(pattern)
+                self.__hits += 1
+                return compiledRegex
+            
+        # Compile outside the lock - an invalid pattern raises an error here
+        compiledRegex = re.compile(pattern)
+        
+        with self.__lock:
+            self.__misses += 1
+            self.__entries[pattern] = compiledRegex
+            while len(self.__entries) > self.__maxSize:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+                
+        return compiledRegex
+    
+    def clear(self):
+        """Remove all entries.  Counters are not reset."""
+        with self.__lock:
+            self.__entries.clear()
+            
+    def resetCounters(self):
+        """Reset the hit, miss and eviction counters"""
+        with self.__lock:
+            self.__hits = 0
+            self.__misses = 0
+            self.__evictions = 0
+
+
 class RegexpMatchBase(AbstractFunction):
     """XACML 2.0 Regular Expression matching base class function
     
@@ -33,15 +176,61 @@ class RegexpMatchBase(AbstractFunction):
     @cvar CLASS_NAME_SUFFIX: suffix for all regular expression class names
     @type CLASS_NAME_SUFFIX: string
     
-    @cvar compiled_regexes: cache of compiled regular expressions
-    @type compiled_regexes: dict of string mappings to re.RegexObject
+    @cvar regexCache: cache of compiled regular expressions for patterns 
+    which aren't compiled in advance, shared by all regular expression match 
+    functions
+    @type regexCache: ndg.xacml.core.functions.v1.regexp_match.RegexCache
+    @cvar compiled_regexes: read-only view of the entries of regexCache kept
+    for compatibility with code reading the unbounded dictionary of compiled 
+    regular expressions this class previously held.  It can no longer be 
+    modified: use regexCache instead.
+    @type compiled_regexes: types.MappingProxyType
     """
     FUNCTION_NS = None
     FUNCTION_NS_SUFFIX = '-regexp-match'
     CLASS_NAME_SUFFIX = 'RegexpMatch'
     TYPE = None
 
-    compiled_regexes = {}
+    regexCache = RegexCache()
+    compiled_regexes = regexCache.entries
+    
+    @classmethod
+    def compilePattern(cls, pat):
+        """Compile a constant pattern in advance of evaluation.  Match and 
+        Apply nodes call this when they are read and pass the result to 
+        evaluateCompiled.
+        
+        @param pat: regular expression
+        @type pat: ndg.xacml.core.attributevalue.AttributeValue
+        @return: compiled regular expression or None if the pattern is not of
+        the type for this function or is invalid.  Evaluating with the pattern
+        raises the error as normal.
+        @rtype: re.Pattern / NoneType
+        """
+        if (not isinstance(pat, cls.TYPE) or 
+            not isinstance(pat.value, str)):
+            return None
+        
+        try:
+            return re.compile(pat.value)
+        except re.error:
+            return None
+        
+    def evaluateCompiled(self, compiledRegex, input):
+        """Match against a regular expression compiled with compilePattern
+        
+        @param compiledRegex: compiled regular expression
+        @type compiledRegex: re.Pattern
+        @param input: URI to match
+        @type input: type
+        @return: True if URI matches pattern, False otherwise
+        @rtype: bool
+        """
+        if not isinstance(input, self.__class__.TYPE):
+            raise TypeError('Expecting %r derived type for "input"; got %r' %
+                            (self.__class__.TYPE, type(input)))
+            
+        return bool(compiledRegex.match(input.value))
     
     def evaluate(self, pat, input):
         """Match URI against regular expression pattern
@@ -61,11 +250,8 @@ class RegexpMatchBase(AbstractFunction):
             raise TypeError('Expecting %r derived type for "input"; got %r' %
                             (self.__class__.TYPE, type(input)))
             
-        compiled_regex = self.compiled_regexes.get(pat.value, None)
-        if compiled_regex is None:
-            compiled_regex = re.compile(pat.value)
-            self.compiled_regexes[pat.value] = compiled_regex
-        return bool(compiled_regex.match(input.value))
+        compiledRegex = self.regexCache.compile(pat.value)
+        return bool(compiledRegex.match(input.value))
     
 
 attributeValueClassFactory = AttributeValueClassFactory()
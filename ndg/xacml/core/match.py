@@ -12,6 +12,7 @@ __revision__ = "$Id$"
 import logging
 log = logging.getLogger(__name__)
 
+from ndg.xacml import Config
 from ndg.xacml.core import XacmlCoreBase
 from ndg.xacml.core.attributevalue import AttributeValue
 from ndg.xacml.core.attributedesignator import AttributeDesignator
@@ -19,6 +20,8 @@ from ndg.xacml.core.attributeselector import AttributeSelector
 from ndg.xacml.core.functions import (FunctionMap, functionMap,
                                       UnsupportedStdFunctionError,
                                       UnsupportedFunctionError)
+from ndg.xacml.core.functions.v1.equal import EqualBase
+from ndg.xacml.core.functions.v1.regexp_match import RegexpMatchBase
 from ndg.xacml.core.context.exceptions import XacmlContextError
 
 
@@ -54,6 +57,14 @@ class MatchBase(XacmlCoreBase):
     @ivar __loadFunctionFromId: boolean determines whether or not to load
     function classes for given function URN in functionId set property method
     @type __loadFunctionFromId: bool
+    @ivar __isFunctionErrorFreeResult: function, attribute value and 
+    designator data type for which isFunctionErrorFree was last called, and 
+    its result
+    @type __isFunctionErrorFreeResult: tuple / NoneType
+    @ivar __compiledPattern: attribute value pattern and the regular 
+    expression compiled from it when the match function is a regular 
+    expression match function
+    @type __compiledPattern: tuple / NoneType
     """
     ELEMENT_LOCAL_NAME = None
     MATCH_ID_ATTRIB_NAME = 'MatchId'
@@ -67,6 +78,8 @@ class MatchBase(XacmlCoreBase):
         '__function', 
         '__functionMap',
         '__loadFunctionFromId',
+        '__isFunctionErrorFreeResult',
+        '__compiledPattern',
     )
     
     def __init__(self):
@@ -84,6 +97,8 @@ class MatchBase(XacmlCoreBase):
         self.__function = None
         self.__functionMap = functionMap
         self.__loadFunctionFromId = True
+        self.__isFunctionErrorFreeResult = None
+        self.__compiledPattern = None
         
     @property
     def attributeValue(self):
@@ -106,6 +121,7 @@ class MatchBase(XacmlCoreBase):
                             (AttributeValue, type(value)))
             
         self.__attributeValue = value
+        self._compilePattern()
         
     @property
     def attributeDesignator(self):
@@ -242,6 +258,37 @@ class MatchBase(XacmlCoreBase):
                                            self.matchId) 
             
         self.__function = functionClass()
+        self._compilePattern()
+
+    def _compilePattern(self):
+        """Compile the attribute value pattern in advance of evaluation if the
+        match function is a regular expression match function
+        """
+        self.__compiledPattern = None
+        if (isinstance(self.__function, RegexpMatchBase) and 
+            self.__attributeValue is not None):
+            compiledRegex = self.__function.compilePattern(
+                                                        self.__attributeValue)
+            if compiledRegex is not None:
+                self.__compiledPattern = (self.__attributeValue.value, 
+                                          compiledRegex)
+            
+    @property
+    def compiledPattern(self):
+        """@return: regular expression compiled from the attribute value or 
+        None if the match function is not a regular expression match function
+        or the pattern is invalid
+        @rtype: re.Pattern / NoneType
+        """
+        if self.__compiledPattern is None:
+            return None
+        
+        # Check the attribute value hasn't been modified in place
+        pattern, compiledRegex = self.__compiledPattern
+        if pattern is not self.__attributeValue.value:
+            return None
+        
+        return compiledRegex
     
     @property
     def functionMap(self):
@@ -315,16 +362,24 @@ class MatchBase(XacmlCoreBase):
         # is found.  The other attributes need to be checked in case an
         # error occurs.  In this case the top-level PDP exception handling
         # block will catch it and set an overall decision of INDETERMINATE.
+        # The exception is where short circuit matching is enabled and the 
+        # match function can't raise an error for these values.
         attrMatchStatusValues = [False]*len(requestAttributeValues)
         matchFunction = self.function
         matchAttributeValue = self.attributeValue
+        compiledPattern = self.compiledPattern
         
         for i, requestAttributeValue in enumerate(requestAttributeValues):
             
-            attrMatchStatusValues[i] = matchFunction.evaluate(
+            if compiledPattern is not None:
+                attrMatchStatusValues[i] = matchFunction.evaluateCompiled(
+                                                         compiledPattern,
+                                                         requestAttributeValue)
+            else:
+                attrMatchStatusValues[i] = matchFunction.evaluate(
                                                          matchAttributeValue,
                                                          requestAttributeValue)
-            if log.getEffectiveLevel() <= logging.DEBUG:
+            if Config.trace:
                 if attrMatchStatusValues[i] == True:
                     log.debug('Target attribute value %r matches request '
                               'attribute value %r matches using match '
@@ -340,12 +395,95 @@ class MatchBase(XacmlCoreBase):
                               requestAttributeValue,
                               self.matchId)
                     
+            if (attrMatchStatusValues[i] and 
+                context.shortCircuitMatching and 
+                self.isFunctionErrorFree()):
+                break
             
         # Return true if a match was found.
         matchStatus = any(attrMatchStatusValues)
         
         return matchStatus
     
+    def isFunctionErrorFree(self):
+        """Check whether the match function can't raise an error for any 
+        attribute values selected by the designator.  This is so for the 
+        standard equal functions and for the standard regular expression 
+        functions with a valid pattern, where the match attribute value and
+        the designator data type are of the type the function expects.
+        
+        @return: True if the match function can't raise an error
+        @rtype: bool
+        """
+        matchFunction = self.__function
+        designator = self.__attributeDesignator
+        if matchFunction is None or designator is None:
+            return False
+        
+        # The result is held as this is called during evaluation
+        lastResult = self.__isFunctionErrorFreeResult
+        if (lastResult is not None and 
+            lastResult[0] is matchFunction and
+            lastResult[1] is self.__attributeValue and
+            lastResult[2] == designator.dataType):
+            return lastResult[3]
+        
+        isFunctionErrorFree = self._isFunctionErrorFree(matchFunction, 
+                                                        designator)
+        self.__isFunctionErrorFreeResult = (matchFunction,
+                                            self.__attributeValue,
+                                            designator.dataType,
+                                            isFunctionErrorFree)
+        return isFunctionErrorFree
+    
+    def _isFunctionErrorFree(self, matchFunction, designator):
+        """Check whether the match function can't raise an error for any 
+        attribute values selected by the designator
+        
+        @param matchFunction: match function
+        @type matchFunction: ndg.xacml.core.functions.AbstractFunction
+        @param designator: attribute designator
+        @type designator: 
+        ndg.xacml.core.attributedesignator.AttributeDesignator
+        @return: True if the match function can't raise an error
+        @rtype: bool
+        """
+        functionType = getattr(matchFunction.__class__, 'TYPE', None)
+        valueClass = designator.attributeValueFactory(designator.dataType)
+        if (functionType is None or 
+            valueClass is None or
+            not issubclass(valueClass, functionType) or
+            not isinstance(self.__attributeValue, functionType)):
+            return False
+        
+        functionEvaluate = type(matchFunction).evaluate
+        if functionEvaluate is EqualBase.evaluate:
+            return True
+        
+        if (functionEvaluate is RegexpMatchBase.evaluate and 
+            issubclass(functionType.TYPE, str)):
+            # Evaluation raises an error for an invalid pattern
+            return matchFunction.compilePattern(
+                                        self.__attributeValue) is not None
+        
+        return False
+    
+    def mayRaiseError(self, context):
+        """Check whether evaluating this match for the given request context 
+        may raise an error.  Evaluation may be skipped if its result is not 
+        needed only where this returns False.
+        
+        @param context: the request context
+        @type context: ndg.xacml.core.context.request.Request
+        @return: True if an error may be raised
+        @rtype: bool
+        """
+        return (type(self).evaluate is not MatchBase.evaluate or
+                self.__attributeDesignator is None or
+                self.__attributeSelector is not None or
+                self.__attributeDesignator.mayRaiseError(context) or
+                not self.isFunctionErrorFree())
+    
     
 class SubjectMatch(MatchBase):
     "Subject Match Type"
@@ -0,0 +1,488 @@
+"""NDG XACML policy optimiser - flattens and simplifies a parsed policy or
+policy set tree preserving its decisions
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import sys
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml import importElementTree
+ElementTree = importElementTree()
+
+from ndg.xacml.core.policybase import PolicyBase
+from ndg.xacml.core.policy import Policy
+from ndg.xacml.core.policyset import PolicySet
+from ndg.xacml.core.rule import Rule
+from ndg.xacml.core.target import Target
+from ndg.xacml.core.match import MatchBase
+from ndg.xacml.core.apply import Apply
+from ndg.xacml.core.rule_combining_alg import FirstApplicableRuleCombiningAlg
+from ndg.xacml.core.policy_combining_alg import (
+                                            DenyOverridesPolicyCombiningAlg,
+                                            PermitOverridesPolicyCombiningAlg,
+                                            FirstApplicablePolicyCombiningAlg)
+from ndg.xacml.core.snapshot import PolicySnapshot
+from ndg.xacml.parsers.etree.writer import PolicyWriter
+
+
+class _AnyRequestContext(object):
+    """Stand in for a request context for checking whether an attribute 
+    designator may raise an error for any request: a context handler is set
+    and there is no action or environment
+    """
+    __slots__ = ()
+    ctxHandler = object()
+    action = None
+    environment = None
+
+
+class PolicyOptimisationReport(object):
+    """Summary of the changes made optimising a policy or policy set
+
+    @ivar __nNodesBefore: number of nodes in the policy tree before
+    optimisation
+    @type __nNodesBefore: int
+    @ivar __nNodesAfter: number of nodes in the policy tree after optimisation
+    @type __nNodesAfter: int
+    @ivar __nPolicySetsMerged: number of nested policy sets merged into their
+    parents
+    @type __nPolicySetsMerged: int
+    @ivar __nTargetSectionsHoisted: number of target sections common to all
+    the children of a policy or policy set moved to the parent's target
+    @type __nTargetSectionsHoisted: int
+    @ivar __nUnreachableRemoved: number of rules, policies and policy sets
+    removed as they follow a catch all in a first applicable combination
+    @type __nUnreachableRemoved: int
+    """
+    __slots__ = (
+        '__nNodesBefore',
+        '__nNodesAfter',
+        '__nPolicySetsMerged',
+        '__nTargetSectionsHoisted',
+        '__nUnreachableRemoved'
+    )
+
+    def __init__(self):
+        self.__nNodesBefore = 0
+        self.__nNodesAfter = 0
+        self.__nPolicySetsMerged = 0
+        self.__nTargetSectionsHoisted = 0
+        self.__nUnreachableRemoved = 0
+
+    def __str__(self):
+        return ('Nodes: %d before, %d after; %d policy set(s) merged, %d '
+                'target section(s) hoisted, %d unreachable node(s) removed; '
+                'expected speedup %.2fx' % (self.__nNodesBefore,
+                                            self.__nNodesAfter,
+                                            self.__nPolicySetsMerged,
+                                            self.__nTargetSectionsHoisted,
+                                            self.__nUnreachableRemoved,
+                                            self.expectedSpeedup))
+
+    @property
+    def nNodesBefore(self):
+        """Number of nodes in the policy tree before optimisation"""
+        return self.__nNodesBefore
+
+    @property
+    def nNodesAfter(self):
+        """Number of nodes in the policy tree after optimisation"""
+        return self.__nNodesAfter
+
+    @property
+    def nPolicySetsMerged(self):
+        """Number of nested policy sets merged into their parents"""
+        return self.__nPolicySetsMerged
+
+    @property
+    def nTargetSectionsHoisted(self):
+        """Number of target sections moved to the target of the parent"""
+        return self.__nTargetSectionsHoisted
+
+    @property
+    def nUnreachableRemoved(self):
+        """Number of unreachable rules, policies and policy sets removed"""
+        return self.__nUnreachableRemoved
+
+    @property
+    def expectedSpeedup(self):
+        """Expected speedup of evaluation estimated from the reduction in the
+        number of nodes in the policy tree.  Hoisted target sections also
+        avoid evaluating the same matches for each child so the speedup for
+        requests which aren't applicable may be greater.
+
+        @return: ratio of nodes before to nodes after optimisation
+        @rtype: float
+        """
+        if self.__nNodesAfter == 0:
+            return 1.
+
+        return float(self.__nNodesBefore) / self.__nNodesAfter
+
+    def _setNodeCounts(self, nNodesBefore, nNodesAfter):
+        self.__nNodesBefore = nNodesBefore
+        self.__nNodesAfter = nNodesAfter
+
+    def _addPolicySetMerged(self):
+        self.__nPolicySetsMerged += 1
+
+    def _addTargetSectionHoisted(self):
+        self.__nTargetSectionsHoisted += 1
+
+    def _addUnreachableRemoved(self, nRemoved):
+        self.__nUnreachableRemoved += nRemoved
+
+
+class PolicyOptimiser(object):
+    """Optimise a policy or policy set for evaluation.  Decisions for the
+    optimised policy are the same as for the original.  The policy passed is
+    not changed: a copy is made in which policies referenced more than once
+    are separate objects so that each may be optimised for its position in
+    the tree.  As for PolicySnapshot, custom node types aren't supported.
+
+    Optimisations are made bottom up in turn for the whole tree:
+
+     - nested policy sets without a target and with the same deny overrides,
+       permit overrides or first applicable policy combining algorithm as
+       their parent are merged into the parent
+     - rules, policies and policy sets following a catch all - one with no
+       target or condition which is applicable to every request - are removed
+       in first applicable combinations
+     - target sections - subjects, resources, actions or environments -
+       which are the same for all the rules of a policy or all the policies of
+       a policy set are moved to the target of the parent where it has none
+       for that section.  Sections are only moved where their matches can't
+       raise an error since the error would then change the decision.
+
+    Policies may be optimised offline by running this module with the input
+    policy file and output file path as arguments.
+
+    @cvar MERGEABLE_POLICY_COMBINING_ALGS: policy combining algorithms for
+    which nested policy sets can be merged into their parents
+    @type MERGEABLE_POLICY_COMBINING_ALGS: tuple
+    @cvar TARGET_SECTION_NAMES: target attribute names for each section
+    @type TARGET_SECTION_NAMES: tuple
+
+    @ivar __report: report for the last policy optimised
+    @type __report: PolicyOptimisationReport / NoneType
+    """
+    MERGEABLE_POLICY_COMBINING_ALGS = (
+        DenyOverridesPolicyCombiningAlg,
+        PermitOverridesPolicyCombiningAlg,
+        FirstApplicablePolicyCombiningAlg
+    )
+    TARGET_SECTION_NAMES = ('subjects', 'resources', 'actions', 'environments')
+
+    __slots__ = ('__report',)
+
+    def __init__(self):
+        self.__report = None
+
+    @property
+    def report(self):
+        """Report of the changes made to the last policy optimised
+        @rtype: PolicyOptimisationReport / NoneType
+        """
+        return self.__report
+
+    def optimise(self, policy):
+        """Optimise a policy or policy set
+
+        @param policy: policy or policy set
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        @return: optimised copy of the policy
+        @rtype: ndg.xacml.core.policybase.PolicyBase
+        @raise TypeError: incorrect input type
+        @raise ndg.xacml.core.snapshot.PolicySnapshotError: policy contains
+        custom types which can't be copied
+        """
+        if not isinstance(policy, PolicyBase):
+            raise TypeError('Expecting %r derived type for "policy" input; got '
+                            '%r instead' % (PolicyBase, type(policy)))
+
+        self.__report = PolicyOptimisationReport()
+        nNodesBefore = self.countNodes(policy)
+
+        policy = PolicySnapshot.decode(PolicySnapshot.encode(policy))
+        self._mergePolicySets(policy)
+        self._removeUnreachable(policy)
+        self._hoistTargetSections(policy)
+
+        self.__report._setNodeCounts(nNodesBefore, self.countNodes(policy))
+        log.debug('Optimised %s %r: %s', policy.ELEMENT_LOCAL_NAME,
+                  policy.ident, self.__report)
+        return policy
+
+    @classmethod
+    def countNodes(cls, node):
+        """Count the nodes in a policy tree: policies, policy sets, rules,
+        target children, matches and condition expressions
+
+        @param node: policy, policy set, rule, target or expression
+        @type node: ndg.xacml.core.XacmlCoreBase derived type
+        @return: number of nodes
+        @rtype: int
+        """
+        if isinstance(node, PolicySet):
+            return (1 + cls.countNodes(node.target) +
+                    sum([cls.countNodes(child) for child in node.policies]))
+
+        elif isinstance(node, Policy):
+            return (1 + cls.countNodes(node.target) +
+                    sum([cls.countNodes(rule) for rule in node.rules]))
+
+        elif isinstance(node, Target):
+            nNodes = 0
+            for sectionName in cls.TARGET_SECTION_NAMES:
+                for targetChild in getattr(node, sectionName):
+                    nNodes += 1 + len(targetChild.matches)
+            return nNodes
+
+        elif isinstance(node, Apply):
+            return 1 + sum([cls.countNodes(expression)
+                            for expression in node.expressions])
+
+        elif isinstance(node, Rule):
+            nNodes = 1 + cls.countNodes(node.target)
+            if node.condition is not None:
+                nNodes += cls.countNodes(node.condition.expression)
+            return nNodes
+
+        elif node is None:
+            return 0
+
+        return 1
+
+    def _mergePolicySets(self, policy):
+        """Merge nested policy sets with no target and the same combining
+        algorithm as their parent into it
+
+        @param policy: policy or policy set
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        """
+        if not isinstance(policy, PolicySet):
+            return
+
+        for childPolicy in policy.policies:
+            self._mergePolicySets(childPolicy)
+
+        if not (type(policy.policyCombiningAlg) in
+                self.__class__.MERGEABLE_POLICY_COMBINING_ALGS):
+            return
+
+        policies = []
+        for childPolicy in policy.policies:
+            if (isinstance(childPolicy, PolicySet) and
+                childPolicy.policyCombiningAlgId ==
+                    policy.policyCombiningAlgId and
+                self._isEmptyTarget(childPolicy.target)):
+                policies.extend(childPolicy.policies)
+                self.__report._addPolicySetMerged()
+            else:
+                policies.append(childPolicy)
+
+        self._replaceItems(policy.policies, policies)
+
+    def _removeUnreachable(self, policy):
+        """Remove rules, policies and policy sets following a catch all in
+        first applicable combinations
+
+        @param policy: policy or policy set
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        """
+        if isinstance(policy, PolicySet):
+            for childPolicy in policy.policies:
+                self._removeUnreachable(childPolicy)
+
+            if isinstance(policy.policyCombiningAlg,
+                          FirstApplicablePolicyCombiningAlg):
+                self._truncateAfterCatchAll(policy.policies)
+
+        elif isinstance(policy.ruleCombiningAlg,
+                        FirstApplicableRuleCombiningAlg):
+            self._truncateAfterCatchAll(policy.rules)
+
+    def _truncateAfterCatchAll(self, children):
+        """Remove children following the first catch all
+
+        @param children: rules, or policies and policy sets
+        @type children: ndg.xacml.utils.TypedList
+        """
+        for i, child in enumerate(children):
+            if self._isCatchAll(child):
+                nRemoved = len(children) - i - 1
+                if nRemoved > 0:
+                    self._replaceItems(children, children[:i + 1])
+                    self.__report._addUnreachableRemoved(nRemoved)
+                break
+
+    @classmethod
+    def _isCatchAll(cls, node):
+        """Check whether a rule, policy or policy set is applicable to every
+        request - the combining algorithms return a decision other than
+        NotApplicable if any of the nodes combined is applicable
+
+        @param node: rule, policy or policy set
+        @type node: ndg.xacml.core.rule.Rule /
+        ndg.xacml.core.policybase.PolicyBase
+        @return: True if the node is never NotApplicable
+        @rtype: bool
+        """
+        if not cls._isEmptyTarget(node.target):
+            return False
+
+        if isinstance(node, PolicySet):
+            return (type(node.policyCombiningAlg) in
+                        cls.MERGEABLE_POLICY_COMBINING_ALGS and
+                    any([cls._isCatchAll(child) for child in node.policies]))
+
+        elif isinstance(node, Policy):
+            return any([cls._isCatchAll(rule) for rule in node.rules])
+
+        return node.condition is None
+
+    def _hoistTargetSections(self, policy):
+        """Move target sections common to all the children of a policy or
+        policy set to its target
+
+        @param policy: policy or policy set
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        """
+        if isinstance(policy, PolicySet):
+            for childPolicy in policy.policies:
+                self._hoistTargetSections(childPolicy)
+            children = policy.policies
+        else:
+            children = policy.rules
+
+        if len(children) == 0:
+            return
+
+        for sectionName in self.__class__.TARGET_SECTION_NAMES:
+            if (policy.target is not None and
+                len(getattr(policy.target, sectionName)) > 0):
+                continue
+
+            sectionKey = None
+            for child in children:
+                childSectionKey = self._getSectionKey(child.target,
+                                                      sectionName)
+                if (childSectionKey is None or
+                    (sectionKey is not None and
+                     childSectionKey != sectionKey)):
+                    break
+                sectionKey = childSectionKey
+            else:
+                if policy.target is None:
+                    policy.target = Target()
+
+                section = getattr(policy.target, sectionName)
+                section.extend(getattr(children[0].target, sectionName))
+                for child in children:
+                    self._replaceItems(getattr(child.target, sectionName), [])
+
+                self.__report._addTargetSectionHoisted()
+
+    @classmethod
+    def _getSectionKey(cls, target, sectionName):
+        """Get a key identifying the content of a target section which may be
+        hoisted
+
+        @param target: target
+        @type target: ndg.xacml.core.target.Target / NoneType
+        @param sectionName: target section attribute name
+        @type sectionName: string
+        @return: serialised target section or None if the section is empty or
+        its matches may raise an error
+        @rtype: bytes / NoneType
+        """
+        if target is None:
+            return None
+
+        section = getattr(target, sectionName)
+        if len(section) == 0:
+            return None
+
+        for targetChild in section:
+            for match in targetChild.matches:
+                if cls._mayRaiseError(match):
+                    return None
+
+        return b''.join([ElementTree.tostring(PolicyWriter.toElement(
+                                                                targetChild))
+                         for targetChild in section])
+
+    @staticmethod
+    def _mayRaiseError(match):
+        """Check whether a match may raise an error for any request.  Moving
+        such a match to the parent's target would change the decision as 
+        the error would make the parent Indeterminate instead of each child.
+
+        @param match: target match
+        @type match: ndg.xacml.core.match.MatchBase
+        @return: True if an error may be raised
+        @rtype: bool
+        """
+        return (type(match).evaluate is not MatchBase.evaluate or
+                match.attributeDesignator is None or
+                match.attributeSelector is not None or
+                match.attributeDesignator.mayRaiseError(_AnyRequestContext()) or
+                not match.isFunctionErrorFree())
+
+    @classmethod
+    def _isEmptyTarget(cls, target):
+        """Check for a target which matches every request
+
+        @param target: target
+        @type target: ndg.xacml.core.target.Target / NoneType
+        @rtype: bool
+        """
+        return target is None or all([
+            len(getattr(target, sectionName)) == 0
+            for sectionName in cls.TARGET_SECTION_NAMES])
+
+    @staticmethod
+    def _replaceItems(items, newItems):
+        """Replace the contents of a typed list in place
+
+        @param items: list to update
+        @type items: ndg.xacml.utils.TypedList
+        @param newItems: new contents
+        @type newItems: list
+        """
+        newItems = list(newItems)
+        del items[:]
+        items.extend(newItems)
+
+
+def main(args=sys.argv[1:]):
+    """Optimise a policy or policy set file writing the result to a new file
+
+    @param args: input policy file path and output file path
+    @type args: list
+    """
+    from ndg.xacml.parsers.etree.factory import ReaderFactory
+    from ndg.xacml.finder.defaultfinder import getDefaultPolicyFinder
+
+    if len(args) != 2:
+        sys.exit('Usage: python -m ndg.xacml.core.optimiser <policy file> '
+                 '<output file>')
+
+    inputFilePath, outputFilePath = args
+    policy = PolicyBase.fromSource(inputFilePath, ReaderFactory,
+                                   getDefaultPolicyFinder(inputFilePath))
+    optimiser = PolicyOptimiser()
+    PolicyWriter.write(optimiser.optimise(policy), outputFilePath)
+    print(optimiser.report)
+
+
+if __name__ == "__main__":
+    main()
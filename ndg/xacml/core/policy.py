@@ -388,10 +388,21 @@ class Policy(PolicyBase):
                               "Policy PolicyDefaults element")   
 
     def evaluateCombiningAlgorithm(self, context):
-        """Evaluates the rule combining algorithm for this policy.
+        """Evaluates the rule combining algorithm for this policy.  Rules are
+        evaluated in the adaptive rule order set for this policy in the 
+        request context, if any, where the algorithm is order independent.
         @param context: the request context
         @type context: ndg.xacml.core.request.Request
         @return: result of the evaluation - the decision for this policy
         @rtype: ndg.xacml.core.context.result.Decision
         """
-        return self.ruleCombiningAlg.evaluate(self.rules, context)
+        ruleCombiningAlg = self.ruleCombiningAlg
+        adaptiveRuleOrders = getattr(context, 'adaptiveRuleOrders', None)
+        if (adaptiveRuleOrders is not None and 
+            getattr(ruleCombiningAlg, 'ORDER_INDEPENDENT', False)):
+            adaptiveRuleOrder = adaptiveRuleOrders.get(id(self))
+            if adaptiveRuleOrder is not None:
+                return adaptiveRuleOrder.evaluate(ruleCombiningAlg, self.rules,
+                                                  context)
+            
+        return ruleCombiningAlg.evaluate(self.rules, context)
@@ -14,6 +14,7 @@ log = logging.getLogger(__name__)
 
 from abc import abstractmethod
 
+from ndg.xacml import Config
 from ndg.xacml.core.context.result import Decision
 
 
@@ -67,18 +68,18 @@ class DenyOverridesPolicyCombiningAlg(PolicyCombiningAlgInterface):
         atLeastOnePermit = False
 
         for policy in policies:
-            decision = policy.evaluate(context)
-            if decision == Decision.DENY:
+            decision = Decision.getInstance(policy.evaluate(context))
+            if decision is Decision.DENY:
                 return Decision.DENY
 
-            if decision == Decision.PERMIT:
+            if decision is Decision.PERMIT:
                 atLeastOnePermit = True
                 continue
 
-            if decision == Decision.NOT_APPLICABLE:
+            if decision is Decision.NOT_APPLICABLE:
                 continue
 
-            if decision == Decision.INDETERMINATE:
+            if decision is Decision.INDETERMINATE:
                 return Decision.DENY
 
         if atLeastOnePermit:
@@ -106,35 +107,39 @@ class PermitOverridesPolicyCombiningAlg(PolicyCombiningAlgInterface):
         atLeastOneDeny = False
 
         for policy in policies:
-            decision = policy.evaluate(context)
-            if decision == Decision.DENY:
+            decision = Decision.getInstance(policy.evaluate(context))
+            if decision is Decision.DENY:
                 atLeastOneDeny = True
                 continue
 
-            if decision == Decision.PERMIT:
-                log.debug("Policy %r permits, returning overall permit"
-                          " decision", policy.ident)
+            if decision is Decision.PERMIT:
+                if Config.trace:
+                    log.debug("Policy %r permits, returning overall permit"
+                              " decision", policy.ident)
                 return Decision.PERMIT
 
-            if decision == Decision.NOT_APPLICABLE:
+            if decision is Decision.NOT_APPLICABLE:
                 continue
 
-            if decision == Decision.INDETERMINATE:
+            if decision is Decision.INDETERMINATE:
                 atLeastOneError = True
                 continue
 
         if atLeastOneDeny:
-            log.debug('At least one policy with a deny decision found, '
-                      'returning overall deny decision')
+            if Config.trace:
+                log.debug('At least one policy with a deny decision found, '
+                          'returning overall deny decision')
             return Decision.DENY
 
         if atLeastOneError:
-            log.debug('At least one policy with an error found, returning '
-                      'overall indeterminate decision')
+            if Config.trace:
+                log.debug('At least one policy with an error found, '
+                          'returning overall indeterminate decision')
             return Decision.INDETERMINATE
 
-        log.debug('No policies were applicable to the request, returning '
-                  'overall not applicable decision')
+        if Config.trace:
+            log.debug('No policies were applicable to the request, '
+                      'returning overall not applicable decision')
         return Decision.NOT_APPLICABLE
 
 
@@ -155,28 +160,32 @@ class FirstApplicablePolicyCombiningAlg(PolicyCombiningAlgInterface):
         @rtype: ndg.xacml.core.context.result.Decision
         """
         for policy in policies:
-            decision = policy.evaluate(context)
-            if decision == Decision.DENY:
-                log.debug("Policy %r denies, returning overall deny decision",
-                          policy.ident)
+            decision = Decision.getInstance(policy.evaluate(context))
+            if decision is Decision.DENY:
+                if Config.trace:
+                    log.debug("Policy %r denies, returning overall deny "
+                              "decision", policy.ident)
                 return Decision.DENY
 
-            if decision == Decision.PERMIT:
-                log.debug("Policy %r permits, returning overall permit "
-                          "decision",
-                          policy.ident)
+            if decision is Decision.PERMIT:
+                if Config.trace:
+                    log.debug("Policy %r permits, returning overall permit "
+                              "decision",
+                              policy.ident)
                 return Decision.PERMIT
 
-            if decision == Decision.NOT_APPLICABLE:
+            if decision is Decision.NOT_APPLICABLE:
                 continue
 
-            if decision == Decision.INDETERMINATE:
-                log.debug("Policy %r is indeterminate, returning overall "
-                          "indeterminate decision", policy.ident)
+            if decision is Decision.INDETERMINATE:
+                if Config.trace:
+                    log.debug("Policy %r is indeterminate, returning "
+                              "overall indeterminate decision", policy.ident)
                 return Decision.INDETERMINATE
 
-        log.debug('No policies were applicable to the request, returning '
-                  'overall not applicable decision')
+        if Config.trace:
+            log.debug('No policies were applicable to the request, '
+                      'returning overall not applicable decision')
         return Decision.NOT_APPLICABLE
 
 
@@ -15,6 +15,7 @@ import traceback
 import logging
 log = logging.getLogger(__name__)
 
+from ndg.xacml import Config
 from ndg.xacml.finder.policyfinderbase import PolicyFinderBase
 from ndg.xacml.parsers import AbstractReaderFactory, AbstractReader
 from ndg.xacml.parsers.common import Common
@@ -74,6 +75,7 @@ class PolicyBase(XacmlCoreBase, metaclass=ABCMeta):
             raise TypeError('Expecting %r derived object for policy finder; '
                             'got %r' % (PolicyFinderBase, type(finder)))
         finder.setReader(reader)
+        finder.prefetchReferences(source)
 
         common = Common(finder)
         return reader.parse(source, common)
@@ -112,10 +114,11 @@ class PolicyBase(XacmlCoreBase, metaclass=ABCMeta):
         try:
             result.decision = self.evaluate(request)
         except XacmlContextError as e:
-            log.error('Exception raised evaluating request context, returning '
-                      '%r decision:%s',
-                      e.response.results[0].decision,
-                      traceback.format_exc())
+            if getattr(request, 'logEvaluationErrors', True):
+                log.error('Exception raised evaluating request context, '
+                          'returning %r decision:%s',
+                          e.response.results[0].decision,
+                          traceback.format_exc())
 
             result = e.response.results[0]
 
@@ -133,27 +136,27 @@ class PolicyBase(XacmlCoreBase, metaclass=ABCMeta):
         # Exception block around all rule processing in order to set
         # INDETERMINATE response from any exceptions raised
         try:
-            log.debug('Evaluating %s %r ...', self.ELEMENT_LOCAL_NAME,
-                      self.ident)
-
-            # Instantiation implicitly sets to default value of Indeterminate.
-            decision = Decision()
+            if Config.trace:
+                log.debug('Evaluating %s %r ...', self.ELEMENT_LOCAL_NAME,
+                          self.ident)
 
             # Check for a policy(set) target.
             if self.target is not None:
                 targetMatch = self.target.match(context)
-                if targetMatch:
+                if targetMatch and Config.trace:
                     log.debug('Match to request context for target in %s '
                               '%r', self.ELEMENT_LOCAL_NAME, self.ident)
             else:
-                log.debug('No target set in %s %r', self.ELEMENT_LOCAL_NAME,
-                          self.ident)
+                if Config.trace:
+                    log.debug('No target set in %s %r',
+                              self.ELEMENT_LOCAL_NAME, self.ident)
                 targetMatch = True
       
             if not targetMatch:
-                log.debug('No match to request context for target in %s '
-                          '%r returning NotApplicable status',
-                          self.ELEMENT_LOCAL_NAME, self.ident)
+                if Config.trace:
+                    log.debug('No match to request context for target in %s '
+                              '%r returning NotApplicable status',
+                              self.ELEMENT_LOCAL_NAME, self.ident)
                 decision = Decision.NOT_APPLICABLE
                 return decision
 
@@ -161,13 +164,18 @@ class PolicyBase(XacmlCoreBase, metaclass=ABCMeta):
             # effects from the rules evaluated into an overall decision
             decision = self.evaluateCombiningAlgorithm(context)
 
-        except Exception:
+        except Exception as e:
             # Catch all so that nothing is handled from within the scope of this
             # method
-            log.error('No PDPError type exception raised evaluating request '
-                      'context, returning %r decision:%s',
-                      Decision.INDETERMINATE_STR,
-                      traceback.format_exc())
+            if getattr(context, 'logEvaluationErrors', True):
+                log.error('No PDPError type exception raised evaluating '
+                          'request context, returning %r decision:%s',
+                          Decision.INDETERMINATE_STR,
+                          traceback.format_exc())
+
+            metricsSink = getattr(context, 'metricsSink', None)
+            if metricsSink is not None:
+                metricsSink.recordIndeterminate(type(e).__name__)
 
             decision = Decision.INDETERMINATE
 
@@ -20,7 +20,11 @@ from ndg.xacml.core.policydefaults import PolicyDefaults
 from ndg.xacml.core.target import Target
 from ndg.xacml.core.obligation import Obligation
 from ndg.xacml.core.policy_combining_alg import (PolicyCombiningAlgClassFactory,
-                                                 PolicyCombiningAlgInterface)
+                                                 PolicyCombiningAlgInterface,
+                                        DenyOverridesPolicyCombiningAlg,
+                                        PermitOverridesPolicyCombiningAlg,
+                                        FirstApplicablePolicyCombiningAlg)
+from ndg.xacml.core.targetindex import TargetIndex
 from ndg.xacml.core.functions import (UnsupportedStdFunctionError,
                                       UnsupportedFunctionError)
 
@@ -55,6 +59,10 @@ class PolicySet(PolicyBase):
     @type POLICY_SET_COMBINER_PARAMETERS_LOCAL_NAME: string
     @cvar OBLIGATIONS_LOCAL_NAME: obligations XML element local name
     @type OBLIGATIONS_LOCAL_NAME: string
+    @cvar TARGET_INDEXABLE_POLICY_COMBINING_ALGS: policy combining algorithms
+    for which the result is unaffected by skipping children which are not
+    applicable and so may be used with a target index
+    @type TARGET_INDEXABLE_POLICY_COMBINING_ALGS: tuple
     
     @ivar __policySetId: policy set id
     @type __policySetId: NoneType / basestring
@@ -74,6 +82,9 @@ class PolicySet(PolicyBase):
     @type __policyCombiningAlgFactory: ndg.xacml.core.policy_combining_alg.PolicyCombiningAlgClassFactory
     @ivar __policyCombiningAlg: policy combining algorithm
     @type __policyCombiningAlg: NoneType / ndg.xacml.core.policy_combining_alg.PolicyCombiningAlgInterface
+    @ivar __targetIndex: optional index of the targets of child policies used
+    to skip those which can't apply to a given request
+    @type __targetIndex: NoneType / ndg.xacml.core.targetindex.TargetIndex
     """ 
 
     DEFAULT_XACML_VERSION = "2.0"
@@ -90,6 +101,12 @@ class PolicySet(PolicyBase):
     OBLIGATIONS_LOCAL_NAME = "Obligations"
     POLICY_SET_ID_REFERENCE = "PolicySetIdReference"
 
+    TARGET_INDEXABLE_POLICY_COMBINING_ALGS = (
+        DenyOverridesPolicyCombiningAlg,
+        PermitOverridesPolicyCombiningAlg,
+        FirstApplicablePolicyCombiningAlg
+    )
+
     __slots__ = (
         '__policySetId',
         '__version',
@@ -100,7 +117,8 @@ class PolicySet(PolicyBase):
         '__policies',
         '__obligations',
         '__policyCombiningAlgFactory',
-        '__policyCombiningAlg'
+        '__policyCombiningAlg',
+        '__targetIndex'
     )
 
     def __init__(self, policyCombiningAlgFactory=None):
@@ -129,6 +147,7 @@ class PolicySet(PolicyBase):
             self.policyCombiningAlgFactory = policyCombiningAlgFactory
 
         self.__policyCombiningAlg = None
+        self.__targetIndex = None
 
     @classmethod
     def fromSource(cls, source, readerFactory):
@@ -387,4 +406,51 @@ class PolicySet(PolicyBase):
         @return: result of the evaluation - the decision for this policy set
         @rtype: ndg.xacml.core.context.result.Decision
         """
-        return self.policyCombiningAlg.evaluate(self.policies, context)
+        policies = self.policies
+        if (self.__targetIndex is not None and
+            isinstance(self.policyCombiningAlg,
+                       self.__class__.TARGET_INDEXABLE_POLICY_COMBINING_ALGS)):
+            policies = self.__targetIndex.getCandidates(policies, context)
+
+        return self.policyCombiningAlg.evaluate(policies, context)
+
+    @property
+    def targetIndex(self):
+        """@return: index of child policy targets or None if no index has been
+        built
+        @rtype: NoneType / ndg.xacml.core.targetindex.TargetIndex
+        """
+        return self.__targetIndex
+
+    def buildTargetIndex(self, recursive=True):
+        """Build an index of the targets of the child policies and policy sets.
+        On evaluation, children whose targets can't match the request context
+        are skipped.  The index must be rebuilt if the list of child policies
+        is subsequently altered - until it is, all children are evaluated.
+
+        @param recursive: set to True to build indexes for child policy sets
+        too
+        @type recursive: bool
+        @return: the new target index
+        @rtype: ndg.xacml.core.targetindex.TargetIndex
+        """
+        self.__targetIndex = TargetIndex(self.policies)
+        if recursive:
+            for policy in self.policies:
+                if isinstance(policy, PolicySet):
+                    policy.buildTargetIndex(recursive=True)
+
+        return self.__targetIndex
+
+    def clearTargetIndex(self, recursive=True):
+        """Remove the target index so that all child policies are evaluated
+
+        @param recursive: set to True to remove the indexes for child policy
+        sets too
+        @type recursive: bool
+        """
+        self.__targetIndex = None
+        if recursive:
+            for policy in self.policies:
+                if isinstance(policy, PolicySet):
+                    policy.clearTargetIndex(recursive=True)
@@ -0,0 +1,438 @@
+"""NDG XACML per-node policy evaluation profiler
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import threading
+import time
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml import XacmlError
+from ndg.xacml.core.policybase import PolicyBase
+from ndg.xacml.core.rule import Rule
+from ndg.xacml.core.target import Target
+from ndg.xacml.core.match import MatchBase
+from ndg.xacml.core.condition import Condition
+from ndg.xacml.core.apply import Apply
+from ndg.xacml.core.context.result import Decision
+
+
+class EvaluationProfilerError(XacmlError):
+    """Error enabling or disabling an evaluation profiler"""
+
+
+class NodeStats(object):
+    """Evaluation statistics for a policy node
+
+    @ivar __path: labels of the node and the nodes it was evaluated within,
+    outermost first
+    @type __path: tuple
+    @ivar __nCalls: number of evaluations of the node
+    @type __nCalls: int
+    @ivar __cumulativeTime: total time in seconds spent evaluating the node
+    including the nodes within it
+    @type __cumulativeTime: float
+    @ivar __selfTime: total time in seconds spent evaluating the node
+    excluding the profiled nodes within it
+    @type __selfTime: float
+    @ivar __outcomes: number of evaluations for each decision, match or
+    condition status or exception type resulting
+    @type __outcomes: dict
+    """
+    __slots__ = (
+        '__path',
+        '__nCalls',
+        '__cumulativeTime',
+        '__selfTime',
+        '__outcomes'
+    )
+
+    def __init__(self, path):
+        """@param path: labels of the node and the nodes it was evaluated
+        within, outermost first
+        @type path: tuple
+        """
+        self.__path = path
+        self.__nCalls = 0
+        self.__cumulativeTime = 0.
+        self.__selfTime = 0.
+        self.__outcomes = {}
+
+    def add(self, cumulativeTime, selfTime, outcome, nCalls=1):
+        """Add evaluations of the node
+
+        @param cumulativeTime: time spent evaluating the node including the
+        nodes within it
+        @type cumulativeTime: float
+        @param selfTime: time spent evaluating the node excluding the nodes
+        within it
+        @type selfTime: float
+        @param outcome: decision, match or condition status or exception type
+        resulting or None if the result is not recorded for the node type
+        @type outcome: string / NoneType
+        @param nCalls: number of evaluations
+        @type nCalls: int
+        """
+        self.__nCalls += nCalls
+        self.__cumulativeTime += cumulativeTime
+        self.__selfTime += selfTime
+        if outcome is not None:
+            self.__outcomes[outcome] = self.__outcomes.get(outcome, 0) + nCalls
+
+    def merge(self, nodeStats):
+        """Add the statistics for another node
+
+        @param nodeStats: statistics to add
+        @type nodeStats: ndg.xacml.core.profiler.NodeStats
+        """
+        self.__nCalls += nodeStats.nCalls
+        self.__cumulativeTime += nodeStats.cumulativeTime
+        self.__selfTime += nodeStats.selfTime
+        for outcome, n in nodeStats.outcomes.items():
+            self.__outcomes[outcome] = self.__outcomes.get(outcome, 0) + n
+
+    @property
+    def path(self):
+        """@return: labels of the node and the nodes it was evaluated within,
+        outermost first
+        @rtype: tuple
+        """
+        return self.__path
+
+    @property
+    def label(self):
+        """@return: label of the node e.g. Rule:<RuleId>
+        @rtype: string
+        """
+        return self.__path[-1]
+
+    @property
+    def nCalls(self):
+        """@return: number of evaluations of the node
+        @rtype: int
+        """
+        return self.__nCalls
+
+    @property
+    def cumulativeTime(self):
+        """@return: total time in seconds spent evaluating the node including
+        the nodes within it
+        @rtype: float
+        """
+        return self.__cumulativeTime
+
+    @property
+    def selfTime(self):
+        """@return: total time in seconds spent evaluating the node excluding
+        the profiled nodes within it
+        @rtype: float
+        """
+        return self.__selfTime
+
+    @property
+    def outcomes(self):
+        """@return: number of evaluations for each decision, match or
+        condition status or exception type resulting
+        @rtype: dict
+        """
+        return dict(self.__outcomes)
+
+    def __repr__(self):
+        return '<%s %r: %d calls, %.6fs cumulative, %.6fs self>' % (
+                    self.__class__.__name__, self.label, self.__nCalls,
+                    self.__cumulativeTime, self.__selfTime)
+
+
+class EvaluationProfiler(object):
+    """Profile the evaluation of policies by the PDP recording the number of
+    calls, the cumulative and self time and the distribution of results for
+    each policy set, policy, rule, target, match, condition and apply node.
+
+    Nodes are identified by a path of labels of the form <Element>:<Id> e.g.
+    Rule:<RuleId> or ResourceMatch:<MatchId> for the node and the nodes it was
+    evaluated within, so the same rule evaluated from two policy sets is
+    recorded separately.  Targets and conditions are labelled by element name
+    alone as they are identified by the path of their parent.
+
+    Profiling is opt-in: enable replaces the evaluation methods of the node
+    classes with profiling ones and disable restores them, so that there is
+    no cost to evaluation when no profiler is enabled.  Use as a context
+    manager to enable it for the duration of a block,
+
+    >>> with EvaluationProfiler() as profiler:
+    ...     pdp.evaluate(request)
+    >>> print(profiler.formatHotRules())
+
+    Only one profiler may be enabled at a time.  Evaluations from all threads
+    are recorded.  Nodes which override the evaluation methods of the classes
+    profiled, the closures evaluated by CompiledPDP and requests evaluated in
+    the worker processes of ParallelPDP aren't profiled.
+
+    @cvar HOOKS: classes and method names profiled with a function returning
+    the label for a node
+    @type HOOKS: tuple
+    @cvar FLAME_GRAPH_TIME_UNIT: number of flame graph sample units per second
+    @type FLAME_GRAPH_TIME_UNIT: float
+
+    @ivar __nodeStats: statistics keyed by node path
+    @type __nodeStats: dict
+    @ivar __lock: lock for updates to the statistics
+    @type __lock: threading.Lock
+    @ivar __local: thread local stack of the nodes being evaluated
+    @type __local: threading.local
+    @ivar __savedMethods: evaluation methods replaced while enabled
+    @type __savedMethods: list
+    """
+    HOOKS = (
+        (PolicyBase, 'evaluate',
+         lambda node: '%s:%s' % (node.ELEMENT_LOCAL_NAME, node.ident)),
+        (Rule, 'evaluate', lambda node: 'Rule:%s' % node.id),
+        (Target, 'match', lambda node: Target.ELEMENT_LOCAL_NAME),
+        (MatchBase, 'evaluate',
+         lambda node: '%s:%s' % (node.ELEMENT_LOCAL_NAME, node.matchId)),
+        (Condition, 'evaluate', lambda node: Condition.ELEMENT_LOCAL_NAME),
+        (Apply, 'evaluate', lambda node: 'Apply:%s' % node.functionId),
+    )
+    FLAME_GRAPH_TIME_UNIT = 1e6
+
+    # Only one profiler may replace the evaluation methods at a time
+    __enabledProfiler = None
+    __enableLock = threading.Lock()
+
+    __slots__ = ('__nodeStats', '__lock', '__local', '__savedMethods')
+
+    def __init__(self):
+        self.__nodeStats = {}
+        self.__lock = threading.Lock()
+        self.__local = threading.local()
+        self.__savedMethods = []
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *excInfo):
+        self.disable()
+
+    @classmethod
+    def getEnabledProfiler(cls):
+        """@return: the profiler enabled or None if profiling is disabled
+        @rtype: ndg.xacml.core.profiler.EvaluationProfiler / NoneType
+        """
+        return cls.__enabledProfiler
+
+    @property
+    def enabled(self):
+        """@return: True if this profiler is enabled
+        @rtype: bool
+        """
+        return self.__class__.__enabledProfiler is self
+
+    def enable(self):
+        """Start profiling evaluations.  Statistics are added to those
+        already recorded.
+
+        @raise EvaluationProfilerError: another profiler is already enabled
+        """
+        cls = self.__class__
+        with cls.__enableLock:
+            if cls.__enabledProfiler is self:
+                return
+
+            if cls.__enabledProfiler is not None:
+                raise EvaluationProfilerError('Another evaluation profiler is '
+                                              'already enabled')
+
+            for nodeClass, methodName, getLabel in cls.HOOKS:
+                method = nodeClass.__dict__[methodName]
+                self.__savedMethods.append((nodeClass, methodName, method))
+                setattr(nodeClass, methodName,
+                        self._createHook(method, getLabel))
+
+            EvaluationProfiler.__enabledProfiler = self
+
+    def disable(self):
+        """Stop profiling evaluations restoring the evaluation methods"""
+        cls = self.__class__
+        with cls.__enableLock:
+            if cls.__enabledProfiler is not self:
+                return
+
+            for nodeClass, methodName, method in self.__savedMethods:
+                setattr(nodeClass, methodName, method)
+
+            self.__savedMethods = []
+            EvaluationProfiler.__enabledProfiler = None
+
+    def reset(self):
+        """Clear the statistics recorded"""
+        with self.__lock:
+            self.__nodeStats = {}
+
+    def _createHook(self, method, getLabel):
+        """Create a profiling replacement for an evaluation method
+
+        @param method: evaluation method
+        @type method: function
+        @param getLabel: function returning the label for a node
+        @type getLabel: function
+        @return: profiling evaluation method
+        @rtype: function
+        """
+        profiler = self
+
+        def hook(node, context):
+            return profiler._profile(method, getLabel(node), node, context)
+
+        hook.__name__ = method.__name__
+        hook.__doc__ = method.__doc__
+        return hook
+
+    def _profile(self, method, label, node, context):
+        """Evaluate a node recording the time taken and the result
+
+        @param method: evaluation method
+        @type method: function
+        @param label: label for the node
+        @type label: string
+        @param node: node to evaluate
+        @type node: ndg.xacml.core.XacmlCoreBase
+        @param context: request context
+        @type context: ndg.xacml.core.context.request.Request
+        @return: result of the evaluation method
+        """
+        stack = getattr(self.__local, 'stack', None)
+        if stack is None:
+            stack = self.__local.stack = []
+
+        if stack:
+            path = stack[-1][0] + (label,)
+        else:
+            path = (label,)
+
+        # Path and time spent in the nodes evaluated within this one
+        frame = [path, 0.]
+        stack.append(frame)
+        outcome = None
+        startTime = time.perf_counter()
+        try:
+            result = method(node, context)
+            if isinstance(result, Decision):
+                outcome = str(result)
+            elif isinstance(result, bool):
+                outcome = str(result)
+            return result
+
+        except Exception as e:
+            outcome = type(e).__name__
+            raise
+
+        finally:
+            elapsed = time.perf_counter() - startTime
+            stack.pop()
+            if stack:
+                stack[-1][1] += elapsed
+
+            with self.__lock:
+                nodeStats = self.__nodeStats.get(path)
+                if nodeStats is None:
+                    nodeStats = self.__nodeStats[path] = NodeStats(path)
+                nodeStats.add(elapsed, elapsed - frame[1], outcome)
+
+    def getNodeStats(self):
+        """@return: statistics for each node path recorded in order of
+        decreasing cumulative time
+        @rtype: list
+        """
+        with self.__lock:
+            nodeStats = list(self.__nodeStats.values())
+
+        return sorted(nodeStats, key=lambda stats: stats.cumulativeTime,
+                      reverse=True)
+
+    def getHotRules(self, nRules=None):
+        """Get the statistics for the rules taking the most time.  The
+        statistics for a rule evaluated within more than one policy set are
+        combined.
+
+        @param nRules: maximum number of rules to return or None for all of
+        them
+        @type nRules: int / NoneType
+        @return: rule statistics in order of decreasing cumulative time
+        @rtype: list
+        """
+        ruleStats = {}
+        for nodeStats in self.getNodeStats():
+            if not nodeStats.label.startswith('Rule:'):
+                continue
+
+            stats = ruleStats.get(nodeStats.label)
+            if stats is None:
+                stats = ruleStats[nodeStats.label] = NodeStats(
+                                                        (nodeStats.label,))
+            stats.merge(nodeStats)
+
+        hotRules = sorted(ruleStats.values(),
+                          key=lambda stats: stats.cumulativeTime,
+                          reverse=True)
+        return hotRules[:nRules]
+
+    def formatHotRules(self, nRules=10):
+        """Format a report of the rules taking the most time
+
+        @param nRules: maximum number of rules to report or None for all of
+        them
+        @type nRules: int / NoneType
+        @return: table of rule statistics
+        @rtype: string
+        """
+        decisions = (Decision.PERMIT_STR, Decision.DENY_STR,
+                     Decision.NOT_APPLICABLE_STR, Decision.INDETERMINATE_STR)
+        header = '%-48s %8s %10s %10s %10s' % ('Rule', 'Calls', 'Cum/ms',
+                                               'Self/ms', 'Mean/us')
+        header += ''.join([' %14s' % decision for decision in decisions])
+        lines = [header, '-'*len(header)]
+        for stats in self.getHotRules(nRules):
+            outcomes = stats.outcomes
+            line = '%-48s %8d %10.3f %10.3f %10.1f' % (
+                        stats.label[len('Rule:'):],
+                        stats.nCalls,
+                        stats.cumulativeTime*1e3,
+                        stats.selfTime*1e3,
+                        stats.cumulativeTime*1e6/stats.nCalls)
+            line += ''.join([' %14d' % outcomes.get(decision, 0)
+                             for decision in decisions])
+            lines.append(line)
+
+        return '\n'.join(lines)
+
+    def writeFlameGraph(self, dest):
+        """Write the self time of each node path in the collapsed stack
+        format read by flame graph tools e.g. flamegraph.pl.  Each line is a
+        path of node labels separated by semicolons followed by the self
+        time in microseconds.
+
+        @param dest: file path or text stream to write to
+        @type dest: string / file like object
+        """
+        if isinstance(dest, str):
+            with open(dest, 'w') as stream:
+                self.writeFlameGraph(stream)
+            return
+
+        timeUnit = self.__class__.FLAME_GRAPH_TIME_UNIT
+        for nodeStats in sorted(self.getNodeStats(),
+                                key=lambda stats: stats.path):
+            sampleCount = int(round(nodeStats.selfTime*timeUnit))
+            if sampleCount > 0:
+                dest.write('%s %d\n' % (
+                           ';'.join([label.replace(';', ',')
+                                     for label in nodeStats.path]),
+                           sampleCount))
@@ -0,0 +1,285 @@
+"""NDG XACML regular expression match automaton - matches an attribute value
+against the regular expression patterns of many matches in a single scan
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import re
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml.core.targetindex import PrefixTrie, TargetIndex
+
+
+class RegexpMatchAutomaton(object):
+    """Match a value against many regular expression patterns with a single
+    scan, giving the same results as calling match for each pattern.
+
+    Patterns with literal prefixes are held in a trie so that only those whose
+    prefix starts the value are matched.  The remaining patterns are combined
+    into one regular expression with each in a lookahead assertion capturing
+    to its own named group: one match at the start of the value gives the set
+    of these patterns which match.  Patterns which can't be combined - those
+    with flags set, named groups or back references which would refer to the
+    wrong groups once combined - are matched separately.
+
+    The sets of patterns matched are kept for recently matched values so that
+    all the matches testing an attribute share the scan.
+
+    @cvar DEFAULT_MAX_MEMO_SIZE: default maximum number of values for which
+    the sets of patterns matched are kept
+    @type DEFAULT_MAX_MEMO_SIZE: int
+    @cvar GROUP_NAME_PREFIX: prefix for the names of the groups added for each
+    pattern in the combined regular expression
+    @type GROUP_NAME_PREFIX: string
+    @cvar GROUP_REFERENCE_PAT: regular expression to find back references and
+    conditional group references in a pattern
+    @type GROUP_REFERENCE_PAT: re.Pattern
+
+    @ivar __patterns: compiled regular expressions added
+    @type __patterns: list
+    @ivar __patternIndices: index of each pattern keyed by pattern string and
+    flags
+    @type __patternIndices: dict
+    @ivar __prefixTrie: trie of literal prefixes to pattern indices
+    @type __prefixTrie: ndg.xacml.core.targetindex.PrefixTrie
+    @ivar __nPrefixed: number of patterns held in the prefix trie
+    @type __nPrefixed: int
+    @ivar __combinedRegex: combined regular expression or None if there are no
+    patterns to combine
+    @type __combinedRegex: re.Pattern / NoneType
+    @ivar __groupIndices: pairs of pattern index and the number of its group
+    in the combined regular expression
+    @type __groupIndices: tuple
+    @ivar __residualPatterns: pairs of pattern index and compiled regular
+    expression for patterns which are matched separately
+    @type __residualPatterns: tuple
+    @ivar __isBuilt: True if the trie and combined regular expression are up
+    to date with the patterns added
+    @type __isBuilt: bool
+    @ivar __maxMemoSize: maximum number of values for which the sets of
+    patterns matched are kept
+    @type __maxMemoSize: int
+    @ivar __memo: sets of patterns matched keyed by value
+    @type __memo: dict
+    """
+    DEFAULT_MAX_MEMO_SIZE = 1024
+    GROUP_NAME_PREFIX = '_p'
+    GROUP_REFERENCE_PAT = re.compile(r'\\[1-9]|\(\?P=|\(\?\(')
+
+    __slots__ = (
+        '__patterns',
+        '__patternIndices',
+        '__prefixTrie',
+        '__nPrefixed',
+        '__combinedRegex',
+        '__groupIndices',
+        '__residualPatterns',
+        '__isBuilt',
+        '__maxMemoSize',
+        '__memo'
+    )
+
+    def __init__(self, maxMemoSize=DEFAULT_MAX_MEMO_SIZE):
+        """@param maxMemoSize: maximum number of values for which the sets of
+        patterns matched are kept
+        @type maxMemoSize: int
+        @raise TypeError: incorrect input type
+        @raise ValueError: invalid input value
+        """
+        if not isinstance(maxMemoSize, int):
+            raise TypeError('Expecting %r type for "maxMemoSize"; got %r' %
+                            (int, type(maxMemoSize)))
+        if maxMemoSize < 1:
+            raise ValueError('Expecting "maxMemoSize" greater than zero; got '
+                             '%r' % maxMemoSize)
+
+        self.__patterns = []
+        self.__patternIndices = {}
+        self.__prefixTrie = PrefixTrie()
+        self.__nPrefixed = 0
+        self.__combinedRegex = None
+        self.__groupIndices = ()
+        self.__residualPatterns = ()
+        self.__isBuilt = False
+        self.__maxMemoSize = maxMemoSize
+        self.__memo = {}
+
+    def __len__(self):
+        """@return: number of patterns added
+        @rtype: int
+        """
+        return len(self.__patterns)
+
+    @property
+    def patterns(self):
+        """@return: compiled regular expressions added in order of index
+        @rtype: tuple
+        """
+        return tuple(self.__patterns)
+
+    @property
+    def nPrefixedPatterns(self):
+        """@return: number of patterns looked up by their literal prefixes
+        @rtype: int
+        """
+        if not self.__isBuilt:
+            self.build()
+        return self.__nPrefixed
+
+    @property
+    def nCombinedPatterns(self):
+        """@return: number of patterns in the combined regular expression
+        @rtype: int
+        """
+        if not self.__isBuilt:
+            self.build()
+        return len(self.__groupIndices)
+
+    @property
+    def nResidualPatterns(self):
+        """@return: number of patterns matched separately
+        @rtype: int
+        """
+        if not self.__isBuilt:
+            self.build()
+        return len(self.__residualPatterns)
+
+    @classmethod
+    def isCombinable(cls, compiledRegex):
+        """Check whether a pattern can be combined with others into a single
+        regular expression
+
+        @param compiledRegex: compiled regular expression
+        @type compiledRegex: re.Pattern
+        @return: True if the pattern can be combined
+        @rtype: bool
+        """
+        return (isinstance(compiledRegex.pattern, str) and
+                compiledRegex.flags == re.UNICODE and
+                len(compiledRegex.groupindex) == 0 and
+                (compiledRegex.groups == 0 or
+                 cls.GROUP_REFERENCE_PAT.search(compiledRegex.pattern) is None))
+
+    def addPattern(self, compiledRegex):
+        """Add a pattern
+
+        @param compiledRegex: compiled regular expression
+        @type compiledRegex: re.Pattern
+        @return: index of the pattern.  Patterns added more than once have the
+        same index.
+        @rtype: int
+        @raise TypeError: incorrect input type
+        """
+        if not isinstance(compiledRegex, re.Pattern):
+            raise TypeError('Expecting %r type for "compiledRegex"; got %r' %
+                            (re.Pattern, type(compiledRegex)))
+
+        key = (compiledRegex.pattern, compiledRegex.flags)
+        index = self.__patternIndices.get(key)
+        if index is None:
+            index = len(self.__patterns)
+            self.__patterns.append(compiledRegex)
+            self.__patternIndices[key] = index
+            self.__isBuilt = False
+
+        return index
+
+    def build(self):
+        """Build the prefix trie and combined regular expression from the
+        patterns added.  This is called on the first match following the
+        addition of patterns if it hasn't been called explicitly.
+        """
+        groupNamePrefix = self.__class__.GROUP_NAME_PREFIX
+        prefixTrie = PrefixTrie()
+        nPrefixed = 0
+        combinedPatterns = []
+        combinedIndices = []
+        residualPatterns = []
+        for index, compiledRegex in enumerate(self.__patterns):
+            if (isinstance(compiledRegex.pattern, str) and
+                compiledRegex.flags == re.UNICODE):
+                prefixes = TargetIndex.getRegexpPrefixes(compiledRegex.pattern)
+            else:
+                prefixes = None
+
+            if prefixes is not None:
+                for prefix in prefixes:
+                    prefixTrie.add(prefix, index)
+                nPrefixed += 1
+
+            elif self.isCombinable(compiledRegex):
+                # An empty alternative allows the match to continue whether
+                # or not the pattern matches
+                combinedPatterns.append('(?:(?=(?P<%s%d>%s))|)' %
+                                        (groupNamePrefix, index,
+                                         compiledRegex.pattern))
+                combinedIndices.append(index)
+            else:
+                residualPatterns.append((index, compiledRegex))
+
+        if len(combinedPatterns) > 0:
+            combinedRegex = re.compile(''.join(combinedPatterns))
+            groupIndices = tuple([
+                (index, combinedRegex.groupindex['%s%d' % (groupNamePrefix,
+                                                           index)])
+                for index in combinedIndices])
+        else:
+            combinedRegex = None
+            groupIndices = ()
+
+        self.__prefixTrie = prefixTrie
+        self.__nPrefixed = nPrefixed
+        self.__combinedRegex = combinedRegex
+        self.__groupIndices = groupIndices
+        self.__residualPatterns = tuple(residualPatterns)
+        self.__memo = {}
+        self.__isBuilt = True
+
+        log.debug('Built regular expression match automaton with %d '
+                  'prefixed, %d combined and %d residual pattern(s)',
+                  nPrefixed, len(groupIndices), len(residualPatterns))
+
+    def match(self, value):
+        """Match a value against all the patterns
+
+        @param value: value to match
+        @type value: basestring
+        @return: indices of the patterns which match at the start of the value
+        @rtype: frozenset
+        """
+        if not self.__isBuilt:
+            self.build()
+
+        memo = self.__memo
+        matched = memo.get(value)
+        if matched is not None:
+            return matched
+
+        patterns = self.__patterns
+        indices = [index for index in self.__prefixTrie.lookup(value)
+                   if patterns[index].match(value)]
+
+        combinedRegex = self.__combinedRegex
+        if combinedRegex is not None:
+            # Always matches as each pattern has an empty alternative
+            groups = combinedRegex.match(value).groups()
+            indices.extend([index for index, groupNum in self.__groupIndices
+                            if groups[groupNum - 1] is not None])
+
+        indices.extend([index
+                        for index, compiledRegex in self.__residualPatterns
+                        if compiledRegex.match(value)])
+
+        matched = frozenset(indices)
+        if len(memo) >= self.__maxMemoSize:
+            memo.clear()
+        memo[value] = matched
+
+        return matched
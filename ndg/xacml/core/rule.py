@@ -13,6 +13,7 @@ import traceback
 import logging
 log = logging.getLogger(__name__)
 
+from ndg.xacml import Config
 from ndg.xacml.core import XacmlCoreBase
 from ndg.xacml.core.target import Target
 from ndg.xacml.core.condition import Condition
@@ -120,16 +121,20 @@ class Effect(object):
         @raise AttributeError: invalid decision string value input
         @raise TypeError: invalid type for input decision value
         """
+        if effect is self:
+            return True
+        
         if isinstance(effect, Effect):
-            # Cast to string
-            value = effect.value
+            # Effect values are validated when set so compare directly
+            return self.__value == effect.value
             
         elif isinstance(effect, str):
             value = effect
             
         else:
             raise TypeError('Expecting string or Effect instance for '
-                            'input effect value; got %r instead' % type(value))
+                            'input effect value; got %r instead' % 
+                            type(effect))
             
         if value not in self.__class__.TYPES:
             raise AttributeError('Permissable effect types are %r; got '
@@ -225,6 +230,7 @@ class Rule(XacmlCoreBase):
         self.__effect = None
         self.__target = None
         self.__condition = None
+        self.__description = None
         
     @property
     def target(self):
@@ -350,24 +356,25 @@ class Rule(XacmlCoreBase):
         # Place exception block to enable rule combining algorithm which calls
         # this method to correctly handle Indeterminate results
         try:
-            log.debug('Evaluating rule %r ...', self.id)
-            
-            # Instantiation implicitly sets to default value of Indeterminate
-            decision = Decision()
+            if Config.trace:
+                log.debug('Evaluating rule %r ...', self.id)
             
             # Check for a rule target
             if self.target is not None:
                 targetMatch = self.target.match(context)
-                if targetMatch:
+                if targetMatch and Config.trace:
                     log.debug('Match to request context for target in rule '
                               '%r', self.id)
             else:
-                log.debug('No target set in rule %r', self.id)
+                if Config.trace:
+                    log.debug('No target set in rule %r', self.id)
                 targetMatch = True
       
             if not targetMatch:
-                log.debug('No match to request context for target in rule '
-                          '%r returning NotApplicable status', self.id)
+                if Config.trace:
+                    log.debug('No match to request context for target in '
+                              'rule %r returning NotApplicable status',
+                              self.id)
                 decision = Decision.NOT_APPLICABLE
                 return decision
             
@@ -379,23 +386,30 @@ class Rule(XacmlCoreBase):
                 #
                 # The condition value SHALL be "True" if the <Condition> element
                 # is absent
-                log.debug('No condition set for rule %r: setting condition '
-                          'status True', self.id)
+                if Config.trace:
+                    log.debug('No condition set for rule %r: setting '
+                              'condition status True', self.id)
                 conditionStatus = True
                 
             # Ref. Spec. 7.9 Rule evaluation, Nb. to get this far, the target
             # must evaluated as True
             if conditionStatus:
-                decision = Decision(decision=self.effect.value)
+                decision = Decision.getInstance(self.effect.value)
             else:
                 decision = Decision.NOT_APPLICABLE
                
-            log.debug('Rule %r evaluates to %s', self.id, decision) 
+            if Config.trace:
+                log.debug('Rule %r evaluates to %s', self.id, decision) 
             return decision
         
-        except Exception:
-            _traceback = traceback.format_exc()
-            log.error('Error occurred evaluating rule %r, returning '
-                      'Indeterminate result to caller: %s',
-                      self.id, _traceback)
+        except Exception as e:
+            if getattr(context, 'logEvaluationErrors', True):
+                log.error('Error occurred evaluating rule %r, returning '
+                          'Indeterminate result to caller: %s',
+                          self.id, traceback.format_exc())
+            
+            metricsSink = getattr(context, 'metricsSink', None)
+            if metricsSink is not None:
+                metricsSink.recordIndeterminate(type(e).__name__)
+                
             return Decision.INDETERMINATE
@@ -14,6 +14,7 @@ log = logging.getLogger(__name__)
 
 from abc import abstractmethod
 
+from ndg.xacml import Config
 from ndg.xacml.core.context.result import Decision
 
 
@@ -34,7 +35,18 @@ ALGORITHMS = (
 
 
 class RuleCombiningAlgInterface(object):
-    """Interface class for XAML rule combining algorithms"""
+    """Interface class for XAML rule combining algorithms
+    
+    @cvar ORDER_INDEPENDENT: True if the decision is the same for any order 
+    of rules so that they may be evaluated in a different order to that of 
+    the policy
+    @type ORDER_INDEPENDENT: bool
+    @cvar OVERRIDING_DECISION: decision from a rule which stops evaluation of
+    the remaining rules for order independent algorithms
+    @type OVERRIDING_DECISION: ndg.xacml.core.context.result.Decision / None
+    """
+    ORDER_INDEPENDENT = False
+    OVERRIDING_DECISION = None
     
     @abstractmethod
     def evaluate(self, rules, context):
@@ -55,6 +67,8 @@ class RuleCombiningAlgInterface(object):
 
 class DenyOverridesRuleCombiningAlg(RuleCombiningAlgInterface):
     """Deny overrides rule combining algorithm"""
+    ORDER_INDEPENDENT = True
+    OVERRIDING_DECISION = Decision.DENY
     
     def evaluate(self, rules, context):
         """Combine the input rule results to make an access control decision.
@@ -74,21 +88,21 @@ class DenyOverridesRuleCombiningAlg(RuleCombiningAlgInterface):
         atLeastOnePermit = False
         
         for rule in rules:
-            decision = rule.evaluate(context)
-            if decision == Decision.DENY:
+            decision = Decision.getInstance(rule.evaluate(context))
+            if decision is Decision.DENY:
                 return Decision.DENY
 
-            if decision == Decision.PERMIT:
+            if decision is Decision.PERMIT:
                 atLeastOnePermit = True
                 continue
             
-            if decision == Decision.NOT_APPLICABLE:
+            if decision is Decision.NOT_APPLICABLE:
                 continue
             
-            if decision == Decision.INDETERMINATE:
+            if decision is Decision.INDETERMINATE:
                 atLeastOneError = True
     
-                if rule.effect.value == Decision.DENY:
+                if rule.effect.value == Decision.DENY_STR:
                     potentialDeny = True
                     
                 continue
@@ -107,6 +121,8 @@ class DenyOverridesRuleCombiningAlg(RuleCombiningAlgInterface):
 
 class PermitOverridesRuleCombiningAlg(RuleCombiningAlgInterface):
     """Implementation of permit overrides XACML rule combining algorithm"""
+    ORDER_INDEPENDENT = True
+    OVERRIDING_DECISION = Decision.PERMIT
     
     def evaluate(self, rules, context):
         """Combine the input rule results to make an access control decision.
@@ -126,20 +142,21 @@ class PermitOverridesRuleCombiningAlg(RuleCombiningAlgInterface):
         atLeastOneDeny = False
         
         for rule in rules:
-            decision = rule.evaluate(context)
-            if decision == Decision.DENY:
+            decision = Decision.getInstance(rule.evaluate(context))
+            if decision is Decision.DENY:
                 atLeastOneDeny = True
                 continue
             
-            if decision == Decision.PERMIT:
-                log.debug("Rule %r permits, returning overall permit decision",
-                          rule.id)
+            if decision is Decision.PERMIT:
+                if Config.trace:
+                    log.debug("Rule %r permits, returning overall permit "
+                              "decision", rule.id)
                 return Decision.PERMIT
             
-            if decision == Decision.NOT_APPLICABLE:
+            if decision is Decision.NOT_APPLICABLE:
                 continue
             
-            if decision == Decision.INDETERMINATE:
+            if decision is Decision.INDETERMINATE:
                 atLeastOneError = True
                 
                 if rule.effect.value == Decision.PERMIT_STR:
@@ -148,22 +165,27 @@ class PermitOverridesRuleCombiningAlg(RuleCombiningAlgInterface):
                 continue
         
         if potentialPermit:
-            log.debug('Rule found with potential permit but it evaluates to '
-                      'indeterminate, returning overall indeterminate decision')
+            if Config.trace:
+                log.debug('Rule found with potential permit but it evaluates '
+                          'to indeterminate, returning overall indeterminate '
+                          'decision')
             return Decision.INDETERMINATE
         
         if atLeastOneDeny:
-            log.debug('At least one rule with a deny decision found, returning '
-                      'overall deny decision')
+            if Config.trace:
+                log.debug('At least one rule with a deny decision found, '
+                          'returning overall deny decision')
             return Decision.DENY
         
         if atLeastOneError:
-            log.debug('At least one rule with an error found, returning '
-                      'overall indeterminate decision')
+            if Config.trace:
+                log.debug('At least one rule with an error found, '
+                          'returning overall indeterminate decision')
             return Decision.INDETERMINATE
         
-        log.debug('No rules were applicable to the request, returning '
-                  'overall not applicable decision')
+        if Config.trace:
+            log.debug('No rules were applicable to the request, returning '
+                      'overall not applicable decision')
         return Decision.NOT_APPLICABLE
 
     
@@ -184,27 +206,31 @@ class FirstApplicableRuleCombiningAlg(RuleCombiningAlgInterface):
         @rtype: ndg.xacml.core.context.result.Decision
         """
         for rule in rules:
-            decision = rule.evaluate(context)
-            if decision == Decision.DENY:
-                log.debug("Rule %r denies, returning overall deny decision",
-                          rule.id)
+            decision = Decision.getInstance(rule.evaluate(context))
+            if decision is Decision.DENY:
+                if Config.trace:
+                    log.debug("Rule %r denies, returning overall deny "
+                              "decision", rule.id)
                 return Decision.DENY
 
-            if decision == Decision.PERMIT:
-                log.debug("Rule %r permits, returning overall permit decision",
-                          rule.id)
+            if decision is Decision.PERMIT:
+                if Config.trace:
+                    log.debug("Rule %r permits, returning overall permit "
+                              "decision", rule.id)
                 return Decision.PERMIT
 
-            if decision == Decision.NOT_APPLICABLE:
+            if decision is Decision.NOT_APPLICABLE:
                 continue
 
-            if decision == Decision.INDETERMINATE:
-                log.debug("Rule %r is indeterminate, returning overall "
-                          "indeterminate decision", rule.id)
+            if decision is Decision.INDETERMINATE:
+                if Config.trace:
+                    log.debug("Rule %r is indeterminate, returning overall "
+                              "indeterminate decision", rule.id)
                 return Decision.INDETERMINATE
         
-        log.debug('No rules were applicable to the request, returning '
-                  'overall not applicable decision')
+        if Config.trace:
+            log.debug('No rules were applicable to the request, returning '
+                      'overall not applicable decision')
         return Decision.NOT_APPLICABLE
 
 
@@ -0,0 +1,355 @@
+"""NDG XACML adaptive rule ordering for order independent rule combining
+algorithms
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import threading
+import time
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml.core.context.result import Decision
+
+
+class _EvaluatedRule(object):
+    """Stand in for a rule already evaluated for a sample so that the rule
+    combining algorithm can combine the decisions without evaluating the rule
+    again
+
+    @ivar id: rule ID
+    @type id: basestring
+    @ivar effect: rule effect
+    @type effect: ndg.xacml.core.rule.Effect
+    @ivar decision: decision from evaluating the rule
+    @type decision: ndg.xacml.core.context.result.Decision
+    """
+    __slots__ = ('id', 'effect', 'decision')
+
+    def __init__(self, rule, decision):
+        self.id = rule.id
+        self.effect = rule.effect
+        self.decision = decision
+
+    def evaluate(self, context):
+        """@return: decision from evaluating the rule
+        @rtype: ndg.xacml.core.context.result.Decision
+        """
+        return self.decision
+
+
+class AdaptiveRuleOrder(object):
+    """Order in which to evaluate the rules of a policy learnt from the rule
+    decisions and evaluation times observed at runtime.
+
+    Deny overrides and permit overrides rule combining algorithms give the
+    same decision for any order of rules: the order only determines how soon
+    evaluation stops at the first rule giving the overriding decision - Deny
+    or Permit respectively.  Indeterminate results are also unaffected as
+    these only set flags checked after all the rules have been evaluated.
+    Rules are evaluated in decreasing order of the ratio of the fraction of
+    requests for which they give the overriding decision to their mean
+    evaluation time so that the rules most likely to stop evaluation at the
+    least cost come first.
+
+    Every sampleInterval evaluations, starting with the first, is a sample:
+    all the rules are evaluated in their original order with the time taken
+    for each recorded and the decisions are then combined by the same
+    algorithm.  Once maxSamples samples have been recorded the statistics
+    are halved so that the order follows changes in the requests made.
+    Statistics are reset if the number of rules changes.  Call reset if the
+    rules of a policy are modified in place otherwise.  Samples may be
+    recorded from concurrent evaluations: updates to the statistics and
+    order are made under a lock.
+
+    Rule combining algorithms are only reordered where ORDER_INDEPENDENT is
+    set for them: first applicable and custom algorithms never are.  Orders
+    are held by the PDP for each of the policies it evaluates - see 
+    ndg.xacml.core.context.pdp.PDP.adaptiveRuleOrdering - so that PDPs 
+    sharing policy objects don't share rule orders.
+
+    @cvar DEFAULT_SAMPLE_INTERVAL: default number of evaluations for each
+    sample
+    @type DEFAULT_SAMPLE_INTERVAL: int
+    @cvar DEFAULT_MAX_SAMPLES: default number of samples after which the
+    statistics are halved
+    @type DEFAULT_MAX_SAMPLES: int
+
+    @ivar __sampleInterval: number of evaluations for each sample
+    @type __sampleInterval: int
+    @ivar __maxSamples: number of samples after which the statistics are
+    halved
+    @type __maxSamples: int
+    @ivar __nEvaluations: count of evaluations
+    @type __nEvaluations: int
+    @ivar __nSamples: count of samples in the statistics
+    @type __nSamples: float
+    @ivar __overridingDecision: overriding decision for the rule combining
+    algorithm the statistics were recorded for
+    @type __overridingDecision: ndg.xacml.core.context.result.Decision / None
+    @ivar __nApplicable: count of samples in which each rule was applicable
+    @type __nApplicable: list
+    @ivar __nOverriding: count of samples in which each rule gave the
+    overriding decision
+    @type __nOverriding: list
+    @ivar __costs: total evaluation time for each rule in seconds
+    @type __costs: list
+    @ivar __order: indices of the rules in the order to evaluate them or None
+    if no samples have been recorded
+    @type __order: tuple / None
+    @ivar __lock: lock for updating the evaluation count, statistics and 
+    order
+    @type __lock: threading.Lock
+    """
+    DEFAULT_SAMPLE_INTERVAL = 64
+    DEFAULT_MAX_SAMPLES = 1024
+
+    __slots__ = (
+        '__sampleInterval',
+        '__maxSamples',
+        '__nEvaluations',
+        '__nSamples',
+        '__overridingDecision',
+        '__nApplicable',
+        '__nOverriding',
+        '__costs',
+        '__order',
+        '__lock'
+    )
+
+    def __init__(self, sampleInterval=DEFAULT_SAMPLE_INTERVAL,
+                 maxSamples=DEFAULT_MAX_SAMPLES):
+        """
+        @param sampleInterval: number of evaluations for each sample.  Set to
+        1 to sample every evaluation
+        @type sampleInterval: int
+        @param maxSamples: number of samples after which the statistics are
+        halved
+        @type maxSamples: int
+        @raise TypeError: incorrect input type
+        @raise ValueError: sample interval or maximum samples less than one
+        """
+        for name, value in (('sampleInterval', sampleInterval),
+                            ('maxSamples', maxSamples)):
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise TypeError('Expecting %r type for "%s"; got %r' %
+                                (int, name, type(value)))
+            if value < 1:
+                raise ValueError('Expecting "%s" greater than zero; got %r' %
+                                 (name, value))
+
+        self.__sampleInterval = sampleInterval
+        self.__maxSamples = maxSamples
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear the statistics and rule order.  The next evaluation is a
+        sample.
+        """
+        with self.__lock:
+            self.__nEvaluations = 0
+            self.__nSamples = 0
+            self.__overridingDecision = None
+            self.__nApplicable = None
+            self.__nOverriding = None
+            self.__costs = None
+            self.__order = None
+
+    @property
+    def sampleInterval(self):
+        """@return: number of evaluations for each sample
+        @rtype: int
+        """
+        return self.__sampleInterval
+
+    @property
+    def maxSamples(self):
+        """@return: number of samples after which the statistics are halved
+        @rtype: int
+        """
+        return self.__maxSamples
+
+    @property
+    def nEvaluations(self):
+        """@return: count of evaluations
+        @rtype: int
+        """
+        return self.__nEvaluations
+
+    @property
+    def nSamples(self):
+        """@return: count of samples in the statistics.  This is halved with
+        the statistics after maxSamples samples.
+        @rtype: int / float
+        """
+        return self.__nSamples
+
+    @property
+    def order(self):
+        """@return: indices of the rules in the order to evaluate them or None
+        if no samples have been recorded
+        @rtype: tuple / None
+        """
+        return self.__order
+
+    def isSampleDue(self):
+        """Count an evaluation and check whether it should be a sample
+
+        @return: True if all the rules should be evaluated and recorded with
+        recordSample
+        @rtype: bool
+        """
+        with self.__lock:
+            nEvaluations = self.__nEvaluations
+            self.__nEvaluations = nEvaluations + 1
+            
+        return nEvaluations % self.__sampleInterval == 0
+
+    def getOrder(self, nRules):
+        """Get the order in which to evaluate the rules
+
+        @param nRules: number of rules in the policy
+        @type nRules: int
+        @return: indices of the rules in the order to evaluate them or None if
+        they should be evaluated in their original order because no samples
+        have been recorded for this number of rules
+        @rtype: tuple / None
+        """
+        order = self.__order
+        if order is None or len(order) != nRules:
+            return None
+
+        return order
+
+    def recordSample(self, decisions, costs, overridingDecision):
+        """Record the decision and evaluation time for each rule of a policy
+        for a sample and update the rule order
+
+        @param decisions: decision for each rule in the original order
+        @type decisions: sequence
+        @param costs: evaluation time for each rule in seconds
+        @type costs: sequence
+        @param overridingDecision: decision which stops the rule combining
+        algorithm
+        @type overridingDecision: ndg.xacml.core.context.result.Decision
+        """
+        with self.__lock:
+            nRules = len(decisions)
+            if (self.__costs is None or len(self.__costs) != nRules or
+                overridingDecision is not self.__overridingDecision):
+                self.__nSamples = 0
+                self.__overridingDecision = overridingDecision
+                self.__nApplicable = [0] * nRules
+                self.__nOverriding = [0] * nRules
+                self.__costs = [0.] * nRules
+
+            nApplicable = self.__nApplicable
+            nOverriding = self.__nOverriding
+            ruleCosts = self.__costs
+            if self.__nSamples >= self.__maxSamples:
+                for i in range(nRules):
+                    nApplicable[i] /= 2.
+                    nOverriding[i] /= 2.
+                    ruleCosts[i] /= 2.
+                self.__nSamples /= 2.
+
+            for i, (decision, cost) in enumerate(zip(decisions, costs)):
+                if decision is not Decision.NOT_APPLICABLE:
+                    nApplicable[i] += 1
+                if decision is overridingDecision:
+                    nOverriding[i] += 1
+                ruleCosts[i] += cost
+
+            self.__nSamples += 1
+
+            # Sort is stable so that rules with equal scores keep their
+            # original order
+            scores = [self._getScore(nOverriding[i], ruleCosts[i])
+                      for i in range(nRules)]
+            self.__order = tuple(sorted(range(nRules),
+                                        key=lambda i: -scores[i]))
+
+    @staticmethod
+    def _getScore(nOverriding, cost):
+        """Score a rule for its place in the order: rules with higher scores
+        are evaluated first
+
+        @param nOverriding: count of samples in which the rule gave the
+        overriding decision
+        @type nOverriding: int / float
+        @param cost: total evaluation time for the rule
+        @type cost: float
+        @return: score
+        @rtype: float
+        """
+        if nOverriding == 0:
+            return 0.
+        elif cost <= 0.:
+            return float('inf')
+        else:
+            return nOverriding / cost
+
+    def getRuleStats(self):
+        """Get the statistics recorded for each rule
+
+        @return: tuples of the fraction of samples in which the rule was
+        applicable, the fraction in which it gave the overriding decision and
+        the mean evaluation time in seconds for each rule in the original
+        order.  The list is empty if no samples have been recorded.
+        @rtype: list
+        """
+        with self.__lock:
+            if not self.__nSamples:
+                return []
+
+            nSamples = float(self.__nSamples)
+            return [(self.__nApplicable[i] / nSamples,
+                     self.__nOverriding[i] / nSamples,
+                     self.__costs[i] / nSamples)
+                    for i in range(len(self.__costs))]
+
+    def evaluate(self, ruleCombiningAlg, rules, context):
+        """Evaluate the rule combining algorithm of a policy with the rules
+        in the order learnt.  The algorithm's ORDER_INDEPENDENT and
+        OVERRIDING_DECISION attributes must be set.
+
+        @param ruleCombiningAlg: rule combining algorithm
+        @type ruleCombiningAlg:
+        ndg.xacml.core.rule_combining_alg.RuleCombiningAlgInterface
+        @param rules: rules from the policy
+        @type rules: TypedList(<ndg.xacml.core.rule.Rule>)
+        @param context: request context to apply to the rules
+        @type context: ndg.xacml.core.request.Request
+        @return: resulting overall access control decision
+        @rtype: ndg.xacml.core.context.result.Decision
+        """
+        if self.isSampleDue():
+            decisions = []
+            costs = []
+            for rule in rules:
+                startTime = time.perf_counter()
+                decision = Decision.getInstance(rule.evaluate(context))
+                costs.append(time.perf_counter() - startTime)
+                decisions.append(decision)
+
+            self.recordSample(decisions, costs,
+                              ruleCombiningAlg.OVERRIDING_DECISION)
+            return ruleCombiningAlg.evaluate(
+                                [_EvaluatedRule(rule, decision)
+                                 for rule, decision in zip(rules, decisions)],
+                                context)
+
+        order = self.getOrder(len(rules))
+        if order is None:
+            return ruleCombiningAlg.evaluate(rules, context)
+
+        # Rules are looked up by index as they're needed so that evaluation
+        # stopping early doesn't pay for ordering the rest
+        return ruleCombiningAlg.evaluate((rules[i] for i in order), context)
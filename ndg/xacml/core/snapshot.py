@@ -0,0 +1,468 @@
+"""NDG XACML policy snapshot - versioned binary encoding of a parsed policy or
+policy set for fast loading without re-parsing the policy XML
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import logging
+log = logging.getLogger(__name__)
+import pickle
+import struct
+
+from ndg.xacml import XacmlError
+from ndg.xacml.core.policy import Policy
+from ndg.xacml.core.policyset import PolicySet
+from ndg.xacml.core.policydefaults import PolicyDefaults
+from ndg.xacml.core.target import Target
+from ndg.xacml.core.subject import Subject
+from ndg.xacml.core.resource import Resource
+from ndg.xacml.core.action import Action
+from ndg.xacml.core.environment import Environment
+from ndg.xacml.core.match import (SubjectMatch, ResourceMatch, ActionMatch,
+                                  EnvironmentMatch)
+from ndg.xacml.core.rule import Rule, Effect
+from ndg.xacml.core.condition import Condition
+from ndg.xacml.core.apply import Apply
+from ndg.xacml.core.attributevalue import (AttributeValue,
+                                           AttributeValueClassFactory)
+from ndg.xacml.core.attributedesignator import (SubjectAttributeDesignator,
+                                                ResourceAttributeDesignator,
+                                                ActionAttributeDesignator,
+                                                EnvironmentAttributeDesignator)
+from ndg.xacml.core.attributeselector import AttributeSelector
+
+
+class PolicySnapshotError(XacmlError):
+    """Error saving or loading a policy snapshot"""
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    """Unpickler restricted to the built in types used in snapshots and the
+    date and time types of attribute values"""
+    SAFE_CLASSES = {
+        ('datetime', 'datetime'),
+        ('datetime', 'date'),
+        ('datetime', 'time'),
+        ('datetime', 'timedelta'),
+        ('datetime', 'timezone')
+    }
+
+    def find_class(self, module, name):
+        if (module, name) not in self.__class__.SAFE_CLASSES:
+            raise PolicySnapshotError('Policy snapshot references %s.%s: only '
+                                      'attribute value date and time types '
+                                      'are permitted' % (module, name))
+        return super(_SnapshotUnpickler, self).find_class(module, name)
+
+
+class PolicySnapshot(object):
+    """Encode a parsed policy or policy set as nested tuples of strings and
+    attribute value native types and save it to a file, and load and decode
+    it again.  Loading a snapshot avoids parsing the policy XML, resolving
+    policy references and parsing attribute values.
+
+    Functions are stored by their URN and looked up in the function map when
+    the snapshot is loaded.  Attribute values are stored by their data type
+    URI and native value.  Policies are encoded as:
+
+     - policy: (POLICY, policy ID, version, rule combining algorithm ID,
+       description, defaults, target, rules)
+     - policy set: (POLICY_SET, policy set ID, version, policy combining
+       algorithm ID, description, defaults, target, policies)
+     - rule: (rule ID, effect, description, target, condition expression)
+     - target: matches for each subject, resource, action and environment
+       for each of these target sections, or None if no target is set
+     - match: (match ID, attribute value, designator or selector)
+
+    and expressions as tuples tagged with their type.
+
+    Snapshots are files with a header of SNAPSHOT_MAGIC and format version
+    followed by the encoded policy pickled.  Unpickling is restricted to the
+    built in and date and time types only.
+
+    @cvar SNAPSHOT_MAGIC: identifies a file as a policy snapshot
+    @type SNAPSHOT_MAGIC: bytes
+    @cvar FORMAT_VERSION: version of the snapshot encoding.  Snapshots with a
+    different version are rejected.
+    @type FORMAT_VERSION: int
+    @cvar ATTRIBUTE_VALUE_CLASS_FACTORY: factory for attribute value classes
+    used in decoding
+    @type ATTRIBUTE_VALUE_CLASS_FACTORY:
+    ndg.xacml.core.attributevalue.AttributeValueClassFactory
+    """
+    SNAPSHOT_MAGIC = b'NDGXACMLSNAPSHOT'
+    FORMAT_VERSION = 1
+    HEADER_FORMAT = '>%dsH' % len(SNAPSHOT_MAGIC)
+    HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+    ATTRIBUTE_VALUE_CLASS_FACTORY = AttributeValueClassFactory()
+
+    # Tags for encoded policies and expressions
+    POLICY, POLICY_SET = list(range(2))
+    APPLY, ATTRIBUTE_VALUE, ATTRIBUTE_DESIGNATOR, ATTRIBUTE_SELECTOR = list(
+                                                                    range(4))
+
+    # Target section and designator types in order of encoding
+    TARGET_CHILD_TYPES = (
+        ('subjects', Subject, SubjectMatch),
+        ('resources', Resource, ResourceMatch),
+        ('actions', Action, ActionMatch),
+        ('environments', Environment, EnvironmentMatch)
+    )
+    ATTRIBUTE_DESIGNATOR_TYPES = (
+        SubjectAttributeDesignator,
+        ResourceAttributeDesignator,
+        ActionAttributeDesignator,
+        EnvironmentAttributeDesignator
+    )
+
+    @classmethod
+    def save(cls, policy, filePath):
+        """Save a snapshot of a policy or policy set to a file
+
+        @param policy: policy or policy set
+        @type policy: ndg.xacml.core.policybase.PolicyBase derived type
+        @param filePath: snapshot file path
+        @type filePath: string
+        @raise PolicySnapshotError: policy contains types which can't be
+        encoded
+        """
+        encodedPolicy = cls.encode(policy)
+        with open(filePath, 'wb') as snapshotFile:
+            snapshotFile.write(struct.pack(cls.HEADER_FORMAT,
+                                           cls.SNAPSHOT_MAGIC,
+                                           cls.FORMAT_VERSION))
+            pickle.dump(encodedPolicy, snapshotFile,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, filePath):
+        """Load a policy or policy set from a snapshot file
+
+        @param filePath: snapshot file path
+        @type filePath: string
+        @return: policy or policy set
+        @rtype: ndg.xacml.core.policybase.PolicyBase derived type
+        @raise PolicySnapshotError: file is not a policy snapshot or has a
+        different format version
+        """
+        with open(filePath, 'rb') as snapshotFile:
+            header = snapshotFile.read(cls.HEADER_SIZE)
+            if (len(header) != cls.HEADER_SIZE or
+                not header.startswith(cls.SNAPSHOT_MAGIC)):
+                raise PolicySnapshotError('%r is not a policy snapshot' %
+                                          filePath)
+
+            formatVersion = struct.unpack(cls.HEADER_FORMAT, header)[1]
+            if formatVersion != cls.FORMAT_VERSION:
+                raise PolicySnapshotError('Policy snapshot %r has format '
+                                          'version %d; expecting %d' %
+                                          (filePath, formatVersion,
+                                           cls.FORMAT_VERSION))
+            try:
+                encodedPolicy = _SnapshotUnpickler(snapshotFile).load()
+            except (pickle.UnpicklingError, EOFError) as e:
+                raise PolicySnapshotError('Error reading policy snapshot %r: '
+                                          '%s' % (filePath, e))
+
+        return cls.decode(encodedPolicy)
+
+    @classmethod
+    def encode(cls, policy):
+        """Encode a policy or policy set
+
+        @param policy: policy or policy set
+        @type policy: ndg.xacml.core.policybase.PolicyBase derived type
+        @return: encoded policy
+        @rtype: tuple
+        @raise PolicySnapshotError: policy contains types which can't be
+        encoded
+        """
+        policyType = type(policy)
+        if policyType is Policy:
+            return (cls.POLICY,
+                    policy.policyId,
+                    policy.version,
+                    policy.ruleCombiningAlgId,
+                    policy.description,
+                    cls._encodePolicyDefaults(policy.policyDefaults),
+                    cls._encodeTarget(policy.target),
+                    tuple([cls._encodeRule(rule) for rule in policy.rules]))
+
+        elif policyType is PolicySet:
+            return (cls.POLICY_SET,
+                    policy.policySetId,
+                    policy.version,
+                    policy.policyCombiningAlgId,
+                    policy.description,
+                    cls._encodePolicyDefaults(policy.policySetDefaults),
+                    cls._encodeTarget(policy.target),
+                    tuple([cls.encode(childPolicy)
+                           for childPolicy in policy.policies]))
+
+        raise PolicySnapshotError('Policy type %r is not supported for '
+                                  'snapshots' % policyType)
+
+    @classmethod
+    def decode(cls, encodedPolicy):
+        """Decode a policy or policy set
+
+        @param encodedPolicy: encoded policy
+        @type encodedPolicy: tuple
+        @return: policy or policy set
+        @rtype: ndg.xacml.core.policybase.PolicyBase derived type
+        @raise PolicySnapshotError: invalid encoding
+        """
+        (tag, ident, version, combiningAlgId, description, encodedDefaults,
+         encodedTarget, encodedChildren) = encodedPolicy
+
+        if tag == cls.POLICY:
+            policy = Policy()
+            policy.policyId = ident
+            policy.ruleCombiningAlgId = combiningAlgId
+            for encodedRule in encodedChildren:
+                policy.rules.append(cls._decodeRule(encodedRule))
+
+            if encodedDefaults is not None:
+                policy.policyDefaults = cls._decodePolicyDefaults(
+                                                            encodedDefaults)
+        elif tag == cls.POLICY_SET:
+            policy = PolicySet()
+            policy.policySetId = ident
+            policy.policyCombiningAlgId = combiningAlgId
+            for encodedChildPolicy in encodedChildren:
+                policy.policies.append(cls.decode(encodedChildPolicy))
+
+            if encodedDefaults is not None:
+                policy.policySetDefaults = cls._decodePolicyDefaults(
+                                                            encodedDefaults)
+        else:
+            raise PolicySnapshotError('Unrecognised policy tag %r in policy '
+                                      'snapshot' % tag)
+
+        if version is not None:
+            policy.version = version
+
+        if description is not None:
+            policy.description = description
+
+        if encodedTarget is not None:
+            policy.target = cls._decodeTarget(encodedTarget)
+
+        return policy
+
+    @staticmethod
+    def _encodePolicyDefaults(policyDefaults):
+        if policyDefaults is None:
+            return None
+        return (policyDefaults.xpathVersion,)
+
+    @staticmethod
+    def _decodePolicyDefaults(encodedPolicyDefaults):
+        policyDefaults = PolicyDefaults()
+        xpathVersion, = encodedPolicyDefaults
+        if xpathVersion is not None:
+            policyDefaults.xpathVersion = xpathVersion
+        return policyDefaults
+
+    @classmethod
+    def _encodeRule(cls, rule):
+        if type(rule) is not Rule:
+            raise PolicySnapshotError('Rule type %r is not supported for '
+                                      'snapshots' % type(rule))
+
+        if rule.condition is None:
+            encodedCondition = None
+        else:
+            encodedCondition = cls._encodeExpression(rule.condition.expression)
+
+        return (rule.id,
+                rule.effect.value,
+                rule.description,
+                cls._encodeTarget(rule.target),
+                encodedCondition)
+
+    @classmethod
+    def _decodeRule(cls, encodedRule):
+        (ruleId, effect, description, encodedTarget,
+         encodedCondition) = encodedRule
+
+        rule = Rule()
+        rule.id = ruleId
+        rule.effect = Effect(effect)
+        if description is not None:
+            rule.description = description
+
+        if encodedTarget is not None:
+            rule.target = cls._decodeTarget(encodedTarget)
+
+        if encodedCondition is not None:
+            rule.condition = Condition()
+            rule.condition.expression = cls._decodeExpression(
+                                                            encodedCondition)
+        return rule
+
+    @classmethod
+    def _encodeTarget(cls, target):
+        if target is None:
+            return None
+
+        return tuple([
+            tuple([tuple([cls._encodeMatch(match) for match in child.matches])
+                   for child in getattr(target, attrName)])
+            for attrName, childType, matchType in cls.TARGET_CHILD_TYPES
+        ])
+
+    @classmethod
+    def _decodeTarget(cls, encodedTarget):
+        target = Target()
+        for (attrName, childType, matchType), encodedChildren in zip(
+                                                        cls.TARGET_CHILD_TYPES,
+                                                        encodedTarget):
+            children = getattr(target, attrName)
+            for encodedMatches in encodedChildren:
+                child = childType()
+                for encodedMatch in encodedMatches:
+                    child.matches.append(cls._decodeMatch(matchType,
+                                                          encodedMatch))
+                children.append(child)
+
+        return target
+
+    @classmethod
+    def _encodeMatch(cls, match):
+        if match.attributeDesignator is not None:
+            encodedAttributeRef = cls._encodeExpression(
+                                                    match.attributeDesignator)
+        elif match.attributeSelector is not None:
+            encodedAttributeRef = cls._encodeExpression(
+                                                    match.attributeSelector)
+        else:
+            encodedAttributeRef = None
+
+        return (match.matchId,
+                cls._encodeExpression(match.attributeValue),
+                encodedAttributeRef)
+
+    @classmethod
+    def _decodeMatch(cls, matchType, encodedMatch):
+        matchId, encodedAttributeValue, encodedAttributeRef = encodedMatch
+
+        match = matchType()
+        match.matchId = matchId
+        match.attributeValue = cls._decodeExpression(encodedAttributeValue)
+        if encodedAttributeRef is not None:
+            attributeRef = cls._decodeExpression(encodedAttributeRef)
+            if isinstance(attributeRef, AttributeSelector):
+                match.attributeSelector = attributeRef
+            else:
+                match.attributeDesignator = attributeRef
+
+        return match
+
+    @classmethod
+    def _encodeExpression(cls, expression):
+        """Encode an expression
+
+        @param expression: expression
+        @type expression: ndg.xacml.core.expression.Expression derived type
+        @return: encoded expression tagged with its type
+        @rtype: tuple
+        @raise PolicySnapshotError: expression type is not supported
+        """
+        expressionType = type(expression)
+        if expressionType is Apply:
+            return (cls.APPLY,
+                    expression.functionId,
+                    expression.dataType,
+                    tuple([cls._encodeExpression(childExpression)
+                           for childExpression in expression.expressions]))
+
+        elif isinstance(expression, AttributeValue):
+            # Custom types may override value to derive it from other state
+            if expressionType.value is not AttributeValue.value:
+                raise PolicySnapshotError('Attribute value type %r is not '
+                                          'supported for snapshots' %
+                                          expressionType)
+
+            return (cls.ATTRIBUTE_VALUE,
+                    expression.dataType,
+                    expression.value)
+
+        elif expressionType in cls.ATTRIBUTE_DESIGNATOR_TYPES:
+            return (cls.ATTRIBUTE_DESIGNATOR,
+                    cls.ATTRIBUTE_DESIGNATOR_TYPES.index(expressionType),
+                    expression.attributeId,
+                    expression.dataType,
+                    expression.issuer,
+                    expression.mustBePresent)
+
+        elif expressionType is AttributeSelector:
+            return (cls.ATTRIBUTE_SELECTOR,
+                    expression.requestContextPath,
+                    expression.dataType,
+                    expression.mustBePresent)
+
+        raise PolicySnapshotError('Expression type %r is not supported for '
+                                  'snapshots' % expressionType)
+
+    @classmethod
+    def _decodeExpression(cls, encodedExpression):
+        """Decode an expression
+
+        @param encodedExpression: encoded expression
+        @type encodedExpression: tuple
+        @return: expression
+        @rtype: ndg.xacml.core.expression.Expression derived type
+        @raise PolicySnapshotError: invalid encoding
+        """
+        tag = encodedExpression[0]
+        if tag == cls.APPLY:
+            functionId, dataType, encodedChildExpressions = \
+                                                        encodedExpression[1:]
+            expression = Apply()
+            expression.functionId = functionId
+            for encodedChildExpression in encodedChildExpressions:
+                expression.expressions.append(
+                            cls._decodeExpression(encodedChildExpression))
+            expression.compilePattern()
+
+        elif tag == cls.ATTRIBUTE_VALUE:
+            dataType, value = encodedExpression[1:]
+            attributeValueClass = cls.ATTRIBUTE_VALUE_CLASS_FACTORY(dataType)
+            if attributeValueClass is None:
+                raise PolicySnapshotError('No Attribute Value class available '
+                                          'for %r type' % dataType)
+            expression = attributeValueClass(value)
+
+        elif tag == cls.ATTRIBUTE_DESIGNATOR:
+            (designatorTypeIndex, attributeId, dataType, issuer,
+             mustBePresent) = encodedExpression[1:]
+            expression = cls.ATTRIBUTE_DESIGNATOR_TYPES[designatorTypeIndex]()
+            expression.attributeId = attributeId
+            if issuer is not None:
+                expression.issuer = issuer
+            if mustBePresent is not None:
+                expression.mustBePresent = mustBePresent
+
+        elif tag == cls.ATTRIBUTE_SELECTOR:
+            requestContextPath, dataType, mustBePresent = encodedExpression[1:]
+            expression = AttributeSelector()
+            expression.requestContextPath = requestContextPath
+            if mustBePresent is not None:
+                expression.mustBePresent = mustBePresent
+
+        else:
+            raise PolicySnapshotError('Unrecognised expression tag %r in '
+                                      'policy snapshot' % tag)
+
+        if dataType is not None:
+            expression.dataType = dataType
+
+        return expression
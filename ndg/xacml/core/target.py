@@ -23,6 +23,7 @@ from ndg.xacml.core.action import Action
 from ndg.xacml.core.resource import Resource
 from ndg.xacml.core.subject import Subject
 from ndg.xacml.core.environment import Environment
+from ndg.xacml.core.attributedesignator import ResourceAttributeDesignator
 
 
 class Target(XacmlCoreBase):
@@ -41,6 +42,10 @@ class Target(XacmlCoreBase):
     @type ENVIRONMENTS_ELEMENT_LOCAL_NAME: string
     @cvar CHILD_ATTRS: list of the XML child element names for <Target/>
     @type CHILD_ATTRS: tuple
+    @cvar RESOURCES_CHILD_ATTR: name of the child for the resources section,
+    the results for which can't be shared between requests for different
+    resources
+    @type RESOURCES_CHILD_ATTR: string
     
     @ivar __subjects: list of subjects for this target
     @type __subjects: ndg.xacml.utils.TypedList
@@ -57,6 +62,7 @@ class Target(XacmlCoreBase):
     RESOURCES_ELEMENT_LOCAL_NAME = "Resources"
     ENVIRONMENTS_ELEMENT_LOCAL_NAME = "Environments"
     CHILD_ATTRS = ('subjects', 'resources', 'actions', 'environments')
+    RESOURCES_CHILD_ATTR = 'resources'
    
     __slots__ = ('__subjects', '__resources', '__actions', '__environments')
     
@@ -123,6 +129,11 @@ class Target(XacmlCoreBase):
         # request context. 
         statusValues = [False]*len(self.__class__.CHILD_ATTRS) 
         
+        # Results for sections other than resources may have been made already
+        # for another request in the same batch with the same subjects, action
+        # and environment
+        matchResultCache = request.matchResultCache
+        
         # Iterate for target subjects, resources, actions and environments 
         # elements
         for i, attrName in enumerate(self.__class__.CHILD_ATTRS):
@@ -137,6 +148,16 @@ class Target(XacmlCoreBase):
                 statusValues[i] = True
                 continue
             
+            if (matchResultCache is not None and 
+                attrName != self.__class__.RESOURCES_CHILD_ATTR):
+                matchResultKey = (id(self), attrName)
+                matchResult = matchResultCache.get(matchResultKey)
+                if matchResult is not None:
+                    statusValues[i] = matchResult
+                    continue
+            else:
+                matchResultKey = None
+                
             # Iterate over each for example, subject in the list of subjects:
             # <Target>
             #     <Subjects>
@@ -148,18 +169,83 @@ class Target(XacmlCoreBase):
             #          </Subject>
             #     ...
             # or resource in the list of resources and so on
-            for targetSubElem in targetElem:
+            for j, targetSubElem in enumerate(targetElem):
                 if self._matchChild(targetSubElem, request):
                     # Within the list of e.g. subjects if one subject 
                     # matches then this counts as a subject match overall 
                     # for this target
                     statusValues[i] = True
+                    
+                    # The remaining subjects etc. need only be evaluated to
+                    # report any error
+                    if (request.shortCircuitMatching and 
+                        not self._mayRaiseError(targetElem[j + 1:], request)):
+                        break
+            
+            if (matchResultKey is not None and 
+                self.isSectionIndependentOfResources(attrName)):
+                matchResultCache[matchResultKey] = statusValues[i]
+                
+            # Similarly, once a section fails to match the target can't match
+            if not statusValues[i] and request.shortCircuitMatching:
+                remainingTargetElems = []
+                for remainingAttrName in self.__class__.CHILD_ATTRS[i + 1:]:
+                    remainingTargetElems += getattr(self, remainingAttrName)
+                    
+                if not self._mayRaiseError(remainingTargetElems, request):
+                    return False
  
         # Target matches if all the children (i.e. subjects, resources, actions
         # and environment sections) have at least one match.  Otherwise it 
         # doesn't count as a match
         return all(statusValues)
     
+    @staticmethod
+    def _mayRaiseError(targetChildren, request):
+        """Check whether evaluating any of the matches of the given target 
+        children may raise an error
+        
+        @param targetChildren: Target Subjects, Resources, Actions or 
+        Environments
+        @type targetChildren: iterable
+        @param request: Request context object
+        @type request: ndg.xacml.core.context.request.Request
+        @return: True if an error may be raised
+        @rtype: bool
+        """
+        for targetChild in targetChildren:
+            for childMatch in targetChild.matches:
+                if childMatch.mayRaiseError(request):
+                    return True
+                
+        return False
+    
+    def isSectionIndependentOfResources(self, attrName):
+        """Check whether the match result for a section of the target 
+        depends only on the request subjects, action or environment.  This is
+        so if it isn't the resources section and all its matches use
+        designators other than resource attribute designators.  Attribute
+        selectors may select any part of the request.
+        
+        @param attrName: section name, one of CHILD_ATTRS
+        @type attrName: string
+        @return: True if the section match result doesn't depend on the 
+        request resources
+        @rtype: bool
+        """
+        if attrName == self.__class__.RESOURCES_CHILD_ATTR:
+            return False
+        
+        for targetChild in getattr(self, attrName):
+            for childMatch in targetChild.matches:
+                if (childMatch.attributeSelector is not None or
+                    childMatch.attributeDesignator is None or
+                    isinstance(childMatch.attributeDesignator, 
+                               ResourceAttributeDesignator)):
+                    return False
+                
+        return True
+        
     def _matchChild(self, targetChild, request):
         """Match a request child element (a <Subject>, <Resource>, <Action> or 
         <Environment>) with the corresponding target's <Subject>, <Resource>, 
@@ -191,9 +277,18 @@ class Target(XacmlCoreBase):
         # respectively, are "True".
         #
         # e.g. for <SubjectMatch>es in <Subject> ...
-        for i, childMatch in enumerate(targetChild.matches):
+        childMatches = targetChild.matches
+        for i, childMatch in enumerate(childMatches):
             matchStatusValues[i] = childMatch.evaluate(request)
             
+            # Once a match fails the remaining matches need only be evaluated
+            # to report any error
+            if (not matchStatusValues[i] and 
+                request.shortCircuitMatching and
+                not any([remainingMatch.mayRaiseError(request)
+                         for remainingMatch in childMatches[i + 1:]])):
+                return False
+            
         # All match => overall match      
         return all(matchStatusValues)
 
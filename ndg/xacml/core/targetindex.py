@@ -0,0 +1,518 @@
+"""NDG XACML Target index for Policy Set evaluation - enables a Policy Set to
+skip child policies whose targets can never match a given request context
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import re
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml.core.attributevalue import AttributeValueClassFactory
+from ndg.xacml.core.attributedesignator import (SubjectAttributeDesignator,
+                                                ResourceAttributeDesignator,
+                                                ActionAttributeDesignator)
+from ndg.xacml.core.functions.v1.equal import EqualBase
+from ndg.xacml.core.functions.v1.regexp_match import RegexpMatchBase
+
+
+class PrefixTrie(object):
+    """Character trie mapping literal string prefixes to sets of integer
+    identifiers.  A look-up returns the identifiers for every prefix of the
+    input string held in the trie.
+
+    @cvar IDENTIFIERS_KEY: key used within trie nodes to hold the set of
+    identifiers for the prefix terminating at that node
+    @type IDENTIFIERS_KEY: NoneType
+
+    @ivar __root: root node of the trie
+    @type __root: dict
+    """
+    IDENTIFIERS_KEY = None
+
+    __slots__ = ('__root',)
+
+    def __init__(self):
+        self.__root = {}
+
+    def add(self, prefix, identifier):
+        """Add an identifier for the given prefix
+
+        @param prefix: literal prefix
+        @type prefix: basestring
+        @param identifier: identifier to associate with the prefix
+        @type identifier: int
+        """
+        node = self.__root
+        for char in prefix:
+            node = node.setdefault(char, {})
+
+        node.setdefault(self.__class__.IDENTIFIERS_KEY, set()).add(identifier)
+
+    def lookup(self, value):
+        """Find the identifiers for all the prefixes of the input value
+
+        @param value: string to look up
+        @type value: basestring
+        @return: identifiers for all prefixes of value held in the trie
+        @rtype: set
+        """
+        identifiersKey = self.__class__.IDENTIFIERS_KEY
+        identifiers = set()
+        node = self.__root
+        for char in value:
+            node = node.get(char)
+            if node is None:
+                break
+
+            if identifiersKey in node:
+                identifiers.update(node[identifiersKey])
+
+        return identifiers
+
+    def __len__(self):
+        """@return: number of distinct leading characters held in the trie
+        @rtype: int
+        """
+        return len(self.__root)
+
+
+class TargetIndexEntry(object):
+    """Index entry for a single attribute designator.  Holds the equality and
+    regular expression prefix matches made against that designator by the
+    targets of child policies
+
+    @ivar designator: representative designator used to extract the bag of
+    values from the request context
+    @type designator: ndg.xacml.core.attributedesignator.AttributeDesignator
+    @ivar equal: mapping of literal values to child policy indices
+    @type equal: dict
+    @ivar prefixes: trie of regular expression literal prefixes to child policy
+    indices
+    @type prefixes: ndg.xacml.core.targetindex.PrefixTrie
+    @ivar identifiers: all the child policy indices referenced by this entry
+    @type identifiers: set
+    """
+    __slots__ = ('designator', 'equal', 'prefixes', 'identifiers')
+
+    def __init__(self, designator):
+        """@param designator: designator for this entry
+        @type designator: ndg.xacml.core.attributedesignator.AttributeDesignator
+        """
+        self.designator = designator
+        self.equal = {}
+        self.prefixes = PrefixTrie()
+        self.identifiers = set()
+
+    def lookup(self, context):
+        """Get the child policy indices whose key match may be satisfied by the
+        request context
+
+        @param context: request context
+        @type context: ndg.xacml.core.context.request.Request
+        @return: child policy indices
+        @rtype: set
+        """
+        try:
+            bag = self.designator.evaluate(context)
+        except Exception:
+            # Leave it to the full evaluation of the children to report the
+            # error
+            return self.identifiers
+
+        identifiers = set()
+        for attributeValue in bag:
+            value = attributeValue.value
+            identifiers.update(self.equal.get(value, ()))
+            identifiers.update(self.prefixes.lookup(value))
+
+        return identifiers
+
+
+class TargetIndex(object):
+    """Index of the targets of the child policies and policy sets of a
+    PolicySet.  Child targets are inspected for <ResourceMatch> and
+    <ActionMatch> elements which can be resolved from the request context
+    without evaluating them: equality matches are placed in a hash map and
+    regular expression matches with a literal anchored prefix in a trie.  For
+    a given request, only children which may match are returned as candidates
+    for evaluation.
+
+    A child is only ever excluded if evaluation of its target is certain to
+    result in no match, without raising an error.  This ensures that the result
+    of the policy combining algorithms is unchanged since a child which is
+    excluded would otherwise have been evaluated as NotApplicable.
+
+    @cvar GUARD_SECTIONS: target sections which may be used to index a child,
+    in order of preference
+    @type GUARD_SECTIONS: tuple
+    @cvar GUARD_DESIGNATOR_TYPES: designator types which may be used to index a
+    child.  Subject designators are excluded as they may involve a query to a
+    Policy Information Point.
+    @type GUARD_DESIGNATOR_TYPES: tuple
+    @cvar REGEXP_SPECIAL_CHARS: regular expression special characters
+    @type REGEXP_SPECIAL_CHARS: string
+    @cvar REGEXP_QUANTIFIER_CHARS: regular expression repetition characters
+    @type REGEXP_QUANTIFIER_CHARS: string
+    @cvar MAX_PREFIX_ALTERNATIVES: maximum number of alternative prefixes to
+    derive from a regular expression with optional characters
+    @type MAX_PREFIX_ALTERNATIVES: int
+
+    @ivar __policies: child policies from which the index was built
+    @type __policies: tuple
+    @ivar __entries: index entries keyed by designator
+    @type __entries: dict
+    @ivar __unindexed: indices of children which can't be indexed and so must
+    always be evaluated
+    @type __unindexed: set
+    @ivar __pipDependent: indices of indexed children which contain subject
+    matches and so may query a Policy Information Point when evaluated
+    @type __pipDependent: set
+    """
+    GUARD_SECTIONS = ('resources', 'actions')
+    GUARD_DESIGNATOR_TYPES = (ResourceAttributeDesignator,
+                              ActionAttributeDesignator)
+    REGEXP_SPECIAL_CHARS = '.^$*+?{}[]|()\\'
+    REGEXP_QUANTIFIER_CHARS = '*+?{'
+    MAX_PREFIX_ALTERNATIVES = 16
+
+    __slots__ = ('__policies', '__entries', '__unindexed', '__pipDependent')
+
+    def __init__(self, policies):
+        """Build the index from the given child policies
+
+        @param policies: child policies and / or policy sets
+        @type policies: ndg.xacml.utils.TypedList
+        """
+        self.__policies = tuple(policies)
+        self.__entries = {}
+        self.__unindexed = set()
+        self.__pipDependent = set()
+
+        for i, policy in enumerate(self.__policies):
+            if not self._addPolicy(i, policy):
+                self.__unindexed.add(i)
+
+        log.debug('Target index built for %d policies: %d could not be '
+                  'indexed', len(self.__policies), len(self.__unindexed))
+
+    @property
+    def policies(self):
+        """@return: child policies from which the index was built
+        @rtype: tuple
+        """
+        return self.__policies
+
+    @property
+    def nIndexed(self):
+        """@return: number of children which have been indexed
+        @rtype: int
+        """
+        return len(self.__policies) - len(self.__unindexed)
+
+    def isValidFor(self, policies):
+        """Check that the index was built from the given list of policies
+
+        @param policies: child policies and / or policy sets
+        @type policies: ndg.xacml.utils.TypedList
+        @return: True if the index is valid for the input policies
+        @rtype: bool
+        """
+        if len(policies) != len(self.__policies):
+            return False
+
+        for policy, indexedPolicy in zip(policies, self.__policies):
+            if policy is not indexedPolicy:
+                return False
+
+        return True
+
+    def getCandidates(self, policies, context):
+        """Return the child policies which may apply to the given request
+        context, preserving their original order
+
+        @param policies: child policies and / or policy sets - this should be
+        the same list as that the index was built from
+        @type policies: ndg.xacml.utils.TypedList
+        @param context: request context
+        @type context: ndg.xacml.core.context.request.Request
+        @return: candidate child policies
+        @rtype: list
+        """
+        if not self.isValidFor(policies):
+            log.warning('Target index is out of date with respect to the '
+                        'policies it was built from: evaluating all policies')
+            return policies
+
+        if not self._isWellFormed(context):
+            return policies
+
+        candidates = set(self.__unindexed)
+        if context.ctxHandler is not None:
+            candidates.update(self.__pipDependent)
+
+        for entry in self.__entries.values():
+            candidates.update(entry.lookup(context))
+
+        return [policy for i, policy in enumerate(policies) if i in candidates]
+
+    @staticmethod
+    def _isWellFormed(context):
+        """Check that all the request attribute values are of the type
+        registered for their data type.  Designator evaluation fails for any
+        which are not and so in that case no children can safely be excluded.
+
+        @param context: request context
+        @type context: ndg.xacml.core.context.request.Request
+        @return: True if the request attribute values are all well formed
+        @rtype: bool
+        """
+        if context.action is None:
+            return False
+
+        attributeValueFactory = AttributeValueClassFactory()
+        requestChildren = list(context.subjects) + list(context.resources)
+        requestChildren.append(context.action)
+        if context.environment is not None:
+            requestChildren.append(context.environment)
+
+        for requestChild in requestChildren:
+            for attribute in requestChild.attributes:
+                for attributeValue in attribute.attributeValues:
+                    if attributeValue.dataType != attribute.dataType:
+                        continue
+
+                    attributeValueClass = attributeValueFactory(
+                                                        attributeValue.dataType)
+                    if (attributeValueClass is None or
+                        not isinstance(attributeValue, attributeValueClass)):
+                        return False
+
+        return True
+
+    def _addPolicy(self, i, policy):
+        """Add a child policy to the index
+
+        @param i: index of the policy in the list of children
+        @type i: int
+        @param policy: child policy or policy set
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        @return: True if the child could be indexed, False otherwise
+        @rtype: bool
+        """
+        target = policy.target
+        if target is None:
+            return False
+
+        # All matches in the target must be guaranteed not to raise an error
+        # otherwise the child must be evaluated in order to get an
+        # Indeterminate result
+        for attrName in target.CHILD_ATTRS:
+            for targetChild in getattr(target, attrName):
+                for match in targetChild.matches:
+                    if not self._isSafeMatch(match):
+                        return False
+
+        for attrName in self.__class__.GUARD_SECTIONS:
+            guard = self._getGuard(getattr(target, attrName))
+            if guard is not None:
+                break
+        else:
+            return False
+
+        for match, prefixes in guard:
+            designator = match.attributeDesignator
+            key = (designator.__class__,
+                   designator.attributeId,
+                   designator.dataType,
+                   designator.issuer)
+            entry = self.__entries.get(key)
+            if entry is None:
+                entry = TargetIndexEntry(designator)
+                self.__entries[key] = entry
+
+            entry.identifiers.add(i)
+            if prefixes is None:
+                entry.equal.setdefault(match.attributeValue.value, set()).add(i)
+            else:
+                for prefix in prefixes:
+                    entry.prefixes.add(prefix, i)
+
+        if len(target.subjects) > 0:
+            self.__pipDependent.add(i)
+
+        return True
+
+    def _getGuard(self, targetSection):
+        """Get the key matches for a target section: one from each of its
+        children.  If any child has no match which can be indexed, the section
+        can't be used
+
+        @param targetSection: list of subjects, resources, actions or
+        environments for a target
+        @type targetSection: ndg.xacml.utils.TypedList
+        @return: list of tuples of match and its regular expression prefixes
+        or None for equality matches, or None if the section can't be used
+        @rtype: list / NoneType
+        """
+        if len(targetSection) == 0:
+            return None
+
+        guard = []
+        for targetChild in targetSection:
+            for match in targetChild.matches:
+                if not isinstance(match.attributeDesignator,
+                                  self.__class__.GUARD_DESIGNATOR_TYPES):
+                    continue
+
+                function = match.function
+                if isinstance(function, EqualBase):
+                    guard.append((match, None))
+                    break
+
+                elif isinstance(function, RegexpMatchBase):
+                    prefixes = self.getRegexpPrefixes(match.attributeValue.value)
+                    if prefixes is not None:
+                        guard.append((match, prefixes))
+                        break
+            else:
+                return None
+
+        return guard
+
+    @staticmethod
+    def _isSafeMatch(match):
+        """Check whether a match can be evaluated without an error for any
+        well formed request context
+
+        @param match: target match
+        @type match: ndg.xacml.core.match.MatchBase
+        @return: True if the match can't raise an error on evaluation
+        @rtype: bool
+        """
+        designator = match.attributeDesignator
+        if designator is None or designator.mustBePresent:
+            return False
+
+        function = match.function
+        if not isinstance(function, (EqualBase, RegexpMatchBase)):
+            return False
+
+        functionType = function.__class__.TYPE
+        if not isinstance(match.attributeValue, functionType):
+            return False
+
+        if designator.dataType != functionType.IDENTIFIER:
+            return False
+
+        if not issubclass(functionType.TYPE, str):
+            return False
+
+        if isinstance(function, RegexpMatchBase):
+            try:
+                re.compile(match.attributeValue.value)
+            except re.error:
+                return False
+
+        # Subject designators are safe to evaluate only as far as the request
+        # context is concerned - PIP queries are handled separately
+        return isinstance(designator, (SubjectAttributeDesignator,) +
+                          TargetIndex.GUARD_DESIGNATOR_TYPES)
+
+    @classmethod
+    def getRegexpPrefixes(cls, pattern):
+        """Derive the literal prefixes of a regular expression: any string
+        matched by the pattern (using re.match i.e. anchored at the start) must
+        start with one of these prefixes
+
+        @param pattern: regular expression
+        @type pattern: basestring
+        @return: literal prefixes or None if no non-empty prefix can be
+        derived
+        @rtype: list / NoneType
+        """
+        if cls._hasTopLevelAlternation(pattern):
+            return None
+
+        specialChars = cls.REGEXP_SPECIAL_CHARS
+        quantifierChars = cls.REGEXP_QUANTIFIER_CHARS
+        prefixes = ['']
+        nChars = len(pattern)
+        i = 1 if pattern.startswith('^') else 0
+
+        while i < nChars:
+            char = pattern[i]
+            if char == '\\':
+                # Only escaped special characters are literals - other escapes
+                # are character classes, anchors or back references
+                if i + 1 >= nChars or pattern[i + 1] not in specialChars:
+                    break
+                literal = pattern[i + 1]
+                i += 2
+
+            elif char in specialChars:
+                break
+            else:
+                literal = char
+                i += 1
+
+            quantifier = pattern[i] if i < nChars else None
+            if quantifier is not None and quantifier in quantifierChars:
+                if quantifier != '?':
+                    if quantifier == '+':
+                        # At least one occurrence
+                        prefixes = [prefix + literal for prefix in prefixes]
+                    break
+
+                # Optional character - fork the prefixes
+                if len(prefixes)*2 > cls.MAX_PREFIX_ALTERNATIVES:
+                    break
+                prefixes += [prefix + literal for prefix in prefixes]
+                i += 1
+                if i < nChars and pattern[i] == '?':
+                    # Non-greedy qualifier
+                    i += 1
+            else:
+                prefixes = [prefix + literal for prefix in prefixes]
+
+        if '' in prefixes:
+            return None
+
+        return prefixes
+
+    @staticmethod
+    def _hasTopLevelAlternation(pattern):
+        """Check for an alternation operator outside of any group
+
+        @param pattern: regular expression
+        @type pattern: basestring
+        @return: True if the pattern contains a top level alternation
+        @rtype: bool
+        """
+        depth = 0
+        inCharClass = False
+        escaped = False
+        for char in pattern:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif inCharClass:
+                if char == ']':
+                    inCharClass = False
+            elif char == '[':
+                inCharClass = True
+            elif char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+            elif char == '|' and depth == 0:
+                return True
+
+        return False
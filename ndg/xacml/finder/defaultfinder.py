@@ -30,8 +30,9 @@ def getDefaultPolicyFinder(source):
     if isinstance(source, str):
         if os.path.exists(source):
             basePath = os.path.dirname(source)
-    elif isinstance(source, file):
-        if hasattr(file, 'name') and file.name:
-            basePath = os.path.dirname(file.name)
+    elif hasattr(source, 'read'):
+        # File object
+        if getattr(source, 'name', None) and isinstance(source.name, str):
+            basePath = os.path.dirname(source.name)
     finder = UrlPolicyFinder(basePath)
     return finder
@@ -52,6 +52,16 @@ class PolicyFinderBase(object, metaclass=ABCMeta):
         """
         return None
 
+    def prefetchReferences(self, source):
+        """
+        Called with the root policy source before it is parsed so that
+        finders can start retrieving referenced policies early.  This
+        implementation does nothing.
+        @param source: root policy source
+        @type source: string, file, XML node type
+        """
+        pass
+
     def setReader(self, reader):
         """
         Sets the reader to be used when parsing referenced policies.
@@ -9,9 +9,16 @@ __contact__ = "Philip.Kershaw@stfc.ac.uk"
 __license__ = "BSD - see LICENSE file in top-level directory"
 __contact__ = "Philip.Kershaw@stfc.ac.uk"
 __revision__ = "$Id$"
+import io
 import os
+import re
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import unescape
 
 from ndg.xacml.core.policybase import PolicyBase
+from ndg.xacml.core.policyset import PolicySet
 from ndg.xacml.finder.policyfinderbase import PolicyFinderBase
 from ndg.xacml.parsers import XMLParseError
 import ndg.xacml.utils.urlfetcher as urlfetcher
@@ -19,6 +26,11 @@ import ndg.xacml.utils.urlfetcher as urlfetcher
 class UrlPolicyFinder(PolicyFinderBase):
     '''
     Concrete subclass of PolicyFinderBase that interprets ID references as URLs.
+
+    Referenced documents are fetched concurrently by a pool of threads.  Each
+    document is released once it has been parsed.  Call close when parsing
+    is complete to stop the threads and release documents which were fetched
+    but never parsed.
     '''
 
     # File scheme prefix
@@ -32,13 +44,166 @@ class UrlPolicyFinder(PolicyFinderBase):
     # Path start implying relative path.
     _RELATIVE_PATH_PREFIX = '.' + os.path.sep
 
-    def __init__(self, basePath):
+    # Number of threads fetching referenced documents concurrently
+    DEFAULT_MAX_WORKERS = 8
+
+    # Patterns used to scan documents for references before they are parsed
+    _COMMENT_PAT = re.compile(br'<!--.*?-->', re.S)
+    _REFERENCE_PAT = re.compile(br'<(?:[\w.-]+:)?(?:PolicyIdReference|'
+                                br'PolicySetIdReference)\b[^>]*>([^<]*)<')
+    _ID_PAT = re.compile(br'\s(?:PolicyId|PolicySetId)\s*=\s*'
+                         br'(?:"([^"]*)"|\'([^\']*)\')')
+
+    def __init__(self, basePath, maxWorkers=DEFAULT_MAX_WORKERS,
+                 cacheDir=None, fetcher=None):
         '''
-        @param basePath: base path for resolving relative references
+        @param basePath: base path for resolving relative references.  This
+        may also be an HTTP, HTTPS or FTP base URL.
         @type basePath str
+        @param maxWorkers: number of threads used to fetch referenced
+        documents concurrently.  Set to 0 to fetch each referenced document
+        only when it is needed during parsing.
+        @type maxWorkers: int
+        @param cacheDir: directory for caching fetched documents or None for
+        no cache.  Ignored if fetcher is set.
+        @type cacheDir: str / NoneType
+        @param fetcher: fetcher used to retrieve referenced documents.  A
+        new one is created if None.
+        @type fetcher: ndg.xacml.utils.urlfetcher.UrlFetcher / NoneType
         '''
         super(UrlPolicyFinder, self).__init__()
         self.basePath = basePath
+        self.maxWorkers = maxWorkers
+        if fetcher is None:
+            self.fetcher = urlfetcher.UrlFetcher(cacheDir=cacheDir)
+        else:
+            self.fetcher = fetcher
+
+        self._executor = None
+        self._prefetchedDocs = {}
+        self._prefetchLock = threading.Lock()
+
+        # Policies and policy sets declared in each document parsed keyed by
+        # document URL
+        self.documentPolicies = {}
+        self._documentUrls = []
+
+    def addPolicyReference(self, policy):
+        """
+        Records the policy and the document it was declared in
+        @param policy: policy
+        @type policy: ndg.xacml.core.policy.Policy
+        @raise XMLParseError: if the policy's ID is a duplicate of one already
+        found
+        """
+        super(UrlPolicyFinder, self).addPolicyReference(policy)
+        if self._documentUrls:
+            self.documentPolicies[self._documentUrls[-1]].append(policy)
+
+    def addPolicySetReference(self, policySet):
+        """
+        Records the policy set and the document it was declared in
+        @param policySet: policy set
+        @type policySet: ndg.xacml.core.policy.PolicySet
+        @raise XMLParseError: if the policy set's ID is a duplicate of one
+        already found
+        """
+        super(UrlPolicyFinder, self).addPolicySetReference(policySet)
+        if self._documentUrls:
+            self.documentPolicies[self._documentUrls[-1]].append(policySet)
+
+    def parseDocument(self, url, policyDoc, common):
+        """
+        Parses a policy document recording the policies and policy sets
+        declared in it against its URL in documentPolicies.
+        @param url: document URL
+        @type url: str
+        @param policyDoc: document content
+        @type policyDoc: bytes
+        @param common: parsing common data
+        @type common: from ndg.xacml.parsers.common.Common
+        @return: policy or policy set
+        @rtype: ndg.xacml.core.policybase.PolicyBase
+        """
+        self.documentPolicies[url] = []
+        self._documentUrls.append(url)
+        try:
+            return PolicyBase.fromNestedSource(io.BytesIO(policyDoc), common)
+        finally:
+            self._documentUrls.pop()
+
+    def removeDocument(self, url):
+        """
+        Removes the policies and policy sets declared in a document so that
+        it can be parsed again
+        @param url: document URL
+        @type url: str
+        @return: policies and policy sets removed
+        @rtype: list
+        """
+        policies = self.documentPolicies.pop(url, [])
+        for policy in policies:
+            if isinstance(policy, PolicySet):
+                self.policySetMap.pop(policy.policySetId, None)
+            else:
+                self.policyMap.pop(policy.policyId, None)
+
+        return policies
+
+    def prefetchReferences(self, source):
+        """
+        Starts fetching the documents referenced from the root policy
+        document concurrently before it is parsed.  Documents are scanned for
+        references as they are fetched so that the whole tree of referenced
+        documents is fetched in parallel.
+        @param source: root policy source.  Only file paths are scanned.
+        @type source: string, file, XML node type
+        """
+        if self.maxWorkers < 1:
+            return
+
+        if isinstance(source, str) and os.path.isfile(source):
+            with open(source, 'rb') as policyFile:
+                self._prefetchDocReferences(policyFile.read())
+
+    def close(self):
+        """
+        Stops the threads fetching documents, releases documents fetched but
+        not parsed and closes idle connections
+        """
+        with self._prefetchLock:
+            executor = self._executor
+            self._executor = None
+            self._prefetchedDocs = {}
+
+        if executor is not None:
+            executor.shutdown(wait=True)
+        self.fetcher.close()
+
+    @classmethod
+    def findReferences(cls, policyDoc):
+        """
+        Scans a policy document for policy and policy set ID references,
+        excluding those to policies and policy sets declared in the same
+        document.  This is a fast scan made without parsing the document.
+        References it misses are fetched when they are reached in parsing.
+        @param policyDoc: policy document
+        @type policyDoc: bytes
+        @return: references
+        @rtype: list
+        """
+        policyDoc = cls._COMMENT_PAT.sub(b'', policyDoc)
+        try:
+            idents = set([unescape((ident1 or ident2).decode('utf-8'))
+                          for ident1, ident2 in cls._ID_PAT.findall(policyDoc)])
+            references = [unescape(reference.decode('utf-8').strip())
+                          for reference in
+                          cls._REFERENCE_PAT.findall(policyDoc)]
+        except UnicodeDecodeError:
+            return []
+
+        return [reference for reference in references
+                if reference and reference not in idents]
 
     def findPolicy(self, policyIdReference, common):
         """
@@ -98,16 +263,72 @@ class UrlPolicyFinder(PolicyFinderBase):
         @raise XMLParseError: policy set of specified ID not found
         """
         url = self._makeUrlFromReference(reference)
-        policyDoc = urlfetcher.fetch_stream_from_url(url)
-        policy = PolicyBase.fromNestedSource(policyDoc, common)
-        return policy
+        if self.maxWorkers < 1:
+            policyDoc = self.fetcher.fetch(url)
+            return self.parseDocument(url, policyDoc, common)
+
+        try:
+            policyDoc = self._prefetch(reference).result()
+            return self.parseDocument(url, policyDoc, common)
+        finally:
+            # Documents are only kept until they are parsed.  The policies
+            # they declare are found by ID after that so they aren't fetched
+            # again unless a fetch failed or the document has been removed.
+            with self._prefetchLock:
+                self._prefetchedDocs.pop(url, None)
+
+    def _prefetch(self, reference):
+        """
+        Starts fetching the document for a reference if it is not already
+        being fetched.
+        @param reference: ID reference
+        @type reference: str
+        @return: future for the document content
+        @rtype: concurrent.futures.Future
+        """
+        url = self._makeUrlFromReference(reference)
+        with self._prefetchLock:
+            future = self._prefetchedDocs.get(url)
+            if future is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                                        max_workers=self.maxWorkers,
+                                        thread_name_prefix='UrlPolicyFinder')
+                future = self._executor.submit(self._fetch, url)
+                self._prefetchedDocs[url] = future
+
+        return future
+
+    def _fetch(self, url):
+        """
+        Fetches a document and starts fetching the documents it references
+        @param url: URL
+        @type url: str
+        @return: document content
+        @rtype: bytes
+        """
+        policyDoc = self.fetcher.fetch(url)
+        self._prefetchDocReferences(policyDoc)
+        return policyDoc
+
+    def _prefetchDocReferences(self, policyDoc):
+        """
+        Starts fetching the documents referenced from a policy document
+        @param policyDoc: policy document
+        @type policyDoc: bytes
+        """
+        for reference in self.findReferences(policyDoc):
+            if (reference not in self.policyMap and
+                reference not in self.policySetMap):
+                self._prefetch(reference)
 
     def _makeUrlFromReference(self, reference):
         """
         Makes a URL from the reference. If it already begins with a known scheme
         prefix, the reference is not modified, otherwise it is made into a file
         URL (relative to the base path if it does not start with a path
-        separator).
+        separator).  If the base path is itself an HTTP, HTTPS or FTP URL,
+        references without a scheme are made relative to it.
         file://dir/file and file://./dir/file are treated as relative paths.
         file:///dir/file is treated as an absolute path.
         @param reference: ID reference
@@ -130,6 +351,12 @@ class UrlPolicyFinder(PolicyFinderBase):
         elif [True for scheme in self._NON_FILE_SCHEMES
             if reference.startswith(scheme)]:
             url = reference
+        elif self.basePath and [True for scheme in self._NON_FILE_SCHEMES
+                                if self.basePath.startswith(scheme)]:
+            # Relative to a base URL - escape characters such as ':' which
+            # would otherwise be read as part of a URL scheme.
+            url = (self.basePath.rstrip('/') + '/' +
+                   urllib.parse.quote(reference.lstrip('/')))
         else:
             # No scheme so use default scheme.
             if reference.startswith(os.path.sep):
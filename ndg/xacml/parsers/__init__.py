@@ -21,6 +21,10 @@ class XMLParseError(XacmlError):
     """XACML package XML Parsing error"""
 
 
+class XMLWriteError(XacmlError):
+    """XACML package XML writing error"""
+
+
 class AbstractReader(object, metaclass=ABCMeta):
     """Abstract base class for XACML reader"""
     
@@ -148,4 +148,5 @@ class ApplyReader(ETreeAbstractReader):
                 raise XMLParseError('%r Apply sub-element not recognised', 
                                     localName)
    
+        applyObj.compilePattern()
         return applyObj
@@ -0,0 +1,222 @@
+"""NDG XACML ElementTree iterparse based Policy Document Reader - reads
+policies and policy sets incrementally so that the whole document tree is not
+held in memory
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import logging
+log = logging.getLogger(__name__)
+
+from ndg.xacml import importElementTree
+ElementTree = importElementTree()
+
+from ndg.xacml.parsers import XMLParseError
+from ndg.xacml.core.policy import Policy
+from ndg.xacml.core.policyset import PolicySet
+from ndg.xacml.core.policybase import PolicyBase
+from ndg.xacml.parsers.etree import QName
+from ndg.xacml.parsers.etree.reader import ETreeAbstractReader
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+
+
+class IterParsePolicyBaseReader(ETreeAbstractReader):
+    """Parse a Policy Document incrementally using ElementTree iterparse.
+
+    Policy and policy set objects are created from their start tags.  Each
+    of their child elements - rules, targets, policy references etc. - is
+    read with the standard reader as soon as it is complete and the element
+    is then discarded.  Peak memory use is then bounded by the largest child
+    element rather than the size of the document.  Elements already in
+    memory are read as they are by the standard readers.
+
+    @cvar TYPE: XACML type to instantiate from parsed object
+    @type TYPE: type
+    @cvar TYPE_MAP: XACML types for the valid root element local names
+    @type TYPE_MAP: dict
+    """
+    TYPE = PolicyBase
+    TYPE_MAP = {Policy.ELEMENT_LOCAL_NAME: Policy,
+                PolicySet.ELEMENT_LOCAL_NAME: PolicySet}
+
+    def __call__(self, obj, common):
+        """Parse policy or policy set object
+
+        @param obj: input object to parse
+        @type obj: ElementTree Element, or stream object
+        @param common: parsing common data
+        @type common: from ndg.xacml.parsers.common.Common
+        @return: new XACML expression instance
+        @rtype: ndg.xacml.core.policybase.PolicyBase derived type
+        @raise XMLParseError: error reading element
+        @raise NotImplementedError: parsing is not implemented for rule
+        combiner, combiner parameters and obligations elements.
+        """
+        if ElementTree.iselement(obj):
+            reader = ReaderFactory.getReader(self._getRootType(obj))
+            return reader.parse(obj, common)
+
+        # Open elements and those for the policies and policy sets being read
+        # with their readers
+        elemStack = []
+        policyStack = []
+        policy = None
+
+        for event, elem in ElementTree.iterparse(obj,
+                                                 events=('start', 'end')):
+            if event == 'start':
+                if not elemStack:
+                    xacmlType = self._getRootType(elem)
+                else:
+                    xacmlType = self._getChildPolicyType(elem, elemStack,
+                                                         policyStack)
+
+                if xacmlType is not None:
+                    reader = ReaderFactory.getReader(xacmlType)()
+                    policyStack.append(
+                        (elem, reader, reader._processAttributes(elem)))
+
+                elemStack.append(elem)
+                continue
+
+            elemStack.pop()
+            if policyStack and policyStack[-1][0] is elem:
+                # End of a policy or policy set
+                reader, xacmlObj = policyStack.pop()[1:]
+                reader._addReference(xacmlObj, common)
+                if policyStack:
+                    policyStack[-1][2].policies.append(xacmlObj)
+                else:
+                    policy = xacmlObj
+
+            elif policyStack and policyStack[-1][0] is elemStack[-1]:
+                # Child element of the policy or policy set being read is
+                # complete
+                reader, xacmlObj = policyStack[-1][1:]
+                reader._processChildElement(xacmlObj, elem, common)
+
+            else:
+                # Element within a child element being read
+                continue
+
+            # Free the element read
+            elem.clear()
+            if elemStack:
+                elemStack[-1].remove(elem)
+
+        return policy
+
+    def _getRootType(self, elem):
+        """Get the XACML type to instantiate for the root element
+
+        @param elem: root element
+        @type elem: ElementTree Element
+        @return: XACML type
+        @rtype: type
+        @raise XMLParseError: root element is not a policy or policy set
+        """
+        if self.__class__.TYPE is not PolicyBase:
+            # Reader's _processAttributes checks the element type
+            return self.__class__.TYPE
+
+        localName = QName.getLocalPart(elem.tag)
+        xacmlType = self.__class__.TYPE_MAP.get(localName)
+        if xacmlType is None:
+            raise XMLParseError("Element %s is not valid as the root element "
+                                "of a XACML document" % localName)
+        return xacmlType
+
+    @staticmethod
+    def _getChildPolicyType(elem, elemStack, policyStack):
+        """Get the XACML type to instantiate for a policy or policy set
+        element which is a child of the policy set being read
+
+        @param elem: element started
+        @type elem: ElementTree Element
+        @param elemStack: open elements
+        @type elemStack: list
+        @param policyStack: elements, readers and objects for the policies and
+        policy sets being read
+        @type policyStack: list
+        @return: XACML type or None if the element is not a child policy or
+        policy set
+        @rtype: type / NoneType
+        """
+        if (not policyStack or
+            policyStack[-1][0] is not elemStack[-1] or
+            not isinstance(policyStack[-1][2], PolicySet)):
+            return None
+
+        localName = QName.getLocalPart(elem.tag)
+        return IterParsePolicyBaseReader.TYPE_MAP.get(localName)
+
+
+class IterParsePolicyReader(IterParsePolicyBaseReader):
+    """Parse a Policy Document incrementally using ElementTree iterparse
+    @cvar TYPE: XACML type to instantiate from parsed object
+    @type TYPE: type"""
+    TYPE = Policy
+
+    @classmethod
+    def parse(cls, obj, common=None):
+        """Parse from input object and return new XACML object.  As for
+        PolicyReader, allow the common data to be None as it is not needed to
+        read a policy
+
+        @param obj: input source - file name, stream object or other
+        @type obj: string, stream or other
+        @param common: parsing common data
+        @type common: from ndg.xacml.parsers.common.Common
+        @return: new XACML object
+        @rtype: XacmlCoreBase sub type
+        """
+        return super(IterParsePolicyReader, cls).parse(obj, common)
+
+
+class IterParsePolicySetReader(IterParsePolicyBaseReader):
+    """Parse a Policy Set Document incrementally using ElementTree iterparse
+    @cvar TYPE: XACML type to instantiate from parsed object
+    @type TYPE: type"""
+    TYPE = PolicySet
+
+
+class IterParseReaderFactory(ReaderFactory):
+    """Parser factory for ElementTree based parsers reading policy and policy
+    set documents incrementally.  Use in place of ReaderFactory for very
+    large documents e.g.
+
+    pdp = PDP.fromPolicySource(filePath, IterParseReaderFactory)
+
+    @cvar ITERPARSE_READER_CLASS_MAP: iterparse based readers for policy
+    types.  Other XACML types are read with the ReaderFactory readers.
+    @type ITERPARSE_READER_CLASS_MAP: dict
+    """
+    ITERPARSE_READER_CLASS_MAP = {
+        PolicyBase: IterParsePolicyBaseReader,
+        Policy: IterParsePolicyReader,
+        PolicySet: IterParsePolicySetReader
+    }
+
+    @classmethod
+    def getReader(cls, xacmlType):
+        """Return ElementTree based Reader class for the given input
+
+        @param xacmlType: XACML type to return a parser class for
+        @type xacmlType: type
+        @return: iterparse based reader for policy types, otherwise the
+        ReaderFactory reader
+        @rtype: ndg.xacml.parsers.etree.reader.ETreeAbstractReader derived
+        type
+        @raise ImportError: if no reader class found for input type
+        """
+        readerClass = cls.ITERPARSE_READER_CLASS_MAP.get(xacmlType)
+        if readerClass is not None:
+            return readerClass
+
+        return super(IterParseReaderFactory, cls).getReader(xacmlType)
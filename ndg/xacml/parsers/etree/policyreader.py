@@ -70,6 +70,27 @@ class PolicyReader(ETreeAbstractReader):
         @raise NotImplementedError: parsing is not implemented for rule
         combiner, combiner parameters and obligations elements.         
         """
+        policy = self._processAttributes(elem)
+            
+        # Parse sub-elements
+        for childElem in getElementChildren(elem):
+            self._processChildElement(policy, childElem, common)
+            
+        self._addReference(policy, common)
+
+        return policy
+
+    def _processAttributes(self, elem):
+        """Create a new policy from the attributes of the policy element. 
+        Child elements are not read.  This enables the policy to be created 
+        from the start tag alone when reading a document incrementally
+        
+        @param elem: root element of policy
+        @type elem: ElementTree Element
+        @return: new XACML expression instance
+        @rtype: ndg.xacml.core.policy.Policy derived type 
+        @raise XMLParseError: error reading element  
+        """
         # XACML type to instantiate
         xacmlType = self.TYPE
         policy = xacmlType()
@@ -98,56 +119,75 @@ class PolicyReader(ETreeAbstractReader):
         # TODO: version check
         policy.version = (elem.attrib.get(xacmlType.VERSION_ATTRIB_NAME) or 
                           xacmlType.DEFAULT_XACML_VERSION)
-            
-        # Parse sub-elements
-        for childElem in getElementChildren(elem):
-            localName = QName.getLocalPart(childElem.tag)
-            
-            if localName == xacmlType.DESCRIPTION_LOCAL_NAME:
-                if childElem.text is not None:
-                    policy.description = childElem.text.strip()
-                    
-            elif localName == xacmlType.POLICY_DEFAULTS_LOCAL_NAME:
-                PolicyDefaultsReader = ReaderFactory.getReader(PolicyDefaults)
-                policy.policyDefaults = PolicyDefaultsReader.parse(childElem,
-                                                                   common)
-                   
-            elif localName == Target.ELEMENT_LOCAL_NAME:
-                TargetReader = ReaderFactory.getReader(Target)
-                policy.target = TargetReader.parse(childElem, common)
-             
-            elif localName == xacmlType.COMBINER_PARAMETERS_LOCAL_NAME:
-                raise NotImplementedError()
-             
-            elif localName == xacmlType.RULE_COMBINER_PARAMETERS_LOCAL_NAME:
-                raise NotImplementedError()
-            
-            elif localName == VariableDefinition.ELEMENT_LOCAL_NAME:
-                VariableDefinitionReader = ReaderFactory.getReader(
-                                                            VariableDefinition)
-                variableDefinition = VariableDefinitionReader.parse(childElem,
-                                                                    common)
+        
+        return policy
+        
+    def _processChildElement(self, policy, childElem, common):
+        """Parse a child element of a policy, updating the policy with it
+        
+        @param policy: policy being read
+        @type policy: ndg.xacml.core.policy.Policy derived type 
+        @param childElem: child element of the policy element
+        @type childElem: ElementTree Element
+        @param common: parsing common data
+        @type common: from ndg.xacml.parsers.common.Common
+        @raise XMLParseError: error reading element  
+        @raise NotImplementedError: parsing is not implemented for rule
+        combiner, combiner parameters and obligations elements.         
+        """
+        xacmlType = self.TYPE
+        localName = QName.getLocalPart(childElem.tag)
+        
+        if localName == xacmlType.DESCRIPTION_LOCAL_NAME:
+            if childElem.text is not None:
+                policy.description = childElem.text.strip()
                 
-            elif localName == Rule.ELEMENT_LOCAL_NAME:
-                RuleReader = ReaderFactory.getReader(Rule)
-                rule = RuleReader.parse(childElem, common)
-                if rule.id in [_rule.id for _rule in policy.rules]:
-                    raise XMLParseError("Duplicate Rule ID %r found" % rule.id)
-                    
-                policy.rules.append(rule)
-                   
-            elif localName == xacmlType.OBLIGATIONS_LOCAL_NAME:
-                raise NotImplementedError('Parsing for Obligations element is '
-                                          'not implemented')
+        elif localName == xacmlType.POLICY_DEFAULTS_LOCAL_NAME:
+            PolicyDefaultsReader = ReaderFactory.getReader(PolicyDefaults)
+            policy.policyDefaults = PolicyDefaultsReader.parse(childElem,
+                                                               common)
+               
+        elif localName == Target.ELEMENT_LOCAL_NAME:
+            TargetReader = ReaderFactory.getReader(Target)
+            policy.target = TargetReader.parse(childElem, common)
+         
+        elif localName == xacmlType.COMBINER_PARAMETERS_LOCAL_NAME:
+            raise NotImplementedError()
+        
+        elif localName == xacmlType.RULE_COMBINER_PARAMETERS_LOCAL_NAME:
+            raise NotImplementedError()
+        
+        elif localName == VariableDefinition.ELEMENT_LOCAL_NAME:
+            VariableDefinitionReader = ReaderFactory.getReader(
+                                                        VariableDefinition)
+            variableDefinition = VariableDefinitionReader.parse(childElem,
+                                                                common)
             
-            else:
-                raise XMLParseError("XACML Policy child element name %r not "
-                                    "recognised" % localName)
+        elif localName == Rule.ELEMENT_LOCAL_NAME:
+            RuleReader = ReaderFactory.getReader(Rule)
+            rule = RuleReader.parse(childElem, common)
+            if rule.id in [_rule.id for _rule in policy.rules]:
+                raise XMLParseError("Duplicate Rule ID %r found" % rule.id)
+                
+            policy.rules.append(rule)
+               
+        elif localName == xacmlType.OBLIGATIONS_LOCAL_NAME:
+            raise NotImplementedError('Parsing for Obligations element is '
+                                      'not implemented')
+        
+        else:
+            raise XMLParseError("XACML Policy child element name %r not "
+                                "recognised" % localName)
 
-        # Record reference in case of references to this policy.
-        # Allow for there not being a policy finder since this is not needed if
-        # if the root is a policy rather than a policy set.
+    def _addReference(self, policy, common):
+        """Record reference in case of references to this policy.  Allow for 
+        there not being a policy finder since this is not needed if the root 
+        is a policy rather than a policy set.
+        
+        @param policy: policy read
+        @type policy: ndg.xacml.core.policy.Policy derived type 
+        @param common: parsing common data
+        @type common: from ndg.xacml.parsers.common.Common
+        """
         if common is not None and hasattr(common, 'policyFinder'):
             common.policyFinder.addPolicyReference(policy)
-
-        return policy
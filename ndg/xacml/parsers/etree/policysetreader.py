@@ -54,6 +54,28 @@ class PolicySetReader(ETreeAbstractReader):
         @raise NotImplementedError: parsing is not implemented for rule
         combiner, combiner parameters and obligations elements.
         """
+        policySet = self._processAttributes(elem)
+
+        # Parse sub-elements
+        for childElem in getElementChildren(elem):
+            self._processChildElement(policySet, childElem, common)
+
+        self._addReference(policySet, common)
+
+        return policySet
+
+    def _processAttributes(self, elem):
+        """Create a new policy set from the attributes of the policy set 
+        element.  Child elements are not read.  This enables the policy set 
+        to be created from the start tag alone when reading a document 
+        incrementally
+
+        @param elem: root element of policy set
+        @type elem: ElementTree Element
+        @return: new XACML expression instance
+        @rtype: ndg.xacml.core.policy.PolicySet derived type
+        @raise XMLParseError: error reading element
+        """
         # XACML type to instantiate
         xacmlType = self.TYPE
         policySet = xacmlType()
@@ -83,72 +105,92 @@ class PolicySetReader(ETreeAbstractReader):
         policySet.version = (elem.attrib.get(xacmlType.VERSION_ATTRIB_NAME) or
                           xacmlType.DEFAULT_XACML_VERSION)
 
-        # Parse sub-elements
-        for childElem in getElementChildren(elem):
-            localName = QName.getLocalPart(childElem.tag)
-
-            if localName == xacmlType.DESCRIPTION_LOCAL_NAME:
-                if childElem.text is not None:
-                    policySet.description = childElem.text.strip()
-
-            elif localName == xacmlType.POLICY_SET_DEFAULTS_LOCAL_NAME:
-                PolicyDefaultsReader = ReaderFactory.getReader(PolicyDefaults)
-                policySet.policyDefaults = PolicyDefaultsReader.parse(childElem,
-                                                                      common)
-
-            elif localName == Target.ELEMENT_LOCAL_NAME:
-                TargetReader = ReaderFactory.getReader(Target)
-                policySet.target = TargetReader.parse(childElem, common)
-
-            elif localName == xacmlType.COMBINER_PARAMETERS_LOCAL_NAME:
-                raise NotImplementedError()
-
-            elif localName == xacmlType.POLICY_COMBINER_PARAMETERS_LOCAL_NAME:
-                raise NotImplementedError()
-
-            elif (localName ==
-                  xacmlType.POLICY_SET_COMBINER_PARAMETERS_LOCAL_NAME):
-                raise NotImplementedError()
-
-            elif localName == VariableDefinition.ELEMENT_LOCAL_NAME:
-                VariableDefinitionReader = ReaderFactory.getReader(
-                                                            VariableDefinition)
-                variableDefinition = VariableDefinitionReader.parse(childElem,
-                                                                    common)
-
-            elif localName == Policy.ELEMENT_LOCAL_NAME:
-                PolicyReader = ReaderFactory.getReader(Policy)
-                policy = PolicyReader.parse(childElem, common)
-                policySet.policies.append(policy)
-
-            elif localName == Policy.POLICY_ID_REFERENCE:
-                policyIdReference = childElem.text
-                policySet.policies.append(self._getReferencedPolicy(common,
-                                                            policyIdReference))
-
-            elif localName == PolicySet.ELEMENT_LOCAL_NAME:
-                PolicySetReader = ReaderFactory.getReader(PolicySet)
-                policySetChild = PolicySetReader.parse(childElem, common)
-                policySet.policies.append(policySetChild)
-
-            elif localName == PolicySet.POLICY_SET_ID_REFERENCE:
-                policySetIdReference = childElem.text
-                policySet.policies.append(self._getReferencedPolicySet(common,
-                                                        policySetIdReference))
-
-            elif localName == xacmlType.OBLIGATIONS_LOCAL_NAME:
-                raise NotImplementedError('Parsing for Obligations element is '
-                                          'not implemented')
-
-            else:
-                raise XMLParseError("XACML PolicySet child element name %r not "
-                                    "recognised" % localName)
-
-        # Record reference in case of references to this policy set.
-        common.policyFinder.addPolicySetReference(policySet)
-
         return policySet
 
+    def _processChildElement(self, policySet, childElem, common):
+        """Parse a child element of a policy set, updating the policy set with
+        it.  Child policies and policy sets are read in full.
+
+        @param policySet: policy set being read
+        @type policySet: ndg.xacml.core.policy.PolicySet derived type
+        @param childElem: child element of the policy set element
+        @type childElem: ElementTree Element
+        @param common: parsing common data
+        @type common: from ndg.xacml.parsers.common.Common
+        @raise XMLParseError: error reading element
+        @raise NotImplementedError: parsing is not implemented for rule
+        combiner, combiner parameters and obligations elements.
+        """
+        xacmlType = self.TYPE
+        localName = QName.getLocalPart(childElem.tag)
+
+        if localName == xacmlType.DESCRIPTION_LOCAL_NAME:
+            if childElem.text is not None:
+                policySet.description = childElem.text.strip()
+
+        elif localName == xacmlType.POLICY_SET_DEFAULTS_LOCAL_NAME:
+            PolicyDefaultsReader = ReaderFactory.getReader(PolicyDefaults)
+            policySet.policyDefaults = PolicyDefaultsReader.parse(childElem,
+                                                                  common)
+
+        elif localName == Target.ELEMENT_LOCAL_NAME:
+            TargetReader = ReaderFactory.getReader(Target)
+            policySet.target = TargetReader.parse(childElem, common)
+
+        elif localName == xacmlType.COMBINER_PARAMETERS_LOCAL_NAME:
+            raise NotImplementedError()
+
+        elif localName == xacmlType.POLICY_COMBINER_PARAMETERS_LOCAL_NAME:
+            raise NotImplementedError()
+
+        elif (localName ==
+              xacmlType.POLICY_SET_COMBINER_PARAMETERS_LOCAL_NAME):
+            raise NotImplementedError()
+
+        elif localName == VariableDefinition.ELEMENT_LOCAL_NAME:
+            VariableDefinitionReader = ReaderFactory.getReader(
+                                                        VariableDefinition)
+            variableDefinition = VariableDefinitionReader.parse(childElem,
+                                                                common)
+
+        elif localName == Policy.ELEMENT_LOCAL_NAME:
+            PolicyReader = ReaderFactory.getReader(Policy)
+            policy = PolicyReader.parse(childElem, common)
+            policySet.policies.append(policy)
+
+        elif localName == Policy.POLICY_ID_REFERENCE:
+            policyIdReference = childElem.text
+            policySet.policies.append(self._getReferencedPolicy(common,
+                                                        policyIdReference))
+
+        elif localName == PolicySet.ELEMENT_LOCAL_NAME:
+            PolicySetReader = ReaderFactory.getReader(PolicySet)
+            policySetChild = PolicySetReader.parse(childElem, common)
+            policySet.policies.append(policySetChild)
+
+        elif localName == PolicySet.POLICY_SET_ID_REFERENCE:
+            policySetIdReference = childElem.text
+            policySet.policies.append(self._getReferencedPolicySet(common,
+                                                    policySetIdReference))
+
+        elif localName == xacmlType.OBLIGATIONS_LOCAL_NAME:
+            raise NotImplementedError('Parsing for Obligations element is '
+                                      'not implemented')
+
+        else:
+            raise XMLParseError("XACML PolicySet child element name %r not "
+                                "recognised" % localName)
+
+    def _addReference(self, policySet, common):
+        """Record reference in case of references to this policy set.
+
+        @param policySet: policy set read
+        @type policySet: ndg.xacml.core.policy.PolicySet derived type
+        @param common: parsing common data
+        @type common: from ndg.xacml.parsers.common.Common
+        """
+        common.policyFinder.addPolicySetReference(policySet)
+
     def _getReferencedPolicy(self, common, policyIdReference):
         """Retrieve policy referenced by ID.
         @param common: parsing common data
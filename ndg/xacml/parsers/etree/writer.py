@@ -1,4 +1,4 @@
-"""NDG XACML ElementTree writer base module 
+"""NDG XACML ElementTree writer base module
 
 NERC DataGrid
 """
@@ -8,4 +8,517 @@ __copyright__ = "(C) 2010 Science and Technology Facilities Council"
 __contact__ = "Philip.Kershaw@stfc.ac.uk"
 __license__ = "BSD - see LICENSE file in top-level directory"
 __contact__ = "Philip.Kershaw@stfc.ac.uk"
-__revision__ = "$Id$"
\ No newline at end of file
+__revision__ = "$Id$"
+import logging
+log = logging.getLogger(__name__)
+from datetime import datetime, timedelta
+from xml.sax.saxutils import quoteattr
+
+from ndg.xacml import importElementTree
+ElementTree = importElementTree()
+
+from ndg.xacml.core import XacmlPolicyBase, TargetChildBase
+from ndg.xacml.core.policy import Policy
+from ndg.xacml.core.policyset import PolicySet
+from ndg.xacml.core.policydefaults import PolicyDefaults
+from ndg.xacml.core.rule import Rule
+from ndg.xacml.core.target import Target
+from ndg.xacml.core.match import MatchBase
+from ndg.xacml.core.condition import Condition
+from ndg.xacml.core.apply import Apply
+from ndg.xacml.core.attributevalue import AttributeValue
+from ndg.xacml.core.attributedesignator import AttributeDesignator
+from ndg.xacml.core.attributeselector import AttributeSelector
+from ndg.xacml.parsers import XMLWriteError
+from ndg.xacml.utils import VettedDict
+
+
+class PolicyWriter(object):
+    """ElementTree based writer for XACML policies and policy sets and their
+    constituent rules, targets, matches and expressions.  Output can be read
+    back with the ElementTree readers.
+
+    write streams a policy or policy set to a file or stream: the policy and
+    policy set start and end tags are written directly and their child
+    elements - targets, rules and child policies - are serialised one at a
+    time so that the whole document tree for a large policy set is never held
+    in memory.
+
+    toElement creates an element for any of the supported types.  Elements
+    are created without a namespace so that they take that of the document
+    they're added to.
+
+    @cvar XML_DECLARATION: XML declaration written at the start of documents
+    @type XML_DECLARATION: bytes
+    @cvar ENCODING: document encoding
+    @type ENCODING: string
+    @cvar DEFAULT_XMLNS: default namespace for written documents where the
+    policy has none set
+    @type DEFAULT_XMLNS: string
+    @cvar ELEMENT_METHOD_NAMES: names of the methods to create elements for
+    each type.  Types not included are looked up by their base classes.
+    @type ELEMENT_METHOD_NAMES: dict
+    """
+    XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    ENCODING = 'utf-8'
+    DEFAULT_XMLNS = XacmlPolicyBase.XACML_2_0_POLICY_NS
+
+    ELEMENT_METHOD_NAMES = {
+        Policy: '_policyElement',
+        PolicySet: '_policySetElement',
+        PolicyDefaults: '_policyDefaultsElement',
+        Rule: '_ruleElement',
+        Target: '_targetElement',
+        TargetChildBase: '_targetChildElement',
+        MatchBase: '_matchElement',
+        Condition: '_conditionElement',
+        Apply: '_applyElement',
+        AttributeValue: '_attributeValueElement',
+        AttributeDesignator: '_attributeDesignatorElement',
+        AttributeSelector: '_attributeSelectorElement'
+    }
+
+    @classmethod
+    def write(cls, policy, dest):
+        """Write a policy or policy set document
+
+        @param policy: policy or policy set to write
+        @type policy: ndg.xacml.core.policy.Policy /
+        ndg.xacml.core.policyset.PolicySet
+        @param dest: file path or binary stream to write to
+        @type dest: string / file like object
+        @raise XMLWriteError: policy includes a type which can't be written
+        """
+        if isinstance(dest, str):
+            with open(dest, 'wb') as stream:
+                cls._write(policy, stream)
+        else:
+            cls._write(policy, dest)
+
+    @classmethod
+    def toString(cls, policy):
+        """Serialise a policy or policy set document
+
+        @param policy: policy or policy set to write
+        @type policy: ndg.xacml.core.policy.Policy /
+        ndg.xacml.core.policyset.PolicySet
+        @return: policy document
+        @rtype: bytes
+        @raise XMLWriteError: policy includes a type which can't be written
+        """
+        chunks = []
+        cls._write(policy, _ChunkStream(chunks))
+        return b''.join(chunks)
+
+    @classmethod
+    def toElement(cls, xacmlObj):
+        """Create an element for a XACML object
+
+        @param xacmlObj: policy, policy set, rule, target or other XACML policy
+        type
+        @type xacmlObj: ndg.xacml.core.XacmlCoreBase derived type
+        @return: element
+        @rtype: ElementTree Element
+        @raise XMLWriteError: no writer is available for the object's type
+        """
+        for xacmlType in type(xacmlObj).__mro__:
+            methodName = cls.ELEMENT_METHOD_NAMES.get(xacmlType)
+            if methodName is not None:
+                return getattr(cls, methodName)(xacmlObj)
+
+        raise XMLWriteError('No writer available for %r type' %
+                            type(xacmlObj))
+
+    @classmethod
+    def _write(cls, policy, stream):
+        """Write document to a stream
+        """
+        if not isinstance(policy, (Policy, PolicySet)):
+            raise XMLWriteError('Expecting %r or %r type for policy document; '
+                                'got %r' % (Policy, PolicySet, type(policy)))
+
+        stream.write(cls.XML_DECLARATION)
+        cls._writePolicy(policy, stream, set(),
+                         xmlns=policy.xmlns or cls.DEFAULT_XMLNS)
+        stream.write(b'\n')
+
+    @classmethod
+    def _writePolicy(cls, policy, stream, writtenPolicies, xmlns=None):
+        """Write a policy or policy set element to a stream serialising its
+        child elements one at a time.  Policies and policy sets already
+        written are referred to by ID.
+
+        @param policy: policy or policy set to write
+        @type policy: ndg.xacml.core.policy.Policy /
+        ndg.xacml.core.policyset.PolicySet
+        @param stream: binary stream to write to
+        @type stream: file like object
+        @param writtenPolicies: element names and IDs of the policies and
+        policy sets written so far
+        @type writtenPolicies: set
+        @param xmlns: namespace to set on the element or None for child
+        policies which take the namespace of their parent
+        @type xmlns: string / NoneType
+        """
+        if cls._isWritten(policy, writtenPolicies):
+            stream.write(cls._serialise(cls._policyReferenceElement(policy)))
+            return
+
+        attributes = cls._getPolicyAttributes(policy)
+        if xmlns is not None:
+            attributes.insert(0, ('xmlns', xmlns))
+
+        tagName = policy.ELEMENT_LOCAL_NAME
+        startTag = '<%s %s>' % (tagName, ' '.join(['%s=%s' % (name,
+                                                              quoteattr(value))
+                                                   for name, value in
+                                                   attributes]))
+        stream.write(startTag.encode(cls.ENCODING))
+
+        for childElem in cls._getPolicyHeaderElements(policy):
+            stream.write(cls._serialise(childElem))
+
+        if isinstance(policy, PolicySet):
+            for childPolicy in policy.policies:
+                cls._writePolicy(childPolicy, stream, writtenPolicies)
+        else:
+            for rule in policy.rules:
+                stream.write(cls._serialise(cls._ruleElement(rule)))
+
+        stream.write(('</%s>' % tagName).encode(cls.ENCODING))
+
+    @staticmethod
+    def _isWritten(policy, writtenPolicies):
+        """Check whether a policy or policy set has already been written
+        recording it as written if not
+
+        @return: True if the policy has been written already
+        @rtype: bool
+        """
+        key = (policy.ELEMENT_LOCAL_NAME, policy.ident)
+        if key in writtenPolicies:
+            return True
+
+        writtenPolicies.add(key)
+        return False
+
+    @classmethod
+    def _policyReferenceElement(cls, policy):
+        if isinstance(policy, PolicySet):
+            localName = PolicySet.POLICY_SET_ID_REFERENCE
+        else:
+            localName = Policy.POLICY_ID_REFERENCE
+
+        return cls._textElement(localName, policy.ident)
+
+    @classmethod
+    def _serialise(cls, elem):
+        return ElementTree.tostring(elem, encoding=cls.ENCODING)
+
+    @staticmethod
+    def _getPolicyAttributes(policy):
+        """Get XML attributes for a policy or policy set element
+
+        @return: list of attribute name, value tuples
+        @rtype: list
+        """
+        if isinstance(policy, PolicySet):
+            attributes = [
+                (PolicySet.POLICY_SET_ID_ATTRIB_NAME, policy.policySetId),
+                (PolicySet.POLICY_COMBINING_ALG_ID_ATTRIB_NAME,
+                 policy.policyCombiningAlgId)
+            ]
+        else:
+            attributes = [
+                (Policy.POLICY_ID_ATTRIB_NAME, policy.policyId),
+                (Policy.RULE_COMBINING_ALG_ID_ATTRIB_NAME,
+                 policy.ruleCombiningAlgId)
+            ]
+
+        if policy.version is not None:
+            attributes.append((policy.VERSION_ATTRIB_NAME, policy.version))
+
+        return attributes
+
+    @classmethod
+    def _getPolicyHeaderElements(cls, policy):
+        """Get description, defaults and target elements for a policy or
+        policy set
+
+        @return: list of elements
+        @rtype: list
+        """
+        elems = []
+        if policy.description is not None:
+            elems.append(cls._textElement(policy.DESCRIPTION_LOCAL_NAME,
+                                          policy.description))
+
+        if isinstance(policy, PolicySet):
+            policyDefaults = policy.policySetDefaults
+            defaultsLocalName = PolicySet.POLICY_SET_DEFAULTS_LOCAL_NAME
+        else:
+            policyDefaults = policy.policyDefaults
+            defaultsLocalName = Policy.POLICY_DEFAULTS_LOCAL_NAME
+
+        if policyDefaults is not None:
+            defaultsElem = cls._policyDefaultsElement(policyDefaults)
+            defaultsElem.tag = defaultsLocalName
+            elems.append(defaultsElem)
+
+        if policy.target is not None:
+            elems.append(cls._targetElement(policy.target))
+
+        return elems
+
+    @classmethod
+    def _policyElement(cls, policy):
+        elem = ElementTree.Element(Policy.ELEMENT_LOCAL_NAME,
+                                   dict(cls._getPolicyAttributes(policy)))
+        elem.extend(cls._getPolicyHeaderElements(policy))
+        for rule in policy.rules:
+            elem.append(cls._ruleElement(rule))
+        return elem
+
+    @classmethod
+    def _policySetElement(cls, policySet, writtenPolicies=None):
+        if writtenPolicies is None:
+            writtenPolicies = set([(PolicySet.ELEMENT_LOCAL_NAME,
+                                    policySet.ident)])
+
+        elem = ElementTree.Element(PolicySet.ELEMENT_LOCAL_NAME,
+                                   dict(cls._getPolicyAttributes(policySet)))
+        elem.extend(cls._getPolicyHeaderElements(policySet))
+        for policy in policySet.policies:
+            if cls._isWritten(policy, writtenPolicies):
+                elem.append(cls._policyReferenceElement(policy))
+            elif isinstance(policy, PolicySet):
+                elem.append(cls._policySetElement(policy, writtenPolicies))
+            else:
+                elem.append(cls._policyElement(policy))
+        return elem
+
+    @classmethod
+    def _policyDefaultsElement(cls, policyDefaults):
+        elem = ElementTree.Element(PolicyDefaults.ELEMENT_LOCAL_NAME)
+        elem.append(cls._textElement(PolicyDefaults.XPATH_VERSION_ELEMENT_NAME,
+                                     policyDefaults.xpathVersion))
+        return elem
+
+    @classmethod
+    def _ruleElement(cls, rule):
+        elem = ElementTree.Element(Rule.ELEMENT_LOCAL_NAME, {
+            Rule.RULE_ID_ATTRIB_NAME: rule.id,
+            Rule.EFFECT_ATTRIB_NAME: rule.effect.value
+        })
+        if rule.description is not None:
+            elem.append(cls._textElement(Rule.DESCRIPTION_LOCAL_NAME,
+                                         rule.description))
+        if rule.target is not None:
+            elem.append(cls._targetElement(rule.target))
+
+        if rule.condition is not None:
+            elem.append(cls._conditionElement(rule.condition))
+
+        return elem
+
+    @classmethod
+    def _targetElement(cls, target):
+        elem = ElementTree.Element(Target.ELEMENT_LOCAL_NAME)
+
+        # Sections with no children match any request and are omitted
+        for localName, children in (
+                (Target.SUBJECTS_ELEMENT_LOCAL_NAME, target.subjects),
+                (Target.RESOURCES_ELEMENT_LOCAL_NAME, target.resources),
+                (Target.ACTIONS_ELEMENT_LOCAL_NAME, target.actions),
+                (Target.ENVIRONMENTS_ELEMENT_LOCAL_NAME, target.environments)):
+            if len(children) > 0:
+                sectionElem = ElementTree.SubElement(elem, localName)
+                for child in children:
+                    sectionElem.append(cls._targetChildElement(child))
+
+        return elem
+
+    @classmethod
+    def _targetChildElement(cls, targetChild):
+        elem = ElementTree.Element(targetChild.ELEMENT_LOCAL_NAME)
+        for match in targetChild.matches:
+            elem.append(cls._matchElement(match))
+        return elem
+
+    @classmethod
+    def _matchElement(cls, match):
+        elem = ElementTree.Element(match.ELEMENT_LOCAL_NAME,
+                                   {MatchBase.MATCH_ID_ATTRIB_NAME:
+                                    match.matchId})
+        elem.append(cls._attributeValueElement(match.attributeValue))
+        if match.attributeDesignator is not None:
+            elem.append(cls._attributeDesignatorElement(
+                                                    match.attributeDesignator))
+        elif match.attributeSelector is not None:
+            elem.append(cls._attributeSelectorElement(match.attributeSelector))
+
+        return elem
+
+    @classmethod
+    def _conditionElement(cls, condition):
+        elem = ElementTree.Element(Condition.ELEMENT_LOCAL_NAME)
+        elem.append(cls.toElement(condition.expression))
+        return elem
+
+    @classmethod
+    def _applyElement(cls, applyObj):
+        elem = ElementTree.Element(Apply.ELEMENT_LOCAL_NAME,
+                                   {Apply.FUNCTION_ID_ATTRIB_NAME:
+                                    applyObj.functionId})
+        for expression in applyObj.expressions:
+            elem.append(cls.toElement(expression))
+        return elem
+
+    @classmethod
+    def _attributeValueElement(cls, attributeValue):
+        elem = ElementTree.Element(AttributeValue.ELEMENT_LOCAL_NAME,
+                                   {AttributeValue.DATA_TYPE_ATTRIB_NAME:
+                                    attributeValue.dataType})
+        writer = DataTypeWriterClassFactory.getWriter(attributeValue)
+        writer.write(attributeValue, elem)
+        return elem
+
+    @classmethod
+    def _attributeDesignatorElement(cls, attributeDesignator):
+        elem = ElementTree.Element(attributeDesignator.ELEMENT_LOCAL_NAME, {
+            AttributeDesignator.ATTRIBUTE_ID_ATTRIB_NAME:
+                attributeDesignator.attributeId,
+            AttributeDesignator.DATA_TYPE_ATTRIB_NAME:
+                attributeDesignator.dataType
+        })
+        if attributeDesignator.issuer is not None:
+            elem.set(AttributeDesignator.ISSUER_ATTRIB_NAME,
+                     attributeDesignator.issuer)
+
+        cls._setMustBePresent(elem, attributeDesignator)
+        return elem
+
+    @classmethod
+    def _attributeSelectorElement(cls, attributeSelector):
+        elem = ElementTree.Element(AttributeSelector.ELEMENT_LOCAL_NAME, {
+            AttributeSelector.REQUEST_CONTEXT_PATH_ATTRIB_NAME:
+                attributeSelector.requestContextPath,
+            AttributeSelector.DATA_TYPE_ATTRIB_NAME:
+                attributeSelector.dataType
+        })
+        cls._setMustBePresent(elem, attributeSelector)
+        return elem
+
+    @staticmethod
+    def _setMustBePresent(elem, expression):
+        if expression.mustBePresent is not None:
+            elem.set(expression.MUST_BE_PRESENT_ATTRIB_NAME,
+                     str(expression.mustBePresent).lower())
+
+    @staticmethod
+    def _textElement(localName, text):
+        elem = ElementTree.Element(localName)
+        elem.text = text
+        return elem
+
+
+class _ChunkStream(object):
+    """Stream collecting the chunks written to it"""
+    def __init__(self, chunks):
+        self.write = chunks.append
+
+
+class ETreeDataTypeWriterBase(object):
+    """Write the value of an attribute value to its element as text.  This is
+    the counterpart of
+    ndg.xacml.parsers.etree.attributevaluereader.ETreeDataTypeReaderBase.
+    Custom attribute value types may add their own writers to
+    DataTypeWriterClassFactory.
+    """
+    @classmethod
+    def write(cls, attributeValue, elem):
+        elem.text = cls.toText(attributeValue.value)
+
+    @staticmethod
+    def toText(value):
+        """Convert an attribute value to its XML text representation
+
+        @param value: attribute value
+        @type value: any - constrained by attribute value type
+        @return: text representation
+        @rtype: string
+        """
+        if isinstance(value, str):
+            return value
+        elif isinstance(value, bool):
+            return str(value).lower()
+        elif isinstance(value, datetime):
+            return value.isoformat()
+        elif isinstance(value, timedelta):
+            return 'P%dDT%dS' % (value.days, value.seconds)
+        else:
+            return str(value)
+
+
+class ETreeDataTypeWriterClassMap(VettedDict):
+    """Specialised dictionary to hold mappings of XACML AttributeValue DataTypes
+    and their equivalent ElementTree writer classes
+    """
+
+    def __init__(self):
+        """Force entries to derive from ETreeDataTypeWriterBase and IDs to
+        be string type
+        """
+        VettedDict.__init__(self, self.keyFilter, self.valueFilter)
+
+    @staticmethod
+    def keyFilter(key):
+        """Enforce string type keys for Attribute Value DataType URIs
+
+        @param key: URN for attribute
+        @type key: basestring
+        @return: boolean True indicating key is OK
+        @rtype: bool
+        @raise TypeError: incorrect input type
+        """
+        if not isinstance(key, str):
+            raise TypeError('Expecting %r derived type for key; got %r' %
+                            (str, type(key)))
+        return True
+
+    @staticmethod
+    def valueFilter(value):
+        """Enforce ElementTree data type writer derived types for values
+        @param value: attribute value writer
+        @type value: ETreeDataTypeWriterBase derived type
+        @return: boolean True indicating writer is correct type
+        @rtype: bool
+        @raise TypeError: incorrect input type
+        """
+        if not issubclass(value, ETreeDataTypeWriterBase):
+            raise TypeError('Expecting %r derived type for value; got %r' %
+                            (ETreeDataTypeWriterBase, type(value)))
+        return True
+
+
+class DataTypeWriterClassFactory(object):
+    """Return class to write the content of the Attribute value based on the
+    DataType setting"""
+    MAP = ETreeDataTypeWriterClassMap()
+    _id = None
+    for _id in AttributeValue.TYPE_URIS:
+        MAP[_id] = ETreeDataTypeWriterBase
+
+    del _id
+
+    @classmethod
+    def addWriter(cls, identifier, writerClass):
+        cls.MAP[identifier] = writerClass
+
+    @classmethod
+    def getWriter(cls, attributeValue):
+        writerClass = cls.MAP.get(attributeValue.dataType)
+        if writerClass is None:
+            raise XMLWriteError('No writer available for %r attribute value '
+                                'data type' % attributeValue.dataType)
+        return writerClass
@@ -0,0 +1,126 @@
+"""NDG XACML benchmark unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from ndg.xacml.core.context.pdp import PDP
+from ndg.xacml.core.context.result import Decision
+from ndg.xacml.bench.corpora import getBundledCorpora
+from ndg.xacml.bench.synthetic import SyntheticCorpus
+from ndg.xacml.bench.runner import BenchmarkRunner, main
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    """Test benchmarks run for bundled and synthetic corpora with small
+    numbers of decisions"""
+    N_DECISIONS = 5
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def test01BundledCorpora(self):
+        for corpus in getBundledCorpora().values():
+            corpus.prepare()
+            try:
+                pdp = PDP(policy=corpus.loadPolicy())
+                requests = corpus.createRequests(pdp.policy,
+                                                 self.__class__.N_DECISIONS)
+            finally:
+                corpus.cleanup()
+
+            self.assertEqual(len(requests), self.__class__.N_DECISIONS)
+            for request in requests:
+                pdp.evaluate(request)
+
+    def test02SyntheticCorpus(self):
+        corpus = SyntheticCorpus(20, nAttributes=5, seed=1)
+        self.assertEqual(len(corpus.createPolicy().rules), 21)
+
+        # Generation is deterministic from the seed
+        corpus.prepare()
+        try:
+            filePath = corpus.filePath
+            with open(filePath, 'rb') as policyFile:
+                policyDoc = policyFile.read()
+
+            corpus.prepare()
+            with open(corpus.filePath, 'rb') as policyFile:
+                self.assertEqual(policyFile.read(), policyDoc)
+
+            pdp = PDP(policy=corpus.loadPolicy())
+        finally:
+            corpus.cleanup()
+
+        self.assertFalse(os.path.exists(filePath))
+
+        requests = corpus.createRequests(pdp.policy, 50)
+        self.assertEqual(len(requests[0].subjects[0].attributes), 6)
+        decisions = set([str(pdp.evaluate(request).results[0].decision)
+                         for request in requests])
+        self.assertEqual(decisions, set([Decision.PERMIT_STR,
+                                         Decision.DENY_STR]))
+
+        self.assertRaises(ValueError, SyntheticCorpus, 0)
+
+    def test03Runner(self):
+        runner = BenchmarkRunner(nDecisions=self.__class__.N_DECISIONS,
+                                 batchSize=2, nRepeats=1)
+        corpus = getBundledCorpora()['eo_policyset']
+        resultsDoc = runner.run([corpus])
+        self.assertEqual(len(resultsDoc['results']),
+                         len(BenchmarkRunner.PDP_CLASSES))
+        for result in resultsDoc['results']:
+            self.assertEqual(sum(result['decisions'].values()),
+                             self.__class__.N_DECISIONS)
+            self.assertTrue(result['latency']['p50'] <=
+                            result['latency']['p99'] <=
+                            result['latency']['max'])
+            self.assertTrue(result['parseTime'] > 0.)
+            self.assertTrue(result['peakMemory'] > 0)
+
+        self.assertEqual(BenchmarkRunner.getPercentile([1, 2, 3, 4], 50), 2)
+        self.assertEqual(BenchmarkRunner.getPercentile([1, 2, 3, 4], 99), 4)
+        self.assertRaises(ValueError, BenchmarkRunner, nDecisions=0)
+
+    def test04CommandLine(self):
+        jsonFilePath = os.path.join(self.tmpDir, 'results.json')
+        output = io.StringIO()
+        with redirect_stdout(output):
+            main(['-c', 'esgf1', '-r', '10', '-a', '3',
+                  '-n', str(self.__class__.N_DECISIONS), '--repeat', '1',
+                  '--no-memory', '-o', jsonFilePath])
+
+        self.assertIn('synthetic-10rules-3attrs', output.getvalue())
+        with open(jsonFilePath) as jsonFile:
+            resultsDoc = json.load(jsonFile)
+
+        self.assertEqual([result['corpus'] for result in
+                          resultsDoc['results']][::2],
+                         ['esgf1', 'synthetic-10rules-3attrs'])
+        self.assertEqual(resultsDoc['parameters']['nDecisions'],
+                         self.__class__.N_DECISIONS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""NDG XACML feature benchmark unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import io
+import logging
+import unittest
+from contextlib import redirect_stdout
+
+from ndg.xacml import Config
+from ndg.xacml.bench.corpora import getBundledCorpora
+from ndg.xacml.bench.features import (FeatureBenchmark,
+                                      ShortCircuitMatchingBenchmark,
+                                      EvaluationTraceBenchmark,
+                                      SnapshotLoadBenchmark, main)
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class FeatureBenchmarkTestCase(unittest.TestCase):
+    """Test feature benchmarks run with small numbers of requests"""
+    N_REQUESTS = 5
+    CORPUS_NAME = 'policy_cmip5'
+
+    def _run(self, benchmarkClass):
+        benchmark = benchmarkClass(nRequests=self.__class__.N_REQUESTS,
+                                   nRepeats=1)
+        corpus = getBundledCorpora()[self.__class__.CORPUS_NAME]
+        results = benchmark.run([corpus])
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['corpus'], self.__class__.CORPUS_NAME)
+        for key, heading, scale in benchmarkClass.COLUMNS:
+            self.assertTrue(results[0][key] > 0., msg=key)
+
+        self.assertIn(self.__class__.CORPUS_NAME,
+                      benchmarkClass.formatResults(results))
+        return results[0]
+
+    def test01ShortCircuitMatching(self):
+        self._run(ShortCircuitMatchingBenchmark)
+
+    def test02EvaluationTrace(self):
+        self._run(EvaluationTraceBenchmark)
+
+        # Settings are restored
+        self.assertFalse(Config.trace)
+        self.assertEqual(logging.getLogger(
+                                EvaluationTraceBenchmark.LOGGER_NAME).level,
+                         logging.NOTSET)
+
+    def test03SnapshotLoad(self):
+        result = self._run(SnapshotLoadBenchmark)
+        self.assertTrue(result['snapshotSize'] > 0)
+
+    def test04CommandLine(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            results = main(['short-circuit', '-c', 'esgf1', '-c',
+                            'policy_cmip5', '-n',
+                            str(self.__class__.N_REQUESTS), '--repeat', '1'])
+
+        self.assertEqual([result['corpus'] for result in results],
+                         ['esgf1', 'policy_cmip5'])
+        self.assertIn('SC time/us', output.getvalue())
+        self.assertRaises(ValueError, FeatureBenchmark, nRequests=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
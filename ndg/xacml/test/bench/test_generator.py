@@ -0,0 +1,159 @@
+"""NDG XACML synthetic policy and request generator unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import io
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from ndg.xacml.core.policybase import PolicyBase
+from ndg.xacml.core.policy import Policy
+from ndg.xacml.core.policyset import PolicySet
+from ndg.xacml.core.context.pdp import PDP, CompiledPDP
+from ndg.xacml.core.context.result import Decision
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+from ndg.xacml.finder.defaultfinder import getDefaultPolicyFinder
+from ndg.xacml.bench.generator import PolicyGenerator
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class PolicyGeneratorTestCase(unittest.TestCase):
+    """Test generation of policy trees and request streams"""
+    FUNCTION_MIX = {
+        'equal': 1.,
+        'regexp': 1.,
+        'at-least-one-member-of': 1.
+    }
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def _createGenerator(self, **kw):
+        kw.setdefault('depth', 2)
+        kw.setdefault('fanOut', 3)
+        kw.setdefault('functionMix', self.__class__.FUNCTION_MIX)
+        kw.setdefault('attributeCardinality', 3)
+        kw.setdefault('seed', 7)
+        return PolicyGenerator(45, **kw)
+
+    def _getPolicies(self, policySet):
+        if isinstance(policySet, Policy):
+            return [policySet]
+
+        policies = []
+        for policy in policySet.policies:
+            policies.extend(self._getPolicies(policy))
+        return policies
+
+    def test01TreeShape(self):
+        generator = self._createGenerator()
+        policySet = generator.createPolicy()
+        self.assertIsInstance(policySet, PolicySet)
+        self.assertEqual(len(policySet.policies), 3)
+        for child in policySet.policies:
+            self.assertIsInstance(child, PolicySet)
+            self.assertEqual(len(child.policies), 3)
+
+        policies = self._getPolicies(policySet)
+        self.assertEqual(len(policies), generator.nPolicies)
+        self.assertEqual(len(policies), 9)
+
+        # One deny rule in each policy besides the generated rules
+        self.assertEqual(sum([len(policy.rules) for policy in policies]),
+                         45 + 9)
+
+        policy = self._createGenerator(depth=0).createPolicy()
+        self.assertIsInstance(policy, Policy)
+        self.assertEqual(len(policy.rules), 46)
+
+    def test02FunctionMix(self):
+        generator = self._createGenerator(functionMix={'equal': 1.})
+        for policy in self._getPolicies(generator.createPolicy()):
+            for rule in policy.rules[:-1]:
+                match = rule.target.resources[0].matches[0]
+                self.assertTrue(match.matchId.endswith(':anyURI-equal'))
+                self.assertIsNone(rule.condition)
+
+        generator = self._createGenerator(
+                                functionMix={'at-least-one-member-of': 1.})
+        for policy in self._getPolicies(generator.createPolicy()):
+            for rule in policy.rules[:-1]:
+                self.assertTrue(rule.condition.expression.functionId.endswith(
+                                ':string-at-least-one-member-of'))
+                roleBag = rule.condition.expression.expressions[1]
+                self.assertEqual(len(roleBag.expressions), 3)
+
+        self.assertEqual(PolicyGenerator.parseFunctionMix('equal=1,regexp=3'),
+                         {'equal': 1., 'regexp': 3.})
+        self.assertRaises(ValueError, PolicyGenerator.parseFunctionMix,
+                          'equal')
+        self.assertRaises(ValueError, PolicyGenerator, 10,
+                          functionMix={'string-equal': 1.})
+        self.assertRaises(ValueError, PolicyGenerator, 10, hitFraction=2.)
+        self.assertRaises(ValueError, PolicyGenerator, 10, fanOut=0)
+        self.assertRaises(TypeError, PolicyGenerator, 10, depth=1.5)
+
+    def test03Deterministic(self):
+        policyDocs = []
+        for i in range(2):
+            stream = io.BytesIO()
+            self._createGenerator().write(stream)
+            policyDocs.append(stream.getvalue())
+        self.assertEqual(policyDocs[0], policyDocs[1])
+
+        stream = io.BytesIO()
+        self._createGenerator(seed=8).write(stream)
+        self.assertNotEqual(stream.getvalue(), policyDocs[0])
+
+        generator = self._createGenerator()
+        resourceIds = [
+            [request.resources[0].attributes[0].attributeValues[0].value
+             for request in generator.createRequests(20)]
+            for i in range(2)
+        ]
+        self.assertEqual(resourceIds[0], resourceIds[1])
+
+    def test04HitsAndMisses(self):
+        generator = self._createGenerator(hitFraction=0.5)
+
+        # Evaluate the policy read back from its XML document as well as the
+        # generated objects
+        filePath = os.path.join(self.tmpDir, 'generated-policy.xml')
+        generator.write(filePath)
+        policy = PolicyBase.fromSource(filePath, ReaderFactory,
+                                       getDefaultPolicyFinder(filePath))
+        self.assertIsInstance(policy, PolicySet)
+
+        requests = list(generator.iterRequests(100))
+        nHits = len([isHit for request, isHit in requests if isHit])
+        self.assertTrue(0 < nHits < 100)
+
+        for pdp in (PDP(policy=generator.createPolicy()),
+                    PDP(policy=policy),
+                    CompiledPDP(policy=policy)):
+            for request, isHit in requests:
+                self.assertEqual(len(request.subjects[0].attributes), 4)
+                decision = str(pdp.evaluate(request).results[0].decision)
+                if isHit:
+                    self.assertEqual(decision, Decision.PERMIT_STR)
+                else:
+                    self.assertEqual(decision, Decision.DENY_STR)
+
+
+if __name__ == "__main__":
+    unittest.main()
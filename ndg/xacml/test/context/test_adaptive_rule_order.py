@@ -0,0 +1,264 @@
+"""NDG XACML adaptive rule ordering unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import logging
+import threading
+import unittest
+
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+from ndg.xacml.core.policy import Policy
+from ndg.xacml.core.policyset import PolicySet
+from ndg.xacml.core.rule import Rule, Effect
+from ndg.xacml.core.ruleorder import AdaptiveRuleOrder
+from ndg.xacml.core.context.pdp import PDP, CompiledPDP
+from ndg.xacml.core.context.result import Decision
+from ndg.xacml.test.context.test_compiled_pdp import DifferentialTestHarness
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class FixedDecisionRule(Rule):
+    """Rule returning a fixed decision and counting its evaluations"""
+    __slots__ = ('decision', 'nEvaluations')
+
+    def __init__(self, ruleId, effect, decision):
+        super(FixedDecisionRule, self).__init__()
+        self.id = ruleId
+        self.effect = Effect(effect)
+        self.decision = decision
+        self.nEvaluations = 0
+
+    def evaluate(self, context):
+        self.nEvaluations += 1
+        return self.decision
+
+
+class AdaptiveRuleOrderTestCase(DifferentialTestHarness):
+    """Test evaluation of rules in an order learnt at runtime"""
+    DENY_OVERRIDES = ('urn:oasis:names:tc:xacml:1.0:rule-combining-algorithm:'
+                      'deny-overrides')
+    PERMIT_OVERRIDES = ('urn:oasis:names:tc:xacml:1.0:rule-combining-'
+                        'algorithm:permit-overrides')
+    FIRST_APPLICABLE = ('urn:oasis:names:tc:xacml:1.0:rule-combining-'
+                        'algorithm:first-applicable')
+
+    @staticmethod
+    def _createPolicy(ruleCombiningAlgId, rules):
+        policy = Policy()
+        policy.policyId = 'urn:ndg:xacml:test:adaptive-rule-order'
+        policy.ruleCombiningAlgId = ruleCombiningAlgId
+        policy.rules.extend(rules)
+        return policy
+
+    @staticmethod
+    def _getPolicies(policy):
+        policies = [policy]
+        while policies:
+            policy = policies.pop()
+            if isinstance(policy, PolicySet):
+                policies.extend(policy.policies)
+            else:
+                yield policy
+
+    def _evaluate(self, pdp, requests):
+        return [str(pdp.evaluate(request).results[0].decision)
+                for request in requests]
+
+    def test01SameDecisions(self):
+        for filePath in self.__class__.POLICY_FILEPATHS:
+            for pdpClass in (PDP, CompiledPDP):
+                pdp = pdpClass.fromPolicySource(filePath, ReaderFactory)
+                requests = list(self._getRequests(pdp.policy))
+                decisions = self._evaluate(pdp, requests)
+
+                pdp.adaptiveRuleOrdering = True
+                for policy in self._getPolicies(pdp.policy):
+                    if not policy.ruleCombiningAlg.ORDER_INDEPENDENT:
+                        self.assertIsNone(pdp.getAdaptiveRuleOrder(policy))
+                    elif pdp.getAdaptiveRuleOrder(policy) is not None:
+                        pdp.adaptiveRuleOrders[id(policy)] = \
+                                        AdaptiveRuleOrder(sampleInterval=3)
+
+                # Evaluate twice so that requests are evaluated both in
+                # samples and in the order learnt
+                for i in range(2):
+                    self.assertEqual(self._evaluate(pdp, requests), decisions,
+                                     msg=filePath)
+
+                pdp.adaptiveRuleOrdering = False
+                self.assertIsNone(pdp.adaptiveRuleOrders)
+                for policy in self._getPolicies(pdp.policy):
+                    self.assertIsNone(pdp.getAdaptiveRuleOrder(policy))
+
+    def test02OverridingRulesFirst(self):
+        for pdpClass in (PDP, CompiledPDP):
+            for ruleCombiningAlgId, effect, decision in (
+                    (self.__class__.DENY_OVERRIDES, Effect.DENY_STR,
+                     Decision.DENY),
+                    (self.__class__.PERMIT_OVERRIDES, Effect.PERMIT_STR,
+                     Decision.PERMIT)):
+                otherEffect = (Effect.PERMIT_STR
+                               if effect == Effect.DENY_STR
+                               else Effect.DENY_STR)
+                rules = [FixedDecisionRule('rule%d' % i, otherEffect,
+                                           Decision.getInstance(otherEffect))
+                         for i in range(4)]
+                rules.append(FixedDecisionRule('overriding', effect, decision))
+                policy = self._createPolicy(ruleCombiningAlgId, rules)
+                pdp = pdpClass(policy=policy, adaptiveRuleOrdering=True)
+                ruleOrder = pdp.getAdaptiveRuleOrder(policy)
+                request = self._createRequestCtx('http://localhost/')
+
+                # The first evaluation is a sample evaluating all the rules
+                self.assertEqual(self._evaluate(pdp, [request]),
+                                 [str(decision)])
+                self.assertEqual([rule.nEvaluations for rule in rules],
+                                 [1] * len(rules))
+                self.assertEqual(ruleOrder.order[0], len(rules) - 1)
+                ruleStats = ruleOrder.getRuleStats()
+                self.assertEqual(ruleStats[-1][:2], (1., 1.))
+                self.assertEqual(ruleStats[0][:2], (1., 0.))
+
+                # The overriding rule is now evaluated first
+                self.assertEqual(self._evaluate(pdp, [request] * 2),
+                                 [str(decision)] * 2)
+                self.assertEqual([rule.nEvaluations for rule in rules],
+                                 [1, 1, 1, 1, 3])
+                self.assertEqual(ruleOrder.nEvaluations, 3)
+                self.assertEqual(ruleOrder.nSamples, 1)
+
+    def test03IndeterminateUnchanged(self):
+        for pdpClass in (PDP, CompiledPDP):
+            rules = [
+                FixedDecisionRule('deny0', Effect.DENY_STR, Decision.DENY),
+                FixedDecisionRule('error', Effect.PERMIT_STR,
+                                  Decision.INDETERMINATE),
+                FixedDecisionRule('deny1', Effect.DENY_STR, Decision.DENY)
+            ]
+            policy = self._createPolicy(self.__class__.PERMIT_OVERRIDES,
+                                        rules)
+            pdp = pdpClass(policy=policy, adaptiveRuleOrdering=True)
+            pdp.adaptiveRuleOrders[id(policy)] = AdaptiveRuleOrder(
+                                                            sampleInterval=2)
+            request = self._createRequestCtx('http://localhost/')
+            self.assertEqual(self._evaluate(pdp, [request] * 5),
+                             [Decision.INDETERMINATE_STR] * 5)
+
+            # Every rule has to be evaluated to find no rule permits
+            self.assertEqual([rule.nEvaluations for rule in rules], [5] * 3)
+
+    def test04FirstApplicableNotReordered(self):
+        rules = [FixedDecisionRule('permit', Effect.PERMIT_STR,
+                                   Decision.PERMIT),
+                 FixedDecisionRule('deny', Effect.DENY_STR, Decision.DENY)]
+        policy = self._createPolicy(self.__class__.FIRST_APPLICABLE, rules)
+        for pdpClass in (PDP, CompiledPDP):
+            pdp = pdpClass(policy=policy, adaptiveRuleOrdering=True)
+            self.assertEqual(pdp.adaptiveRuleOrders, {})
+
+            # Even if set explicitly the order isn't applied
+            ruleOrder = AdaptiveRuleOrder(sampleInterval=1)
+            pdp.adaptiveRuleOrders[id(policy)] = ruleOrder
+            request = self._createRequestCtx('http://localhost/')
+            self.assertEqual(self._evaluate(pdp, [request] * 3),
+                             [Decision.PERMIT_STR] * 3)
+            self.assertEqual(ruleOrder.nEvaluations, 0)
+            self.assertEqual(rules[1].nEvaluations, 0)
+
+    def test05RuleChangesAndErrors(self):
+        ruleOrder = AdaptiveRuleOrder(sampleInterval=4, maxSamples=2)
+        for i in range(3):
+            ruleOrder.recordSample((Decision.PERMIT, Decision.DENY),
+                                   (1., 1.), Decision.DENY)
+        self.assertEqual(ruleOrder.getOrder(2), (1, 0))
+
+        # Statistics are halved after the maximum number of samples
+        self.assertEqual(ruleOrder.nSamples, 2.)
+        self.assertEqual(ruleOrder.getRuleStats()[1], (1., 1., 1.))
+
+        # The order is only applied for the same number of rules
+        self.assertIsNone(ruleOrder.getOrder(3))
+        ruleOrder.recordSample((Decision.DENY, Decision.NOT_APPLICABLE,
+                                Decision.NOT_APPLICABLE), (1., 1., 1.),
+                               Decision.DENY)
+        self.assertEqual(ruleOrder.nSamples, 1)
+        self.assertEqual(ruleOrder.getOrder(3), (0, 1, 2))
+
+        self.assertEqual([ruleOrder.isSampleDue() for i in range(5)],
+                         [True, False, False, False, True])
+        ruleOrder.reset()
+        self.assertIsNone(ruleOrder.order)
+        self.assertEqual(ruleOrder.getRuleStats(), [])
+
+        self.assertRaises(ValueError, AdaptiveRuleOrder, sampleInterval=0)
+        self.assertRaises(TypeError, AdaptiveRuleOrder, maxSamples='10')
+        self.assertRaises(TypeError, PDP, adaptiveRuleOrdering=1)
+
+    def test06PoliciesSharedBetweenPDPs(self):
+        for pdpClass in (PDP, CompiledPDP):
+            rules = [FixedDecisionRule('permit%d' % i, Effect.PERMIT_STR,
+                                       Decision.PERMIT) for i in range(2)]
+            rules.append(FixedDecisionRule('deny', Effect.DENY_STR,
+                                           Decision.DENY))
+            policy = self._createPolicy(self.__class__.DENY_OVERRIDES, rules)
+            pdp = pdpClass(policy=policy, adaptiveRuleOrdering=True)
+            otherPdp = pdpClass(policy=policy, adaptiveRuleOrdering=True)
+            nonAdaptivePdp = pdpClass(policy=policy)
+            request = self._createRequestCtx('http://localhost/')
+            self._evaluate(pdp, [request])
+            ruleOrder = pdp.getAdaptiveRuleOrder(policy)
+            self.assertEqual(ruleOrder.order[0], 2)
+            self.assertIsNot(otherPdp.getAdaptiveRuleOrder(policy), ruleOrder)
+
+            # A PDP without adaptive rule ordering evaluates the rules in 
+            # their original order
+            self.assertEqual(self._evaluate(nonAdaptivePdp, [request]),
+                             [Decision.DENY_STR])
+            self.assertEqual([rule.nEvaluations for rule in rules], [2] * 3)
+            self.assertEqual(ruleOrder.nEvaluations, 1)
+
+            # Disabling for one PDP leaves the order of another
+            otherPdp.adaptiveRuleOrdering = False
+            self.assertIs(pdp.getAdaptiveRuleOrder(policy), ruleOrder)
+            self.assertEqual(self._evaluate(pdp, [request]),
+                             [Decision.DENY_STR])
+            self.assertEqual([rule.nEvaluations for rule in rules], [2, 2, 3])
+            self.assertEqual(ruleOrder.nEvaluations, 2)
+            self.assertIsNone(request.adaptiveRuleOrders)
+
+    def test07ConcurrentSamples(self):
+        ruleOrder = AdaptiveRuleOrder(sampleInterval=2, maxSamples=10**6)
+        nThreads = 8
+        nSamples = 500
+
+        def recordSamples():
+            for i in range(nSamples):
+                ruleOrder.isSampleDue()
+                ruleOrder.recordSample((Decision.PERMIT, Decision.DENY),
+                                       (1., 1.), Decision.DENY)
+
+        threads = [threading.Thread(target=recordSamples)
+                   for i in range(nThreads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(ruleOrder.nEvaluations, nThreads * nSamples)
+        self.assertEqual(ruleOrder.nSamples, nThreads * nSamples)
+        self.assertEqual(ruleOrder.getRuleStats(), [(1., 0., 1.),
+                                                    (1., 1., 1.)])
+        self.assertEqual(ruleOrder.order, (1, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
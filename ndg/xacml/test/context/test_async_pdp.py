@@ -0,0 +1,273 @@
+"""NDG XACML asynchronous PDP unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import asyncio
+import logging
+import time
+import unittest
+
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+from ndg.xacml.core.context.asyncpdp import AsyncPDP, PIPQueryRecorder
+from ndg.xacml.core.context.handler import AsyncCtxHandlerBase
+from ndg.xacml.core.context.metrics import InMemoryMetricsSink
+from ndg.xacml.core.context.pdp import PDP, CompiledPDP
+from ndg.xacml.core.context.pipcache import PIPCache
+from ndg.xacml.core.context.pipinterface import AsyncPIPInterface
+from ndg.xacml.core.context.result import Decision
+from ndg.xacml.test import XACML_NDGTEST1_FILEPATH
+from ndg.xacml.test.context import (XacmlContextBaseTestCase,
+                                    TestContextHandler,
+                                    StringAttributeValue,
+                                    ROLE_ATTRIBUTE_ID)
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class FakeAsyncPIP(AsyncPIPInterface):
+    """PIP returning an admin role after a delay, as TestContextHandler does
+    synchronously"""
+    def __init__(self, delay=0., error=None):
+        self.delay = delay
+        self.error = error
+        self.nQueries = 0
+
+    async def attributeQuery(self, context, attributeDesignator):
+        self.nQueries += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+
+        if attributeDesignator.attributeId == ROLE_ATTRIBUTE_ID:
+            return [StringAttributeValue(value='admin')]
+        return None
+
+
+class ErrorLogCounter(logging.Handler):
+    """Count error log records"""
+    def __init__(self):
+        super(ErrorLogCounter, self).__init__(level=logging.ERROR)
+        self.nRecords = 0
+
+    def emit(self, record):
+        self.nRecords += 1
+
+
+class AsyncTestContextHandler(AsyncCtxHandlerBase):
+    """Asynchronous context handler passing requests straight to the PDP"""
+    async def handlePEPRequest(self, myRequest):
+        myRequest.ctxHandler = self
+        return await self.pdp.evaluate(myRequest)
+
+
+class AsyncPDPTestCase(XacmlContextBaseTestCase):
+    """Test asynchronous evaluation with a PIP queried asynchronously"""
+    RESOURCE_IDS = (
+        'http://localhost/resource-only-restricted',
+        'http://localhost/private-resource',
+        'http://localhost/at-least-one-of-subject-role-restricted',
+        'http://localhost/unknown'
+    )
+    SUBJECT_ROLES = (('staff',), ('student',), ())
+
+    def setUp(self):
+        self.pip = FakeAsyncPIP()
+        self.ctxHandler = AsyncTestContextHandler()
+        self.ctxHandler.pip = self.pip
+        self.ctxHandler.pdp = AsyncPDP.fromPolicySource(XACML_NDGTEST1_FILEPATH,
+                                                        ReaderFactory)
+
+    def _createRequests(self):
+        return [self._createRequestCtx(resourceId, subjectRoles=subjectRoles)
+                for subjectRoles in self.__class__.SUBJECT_ROLES
+                for resourceId in self.__class__.RESOURCE_IDS]
+
+    def _getExpectedDecisions(self, requests):
+        pdp = self._createPDPfromNdgTest1Policy()
+        ctxHandler = TestContextHandler()
+        decisions = []
+        for request in requests:
+            request.ctxHandler = ctxHandler
+            decisions.append(pdp.evaluate(request).results[0].decision)
+        return decisions
+
+    def test01SameDecisionsAsSynchronousPIP(self):
+        requests = self._createRequests()
+        expectedDecisions = self._getExpectedDecisions(requests)
+        for request, expectedDecision in zip(requests, expectedDecisions):
+            response = asyncio.run(self.ctxHandler.handlePEPRequest(request))
+            self.assertEqual(response.results[0].decision, expectedDecision)
+
+            # Handler is restored after evaluation
+            self.assertIs(request.ctxHandler, self.ctxHandler)
+
+        self.assertTrue(self.pip.nQueries > 0)
+
+    def test02PIPResultUsed(self):
+        # Access is only granted with the admin role from the PIP
+        request = self._createRequestCtx(
+                            'http://localhost/at-least-one-of-subject-role-'
+                            'restricted', subjectRoles=('student',))
+        response = asyncio.run(self.ctxHandler.handlePEPRequest(request))
+        self.assertEqual(response.results[0].decision,
+                         self._getExpectedDecisions([request])[0])
+
+    def test03ConcurrentRequests(self):
+        self.pip.delay = 0.05
+        requests = self._createRequests()
+        for request in requests:
+            request.ctxHandler = self.ctxHandler
+        expectedDecisions = self._getExpectedDecisions(
+                                                    self._createRequests())
+
+        startTime = time.monotonic()
+        response = asyncio.run(self.ctxHandler.pdp.evaluateMany(requests))
+        elapsed = time.monotonic() - startTime
+
+        self.assertEqual([result.decision for result in response.results],
+                         expectedDecisions)
+
+        # Queries overlap rather than running one after another
+        self.assertTrue(elapsed < self.pip.delay * self.pip.nQueries)
+
+    def test04PIPError(self):
+        self.pip.error = IOError('Attribute authority unavailable')
+        request = self._createRequestCtx(self.__class__.RESOURCE_IDS[2])
+        response = asyncio.run(self.ctxHandler.handlePEPRequest(request))
+        self.assertEqual(response.results[0].decision, Decision.INDETERMINATE)
+
+    def test05NoContextHandler(self):
+        pdp = AsyncPDP(pdp=CompiledPDP(
+                            policy=self._createPDPfromNdgTest1Policy().policy))
+        request = self._createRequestCtx(self.__class__.RESOURCE_IDS[0])
+        response = asyncio.run(pdp.evaluate(request))
+        self.assertEqual(response.results[0].decision, Decision.PERMIT)
+        self.assertEqual(self.pip.nQueries, 0)
+
+    def test06SynchronousQueryNotSupported(self):
+        self.assertRaises(NotImplementedError, self.ctxHandler.pipQuery,
+                          None, None)
+        self.assertRaises(TypeError, setattr, self.ctxHandler, 'pip',
+                          object())
+
+    def test07SynchronousPDPNotSupported(self):
+        # An error is raised rather than an Indeterminate result for each
+        # PIP query
+        policy = self._createPDPfromNdgTest1Policy().policy
+        request = self._createRequestCtx(self.__class__.RESOURCE_IDS[2])
+        request.ctxHandler = self.ctxHandler
+        for pdp in (PDP(policy=policy), CompiledPDP(policy=policy),
+                    PDP(policy=policy, prefetchPIPQueries=True)):
+            self.assertRaises(TypeError, pdp.evaluate, request)
+            self.assertRaises(TypeError, pdp.evaluateMany, [request])
+        self.assertEqual(self.pip.nQueries, 0)
+
+        self.assertRaises(TypeError, PIPQueryRecorder().handlePEPRequest,
+                          request)
+
+    def test08SameQueriesAsSynchronousPIP(self):
+        policy = self._createPDPfromNdgTest1Policy().policy
+        for prefetchPIPQueries in (False, True):
+            self.ctxHandler.pdp = AsyncPDP(pdp=PDP(policy=policy,
+                                prefetchPIPQueries=prefetchPIPQueries))
+            syncPdp = PDP(policy=policy,
+                          prefetchPIPQueries=prefetchPIPQueries)
+            ctxHandler = TestContextHandler()
+            for request, syncRequest in zip(self._createRequests(),
+                                            self._createRequests()):
+                syncRequest.ctxHandler = ctxHandler
+                syncPdp.evaluate(syncRequest)
+
+                nQueries = self.pip.nQueries
+                asyncio.run(self.ctxHandler.handlePEPRequest(request))
+                self.assertEqual(self.pip.nQueries - nQueries,
+                                 syncRequest.nPIPQueries)
+
+    def test09DecisionRecordedOnce(self):
+        policy = self._createPDPfromNdgTest1Policy().policy
+        for pdpClass, prefetchPIPQueries in ((PDP, False), (PDP, True),
+                                             (CompiledPDP, False)):
+            metricsSink = InMemoryMetricsSink()
+            self.ctxHandler.pdp = AsyncPDP(pdp=pdpClass(policy=policy,
+                                metricsSink=metricsSink,
+                                prefetchPIPQueries=prefetchPIPQueries))
+            syncMetricsSink = InMemoryMetricsSink()
+            syncPdp = pdpClass(policy=policy, metricsSink=syncMetricsSink,
+                               prefetchPIPQueries=prefetchPIPQueries)
+            ctxHandler = TestContextHandler()
+
+            # Errors are only logged for the final evaluation
+            errorLogCounter = ErrorLogCounter()
+            logger = logging.getLogger('ndg.xacml.core')
+            logger.addHandler(errorLogCounter)
+            try:
+                for request in self._createRequests():
+                    request.ctxHandler = ctxHandler
+                    syncPdp.evaluate(request)
+                nSyncErrors = errorLogCounter.nRecords
+
+                nQueries = self.pip.nQueries
+                for request in self._createRequests():
+                    asyncio.run(self.ctxHandler.handlePEPRequest(request))
+                nErrors = errorLogCounter.nRecords - nSyncErrors
+            finally:
+                logger.removeHandler(errorLogCounter)
+
+            self.assertEqual(nErrors, nSyncErrors)
+
+            counters = metricsSink.getSamples()[0]
+            expectedCounters = syncMetricsSink.getSamples()[0]
+            for name in (InMemoryMetricsSink.DECISIONS,
+                         InMemoryMetricsSink.INDETERMINATE_ERRORS):
+                self.assertEqual(
+                    dict([(key, value) for key, value in counters.items()
+                          if key[0] == name]),
+                    dict([(key, value)
+                          for key, value in expectedCounters.items()
+                          if key[0] == name]))
+
+            self.assertEqual(sum([value
+                                  for key, value in counters.items()
+                                  if key[0] == InMemoryMetricsSink.DECISIONS]),
+                             len(self._createRequests()))
+
+            # Calls to the PIP are recorded rather than calls to the recorder
+            self.assertEqual(metricsSink.getCounter(
+                                            InMemoryMetricsSink.PIP_QUERIES),
+                             self.pip.nQueries - nQueries)
+            self.assertEqual(metricsSink.getCounter(
+                                            InMemoryMetricsSink.PIP_QUERIES),
+                             syncMetricsSink.getCounter(
+                                            InMemoryMetricsSink.PIP_QUERIES))
+            self.assertEqual(metricsSink.getCounter(
+                                            InMemoryMetricsSink.PIP_CALLS),
+                             self.pip.nQueries - nQueries)
+
+    def test10PIPCacheShared(self):
+        self.ctxHandler.pipCache = PIPCache()
+        request = self._createRequestCtx(self.__class__.RESOURCE_IDS[2],
+                                         subjectRoles=('student',))
+        response = asyncio.run(self.ctxHandler.handlePEPRequest(request))
+        nQueries = self.pip.nQueries
+        self.assertTrue(nQueries > 0)
+
+        # Results for the same subject are taken from the cache
+        request = self._createRequestCtx(self.__class__.RESOURCE_IDS[2],
+                                         subjectRoles=('student',))
+        self.assertEqual(
+                asyncio.run(self.ctxHandler.handlePEPRequest(request)
+                            ).results[0].decision,
+                response.results[0].decision)
+        self.assertEqual(self.pip.nQueries, nQueries)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,293 @@
+"""NDG XACML compiled PDP unit tests - differential tests comparing decisions
+from the compiled evaluation plan with those from the policy object tree
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import logging
+import os.path
+import re
+import unittest
+
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+from ndg.xacml.core.match import ResourceMatch, SubjectMatch
+from ndg.xacml.core.policyset import PolicySet
+from ndg.xacml.core.targetindex import TargetIndex
+from ndg.xacml.core.compiler import PolicyCompiler, CompiledPolicy
+from ndg.xacml.core.regexpautomaton import RegexpMatchAutomaton
+from ndg.xacml.core.context.pdp import PDP, CompiledPDP
+from ndg.xacml.core.context.result import Decision
+from ndg.xacml.test import THIS_DIR
+from ndg.xacml.test.context import (XacmlContextBaseTestCase,
+                                    TestContextHandler)
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class DifferentialTestHarness(XacmlContextBaseTestCase):
+    """Base class for differential tests: decisions from an alternative
+    evaluation of each of the test policies are compared with those made by
+    PDP for a range of request contexts derived from the policy contents
+
+    @cvar POLICY_FILEPATHS: test policies and policy sets
+    @type POLICY_FILEPATHS: tuple
+    @cvar RESOURCE_IDS: resource IDs added to those derived from the policies
+    @type RESOURCE_IDS: tuple
+    @cvar SUBJECT_ROLES: roles added to those derived from the policies
+    @type SUBJECT_ROLES: tuple
+    @cvar ACTIONS: actions to make requests for
+    @type ACTIONS: tuple
+    @cvar MAX_DERIVED_VALUES: maximum number of resource IDs or roles to take
+    from a policy
+    @type MAX_DERIVED_VALUES: int
+    """
+    POLICY_FILEPATHS = tuple([os.path.join(THIS_DIR, filename)
+                              for filename in (
+        'ndg1.xml',
+        'firstapplicable.xml',
+        'policy_cmip5.xml',
+        'policy_cmip5_rules.xml',
+        'policy_set_internal_references.xml',
+        'policy_set_nested_only.xml',
+        'rule1.xml',
+        'rule2.xml',
+        'rule4.xml',
+        'subjectmatch.xml',
+        'policy_attributeselector_1.xml',
+        'policy_attributeselector_3.xml',
+        os.path.join('functions', 'policy_and.xml'),
+        os.path.join('functions', 'policy_concatenate.xml'),
+        os.path.join('functions', 'policy_not.xml'),
+        os.path.join('cmip5_policyset', 'cmip5-policyset.xml'),
+        os.path.join('faam_policyset', 'policy_faam_policyset.xml'),
+        os.path.join('eo_policyset', 'eo_policyset.xml')
+    )])
+    RESOURCE_IDS = (
+        'http://localhost/',
+        'http://localhost/unknown/resource',
+        'ftp://elsewhere'
+    )
+    SUBJECT_ROLES = ((), ('staff',), ('admin',), ('staff', 'postdoc'))
+    ACTIONS = ('read', 'write')
+    MAX_DERIVED_VALUES = 10
+
+    @classmethod
+    def _getMatchValues(cls, policy, matchClass):
+        """Get the attribute values from the target matches of a given type in
+        a policy or policy set
+
+        @param policy: policy or policy set
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        @param matchClass: match type
+        @type matchClass: type
+        @return: match attribute values
+        @rtype: list
+        """
+        values = []
+        targets = [policy.target]
+        if isinstance(policy, PolicySet):
+            for childPolicy in policy.policies:
+                values += cls._getMatchValues(childPolicy, matchClass)
+        else:
+            targets += [rule.target for rule in policy.rules]
+
+        for target in targets:
+            if target is None:
+                continue
+            for attrName in target.CHILD_ATTRS:
+                for targetChild in getattr(target, attrName):
+                    for match in targetChild.matches:
+                        if (isinstance(match, matchClass) and
+                            match.attributeValue is not None and
+                            isinstance(match.attributeValue.value, str)):
+                            values.append(match.attributeValue.value)
+        return values
+
+    @classmethod
+    def _getResourceIds(cls, policy):
+        """Derive resource IDs to test from the resource matches in a policy
+
+        @param policy: policy or policy set
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        @return: resource IDs
+        @rtype: list
+        """
+        resourceIds = list(cls.RESOURCE_IDS)
+        for value in cls._getMatchValues(policy, ResourceMatch):
+            prefixes = TargetIndex.getRegexpPrefixes(value)
+            if prefixes is None:
+                resourceIds.append(value)
+            else:
+                resourceIds.append(prefixes[0])
+                resourceIds.append(prefixes[0] + 'x/y.nc')
+
+        return sorted(set(resourceIds))[:cls.MAX_DERIVED_VALUES]
+
+    @classmethod
+    def _getSubjectRoles(cls, policy):
+        """Derive subject roles to test from the subject matches in a policy
+
+        @param policy: policy or policy set
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        @return: tuples of roles
+        @rtype: list
+        """
+        roles = sorted(set(cls._getMatchValues(policy, SubjectMatch)))
+        return list(cls.SUBJECT_ROLES) + [
+                    (role,) for role in roles[:cls.MAX_DERIVED_VALUES]]
+
+    def _getRequests(self, policy):
+        """Generate requests for a policy
+
+        @param policy: policy or policy set
+        @type policy: ndg.xacml.core.policybase.PolicyBase
+        @return: request contexts
+        @rtype: generator
+        """
+        for resourceId in self._getResourceIds(policy):
+            for subjectRoles in self._getSubjectRoles(policy):
+                for action in self.__class__.ACTIONS:
+                    yield self._createRequestCtx(resourceId,
+                                                 subjectRoles=subjectRoles,
+                                                 action=action)
+
+            # Request with no subject
+            yield self._createRequestCtx(resourceId, includeSubject=False)
+
+    def _assertSameDecisions(self, pdp, evaluate, ctxHandler=None):
+        """Check that an alternative evaluation gives the same decisions as
+        the PDP for all the requests derived from its policy
+
+        @param pdp: reference PDP
+        @type pdp: ndg.xacml.core.context.pdp.PDP
+        @param evaluate: alternative evaluation taking a request and returning
+        a response
+        @type evaluate: callable
+        @param ctxHandler: context handler to set in each request
+        @type ctxHandler: ndg.xacml.core.context.handler.CtxHandlerBase
+        @return: number of requests checked
+        @rtype: int
+        """
+        nRequests = 0
+        for request in self._getRequests(pdp.policy):
+            if ctxHandler is not None:
+                request.ctxHandler = ctxHandler
+
+            expectedDecision = pdp.evaluate(request).results[0].decision
+            decision = evaluate(request).results[0].decision
+            self.assertEqual(decision, expectedDecision,
+                             'Decision %s differs from expected %s for '
+                             'policy %r and resource %r' %
+                             (decision,
+                              expectedDecision,
+                              pdp.policy.ident,
+                              request.resources[0].attributes[0
+                                                ].attributeValues[0].value))
+            nRequests += 1
+
+        return nRequests
+
+
+class CompiledPDPTestCase(DifferentialTestHarness):
+    """Differential tests for CompiledPDP against PDP"""
+
+    def _loadPDP(self, filePath):
+        pdp = PDP.fromPolicySource(filePath, ReaderFactory)
+        return pdp
+
+    def test01SameDecisions(self):
+        for filePath in self.__class__.POLICY_FILEPATHS:
+            pdp = self._loadPDP(filePath)
+            compiledPdp = CompiledPDP(policy=pdp.policy)
+            nRequests = self._assertSameDecisions(pdp, compiledPdp.evaluate)
+            self.assertTrue(nRequests > 0)
+
+    def test02SameDecisionsWithPIP(self):
+        ctxHandler = TestContextHandler()
+        for filePath in self.__class__.POLICY_FILEPATHS:
+            pdp = self._loadPDP(filePath)
+            compiledPdp = CompiledPDP(policy=pdp.policy)
+            self._assertSameDecisions(pdp, compiledPdp.evaluate,
+                                      ctxHandler=ctxHandler)
+
+    def test03SameDecisionsWithTargetIndex(self):
+        for filePath in self.__class__.POLICY_FILEPATHS:
+            pdp = self._loadPDP(filePath)
+            if not isinstance(pdp.policy, PolicySet):
+                continue
+
+            pdp.policy.buildTargetIndex()
+            compiledPdp = CompiledPDP(policy=pdp.policy)
+            self._assertSameDecisions(pdp, compiledPdp.evaluate)
+
+    def test04FromPolicySource(self):
+        filePath = self.__class__.POLICY_FILEPATHS[0]
+        compiledPdp = CompiledPDP.fromPolicySource(filePath, ReaderFactory)
+        self.assertIsInstance(compiledPdp.compiledPolicy, CompiledPolicy)
+        self.assertEqual(compiledPdp.compiledPolicy.nFallbacks, 0)
+
+        request = self._createRequestCtx(
+                                    'http://localhost/resource-only-restricted')
+        response = compiledPdp.evaluate(request)
+        self.assertEqual(response.results[0].decision, Decision.PERMIT)
+
+    def test05FallbackNodes(self):
+        # Attribute selectors are not compiled but evaluated via the policy
+        # objects
+        filePath = self.__class__.POLICY_FILEPATHS[10]
+        policy = self._loadPDP(filePath).policy
+        compiledPolicy = PolicyCompiler().compile(policy)
+        self.assertTrue(compiledPolicy.nFallbacks > 0)
+
+    def test06CompileInvalidInput(self):
+        self.assertRaises(TypeError, PolicyCompiler().compile, None)
+
+    def test07RegexpMatchAutomata(self):
+        # Resource ID patterns throughout the policy set are combined
+        filePath = self.__class__.POLICY_FILEPATHS[15]
+        policy = self._loadPDP(filePath).policy
+        compiledPolicy = PolicyCompiler().compile(policy)
+        self.assertEqual(len(compiledPolicy.regexpMatchAutomata), 1)
+
+        automaton = compiledPolicy.regexpMatchAutomata[0]
+        self.assertTrue(len(automaton) > 1)
+        self.assertEqual(automaton.nResidualPatterns, 0)
+
+    def test08RegexpMatchAutomaton(self):
+        patterns = ['^http://localhost/.*$', '^http://localhost/a', 'x*',
+                    '^http://(localhost|example)/', '^[a-z]+://',
+                    '(?i)^HTTP://',
+                    '^(a)\\1', '^(?P<host>[a-z]+)']
+        automaton = RegexpMatchAutomaton(maxMemoSize=2)
+        indices = [automaton.addPattern(re.compile(pattern))
+                   for pattern in patterns]
+        self.assertEqual(indices, list(range(len(patterns))))
+        self.assertEqual(automaton.addPattern(re.compile(patterns[0])), 0)
+        self.assertEqual(len(automaton), len(patterns))
+
+        # Patterns with no literal prefix are combined unless they have flags,
+        # back references or named groups
+        self.assertEqual(automaton.nPrefixedPatterns, 3)
+        self.assertEqual(automaton.nCombinedPatterns, 2)
+        self.assertEqual(automaton.nResidualPatterns, 3)
+
+        for value in ('http://localhost/a/b', 'http://example/', 'aa', '',
+                      'HTTP://LOCALHOST/', 'ftp://elsewhere'):
+            expected = frozenset([i for i, pattern in enumerate(patterns)
+                                  if re.match(pattern, value)])
+            self.assertEqual(automaton.match(value), expected)
+            self.assertIs(automaton.match(value), automaton.match(value))
+
+        self.assertRaises(TypeError, automaton.addPattern, patterns[0])
+        self.assertRaises(ValueError, RegexpMatchAutomaton, maxMemoSize=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,6 +11,7 @@ __license__ = "BSD - see LICENSE file in top-level directory"
 __contact__ = "Philip.Kershaw@stfc.ac.uk"
 __revision__ = "$Id$"
 import unittest
+import pickle
 import logging
 logging.basicConfig(level=logging.DEBUG)
 
@@ -54,6 +55,30 @@ class XacmlContextTestCase(XacmlContextBaseTestCase):
     def test07CreatePDPfromPolicy(self):
         pdp = self._createPDPfromNdgTest1Policy()
         self.assertTrue(pdp)
+
+    def test08ReadOnlyDecisions(self):
+        self.assertRaises(AttributeError, setattr, Decision.PERMIT, 'value',
+                          Decision.DENY_STR)
+        for decisionStr in Decision.TYPES:
+            decision = Decision(decision=decisionStr)
+            instance = Decision.getInstance(decision)
+            self.assertEqual(instance, decision)
+            self.assertEqual(instance, decisionStr)
+            self.assertTrue(Decision.getInstance(decisionStr) is instance)
+            
+            # Read-only instances are preserved by pickling
+            self.assertTrue(pickle.loads(pickle.dumps(instance)) is instance)
+            
+        self.assertRaises(AttributeError, Decision.getInstance, 'Allow')
+        self.assertRaises(TypeError, Decision.PERMIT.__eq__, None)
+        
+    def test09RuleDecisionsAreReadOnlyInstances(self):
+        pdp = self._createPDPfromNdgTest1Policy()
+        request = self._createRequestCtx(
+                                    "http://localhost/resource-only-restricted")
+        for rule in pdp.policy.rules:
+            decision = rule.evaluate(request)
+            self.assertTrue(decision is Decision.getInstance(decision))
         
                                 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+"""NDG XACML per-node evaluation profiler unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import io
+import logging
+import os.path
+import unittest
+
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+from ndg.xacml.core.policybase import PolicyBase
+from ndg.xacml.core.rule import Rule
+from ndg.xacml.core.target import Target
+from ndg.xacml.core.apply import Apply
+from ndg.xacml.core.context.pdp import PDP
+from ndg.xacml.core.profiler import (EvaluationProfiler,
+                                     EvaluationProfilerError)
+from ndg.xacml.test import THIS_DIR
+from ndg.xacml.test.context.test_compiled_pdp import DifferentialTestHarness
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class EvaluationProfilerTestCase(DifferentialTestHarness):
+    """Test profiling of policy evaluation by node"""
+    CMIP5_POLICY_FILEPATH = os.path.join(THIS_DIR, 'policy_cmip5.xml')
+
+    def tearDown(self):
+        profiler = EvaluationProfiler.getEnabledProfiler()
+        if profiler is not None:
+            profiler.disable()
+
+    def _evaluate(self, pdp, requests):
+        return [str(pdp.evaluate(request).results[0].decision)
+                for request in requests]
+
+    def _profileCmip5Policy(self):
+        pdp = PDP.fromPolicySource(self.__class__.CMIP5_POLICY_FILEPATH,
+                                   ReaderFactory)
+        requests = list(self._getRequests(pdp.policy))
+        with EvaluationProfiler() as profiler:
+            self._evaluate(pdp, requests)
+        return profiler, len(requests)
+
+    def test01EnableAndDisable(self):
+        methods = (PolicyBase.evaluate, Rule.evaluate, Target.match,
+                   Apply.evaluate)
+        profiler = EvaluationProfiler()
+        self.assertIsNone(EvaluationProfiler.getEnabledProfiler())
+
+        profiler.enable()
+        self.assertTrue(profiler.enabled)
+        self.assertIsNot(Rule.evaluate, methods[1])
+        self.assertRaises(EvaluationProfilerError,
+                          EvaluationProfiler().enable)
+
+        # Enabling again has no effect
+        profiler.enable()
+        profiler.disable()
+        self.assertFalse(profiler.enabled)
+        self.assertEqual((PolicyBase.evaluate, Rule.evaluate, Target.match,
+                          Apply.evaluate), methods)
+
+    def test02SameDecisions(self):
+        for filePath in self.__class__.POLICY_FILEPATHS:
+            pdp = PDP.fromPolicySource(filePath, ReaderFactory)
+            requests = list(self._getRequests(pdp.policy))
+            decisions = self._evaluate(pdp, requests)
+
+            with EvaluationProfiler() as profiler:
+                self.assertEqual(self._evaluate(pdp, requests), decisions,
+                                 msg=filePath)
+
+            rootStats = [nodeStats for nodeStats in profiler.getNodeStats()
+                         if len(nodeStats.path) == 1]
+            self.assertEqual(len(rootStats), 1, msg=filePath)
+            self.assertEqual(rootStats[0].nCalls, len(requests))
+            self.assertEqual(sorted(rootStats[0].outcomes.keys()),
+                             sorted(set(decisions)))
+
+            for nodeStats in profiler.getNodeStats():
+                self.assertTrue(nodeStats.selfTime <=
+                                nodeStats.cumulativeTime + 1e-9)
+
+    def test03HotRules(self):
+        profiler, nRequests = self._profileCmip5Policy()
+        hotRules = profiler.getHotRules()
+        self.assertTrue(len(hotRules) > 1)
+        self.assertEqual(len(profiler.getHotRules(1)), 1)
+        for stats in hotRules:
+            self.assertTrue(stats.label.startswith('Rule:'))
+            self.assertEqual(sum(stats.outcomes.values()), stats.nCalls)
+
+        cumulativeTimes = [stats.cumulativeTime for stats in hotRules]
+        self.assertEqual(cumulativeTimes,
+                         sorted(cumulativeTimes, reverse=True))
+
+        report = profiler.formatHotRules(5).splitlines()
+        self.assertEqual(len(report), 2 + min(5, len(hotRules)))
+        self.assertIn(hotRules[0].label[len('Rule:'):], report[2])
+
+        profiler.reset()
+        self.assertEqual(profiler.getNodeStats(), [])
+
+    def test04FlameGraph(self):
+        profiler, nRequests = self._profileCmip5Policy()
+        stream = io.StringIO()
+        profiler.writeFlameGraph(stream)
+
+        lines = stream.getvalue().splitlines()
+        self.assertTrue(len(lines) > 0)
+        for line in lines:
+            stack, sampleCount = line.rsplit(' ', 1)
+            self.assertTrue(int(sampleCount) > 0)
+            self.assertTrue(stack.startswith('Policy:'))
+
+        self.assertTrue(any([';Rule:' in line for line in lines]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""NDG XACML evaluation trace switch unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import logging
+import unittest
+
+from ndg.xacml import Config
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+from ndg.xacml.core.context.pdp import PDP, CompiledPDP
+from ndg.xacml.test.context.test_compiled_pdp import DifferentialTestHarness
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class RecordCountingHandler(logging.Handler):
+    """Log handler counting the records emitted to it"""
+    def __init__(self):
+        super(RecordCountingHandler, self).__init__(level=logging.DEBUG)
+        self.nRecords = 0
+        self.nDebugRecords = 0
+
+    def emit(self, record):
+        self.nRecords += 1
+        if record.levelno == logging.DEBUG:
+            self.nDebugRecords += 1
+
+
+class EvaluationTraceTestCase(DifferentialTestHarness):
+    """Test the evaluation trace switch controlling debug logging from policy
+    evaluation"""
+    LOGGER_NAME = 'ndg.xacml.core'
+
+    def setUp(self):
+        self.logger = logging.getLogger(self.__class__.LOGGER_NAME)
+        self.handler = RecordCountingHandler()
+        self.savedLevel = self.logger.level
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        Config.trace = False
+        self.logger.removeHandler(self.handler)
+        self.logger.setLevel(self.savedLevel)
+
+    def _evaluate(self, pdp, requests):
+        return [pdp.evaluate(request).results[0].decision
+                for request in requests]
+
+    def test01NoTraceByDefault(self):
+        self.assertFalse(Config.trace)
+        pdp = self._createPDPfromNdgTest1Policy()
+        self._evaluate(pdp, self._getRequests(pdp.policy))
+        self.assertEqual(self.handler.nRecords, 0)
+
+    def test02Trace(self):
+        pdp = self._createPDPfromNdgTest1Policy()
+        Config.trace = True
+        self._evaluate(pdp, self._getRequests(pdp.policy))
+        self.assertTrue(self.handler.nRecords > 0)
+
+    def test03SameDecisions(self):
+        for filePath in self.__class__.POLICY_FILEPATHS:
+            pdp = PDP.fromPolicySource(filePath, ReaderFactory)
+            requests = list(self._getRequests(pdp.policy))
+            decisions = self._evaluate(pdp, requests)
+
+            Config.trace = True
+            self.assertEqual(self._evaluate(pdp, requests), decisions)
+            Config.trace = False
+
+    def test04NoTraceLogging(self):
+        # Evaluation logs nothing at debug level with the trace switched off
+        # even where debug logging is enabled.  Errors are still logged.  See
+        # ndg.xacml.bench.features for timings.
+        Config.trace = False
+        for filePath in self.__class__.POLICY_FILEPATHS:
+            for pdpClass in (PDP, CompiledPDP):
+                pdp = pdpClass.fromPolicySource(filePath, ReaderFactory)
+                requests = list(self._getRequests(pdp.policy))
+                self.handler.nDebugRecords = 0
+                self._evaluate(pdp, requests)
+                self.assertEqual(self.handler.nDebugRecords, 0,
+                                 msg='%s %s' % (pdpClass.__name__, filePath))
+
+        pdp = self._createPDPfromNdgTest1Policy()
+        Config.trace = True
+        self._evaluate(pdp, self._getRequests(pdp.policy))
+        self.assertTrue(self.handler.nDebugRecords > 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
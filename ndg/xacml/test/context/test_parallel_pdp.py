@@ -0,0 +1,114 @@
+"""NDG XACML parallel PDP unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import logging
+import pickle
+import unittest
+
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+from ndg.xacml.core.context.decisioncache import DecisionCache
+from ndg.xacml.core.context.parallelpdp import ParallelPDP
+from ndg.xacml.core.context.requestcodec import RequestCodec
+from ndg.xacml.core.context.result import Decision, StatusCode
+from ndg.xacml.test import XACML_NDGTEST1_FILEPATH
+from ndg.xacml.test.context import (XacmlContextBaseTestCase,
+                                    TestContextHandler)
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class ParallelPDPTestCase(XacmlContextBaseTestCase):
+    """Test evaluation of requests across worker processes"""
+    RESOURCE_IDS = (
+        'http://localhost/resource-only-restricted',
+        'http://localhost/private-resource',
+        'http://localhost/unknown',
+        'https://localhost'
+    )
+    SUBJECT_ROLES = (('staff',), ('admin',), ('student',), ())
+
+    def _createRequests(self):
+        return [self._createRequestCtx(resourceId, subjectRoles=subjectRoles)
+                for subjectRoles in self.__class__.SUBJECT_ROLES
+                for resourceId in self.__class__.RESOURCE_IDS]
+
+    def _getExpectedDecisions(self, requests):
+        pdp = self._createPDPfromNdgTest1Policy()
+        return [pdp.evaluate(request).results[0].decision
+                for request in requests]
+
+    def test01CodecRoundTrip(self):
+        request = self._createRequestCtx(self.__class__.RESOURCE_IDS[0],
+                                         subjectRoles=('staff', 'postdoc'))
+        encodedRequest = RequestCodec.encodeRequest(request)
+        decodedRequest = RequestCodec.decodeRequest(encodedRequest)
+        self.assertEqual(RequestCodec.encodeRequest(decodedRequest),
+                         encodedRequest)
+        self.assertEqual(DecisionCache.getRequestFingerprint(decodedRequest),
+                         DecisionCache.getRequestFingerprint(request))
+
+        # Encoded requests can be pickled for passing between processes
+        self.assertEqual(pickle.loads(pickle.dumps(encodedRequest)),
+                         encodedRequest)
+
+    def test02CodecResults(self):
+        response = self._createPDPfromNdgTest1Policy().evaluate(
+                        self._createRequestCtx(self.__class__.RESOURCE_IDS[0]))
+        result = RequestCodec.decodeResult(
+                                RequestCodec.encodeResult(response.results[0]))
+        self.assertEqual(result.decision, Decision.PERMIT)
+        self.assertEqual(result.status.statusCode.value, StatusCode.OK)
+
+    def test03CodecRejectsContextHandler(self):
+        request = self._createRequestCtx(self.__class__.RESOURCE_IDS[0])
+        request.ctxHandler = TestContextHandler()
+        self.assertRaises(ValueError, RequestCodec.encodeRequest, request)
+        self.assertRaises(TypeError, RequestCodec.encodeRequest, None)
+
+    def test04EvaluateFromPolicySource(self):
+        requests = self._createRequests()
+        expectedDecisions = self._getExpectedDecisions(requests)
+        with ParallelPDP(policySource=XACML_NDGTEST1_FILEPATH,
+                         readerFactory=ReaderFactory,
+                         nWorkers=2,
+                         chunkSize=3,
+                         maxPendingChunks=2) as pdp:
+            response = pdp.evaluateMany(requests)
+            self.assertEqual([result.decision for result in response.results],
+                             expectedDecisions)
+
+            response = pdp.evaluate(requests[0])
+            self.assertEqual(len(response.results), 1)
+            self.assertEqual(response.results[0].decision,
+                             expectedDecisions[0])
+
+    def test05EvaluateInheritedPDP(self):
+        requests = self._createRequests()
+        expectedDecisions = self._getExpectedDecisions(requests)
+        with ParallelPDP(pdp=self._createPDPfromNdgTest1Policy(),
+                         nWorkers=2,
+                         chunkSize=5) as pdp:
+            decisions = [result.decision
+                         for result in pdp.iterResults(iter(requests))]
+            self.assertEqual(decisions, expectedDecisions)
+
+    def test06InvalidSettings(self):
+        self.assertRaises(ValueError, ParallelPDP)
+        self.assertRaises(ValueError, ParallelPDP,
+                          policySource=XACML_NDGTEST1_FILEPATH,
+                          readerFactory=ReaderFactory,
+                          chunkSize=0)
+        self.assertRaises(TypeError, ParallelPDP, pdp=object())
+
+
+if __name__ == "__main__":
+    unittest.main()
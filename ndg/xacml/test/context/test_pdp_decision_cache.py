@@ -0,0 +1,175 @@
+"""NDG XACML PDP decision cache unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import logging
+import unittest
+
+from ndg.xacml.core import Identifiers
+from ndg.xacml.core.attribute import Attribute
+from ndg.xacml.core.context.decisioncache import DecisionCache
+from ndg.xacml.core.context.pdp import CompiledPDP
+from ndg.xacml.core.context.result import Decision
+from ndg.xacml.test.context import (XacmlContextBaseTestCase,
+                                    TestContextHandler,
+                                    StringAttributeValue)
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class FakeTimer(object):
+    """Settable clock for testing expiry"""
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+
+class DecisionCacheTestCase(XacmlContextBaseTestCase):
+    """Test PDP with decision caching enabled"""
+    PUBLIC_RESOURCE_ID = 'http://localhost/resource-only-restricted'
+    PRIVATE_RESOURCE_ID = 'http://localhost/private-resource'
+
+    def setUp(self):
+        self.timer = FakeTimer()
+        self.pdp = self._createPDPfromNdgTest1Policy()
+        self.pdp.decisionCache = DecisionCache(maxSize=2, ttl=60.,
+                                               timer=self.timer)
+
+    def _evaluate(self, resourceId, **kw):
+        request = self._createRequestCtx(resourceId, **kw)
+        return self.pdp.evaluate(request).results[0].decision
+
+    def test01HitAndMiss(self):
+        cache = self.pdp.decisionCache
+        decision = self._evaluate(self.__class__.PUBLIC_RESOURCE_ID)
+        self.assertEqual(decision, Decision.PERMIT)
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache.hits, 0)
+
+        decision = self._evaluate(self.__class__.PUBLIC_RESOURCE_ID)
+        self.assertEqual(decision, Decision.PERMIT)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(len(cache), 1)
+
+    def test02SameDecisionsAsUncached(self):
+        uncachedPdp = self._createPDPfromNdgTest1Policy()
+        for resourceId in (self.__class__.PUBLIC_RESOURCE_ID,
+                           self.__class__.PRIVATE_RESOURCE_ID,
+                           'https://localhost'):
+            for subjectRoles in (('staff',), ('student',), ('admin',)):
+                for i in range(2):
+                    request = self._createRequestCtx(resourceId,
+                                                     subjectRoles=subjectRoles)
+                    expected = uncachedPdp.evaluate(request
+                                                    ).results[0].decision
+                    self.assertEqual(self._evaluate(resourceId,
+                                                    subjectRoles=subjectRoles),
+                                     expected)
+
+        self.assertTrue(self.pdp.decisionCache.hits > 0)
+
+    def test03Expiry(self):
+        cache = self.pdp.decisionCache
+        self._evaluate(self.__class__.PUBLIC_RESOURCE_ID)
+        self.timer.now = 61.
+        self._evaluate(self.__class__.PUBLIC_RESOURCE_ID)
+        self.assertEqual(cache.expirations, 1)
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(cache.misses, 2)
+
+    def test04LruEviction(self):
+        cache = self.pdp.decisionCache
+        self._evaluate(self.__class__.PUBLIC_RESOURCE_ID)
+        self._evaluate(self.__class__.PRIVATE_RESOURCE_ID)
+
+        # Make the public resource entry the most recently used
+        self._evaluate(self.__class__.PUBLIC_RESOURCE_ID)
+        self._evaluate('https://localhost')
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(len(cache), 2)
+
+        self._evaluate(self.__class__.PUBLIC_RESOURCE_ID)
+        self.assertEqual(cache.hits, 2)
+
+    def test05InvalidatedOnPolicyChange(self):
+        cache = self.pdp.decisionCache
+        self._evaluate(self.__class__.PUBLIC_RESOURCE_ID)
+        self.assertEqual(len(cache), 1)
+
+        self.pdp.policy = self._createPDPfromNdgTest1Policy().policy
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.invalidations, 1)
+
+        # Decisions evaluated before the policy changed are not cached
+        generation = cache.generation
+        self.pdp.policy = self._createPDPfromNdgTest1Policy().policy
+        self.assertFalse(cache.put(('key',), Decision.DENY,
+                                   generation=generation))
+        self.assertTrue(cache.put(('key',), Decision.DENY,
+                                  generation=cache.generation))
+
+    def test06BypassWithContextHandler(self):
+        cache = self.pdp.decisionCache
+        request = self._createRequestCtx(self.__class__.PUBLIC_RESOURCE_ID)
+        request.ctxHandler = TestContextHandler()
+        self.pdp.evaluate(request)
+        self.pdp.evaluate(request)
+        self.assertEqual(cache.bypasses, 2)
+        self.assertEqual(len(cache), 0)
+
+    def test07BypassWithCurrentTime(self):
+        request = self._createRequestCtx(self.__class__.PUBLIC_RESOURCE_ID)
+        attribute = Attribute()
+        attribute.attributeId = Identifiers.Environment.CURRENT_TIME
+        attribute.dataType = StringAttributeValue.IDENTIFIER
+        attribute.attributeValues.append(StringAttributeValue('12:00:00'))
+        request.environment.attributes.append(attribute)
+
+        self.assertIsNone(DecisionCache.getRequestFingerprint(request))
+        self.pdp.evaluate(request)
+        self.assertEqual(self.pdp.decisionCache.bypasses, 1)
+
+    def test08CanonicalFingerprint(self):
+        request1 = self._createRequestCtx(self.__class__.PUBLIC_RESOURCE_ID,
+                                          subjectRoles=('staff', 'postdoc'))
+        request2 = self._createRequestCtx(self.__class__.PUBLIC_RESOURCE_ID,
+                                          subjectRoles=('postdoc', 'staff'))
+        request3 = self._createRequestCtx(self.__class__.PUBLIC_RESOURCE_ID,
+                                          subjectRoles=('staff',))
+        self.assertEqual(DecisionCache.getRequestFingerprint(request1),
+                         DecisionCache.getRequestFingerprint(request2))
+        self.assertNotEqual(DecisionCache.getRequestFingerprint(request1),
+                            DecisionCache.getRequestFingerprint(request3))
+
+    def test09IndeterminateNotCached(self):
+        cache = DecisionCache()
+        self.assertFalse(cache.put(('key',), Decision.INDETERMINATE))
+        self.assertTrue(cache.put(('key',), Decision.DENY))
+
+    def test10CompiledPDP(self):
+        pdp = CompiledPDP(policy=self.pdp.policy,
+                          decisionCache=DecisionCache())
+        for i in range(3):
+            request = self._createRequestCtx(self.__class__.PUBLIC_RESOURCE_ID)
+            self.assertEqual(pdp.evaluate(request).results[0].decision,
+                             Decision.PERMIT)
+        self.assertEqual(pdp.decisionCache.hits, 2)
+
+    def test11InvalidSettings(self):
+        self.assertRaises(ValueError, DecisionCache, maxSize=0)
+        self.assertRaises(ValueError, DecisionCache, ttl=-1)
+        self.assertRaises(TypeError, setattr, self.pdp, 'decisionCache', {})
+
+
+if __name__ == "__main__":
+    unittest.main()
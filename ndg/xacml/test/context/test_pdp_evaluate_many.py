@@ -0,0 +1,103 @@
+"""NDG XACML PDP batch evaluation unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import logging
+import unittest
+from unittest import mock
+
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+from ndg.xacml.core.attributedesignator import SubjectAttributeDesignator
+from ndg.xacml.core.context.pdp import PDP, CompiledPDP
+from ndg.xacml.test.context import TestContextHandler
+from ndg.xacml.test.context.test_compiled_pdp import DifferentialTestHarness
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class PDPEvaluateManyTestCase(DifferentialTestHarness):
+    """Test batch evaluation of requests gives the same results as evaluating
+    each in turn"""
+    RESOURCE_IDS = (
+        'http://localhost/resource-only-restricted',
+        'http://localhost/private-resource',
+        'http://localhost/unknown',
+        'https://localhost'
+    )
+
+    def _assertSameResults(self, pdp, requests):
+        expectedDecisions = [pdp.evaluate(request).results[0].decision
+                             for request in requests]
+        response = pdp.evaluateMany(requests)
+        self.assertEqual(len(response.results), len(requests))
+        self.assertEqual([result.decision for result in response.results],
+                         expectedDecisions)
+
+    def test01SameResults(self):
+        for filePath in self.__class__.POLICY_FILEPATHS:
+            pdp = PDP.fromPolicySource(filePath, ReaderFactory)
+            requests = list(self._getRequests(pdp.policy))
+            self._assertSameResults(pdp, requests)
+            self._assertSameResults(CompiledPDP(policy=pdp.policy), requests)
+
+    def test02SameResultsWithPIP(self):
+        ctxHandler = TestContextHandler()
+        pdp = self._createPDPfromNdgTest1Policy()
+        requests = []
+        for resourceId in self.__class__.RESOURCE_IDS:
+            request = self._createRequestCtx(resourceId)
+            request.ctxHandler = ctxHandler
+            requests.append(request)
+
+        self._assertSameResults(pdp, requests)
+
+    def test03SubjectMatchesShared(self):
+        pdp = self._createPDPfromNdgTest1Policy()
+        requests = [self._createRequestCtx(resourceId)
+                    for resourceId in self.__class__.RESOURCE_IDS]
+
+        subjectEvaluate = SubjectAttributeDesignator.evaluate
+        with mock.patch.object(SubjectAttributeDesignator, 'evaluate',
+                               autospec=True,
+                               side_effect=subjectEvaluate) as subjectSpy:
+            for request in requests:
+                pdp.evaluate(request)
+            nSubjectEvaluations = subjectSpy.call_count
+            self.assertTrue(nSubjectEvaluations > 0)
+
+            # Subject matches are shared so there are fewer subject attribute
+            # look ups than for evaluating each request in turn
+            subjectSpy.reset_mock()
+            pdp.evaluateMany(requests)
+            self.assertTrue(subjectSpy.call_count < nSubjectEvaluations)
+
+        # Requests are left unchanged
+        for request in requests:
+            self.assertIsNone(request.matchResultCache)
+
+    def test04DifferentSubjectsNotShared(self):
+        pdp = self._createPDPfromNdgTest1Policy()
+        requests = []
+        for subjectRoles in (('staff',), ('admin',), ('student',), ()):
+            for resourceId in self.__class__.RESOURCE_IDS:
+                requests.append(self._createRequestCtx(
+                                                resourceId,
+                                                subjectRoles=subjectRoles))
+
+        self._assertSameResults(pdp, requests)
+
+    def test05EmptyBatch(self):
+        pdp = self._createPDPfromNdgTest1Policy()
+        self.assertEqual(len(pdp.evaluateMany([]).results), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
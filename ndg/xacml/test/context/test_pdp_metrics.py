@@ -0,0 +1,178 @@
+"""NDG XACML PDP metrics unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import io
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+from ndg.xacml.core.context.pdp import PDP, CompiledPDP
+from ndg.xacml.core.context.policystore import PolicyStore
+from ndg.xacml.core.context.result import Decision
+from ndg.xacml.core.context.metrics import (InMemoryMetricsSink, Histogram,
+                                            PrometheusTextExporter)
+from ndg.xacml.test import XACML_NDGTEST1_FILEPATH
+from ndg.xacml.test.context import XacmlContextBaseTestCase
+from ndg.xacml.test.context.test_pip_prefetch import (CountingPIP,
+                                                      PIPContextHandler)
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class PDPMetricsTestCase(XacmlContextBaseTestCase):
+    """Test recording of PDP metrics in a sink and exporting them"""
+    RESOURCE_IDS = (
+        'http://localhost/resource-only-restricted',
+        'http://localhost/at-least-one-of-subject-role-restricted',
+        'http://localhost/private-resource',
+        'http://localhost/unknown'
+    )
+
+    def setUp(self):
+        self.policy = self._createPDPfromNdgTest1Policy().policy
+        self.tmpDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def _evaluate(self, pdp, pip=None):
+        ctxHandler = None
+        if pip is not None:
+            ctxHandler = PIPContextHandler()
+            ctxHandler.pip = pip
+
+        decisions = []
+        for resourceId in self.__class__.RESOURCE_IDS:
+            request = self._createRequestCtx(resourceId,
+                                             subjectRoles=('staff',))
+            if ctxHandler is not None:
+                request.ctxHandler = ctxHandler
+            decisions.append(str(pdp.evaluate(request).results[0].decision))
+            self.assertIsNone(request.metricsSink)
+        return decisions
+
+    def test01Decisions(self):
+        for pdpClass in (PDP, CompiledPDP):
+            sink = InMemoryMetricsSink()
+            pdp = pdpClass(policy=self.policy, metricsSink=sink)
+            decisions = self._evaluate(pdp)
+
+            for decision in set(decisions):
+                self.assertEqual(sink.getCounter(sink.DECISIONS,
+                                                 decision=decision),
+                                 decisions.count(decision))
+
+            histogram = sink.getHistogram(sink.DECISION_LATENCY)
+            self.assertEqual(histogram.count, len(decisions))
+            self.assertTrue(histogram.sum > 0.)
+            self.assertEqual(sink.getCounter(sink.PIP_CALLS), 0)
+
+            # Batches are recorded for each request
+            pdp.evaluateMany([self._createRequestCtx(resourceId)
+                              for resourceId in self.__class__.RESOURCE_IDS])
+            self.assertEqual(
+                    sink.getHistogram(sink.DECISION_LATENCY).count,
+                    2*len(decisions))
+
+    def test02PIPCallsAndErrors(self):
+        for pdpClass in (PDP, CompiledPDP):
+            sink = InMemoryMetricsSink()
+            pip = CountingPIP()
+            self._evaluate(pdpClass(policy=self.policy, metricsSink=sink), pip)
+            self.assertTrue(pip.nQueries > 0)
+            self.assertEqual(sink.getCounter(sink.PIP_CALLS), pip.nQueries)
+            self.assertEqual(sink.getCounter(sink.PIP_QUERIES), pip.nQueries)
+            self.assertEqual(sink.getHistogram(sink.PIP_CALL_LATENCY).count,
+                             pip.nQueries)
+            self.assertEqual(sink.getCounter(sink.INDETERMINATE_ERRORS,
+                                             error_type='OSError'), 0)
+
+            sink = InMemoryMetricsSink()
+            pip = CountingPIP(error=IOError('Attribute authority '
+                                            'unavailable'))
+            decisions = self._evaluate(pdpClass(policy=self.policy,
+                                                metricsSink=sink), pip)
+            self.assertIn(Decision.INDETERMINATE_STR, decisions)
+            self.assertEqual(sink.getCounter(sink.PIP_CALL_ERRORS,
+                                             error_type='OSError'),
+                             pip.nQueries)
+            self.assertTrue(sink.getCounter(sink.INDETERMINATE_ERRORS,
+                                            error_type='OSError') > 0)
+
+    def test03PolicyLoads(self):
+        sink = InMemoryMetricsSink()
+        pdp = PDP.fromPolicySource(XACML_NDGTEST1_FILEPATH, ReaderFactory,
+                                   metricsSink=sink)
+        self.assertIs(pdp.metricsSink, sink)
+        self.assertEqual(sink.getCounter(sink.POLICY_LOADS, kind='parse'), 1)
+
+        snapshotFilePath = os.path.join(self.tmpDir, 'policy.snapshot')
+        pdp.saveSnapshot(snapshotFilePath)
+        PDP.fromSnapshot(snapshotFilePath, metricsSink=sink)
+        self.assertEqual(sink.getCounter(sink.POLICY_LOADS, kind='snapshot'),
+                         1)
+
+        PolicyStore(XACML_NDGTEST1_FILEPATH, ReaderFactory, metricsSink=sink)
+        histogram = sink.getHistogram(sink.POLICY_LOAD_LATENCY, kind='parse')
+        self.assertEqual(histogram.count, 2)
+
+        self.assertRaises(TypeError, PDP, metricsSink=object())
+
+    def test04Histogram(self):
+        histogram = Histogram((1., 2., 5.))
+        for value in (.5, 1., 1.5, 3., 10.):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.getCumulativeCounts(), [2, 3, 4, 5])
+        self.assertEqual(histogram.count, 5)
+        self.assertEqual(histogram.sum, 16.)
+        self.assertRaises(ValueError, Histogram, (2., 1.))
+
+    def test05PrometheusTextExporter(self):
+        sink = InMemoryMetricsSink()
+        self.assertEqual(PrometheusTextExporter().export(sink), '')
+
+        self._evaluate(PDP(policy=self.policy, metricsSink=sink),
+                       CountingPIP(error=IOError('Attribute authority '
+                                                 'unavailable')))
+        stream = io.StringIO()
+        PrometheusTextExporter().write(sink, stream)
+        lines = stream.getvalue().splitlines()
+
+        self.assertIn('# TYPE ndg_xacml_decisions_total counter', lines)
+        self.assertIn('# TYPE ndg_xacml_decision_latency_seconds histogram',
+                      lines)
+        self.assertIn('ndg_xacml_decision_latency_seconds_bucket{le="+Inf"} '
+                      '%d' % len(self.__class__.RESOURCE_IDS), lines)
+        self.assertIn('ndg_xacml_decision_latency_seconds_count %d' %
+                      len(self.__class__.RESOURCE_IDS), lines)
+        self.assertTrue(any([line.startswith(
+                                'ndg_xacml_indeterminate_errors_total'
+                                '{error_type="OSError"} ')
+                             for line in lines]))
+
+        # Every sample line is a metric name with optional labels and value
+        for line in lines:
+            if not line.startswith('#'):
+                name, value = line.rsplit(' ', 1)
+                self.assertTrue(name.startswith('ndg_xacml_'))
+                float(value)
+
+        text = PrometheusTextExporter(prefix='pdp_').export(sink)
+        self.assertIn('pdp_decisions_total{decision="', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+"""NDG XACML short circuit target matching unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import logging
+import unittest
+from unittest import mock
+
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+from ndg.xacml.core.attributedesignator import ResourceAttributeDesignator
+from ndg.xacml.core.match import MatchBase
+from ndg.xacml.core.context.exceptions import MissingAttributeError
+from ndg.xacml.core.context.pdp import PDP, CompiledPDP
+from ndg.xacml.core.context.result import Decision
+from ndg.xacml.test.context import TestContextHandler
+from ndg.xacml.test.context.test_compiled_pdp import DifferentialTestHarness
+
+
+logging.basicConfig(level=logging.ERROR)
+log = logging.getLogger(__name__)
+
+
+class ShortCircuitMatchingTestCase(DifferentialTestHarness):
+    """Test short circuit matching of targets gives the same decisions with
+    fewer match evaluations"""
+
+    def _loadPDP(self, filePath):
+        return PDP.fromPolicySource(filePath, ReaderFactory)
+
+    def test01SameDecisions(self):
+        for filePath in self.__class__.POLICY_FILEPATHS:
+            pdp = self._loadPDP(filePath)
+            shortCircuitPdp = PDP(policy=pdp.policy, shortCircuitMatching=True)
+            nRequests = self._assertSameDecisions(pdp, shortCircuitPdp.evaluate)
+            self.assertTrue(nRequests > 0)
+
+    def test02SameDecisionsWithPIP(self):
+        ctxHandler = TestContextHandler()
+        for filePath in self.__class__.POLICY_FILEPATHS:
+            pdp = self._loadPDP(filePath)
+            shortCircuitPdp = PDP(policy=pdp.policy, shortCircuitMatching=True)
+            self._assertSameDecisions(pdp, shortCircuitPdp.evaluate,
+                                      ctxHandler=ctxHandler)
+
+    def test03SameDecisionsCompiled(self):
+        for filePath in self.__class__.POLICY_FILEPATHS:
+            pdp = self._loadPDP(filePath)
+            compiledPdp = CompiledPDP(policy=pdp.policy,
+                                      shortCircuitMatching=True)
+            self._assertSameDecisions(pdp, compiledPdp.evaluate)
+
+    def _getTargetWithResourceMatch(self, mustBePresent):
+        """Get the target of the policy rule restricting access by subject
+        role and resource, requiring a resource attribute which requests don't
+        have"""
+        policy = self._createPDPfromNdgTest1Policy().policy
+        for rule in policy.rules:
+            target = rule.target
+            if (target is not None and
+                len(target.subjects) > 0 and
+                len(target.resources) > 0):
+                break
+        else:
+            self.fail('No rule target with subjects and resources')
+
+        designator = ResourceAttributeDesignator()
+        designator.attributeId = 'urn:ndg:test:missing'
+        designator.dataType = target.resources[0].matches[0
+                                            ].attributeDesignator.dataType
+        designator.mustBePresent = mustBePresent
+        target.resources[0].matches[0].attributeDesignator = designator
+        return target
+
+    def test04ErrorsStillReported(self):
+        target = self._getTargetWithResourceMatch(True)
+
+        # Subjects don't match but the resources section is still evaluated
+        # as its match may raise an error
+        request = self._createRequestCtx('http://localhost/',
+                                         subjectRoles=('unknown',))
+        request.shortCircuitMatching = True
+        self.assertRaises(MissingAttributeError, target.match, request)
+
+    def test05SkippedWhereNoError(self):
+        target = self._getTargetWithResourceMatch(False)
+        request = self._createRequestCtx('http://localhost/',
+                                         subjectRoles=('unknown',))
+        for shortCircuitMatching, expectedCalls in ((False, True),
+                                                    (True, False)):
+            request.shortCircuitMatching = shortCircuitMatching
+            with mock.patch.object(ResourceAttributeDesignator, 'evaluate',
+                                   autospec=True,
+                                   side_effect=
+                                   ResourceAttributeDesignator.evaluate
+                                   ) as resourceSpy:
+                self.assertFalse(target.match(request))
+                self.assertEqual(resourceSpy.call_count > 0, expectedCalls)
+
+    def test06Settings(self):
+        pdp = PDP(policy=self._createPDPfromNdgTest1Policy().policy,
+                  shortCircuitMatching=True)
+        request = self._createRequestCtx(
+                                    'http://localhost/resource-only-restricted')
+        response = pdp.evaluate(request)
+        self.assertEqual(response.results[0].decision, Decision.PERMIT)
+
+        # Setting is only enabled in the request during evaluation
+        self.assertFalse(request.shortCircuitMatching)
+
+        self.assertRaises(TypeError, PDP, shortCircuitMatching=None)
+        self.assertRaises(TypeError, setattr, request, 'shortCircuitMatching',
+                          1)
+
+    def _countMatches(self):
+        """Evaluate the requests for each of the test policies with and without
+        short circuit matching counting the match evaluations.  See 
+        ndg.xacml.bench.features for timings.
+
+        @return: number of match evaluations without and with short circuit 
+        matching for each policy
+        @rtype: list
+        """
+        counts = []
+        for filePath in self.__class__.POLICY_FILEPATHS:
+            policy = self._loadPDP(filePath).policy
+            requests = list(self._getRequests(policy))
+            policyCounts = []
+            for shortCircuitMatching in (False, True):
+                pdp = PDP(policy=policy,
+                          shortCircuitMatching=shortCircuitMatching)
+                with mock.patch.object(MatchBase, 'evaluate', autospec=True,
+                                       side_effect=MatchBase.evaluate
+                                       ) as matchSpy:
+                    for request in requests:
+                        pdp.evaluate(request)
+                    policyCounts.append(matchSpy.call_count)
+
+            counts.append(tuple(policyCounts))
+
+        return counts
+
+    def test07FewerMatches(self):
+        counts = self._countMatches()
+        nMatches = sum([policyCounts[0] for policyCounts in counts])
+        nShortCircuitMatches = sum([policyCounts[1] 
+                                    for policyCounts in counts])
+        log.info('Match evaluations: %d without and %d with short circuit '
+                 'matching', nMatches, nShortCircuitMatches)
+        self.assertTrue(nShortCircuitMatches < nMatches)
+        for nPolicyMatches, nPolicyShortCircuitMatches in counts:
+            self.assertTrue(nPolicyShortCircuitMatches <= nPolicyMatches)
+
+
+if __name__ == "__main__":
+    unittest.main()
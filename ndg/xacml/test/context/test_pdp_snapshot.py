@@ -0,0 +1,87 @@
+"""NDG XACML PDP policy snapshot unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+from ndg.xacml.core.context.pdp import PDP, CompiledPDP
+from ndg.xacml.core.snapshot import PolicySnapshot, PolicySnapshotError
+from ndg.xacml.test import GroupRoleAttributeValue
+from ndg.xacml.test.context.test_compiled_pdp import DifferentialTestHarness
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class PDPSnapshotTestCase(DifferentialTestHarness):
+    """Test PDPs loaded from policy snapshots give the same decisions as those
+    loaded from the policy XML"""
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.snapshotFilePath = os.path.join(self.tmpDir, 'policy.snapshot')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def test01SameDecisions(self):
+        for filePath in self.__class__.POLICY_FILEPATHS:
+            pdp = PDP.fromPolicySource(filePath, ReaderFactory)
+            pdp.saveSnapshot(self.snapshotFilePath)
+            snapshotPdp = PDP.fromSnapshot(self.snapshotFilePath)
+            self.assertEqual(type(snapshotPdp.policy), type(pdp.policy))
+            self.assertEqual(snapshotPdp.policy.ident, pdp.policy.ident)
+            self._assertSameDecisions(pdp, snapshotPdp.evaluate)
+
+    def test02CompiledPDP(self):
+        pdp = self._createPDPfromNdgTest1Policy()
+        pdp.saveSnapshot(self.snapshotFilePath)
+        compiledPdp = CompiledPDP.fromSnapshot(self.snapshotFilePath)
+        self.assertIsInstance(compiledPdp, CompiledPDP)
+        self._assertSameDecisions(pdp, compiledPdp.evaluate)
+
+    def test03InvalidSnapshot(self):
+        with open(self.snapshotFilePath, 'wb') as snapshotFile:
+            snapshotFile.write(b'<Policy/>')
+        self.assertRaises(PolicySnapshotError, PDP.fromSnapshot,
+                          self.snapshotFilePath)
+
+        # Snapshots for a different format version are rejected
+        pdp = self._createPDPfromNdgTest1Policy()
+        pdp.saveSnapshot(self.snapshotFilePath)
+        with open(self.snapshotFilePath, 'r+b') as snapshotFile:
+            snapshotFile.write(struct.pack(PolicySnapshot.HEADER_FORMAT,
+                                           PolicySnapshot.SNAPSHOT_MAGIC,
+                                           PolicySnapshot.FORMAT_VERSION + 1))
+        self.assertRaises(PolicySnapshotError, PDP.fromSnapshot,
+                          self.snapshotFilePath)
+
+    def test04UnsupportedType(self):
+        pdp = self._createPDPfromNdgTest1Policy()
+        for rule in pdp.policy.rules:
+            if rule.target is not None and len(rule.target.subjects) > 0:
+                match = rule.target.subjects[0].matches[0]
+                match.attributeValue = GroupRoleAttributeValue()
+                break
+        else:
+            self.fail('No rule target with subjects')
+
+        self.assertRaises(PolicySnapshotError, pdp.saveSnapshot,
+                          self.snapshotFilePath)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,281 @@
+"""NDG XACML PDP tests with policy references fetched from a local HTTP
+server
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from ndg.xacml.finder.urlpolicyfinder import UrlPolicyFinder
+from ndg.xacml.utils.urlfetcher import UrlFetcher, HTTPConnectionPool
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+from ndg.xacml.core.context.pdp import PDP
+from ndg.xacml.test import THIS_DIR
+from ndg.xacml.test.context import XacmlContextBaseTestCase
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class PolicyRequestHandler(BaseHTTPRequestHandler):
+    """Serve policy documents with ETags recording each request made"""
+    protocol_version = 'HTTP/1.1'
+    DOC_DIR = os.path.join(THIS_DIR, 'cmip5_policyset')
+    RESPONSE_DELAY = 0.05
+
+    lock = threading.Lock()
+    requests = []
+    nInProgress = 0
+    maxInProgress = 0
+
+    @classmethod
+    def reset(cls):
+        with cls.lock:
+            cls.requests = []
+            cls.maxInProgress = 0
+
+    def do_GET(self):
+        cls = self.__class__
+        with cls.lock:
+            cls.nInProgress += 1
+            cls.maxInProgress = max(cls.maxInProgress, cls.nInProgress)
+        try:
+            time.sleep(cls.RESPONSE_DELAY)
+            status = self._respond()
+        finally:
+            with cls.lock:
+                cls.nInProgress -= 1
+                cls.requests.append((urllib.parse.unquote(self.path), status,
+                                     self.client_address[1]))
+
+    def _respond(self):
+        filePath = os.path.join(self.__class__.DOC_DIR,
+                                urllib.parse.unquote(self.path.lstrip('/')))
+        if not os.path.isfile(filePath):
+            self.send_error(404)
+            return 404
+
+        with open(filePath, 'rb') as docFile:
+            doc = docFile.read()
+
+        etag = '"%s"' % hashlib.sha256(doc).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return 304
+
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(doc)))
+        self.end_headers()
+        self.wfile.write(doc)
+        return 200
+
+    def log_message(self, *arg):
+        pass
+
+
+class ClosedConnection(object):
+    """Connection which has been closed by the server"""
+    def __init__(self):
+        self.nRequests = 0
+
+    def set_debuglevel(self, level):
+        pass
+
+    def request(self, method, path, headers=None):
+        self.nRequests += 1
+        raise ConnectionResetError('Connection closed by server')
+
+    def close(self):
+        pass
+
+
+class Test(XacmlContextBaseTestCase):
+    """Test policy references fetched concurrently over keep-alive
+    connections and cached on disk"""
+    RESOURCE_IDS = (
+        'http://localhost/thredds/dodsC/cmip5.output1.MOHC.HadGEM2-ES.rcp60.'
+        'day.land.day.r1i1p1.mrsos.20111007.aggregation.dods',
+        'http://localhost/thredds/dodsC/cmip5.output1.MOHC.HadGEM2-ES.rcp60.'
+        'day.land.day.r1i1p1.mrsos.20110915.aggregation.dods',
+        'http://localhost/thredds/dodsC/cmip5.output1.MOHC.HadGEM2-ES.rcp60.'
+        '3hr.land.3hr.r1i1p1.mrsos.20111007.aggregation.dods'
+    )
+    XACML_FILEPATH = os.path.join(PolicyRequestHandler.DOC_DIR,
+                                  'cmip5-policyset.xml')
+    URL_REFERENCES_FILEPATH = os.path.join(THIS_DIR,
+                                           'policy_set_url_references.xml')
+
+    # Policy set and policy documents referenced from the root policy set
+    N_REFERENCED_DOCS = 8
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0),
+                                         PolicyRequestHandler)
+        cls.server.daemon_threads = True
+        cls.serverThread = threading.Thread(target=cls.server.serve_forever)
+        cls.serverThread.daemon = True
+        cls.serverThread.start()
+        cls.baseUrl = 'http://127.0.0.1:%d/' % cls.server.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        PolicyRequestHandler.reset()
+        self.tmpDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def _createPDP(self, **kw):
+        finder = UrlPolicyFinder(self.__class__.baseUrl, **kw)
+        try:
+            return PDP.fromPolicySource(self.__class__.XACML_FILEPATH,
+                                        ReaderFactory, finder)
+        finally:
+            finder.close()
+
+    def _assertSameDecisions(self, pdp):
+        filePdp = PDP.fromPolicySource(self.__class__.XACML_FILEPATH,
+                                       ReaderFactory)
+        for resourceId in self.__class__.RESOURCE_IDS:
+            request = self._createRequestCtx(resourceId,
+                                             subjectRoles=('cmip5_research',))
+            decisions = [[result.decision
+                          for result in evaluatingPdp.evaluate(request).results]
+                         for evaluatingPdp in (filePdp, pdp)]
+            self.assertEqual(decisions[1], decisions[0])
+
+    def test01ConcurrentFetch(self):
+        pdp = self._createPDP()
+        self._assertSameDecisions(pdp)
+
+        # Each document is fetched once and several at the same time
+        paths = [path for path, status, port in PolicyRequestHandler.requests]
+        self.assertEqual(len(paths), self.__class__.N_REFERENCED_DOCS)
+        self.assertEqual(len(set(paths)), len(paths))
+        self.assertTrue(PolicyRequestHandler.maxInProgress > 1)
+
+    def test02KeepAlive(self):
+        pdp = self._createPDP(maxWorkers=1)
+        self._assertSameDecisions(pdp)
+
+        # All documents are fetched over the same connection
+        ports = set([port for path, status, port in
+                     PolicyRequestHandler.requests])
+        self.assertEqual(len(PolicyRequestHandler.requests),
+                         self.__class__.N_REFERENCED_DOCS)
+        self.assertEqual(len(ports), 1)
+        self.assertEqual(PolicyRequestHandler.maxInProgress, 1)
+
+    def test03FetchWhenNeeded(self):
+        pdp = self._createPDP(maxWorkers=0)
+        self._assertSameDecisions(pdp)
+        self.assertEqual(len(PolicyRequestHandler.requests),
+                         self.__class__.N_REFERENCED_DOCS)
+
+    def test04Cache(self):
+        cacheDir = os.path.join(self.tmpDir, 'cache')
+        self._createPDP(cacheDir=cacheDir)
+        self.assertEqual(set([status for path, status, port in
+                              PolicyRequestHandler.requests]), set([200]))
+
+        # Cached documents are revalidated and not downloaded again
+        PolicyRequestHandler.reset()
+        pdp = self._createPDP(cacheDir=cacheDir)
+        self._assertSameDecisions(pdp)
+        self.assertEqual(len(PolicyRequestHandler.requests),
+                         self.__class__.N_REFERENCED_DOCS)
+        self.assertEqual(set([status for path, status, port in
+                              PolicyRequestHandler.requests]), set([304]))
+
+    def test05MissingReference(self):
+        finder = UrlPolicyFinder(self.__class__.baseUrl + 'missing')
+        try:
+            self.assertRaises(Exception, PDP.fromPolicySource,
+                              self.__class__.XACML_FILEPATH, ReaderFactory,
+                              finder)
+        finally:
+            finder.close()
+
+    def test05_01DocumentsReleased(self):
+        finder = UrlPolicyFinder(self.__class__.baseUrl)
+        try:
+            PDP.fromPolicySource(self.__class__.XACML_FILEPATH, ReaderFactory,
+                                 finder)
+
+            # Documents aren't kept once parsed
+            self.assertEqual(finder._prefetchedDocs, {})
+        finally:
+            finder.close()
+
+    def test05_02RetryOnce(self):
+        netloc = urllib.parse.urlparse(self.__class__.baseUrl).netloc
+        connectionPool = HTTPConnectionPool()
+        staleConnections = [ClosedConnection() for i in range(3)]
+        for connection in staleConnections:
+            connectionPool.releaseConnection('http', netloc, connection)
+
+        # The request is retried on a new connection rather than the other
+        # idle connections
+        fetcher = UrlFetcher(connectionPool=connectionPool)
+        data = fetcher.fetch(self.__class__.baseUrl + 'cmip5-policyset.xml')
+        fetcher.close()
+        self.assertTrue(len(data) > 0)
+        self.assertEqual([connection.nRequests
+                          for connection in staleConnections], [0, 0, 1])
+
+        # Only one retry is made if the new connection fails too
+        for connection in staleConnections:
+            connectionPool.releaseConnection('http', netloc, connection)
+        newConnection = ClosedConnection()
+        with mock.patch.object(connectionPool, 'newConnection',
+                               return_value=newConnection):
+            self.assertRaises(ConnectionResetError, fetcher.fetch,
+                              self.__class__.baseUrl + 'cmip5-policyset.xml')
+        self.assertEqual([connection.nRequests
+                          for connection in staleConnections], [0, 0, 2])
+        self.assertEqual(newConnection.nRequests, 1)
+
+    def test06FindReferences(self):
+        with open(self.__class__.URL_REFERENCES_FILEPATH, 'rb') as policyFile:
+            policyDoc = policyFile.read()
+
+        # References in comments are ignored
+        self.assertEqual(UrlPolicyFinder.findReferences(policyDoc),
+                         ['urn:ndg:security:1.0:authz:test:policy-set-2'])
+
+        # References to policies declared in the same document are excluded
+        internalReferencesFilePath = os.path.join(
+                                THIS_DIR, 'policy_set_internal_references.xml')
+        with open(internalReferencesFilePath, 'rb') as policyFile:
+            self.assertEqual(
+                    UrlPolicyFinder.findReferences(policyFile.read()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
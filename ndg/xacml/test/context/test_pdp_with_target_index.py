@@ -0,0 +1,145 @@
+"""NDG XACML Policy Set target index unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import logging
+import os.path
+import unittest
+
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+from ndg.xacml.core.context.pdp import PDP
+from ndg.xacml.core.policyset import PolicySet
+from ndg.xacml.core.targetindex import TargetIndex
+from ndg.xacml.test import THIS_DIR
+from ndg.xacml.test.context import XacmlContextBaseTestCase
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class TargetIndexRegexpPrefixTestCase(unittest.TestCase):
+    """Test derivation of literal prefixes from regular expressions"""
+
+    def test01LiteralPrefix(self):
+        self.assertEqual(TargetIndex.getRegexpPrefixes(
+                                            '^http://localhost/download.*/$'),
+                         ['http://localhost/download'])
+
+    def test02EscapedCharacters(self):
+        self.assertEqual(TargetIndex.getRegexpPrefixes(r'http://a\.b/c\d'),
+                         ['http://a.b/c'])
+
+    def test03Quantifiers(self):
+        self.assertEqual(TargetIndex.getRegexpPrefixes('abc*'), ['ab'])
+        self.assertEqual(TargetIndex.getRegexpPrefixes('abc+d'), ['abc'])
+        self.assertEqual(TargetIndex.getRegexpPrefixes('abc{2}'), ['ab'])
+        self.assertEqual(sorted(TargetIndex.getRegexpPrefixes('https?://x')),
+                         ['http://x', 'https://x'])
+
+    def test04NoPrefix(self):
+        for pattern in ('.*', '^(a|b)', 'a|b', '[ab]c', 'a?', r'\w+', '(?i)a'):
+            self.assertIsNone(TargetIndex.getRegexpPrefixes(pattern),
+                              'Expecting no prefix for %r' % pattern)
+
+    def test05AlternationInGroup(self):
+        self.assertEqual(TargetIndex.getRegexpPrefixes('abc(d|e)'), ['abc'])
+
+
+class TargetIndexPdpTestCase(XacmlContextBaseTestCase):
+    """Test that PDP decisions are unchanged when Policy Sets are evaluated
+    using a target index
+    """
+    POLICY_SET_FILEPATHS = (
+        os.path.join(THIS_DIR, 'cmip5_policyset', 'cmip5-policyset.xml'),
+        os.path.join(THIS_DIR, 'faam_policyset', 'policy_faam_policyset.xml'),
+        os.path.join(THIS_DIR, 'eo_policyset', 'eo_policyset.xml'),
+        os.path.join(THIS_DIR, 'policy_set_nested_only.xml'),
+        os.path.join(THIS_DIR, 'policy_set_internal_references.xml')
+    )
+    RESOURCE_IDS = (
+        'http://localhost/thredds/dodsC/cmip5.output1.MOHC.HadGEM2-ES.rcp60.day.land.day.r1i1p1.mrsos.20111007.aggregation.dods',
+        'http://localhost/thredds/dodsC/cmip5.output1.MOHC.HadGEM2-ES.rcp60.day.land.day.r1i1p1.mrsos.20110915.aggregation.dods',
+        'http://localhost/thredds/dodsC/cmip5.output1.MOHC.HadGEM2-ES.rcp60.3hr.land.3hr.r1i1p1.mrsos.20111007.aggregation.dods',
+        'http://localhost/download/badc/faam/data/2010/b555-sep-15/core_raw/b555_raw_data.dat',
+        'http://localhost/download/badc/faam/data/2004/',
+        'http://localhost/mtci/',
+        'http://localhost/mtci/myfile',
+        'http://localhost/',
+        'http://localhost/test_securedURI',
+        'http://localhost/unknown/resource',
+        'https://localhost/thredds/dodsC/cmip5',
+        'ftp://elsewhere'
+    )
+    SUBJECT_ROLES = (
+        (),
+        ('cmip5_research',),
+        ('faam_admin',),
+        ('group1',),
+        ('mtci',),
+        ('staff', 'postdoc')
+    )
+    ACTIONS = ('read', 'write')
+
+    def _getRequests(self, includeSubject=True):
+        for resourceId in self.__class__.RESOURCE_IDS:
+            for subjectRoles in self.__class__.SUBJECT_ROLES:
+                for action in self.__class__.ACTIONS:
+                    yield self._createRequestCtx(resourceId,
+                                                 includeSubject=includeSubject,
+                                                 subjectRoles=subjectRoles,
+                                                 action=action)
+
+    def test01DecisionsUnchanged(self):
+        for filePath in self.__class__.POLICY_SET_FILEPATHS:
+            pdp = PDP.fromPolicySource(filePath, ReaderFactory)
+            self.assertIsInstance(pdp.policy, PolicySet)
+
+            expectedDecisions = [pdp.evaluate(request).results[0].decision
+                                 for request in self._getRequests()]
+
+            pdp.policy.buildTargetIndex()
+            self.assertIsNotNone(pdp.policy.targetIndex)
+
+            decisions = [pdp.evaluate(request).results[0].decision
+                         for request in self._getRequests()]
+
+            self.assertEqual(decisions, expectedDecisions,
+                             'Decisions differ using target index for %r' %
+                             filePath)
+
+    def test02CandidatesPruned(self):
+        filePath = self.__class__.POLICY_SET_FILEPATHS[1]
+        policySet = PDP.fromPolicySource(filePath, ReaderFactory).policy
+        targetIndex = policySet.buildTargetIndex()
+        self.assertTrue(targetIndex.nIndexed > 0)
+
+        request = self._createRequestCtx('ftp://elsewhere',
+                                         subjectRoles=('faam_admin',))
+        candidates = targetIndex.getCandidates(policySet.policies, request)
+        self.assertTrue(len(candidates) < len(policySet.policies))
+
+    def test03StaleIndexIgnored(self):
+        filePath = self.__class__.POLICY_SET_FILEPATHS[1]
+        policySet = PDP.fromPolicySource(filePath, ReaderFactory).policy
+        targetIndex = policySet.buildTargetIndex()
+
+        del policySet.policies[0]
+        self.assertFalse(targetIndex.isValidFor(policySet.policies))
+
+        request = self._createRequestCtx('ftp://elsewhere')
+        candidates = targetIndex.getCandidates(policySet.policies, request)
+        self.assertIs(candidates, policySet.policies)
+
+        policySet.clearTargetIndex()
+        self.assertIsNone(policySet.targetIndex)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+"""NDG XACML Policy Information Point query memoisation and cache unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import logging
+import unittest
+
+from ndg.xacml.core.attribute import Attribute
+from ndg.xacml.core.attributedesignator import SubjectAttributeDesignator
+from ndg.xacml.core.context.pdp import CompiledPDP
+from ndg.xacml.core.context.pipcache import PIPCache
+from ndg.xacml.test.context import (XacmlContextBaseTestCase,
+                                    TestContextHandler,
+                                    StringAttributeValue,
+                                    ROLE_ATTRIBUTE_ID)
+from ndg.xacml.test.context.test_pdp_decision_cache import FakeTimer
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class CountingContextHandler(TestContextHandler):
+    """Context handler counting the queries made to it"""
+    def __init__(self):
+        super(CountingContextHandler, self).__init__()
+        self.nQueries = 0
+
+    def pipQuery(self, request, designator):
+        self.nQueries += 1
+        return super(CountingContextHandler, self).pipQuery(request,
+                                                            designator)
+
+
+class PIPCacheTestCase(XacmlContextBaseTestCase):
+    """Test memoisation of PIP queries for a request and caching between
+    requests"""
+    RESOURCE_ID = 'http://localhost/at-least-one-of-subject-role-restricted'
+
+    def setUp(self):
+        self.ctxHandler = CountingContextHandler()
+        self.pdp = self._createPDPfromNdgTest1Policy()
+
+    def _createRequest(self, resourceId=RESOURCE_ID, **kw):
+        request = self._createRequestCtx(resourceId, **kw)
+        request.ctxHandler = self.ctxHandler
+        return request
+
+    @staticmethod
+    def _createDesignator(attributeId=ROLE_ATTRIBUTE_ID):
+        designator = SubjectAttributeDesignator()
+        designator.attributeId = attributeId
+        designator.dataType = StringAttributeValue.IDENTIFIER
+        return designator
+
+    def test01QueriedOncePerRequest(self):
+        request = self._createRequest()
+        designator = self._createDesignator()
+        for i in range(3):
+            bag = designator.evaluate(request)
+            self.assertEqual([i.value for i in bag], ['staff', 'admin'])
+
+        self.assertEqual(self.ctxHandler.nQueries, 1)
+        self.assertEqual(request.nPIPQueries, 1)
+        self.assertEqual(request.nPIPQueriesSaved, 2)
+
+        # Designator with the same attribute ID, data type and issuer
+        self._createDesignator().evaluate(request)
+        self.assertEqual(self.ctxHandler.nQueries, 1)
+
+        # Results are not shared between requests
+        designator.evaluate(self._createRequest())
+        self.assertEqual(self.ctxHandler.nQueries, 2)
+
+    def test02SameDecisions(self):
+        referenceCtxHandler = TestContextHandler()
+        for pdp in (self.pdp, CompiledPDP(policy=self.pdp.policy)):
+            for resourceId in ('http://localhost/resource-only-restricted',
+                               self.__class__.RESOURCE_ID,
+                               'http://localhost/unknown'):
+                for subjectRoles in (('staff',), ('student',), ()):
+                    request = self._createRequest(resourceId,
+                                                  subjectRoles=subjectRoles)
+                    decision = pdp.evaluate(request).results[0].decision
+
+                    # Resetting the context handler clears memoised results
+                    request.ctxHandler = referenceCtxHandler
+                    self.assertEqual(pdp.evaluate(request).results[0].decision,
+                                     decision)
+
+        self.assertTrue(self.ctxHandler.nQueries > 0)
+
+    def test03InvalidatedOnChange(self):
+        request = self._createRequest()
+        designator = self._createDesignator()
+        designator.evaluate(request)
+
+        # Changes to other requests and to attributes not in the request
+        self._createRequest()
+        Attribute().attributeValues.extend([])
+        designator.evaluate(request)
+        self.assertEqual(self.ctxHandler.nQueries, 1)
+
+        request.subjects[0].attributes[-1].attributeValues.append(
+                                            StringAttributeValue('postdoc'))
+        bag = designator.evaluate(request)
+        self.assertEqual([i.value for i in bag], ['staff', 'postdoc', 'admin'])
+        self.assertEqual(self.ctxHandler.nQueries, 2)
+
+        # Different context handler
+        request.ctxHandler = self.ctxHandler
+        designator.evaluate(request)
+        self.assertEqual(self.ctxHandler.nQueries, 3)
+
+    def test04SharedCache(self):
+        pipCache = PIPCache()
+        self.ctxHandler.pipCache = pipCache
+        designator = self._createDesignator()
+        otherDesignator = self._createDesignator(attributeId='urn:other:attr')
+        for i in range(3):
+            request = self._createRequest()
+            self.assertEqual([i.value for i in designator.evaluate(request)],
+                             ['staff', 'admin'])
+            self.assertEqual(len(otherDesignator.evaluate(request)), 0)
+
+        self.assertEqual(self.ctxHandler.nQueries, 2)
+        self.assertEqual(pipCache.misses, 2)
+        self.assertEqual(pipCache.hits, 2)
+        self.assertEqual(pipCache.negativeHits, 2)
+        self.assertEqual(pipCache.queriesSaved, 4)
+
+        # Different subject
+        designator.evaluate(self._createRequest(subjectRoles=('student',)))
+        self.assertEqual(self.ctxHandler.nQueries, 3)
+
+    def test05Expiry(self):
+        timer = FakeTimer()
+        pipCache = PIPCache(ttl=60., negativeTtl=10., timer=timer)
+        self.ctxHandler.pipCache = pipCache
+        designator = self._createDesignator()
+        otherDesignator = self._createDesignator(attributeId='urn:other:attr')
+        designator.evaluate(self._createRequest())
+        otherDesignator.evaluate(self._createRequest())
+
+        timer.now = 30.
+        designator.evaluate(self._createRequest())
+        otherDesignator.evaluate(self._createRequest())
+        self.assertEqual(self.ctxHandler.nQueries, 3)
+        self.assertEqual(pipCache.expirations, 1)
+
+        timer.now = 61.
+        designator.evaluate(self._createRequest())
+        self.assertEqual(self.ctxHandler.nQueries, 4)
+        self.assertEqual(pipCache.expirations, 2)
+
+    def test06NegativeCachingDisabled(self):
+        pipCache = PIPCache(negativeTtl=0)
+        self.assertFalse(pipCache.put(('key',), None))
+        self.assertFalse(pipCache.put(('key',), []))
+        self.assertTrue(pipCache.put(('key',), [StringAttributeValue('a')]))
+
+    def test07InvalidSettings(self):
+        self.assertRaises(ValueError, PIPCache, maxSize=0)
+        self.assertRaises(ValueError, PIPCache, ttl=0)
+        self.assertRaises(ValueError, PIPCache, negativeTtl=-1)
+        self.assertRaises(TypeError, setattr, self.ctxHandler, 'pipCache', {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,184 @@
+"""NDG XACML Policy Information Point query prefetch unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import logging
+import unittest
+
+from ndg.xacml import Config
+from ndg.xacml.core.context.handler import CtxHandlerBase
+from ndg.xacml.core.context.pdp import PDP, CompiledPDP
+from ndg.xacml.core.context.pipcache import PIPCache
+from ndg.xacml.core.context.pipinterface import PIPInterface
+from ndg.xacml.core.context.result import Decision
+from ndg.xacml.test.context import (XacmlContextBaseTestCase,
+                                    TestContextHandler,
+                                    StringAttributeValue,
+                                    ROLE_ATTRIBUTE_ID)
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class CountingPIP(PIPInterface):
+    """PIP returning an admin role as TestContextHandler does, counting the
+    round trips made to it"""
+    def __init__(self, error=None):
+        self.error = error
+        self.nQueries = 0
+
+    def attributeQuery(self, context, attributeDesignator):
+        self.nQueries += 1
+        if self.error is not None:
+            raise self.error
+
+        if attributeDesignator.attributeId == ROLE_ATTRIBUTE_ID:
+            return [StringAttributeValue(value='admin')]
+        return None
+
+
+class BatchCountingPIP(CountingPIP):
+    """PIP answering queries for several attributes in one round trip"""
+    def attributeQueryMany(self, context, attributeDesignators):
+        self.nQueries += 1
+        if self.error is not None:
+            raise self.error
+
+        return [[StringAttributeValue(value='admin')]
+                if attributeDesignator.attributeId == ROLE_ATTRIBUTE_ID
+                else None
+                for attributeDesignator in attributeDesignators]
+
+
+class PIPContextHandler(CtxHandlerBase):
+    """Context handler passing requests straight to the PDP and queries to the
+    PIP"""
+    def handlePEPRequest(self, myRequest):
+        myRequest.ctxHandler = self
+        return self.pdp.evaluate(myRequest)
+
+
+class PIPPrefetchTestCase(XacmlContextBaseTestCase):
+    """Test querying the PIP for all the attributes a policy may need before
+    evaluation"""
+    RESOURCE_IDS = (
+        'http://localhost/resource-only-restricted',
+        'http://localhost/at-least-one-of-subject-role-restricted',
+        'http://localhost/private-resource',
+        'http://localhost/unknown'
+    )
+    SUBJECT_ROLES = (('staff',), ('student',), ())
+
+    def setUp(self):
+        self.policy = self._createPDPfromNdgTest1Policy().policy
+
+    def _createRequests(self, ctxHandler):
+        requests = [self._createRequestCtx(resourceId,
+                                           subjectRoles=subjectRoles)
+                    for subjectRoles in self.__class__.SUBJECT_ROLES
+                    for resourceId in self.__class__.RESOURCE_IDS]
+        for request in requests:
+            request.ctxHandler = ctxHandler
+        return requests
+
+    def _getDecisions(self, pdp, pip, pipCache=None):
+        ctxHandler = PIPContextHandler()
+        ctxHandler.pip = pip
+        ctxHandler.pipCache = pipCache
+        return [pdp.evaluate(request).results[0].decision
+                for request in self._createRequests(ctxHandler)]
+
+    def test01GetPIPQueryDesignators(self):
+        designators = PDP.getPIPQueryDesignators(self.policy)
+        self.assertEqual(designators[0].attributeId, ROLE_ATTRIBUTE_ID)
+        self.assertEqual(len(set([(i.attributeId, i.dataType, i.issuer)
+                                  for i in designators])),
+                         len(designators))
+
+        pdp = PDP(policy=self.policy)
+        self.assertEqual(pdp.pipQueryDesignators, designators)
+
+    def test02SameDecisionsWithOneRoundTrip(self):
+        nRequests = (len(self.__class__.RESOURCE_IDS) *
+                     len(self.__class__.SUBJECT_ROLES))
+        for pdpClass in (PDP, CompiledPDP):
+            pip = BatchCountingPIP()
+            expectedDecisions = self._getDecisions(pdpClass(policy=self.policy),
+                                                   pip)
+            nQueries = pip.nQueries
+
+            pip = BatchCountingPIP()
+            pdp = pdpClass(policy=self.policy, prefetchPIPQueries=True)
+            self.assertEqual(self._getDecisions(pdp, pip), expectedDecisions)
+            self.assertEqual(pip.nQueries, nRequests)
+            self.assertTrue(pip.nQueries < nQueries)
+
+    def test03DefaultBatchQuery(self):
+        # PIP without a batch query is queried for each attribute in turn
+        pip = CountingPIP()
+        pdp = PDP(policy=self.policy, prefetchPIPQueries=True)
+        expectedDecisions = self._getDecisions(PDP(policy=self.policy),
+                                               CountingPIP())
+        self.assertEqual(self._getDecisions(pdp, pip), expectedDecisions)
+        self.assertEqual(pip.nQueries,
+                         len(pdp.pipQueryDesignators) *
+                         len(self.__class__.RESOURCE_IDS) *
+                         len(self.__class__.SUBJECT_ROLES))
+
+    def test04OverriddenPipQuery(self):
+        # Handlers implementing pipQuery are queried via pipQuery
+        pdp = PDP(policy=self.policy, prefetchPIPQueries=True)
+        request = self._createRequestCtx(self.__class__.RESOURCE_IDS[1],
+                                         subjectRoles=('student',))
+        request.ctxHandler = TestContextHandler()
+        response = pdp.evaluate(request)
+        self.assertEqual(response.results[0].decision, Decision.PERMIT)
+        self.assertEqual(request.nPIPQueries, len(pdp.pipQueryDesignators))
+        self.assertTrue(request.nPIPQueriesSaved > 0)
+
+    def test05QueryError(self):
+        error = IOError('Attribute authority unavailable')
+        expectedDecisions = self._getDecisions(PDP(policy=self.policy),
+                                               BatchCountingPIP(error=error))
+        self.assertIn(Decision.INDETERMINATE, expectedDecisions)
+
+        pdp = PDP(policy=self.policy, prefetchPIPQueries=True)
+        self.assertEqual(self._getDecisions(pdp, BatchCountingPIP(error=error)),
+                         expectedDecisions)
+
+    def test06SharedCache(self):
+        pip = BatchCountingPIP()
+        pdp = PDP(policy=self.policy, prefetchPIPQueries=True)
+        pipCache = PIPCache()
+        self._getDecisions(pdp, pip, pipCache=pipCache)
+
+        # One round trip for each distinct subject
+        self.assertEqual(pip.nQueries, len(self.__class__.SUBJECT_ROLES))
+        self.assertTrue(pipCache.queriesSaved > 0)
+
+    def test07InvalidSettings(self):
+        self.assertRaises(TypeError, PDP, prefetchPIPQueries=1)
+
+    def test08NoDebugLoggingWithoutTrace(self):
+        pdp = PDP(policy=self.policy, prefetchPIPQueries=True)
+        pdpLogger = 'ndg.xacml.core.context.pdp'
+        with self.assertNoLogs(pdpLogger, level=logging.DEBUG):
+            self._getDecisions(pdp, BatchCountingPIP())
+
+        Config.trace = True
+        try:
+            with self.assertLogs(pdpLogger, level=logging.DEBUG):
+                self._getDecisions(pdp, BatchCountingPIP())
+        finally:
+            Config.trace = False
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,234 @@
+"""NDG XACML policy optimiser unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import io
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+from ndg.xacml.core.policy import Policy
+from ndg.xacml.core.policyset import PolicySet
+from ndg.xacml.core.target import Target
+from ndg.xacml.core.attribute import Attribute
+from ndg.xacml.core.attributevalue import AttributeValueClassFactory
+from ndg.xacml.core.context.result import Decision
+from ndg.xacml.core.optimiser import PolicyOptimiser, main
+from ndg.xacml.core.context.pdp import PDP, CompiledPDP
+from ndg.xacml.test import THIS_DIR, XACML_NDGTEST1_FILEPATH
+from ndg.xacml.test.context.test_compiled_pdp import DifferentialTestHarness
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class PolicyOptimiserTestCase(DifferentialTestHarness):
+    """Test optimised policies give the same decisions as the originals"""
+    INTERNAL_REFERENCES_FILEPATH = os.path.join(
+                                THIS_DIR, 'policy_set_internal_references.xml')
+    COMBINING_ALG_ID = ("urn:oasis:names:tc:xacml:1.0:%s-combining-algorithm:"
+                        "%s")
+
+    def _createPolicy(self, policyId, ruleCombiningAlg=None):
+        """Create a copy of the NDG test policy
+
+        @param policyId: ID for the policy
+        @type policyId: string
+        @param ruleCombiningAlg: name of the rule combining algorithm to set
+        e.g. first-applicable or None to keep that of the test policy
+        @type ruleCombiningAlg: string / NoneType
+        @return: policy
+        @rtype: ndg.xacml.core.policy.Policy
+        """
+        policy = Policy.fromSource(XACML_NDGTEST1_FILEPATH, ReaderFactory)
+        policy.policyId = policyId
+        if ruleCombiningAlg is not None:
+            policy.ruleCombiningAlgId = self.__class__.COMBINING_ALG_ID % (
+                                                    'rule', ruleCombiningAlg)
+        return policy
+
+    def _createPolicySet(self, policySetId, policyCombiningAlg, policies):
+        policySet = PolicySet()
+        policySet.policySetId = policySetId
+        policySet.policyCombiningAlgId = self.__class__.COMBINING_ALG_ID % (
+                                                'policy', policyCombiningAlg)
+        policySet.policies.extend(policies)
+        return policySet
+
+    def _assertSameDecisionsOptimised(self, policy):
+        """Optimise a policy checking decisions are the same as for the
+        original
+
+        @return: optimised policy and optimisation report
+        @rtype: tuple
+        """
+        pdp = PDP(policy=policy)
+        optimiser = PolicyOptimiser()
+        optimisedPolicy = optimiser.optimise(policy)
+        self._assertSameDecisions(pdp, PDP(policy=optimisedPolicy).evaluate)
+        self._assertSameDecisions(pdp,
+                                  CompiledPDP(policy=optimisedPolicy).evaluate)
+        return optimisedPolicy, optimiser.report
+
+    def test01SameDecisions(self):
+        for filePath in self.__class__.POLICY_FILEPATHS:
+            policy = PDP.fromPolicySource(filePath, ReaderFactory).policy
+            optimisedPolicy, report = self._assertSameDecisionsOptimised(
+                                                                        policy)
+            self.assertTrue(report.nNodesAfter <= report.nNodesBefore)
+            self.assertEqual(report.nNodesAfter,
+                             PolicyOptimiser.countNodes(optimisedPolicy))
+
+    def test02PolicyNotChanged(self):
+        policy = PDP.fromPolicySource(
+                                self.__class__.INTERNAL_REFERENCES_FILEPATH,
+                                ReaderFactory).policy
+        nNodes = PolicyOptimiser.countNodes(policy)
+        optimisedPolicy, report = self._assertSameDecisionsOptimised(policy)
+        self.assertEqual(PolicyOptimiser.countNodes(policy), nNodes)
+        self.assertEqual(report.nNodesBefore, nNodes)
+        self.assertTrue(report.nNodesAfter < nNodes)
+        self.assertTrue(report.expectedSpeedup > 1.)
+
+    def test03MergePolicySets(self):
+        nestedPolicySet = self._createPolicySet('urn:ndg:test:nested',
+                                                'deny-overrides',
+                                                [self._createPolicy('a'),
+                                                 self._createPolicy('b')])
+        policySet = self._createPolicySet('urn:ndg:test:root',
+                                          'deny-overrides',
+                                          [nestedPolicySet,
+                                           self._createPolicy('c')])
+        optimisedPolicy, report = self._assertSameDecisionsOptimised(policySet)
+        self.assertEqual(report.nPolicySetsMerged, 1)
+        self.assertEqual([policy.ident for policy in optimisedPolicy.policies],
+                         ['a', 'b', 'c'])
+
+        # Not merged with a different combining algorithm
+        policySet.policyCombiningAlgId = self.__class__.COMBINING_ALG_ID % (
+                                                'policy', 'permit-overrides')
+        optimisedPolicy, report = self._assertSameDecisionsOptimised(policySet)
+        self.assertEqual(report.nPolicySetsMerged, 0)
+        self.assertEqual(len(optimisedPolicy.policies), 2)
+
+    def test04RemoveUnreachable(self):
+        # Test policy has a deny all rule first
+        policy = self._createPolicy('a', ruleCombiningAlg='first-applicable')
+        nRules = len(policy.rules)
+        optimisedPolicy, report = self._assertSameDecisionsOptimised(policy)
+        self.assertEqual(report.nUnreachableRemoved, nRules - 1)
+        self.assertEqual([rule.id for rule in optimisedPolicy.rules],
+                         [policy.rules[0].id])
+
+        # Policies following a catch all policy in a policy set
+        policy.target = Target()
+        policySet = self._createPolicySet('urn:ndg:test:root',
+                                          'first-applicable',
+                                          [policy, self._createPolicy('b')])
+        optimisedPolicy, report = self._assertSameDecisionsOptimised(policySet)
+        self.assertEqual([child.ident for child in optimisedPolicy.policies],
+                         ['a'])
+
+        # All rules may apply with other combining algorithms
+        policy = self._createPolicy('a')
+        optimisedPolicy, report = self._assertSameDecisionsOptimised(policy)
+        self.assertEqual(report.nUnreachableRemoved, 0)
+        self.assertEqual(len(optimisedPolicy.rules), nRules)
+
+    def test05HoistTargetSections(self):
+        policySet = self._createPolicySet('urn:ndg:test:root',
+                                          'first-applicable',
+                                          [self._createPolicy('a'),
+                                           self._createPolicy('b')])
+        optimisedPolicy, report = self._assertSameDecisionsOptimised(policySet)
+        self.assertEqual(len(optimisedPolicy.target.resources), 1)
+        for policy in optimisedPolicy.policies:
+            self.assertEqual(len(policy.target.resources), 0)
+
+        # Matches which may raise an error are not moved
+        for policy in policySet.policies:
+            policy.target.resources[0].matches[0
+                                    ].attributeDesignator.mustBePresent = True
+        optimisedPolicy, report = self._assertSameDecisionsOptimised(policySet)
+        self.assertIsNone(optimisedPolicy.target)
+        for policy in optimisedPolicy.policies:
+            self.assertEqual(len(policy.target.resources), 1)
+
+    def test05_01NoHoistMatchFunctionError(self):
+        # anyURI-equal raises an error for the string values the designator
+        # selects: each policy is Indeterminate giving an overall Deny, but
+        # if the match were hoisted the policy set would be Indeterminate
+        attributeValueFactory = AttributeValueClassFactory()
+        anyUriClass = attributeValueFactory(
+                                    'http://www.w3.org/2001/XMLSchema#anyURI')
+        stringClass = attributeValueFactory(
+                                    'http://www.w3.org/2001/XMLSchema#string')
+        policySet = self._createPolicySet('urn:ndg:test:root',
+                                          'deny-overrides',
+                                          [self._createPolicy('a'),
+                                           self._createPolicy('b')])
+        for policy in policySet.policies:
+            match = policy.target.resources[0].matches[0]
+            match.matchId = ('urn:oasis:names:tc:xacml:1.0:function:'
+                             'anyURI-equal')
+            match.attributeValue = anyUriClass('http://localhost/')
+            match.attributeDesignator.dataType = stringClass.IDENTIFIER
+
+        request = self._createRequestCtx('http://localhost/')
+        resourceAttribute = Attribute()
+        resourceAttribute.attributeId = request.resources[0].attributes[0
+                                                                ].attributeId
+        resourceAttribute.dataType = stringClass.IDENTIFIER
+        resourceAttribute.attributeValues.append(
+                                            stringClass('http://localhost/'))
+        request.resources[0].attributes.append(resourceAttribute)
+
+        optimisedPolicy, report = self._assertSameDecisionsOptimised(policySet)
+        self.assertEqual(report.nTargetSectionsHoisted, 0)
+        for policy in (policySet, optimisedPolicy):
+            response = PDP(policy=policy).evaluate(request)
+            self.assertEqual(response.results[0].decision, Decision.DENY)
+
+    def test06Offline(self):
+        tmpDir = tempfile.mkdtemp()
+        try:
+            outputFilePath = os.path.join(tmpDir, 'policy.xml')
+            output = io.StringIO()
+            with redirect_stdout(output):
+                main([self.__class__.INTERNAL_REFERENCES_FILEPATH,
+                      outputFilePath])
+            self.assertIn('expected speedup', output.getvalue())
+
+            pdp = PDP.fromPolicySource(
+                                self.__class__.INTERNAL_REFERENCES_FILEPATH,
+                                ReaderFactory)
+            optimisedPdp = PDP.fromPolicySource(outputFilePath, ReaderFactory)
+            self._assertSameDecisions(pdp, optimisedPdp.evaluate)
+        finally:
+            shutil.rmtree(tmpDir)
+
+    def test07Online(self):
+        pdp = CompiledPDP.fromPolicySource(
+                                self.__class__.INTERNAL_REFERENCES_FILEPATH,
+                                ReaderFactory)
+        policy = pdp.policy
+        report = pdp.optimisePolicy()
+        self.assertIsNot(pdp.policy, policy)
+        self.assertEqual(report.nNodesAfter,
+                         PolicyOptimiser.countNodes(pdp.policy))
+        self._assertSameDecisions(PDP(policy=policy), pdp.evaluate)
+
+
+if __name__ == "__main__":
+    unittest.main()
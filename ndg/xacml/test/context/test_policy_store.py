@@ -0,0 +1,232 @@
+"""NDG XACML policy store unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import logging
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+from ndg.xacml.core.context.pdp import PDP, CompiledPDP
+from ndg.xacml.core.context.result import Decision
+from ndg.xacml.core.context.decisioncache import DecisionCache
+from ndg.xacml.core.context.policystore import PolicyStore, PolicyReloadError
+from ndg.xacml.test import THIS_DIR
+from ndg.xacml.test.context import XacmlContextBaseTestCase
+
+
+logging.basicConfig(level=logging.CRITICAL)
+
+
+class PolicyStoreTestCase(XacmlContextBaseTestCase):
+    """Test reloading changed documents of the CMIP5 policy set"""
+    POLICY_DIR = os.path.join(THIS_DIR, 'cmip5_policyset')
+    ROOT_FILENAME = 'cmip5-policyset.xml'
+    POLICY_SET_FILENAME = ('urn:ndg:security:1.0:authz:test:'
+                           'cmip5-policyset-opendap')
+    POLICY_FILENAME = ('urn:ndg:security:1.0:authz:test:'
+                       'cmip5-policy-opendap-hadgem2-es')
+    UNCHANGED_POLICY_ID = ('urn:ndg:security:1.0:authz:test:'
+                           'cmip5-policy-opendap-hadgem2-a')
+
+    # Permitted by the policy set and denied by a rule in the HadGEM2-ES
+    # policy
+    DENIED_RESOURCE_ID = ('http://localhost/thredds/dodsC/cmip5.output1.MOHC.'
+                          'HadGEM2-ES.rcp60.day.land.day.r1i1p1.mrsos.20110915.'
+                          'aggregation.dods')
+    PERMITTED_RESOURCE_ID = ('http://localhost/thredds/dodsC/cmip5.output1.'
+                             'MOHC.HadGEM2-ES.rcp60.day.land.day.r1i1p1.mrsos.'
+                             '20111007.aggregation.dods')
+
+    # Policy documents including the root
+    N_DOCUMENTS = 9
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp()
+        self.policyDir = os.path.join(self.tmpDir, 'policy')
+        shutil.copytree(self.__class__.POLICY_DIR, self.policyDir)
+        self.rootFilePath = os.path.join(self.policyDir,
+                                         self.__class__.ROOT_FILENAME)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir)
+
+    def _modifyDocument(self, fileName, oldText, newText):
+        """Replace text in a policy document updating its modification time
+        """
+        filePath = os.path.join(self.policyDir, fileName)
+        with open(filePath) as policyFile:
+            policyDoc = policyFile.read()
+
+        self.assertIn(oldText, policyDoc)
+        stat = os.stat(filePath)
+        with open(filePath, 'w') as policyFile:
+            policyFile.write(policyDoc.replace(oldText, newText, 1))
+
+        # Ensure the change is seen on file systems with coarse timestamps
+        os.utime(filePath, ns=(stat.st_atime_ns,
+                               stat.st_mtime_ns + 1000000000))
+
+    def _getDecision(self, pdp, resourceId):
+        request = self._createRequestCtx(resourceId,
+                                         subjectRoles=('cmip5_research',))
+        return pdp.evaluate(request).results[0].decision
+
+    def _findPolicy(self, policySet, policyId):
+        for policy in policySet.policies:
+            if policy.ident == policyId:
+                return policy
+            if hasattr(policy, 'policies'):
+                found = self._findPolicy(policy, policyId)
+                if found is not None:
+                    return found
+        return None
+
+    def test01Load(self):
+        pdp = PDP()
+        store = PolicyStore(self.rootFilePath, ReaderFactory, pdps=[pdp])
+        self.assertIs(pdp.policy, store.policy)
+        self.assertEqual(len(store.documentUrls), self.__class__.N_DOCUMENTS)
+
+        filePdp = PDP.fromPolicySource(self.rootFilePath, ReaderFactory)
+        for resourceId in (self.__class__.DENIED_RESOURCE_ID,
+                           self.__class__.PERMITTED_RESOURCE_ID):
+            self.assertIs(self._getDecision(pdp, resourceId),
+                          self._getDecision(filePdp, resourceId))
+
+        self.assertFalse(store.reload())
+        self.assertEqual(store.reloadCount, 0)
+
+    def test02IncrementalReload(self):
+        pdp = PDP()
+        compiledPdp = CompiledPDP()
+        store = PolicyStore(self.rootFilePath, ReaderFactory,
+                            pdps=[pdp, compiledPdp])
+        oldPolicy = store.policy
+        unchangedPolicy = self._findPolicy(oldPolicy,
+                                           self.__class__.UNCHANGED_POLICY_ID)
+        self.assertIs(self._getDecision(pdp,
+                                        self.__class__.DENIED_RESOURCE_ID),
+                      Decision.DENY)
+
+        self._modifyDocument(self.__class__.POLICY_FILENAME, 'Effect="Deny"',
+                             'Effect="Permit"')
+        self.assertTrue(store.reload())
+        self.assertEqual(store.reloadCount, 1)
+        self.assertEqual(store.documentsReparsed, 1)
+        self.assertTrue(store.lastReloadLatency > 0.)
+
+        for evaluatingPdp in (pdp, compiledPdp):
+            self.assertIs(evaluatingPdp.policy, store.policy)
+            self.assertIs(self._getDecision(evaluatingPdp,
+                                            self.__class__.DENIED_RESOURCE_ID),
+                          Decision.PERMIT)
+
+        # The previous policy is unchanged and unchanged documents were not
+        # parsed again
+        self.assertIsNot(store.policy, oldPolicy)
+        self.assertIs(self._getDecision(PDP(policy=oldPolicy),
+                                        self.__class__.DENIED_RESOURCE_ID),
+                      Decision.DENY)
+        self.assertIs(self._findPolicy(store.policy,
+                                       self.__class__.UNCHANGED_POLICY_ID),
+                      unchangedPolicy)
+
+        # Reloads which follow resolve references to the rebuilt policy sets
+        self._modifyDocument(self.__class__.POLICY_FILENAME, 'Effect="Permit"',
+                             'Effect="Deny"')
+        self.assertTrue(store.reload())
+        self.assertIs(self._getDecision(pdp,
+                                        self.__class__.DENIED_RESOURCE_ID),
+                      Decision.DENY)
+
+    def test03RootAndPolicySetReload(self):
+        pdp = PDP()
+        store = PolicyStore(self.rootFilePath, ReaderFactory, pdps=[pdp])
+        unchangedPolicy = self._findPolicy(store.policy,
+                                           self.__class__.UNCHANGED_POLICY_ID)
+
+        self._modifyDocument(self.__class__.ROOT_FILENAME, '<Target>',
+                             '<Description>Changed</Description><Target>')
+        self._modifyDocument(self.__class__.POLICY_SET_FILENAME,
+                             'RF Permit" Effect="Permit"',
+                             'RF Permit" Effect="Deny"')
+        self.assertTrue(store.reload())
+        self.assertEqual(store.documentsReparsed, 2)
+        self.assertEqual(pdp.policy.description, 'Changed')
+        self.assertIs(self._getDecision(pdp,
+                                        self.__class__.PERMITTED_RESOURCE_ID),
+                      Decision.DENY)
+        self.assertIs(self._findPolicy(store.policy,
+                                       self.__class__.UNCHANGED_POLICY_ID),
+                      unchangedPolicy)
+
+    def test04ReloadError(self):
+        pdp = PDP()
+        store = PolicyStore(self.rootFilePath, ReaderFactory, pdps=[pdp])
+        policy = store.policy
+
+        self._modifyDocument(self.__class__.POLICY_FILENAME, '</Policy>', '')
+        self.assertRaises(PolicyReloadError, store.reload)
+        self.assertEqual(store.reloadFailureCount, 1)
+        self.assertIs(pdp.policy, policy)
+
+        # Not retried until changed again
+        self.assertFalse(store.reload())
+
+        self._modifyDocument(self.__class__.POLICY_FILENAME, '</Rule>',
+                             '</Rule></Policy>')
+        self.assertTrue(store.reload())
+        self.assertIsNot(pdp.policy, policy)
+        self.assertIs(self._getDecision(pdp,
+                                        self.__class__.DENIED_RESOURCE_ID),
+                      Decision.DENY)
+
+    def test05DecisionCacheInvalidation(self):
+        pdp = PDP(decisionCache=DecisionCache())
+        store = PolicyStore(self.rootFilePath, ReaderFactory, pdps=[pdp])
+        for resourceId in (self.__class__.DENIED_RESOURCE_ID,
+                           self.__class__.PERMITTED_RESOURCE_ID):
+            self._getDecision(pdp, resourceId)
+        self.assertEqual(len(pdp.decisionCache), 2)
+
+        self._modifyDocument(self.__class__.POLICY_FILENAME, 'Effect="Deny"',
+                             'Effect="Permit"')
+        store.reload()
+        self.assertEqual(store.decisionCacheInvalidations, 2)
+        self.assertEqual(len(pdp.decisionCache), 0)
+        self.assertIs(self._getDecision(pdp,
+                                        self.__class__.DENIED_RESOURCE_ID),
+                      Decision.PERMIT)
+
+    def test06Watch(self):
+        pdp = PDP()
+        store = PolicyStore(self.rootFilePath, ReaderFactory, pdps=[pdp])
+        policy = store.policy
+        store.start(pollInterval=0.01)
+        try:
+            self._modifyDocument(self.__class__.POLICY_FILENAME,
+                                 'Effect="Deny"', 'Effect="Permit"')
+            timeout = time.monotonic() + 10.
+            while pdp.policy is policy and time.monotonic() < timeout:
+                time.sleep(0.01)
+        finally:
+            store.stop()
+
+        self.assertIs(self._getDecision(pdp,
+                                        self.__class__.DENIED_RESOURCE_ID),
+                      Decision.PERMIT)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,209 @@
+"""NDG XACML request context attribute index unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import logging
+import unittest
+
+from ndg.xacml.core import Identifiers
+from ndg.xacml.core.attribute import Attribute
+from ndg.xacml.core.attributedesignator import (SubjectAttributeDesignator,
+                                                ResourceAttributeDesignator,
+                                                ActionAttributeDesignator)
+from ndg.xacml.core.context.action import Action
+from ndg.xacml.core.context.exceptions import MissingAttributeError
+from ndg.xacml.core.context.request import Request
+from ndg.xacml.core.context.subject import Subject
+from ndg.xacml.test.context import (XacmlContextBaseTestCase,
+                                    TestContextHandler,
+                                    StringAttributeValue,
+                                    AnyUriAttributeValue,
+                                    ROLE_ATTRIBUTE_ID)
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class RequestAttributeIndexTestCase(XacmlContextBaseTestCase):
+    """Test look up of request attributes by the attribute designators via the
+    request attribute index"""
+    RESOURCE_ID = 'http://localhost/resource-only-restricted'
+
+    @staticmethod
+    def _createDesignator(designatorClass, attributeId, dataType, issuer=None,
+                          mustBePresent=False):
+        designator = designatorClass()
+        designator.attributeId = attributeId
+        designator.dataType = dataType
+        if issuer is not None:
+            designator.issuer = issuer
+        designator.mustBePresent = mustBePresent
+        return designator
+
+    @staticmethod
+    def _createRoleAttribute(role, issuer=None):
+        attribute = Attribute()
+        attribute.attributeId = ROLE_ATTRIBUTE_ID
+        attribute.dataType = StringAttributeValue.IDENTIFIER
+        if issuer is not None:
+            attribute.issuer = issuer
+        attribute.attributeValues.append(StringAttributeValue(role))
+        return attribute
+
+    def test01LookUp(self):
+        request = self._createRequestCtx(self.__class__.RESOURCE_ID,
+                                         subjectRoles=('staff', 'postdoc'))
+        designator = self._createDesignator(SubjectAttributeDesignator,
+                                            ROLE_ATTRIBUTE_ID,
+                                            StringAttributeValue.IDENTIFIER)
+        bag = designator.evaluate(request)
+        self.assertEqual([i.value for i in bag], ['staff', 'postdoc'])
+        self.assertIs(bag.elementType, StringAttributeValue)
+
+        designator = self._createDesignator(ResourceAttributeDesignator,
+                                            Identifiers.Resource.RESOURCE_ID,
+                                            AnyUriAttributeValue.IDENTIFIER)
+        bag = designator.evaluate(request)
+        self.assertEqual([i.value for i in bag], [self.__class__.RESOURCE_ID])
+
+        # Data type must match as well as attribute ID
+        designator = self._createDesignator(ResourceAttributeDesignator,
+                                            Identifiers.Resource.RESOURCE_ID,
+                                            StringAttributeValue.IDENTIFIER)
+        self.assertEqual(len(designator.evaluate(request)), 0)
+
+    def test02SharedBag(self):
+        request = self._createRequestCtx(self.__class__.RESOURCE_ID)
+        designator = self._createDesignator(ActionAttributeDesignator,
+                                            Identifiers.Action.ACTION_ID,
+                                            StringAttributeValue.IDENTIFIER)
+        designator2 = self._createDesignator(ActionAttributeDesignator,
+                                             Identifiers.Action.ACTION_ID,
+                                             StringAttributeValue.IDENTIFIER)
+        self.assertIs(designator.evaluate(request),
+                      designator2.evaluate(request))
+
+    def test03Issuer(self):
+        request = self._createRequestCtx(self.__class__.RESOURCE_ID,
+                                         subjectRoles=())
+        subject = request.subjects[0]
+        subject.attributes.append(self._createRoleAttribute('staff',
+                                                            issuer='idp-a'))
+        subject.attributes.append(self._createRoleAttribute('admin',
+                                                            issuer='idp-b'))
+        designator = self._createDesignator(SubjectAttributeDesignator,
+                                            ROLE_ATTRIBUTE_ID,
+                                            StringAttributeValue.IDENTIFIER,
+                                            issuer='idp-b')
+        self.assertEqual([i.value for i in designator.evaluate(request)],
+                         ['admin'])
+
+        designator = self._createDesignator(SubjectAttributeDesignator,
+                                            ROLE_ATTRIBUTE_ID,
+                                            StringAttributeValue.IDENTIFIER)
+        self.assertEqual([i.value for i in designator.evaluate(request)],
+                         ['staff', 'admin'])
+
+    def test04InvalidatedOnChange(self):
+        request = self._createRequestCtx(self.__class__.RESOURCE_ID,
+                                         subjectRoles=('staff',))
+        designator = self._createDesignator(SubjectAttributeDesignator,
+                                            ROLE_ATTRIBUTE_ID,
+                                            StringAttributeValue.IDENTIFIER)
+        self.assertEqual(len(designator.evaluate(request)), 1)
+        attributeIndex = request.getAttributeIndex('subjects')
+        self.assertIs(request.getAttributeIndex('subjects'), attributeIndex)
+
+        # Changes to other requests and to attributes not in the request
+        self._createRequestCtx(self.__class__.RESOURCE_ID)
+        Attribute().attributeValues.extend([])
+        self.assertIs(request.getAttributeIndex('subjects'), attributeIndex)
+
+        # New attribute value for an existing attribute
+        request.subjects[0].attributes[-1].attributeValues.append(
+                                            StringAttributeValue('postdoc'))
+        self.assertEqual(len(designator.evaluate(request)), 2)
+        self.assertIsNot(request.getAttributeIndex('subjects'), attributeIndex)
+
+        # New subject
+        subject = Subject()
+        subject.attributes.append(self._createRoleAttribute('admin'))
+        request.subjects.append(subject)
+        self.assertEqual([i.value for i in designator.evaluate(request)],
+                         ['staff', 'postdoc', 'admin'])
+
+        # Attribute ID changed
+        subject.attributes[0].attributeId = 'urn:other:attr'
+        self.assertEqual(len(designator.evaluate(request)), 2)
+
+        # Removal
+        del request.subjects[0]
+        self.assertEqual(len(designator.evaluate(request)), 0)
+
+        # New action replacing the old
+        designator = self._createDesignator(ActionAttributeDesignator,
+                                            Identifiers.Action.ACTION_ID,
+                                            StringAttributeValue.IDENTIFIER)
+        self.assertEqual(len(designator.evaluate(request)), 1)
+        request.action = Action()
+        self.assertEqual(len(designator.evaluate(request)), 0)
+
+    def test05MustBePresent(self):
+        request = self._createRequestCtx(self.__class__.RESOURCE_ID,
+                                         includeSubject=False)
+        designator = self._createDesignator(SubjectAttributeDesignator,
+                                            ROLE_ATTRIBUTE_ID,
+                                            StringAttributeValue.IDENTIFIER,
+                                            mustBePresent=True)
+        self.assertRaises(MissingAttributeError, designator.evaluate, request)
+
+    def test06MissingAction(self):
+        request = Request()
+        designator = self._createDesignator(ActionAttributeDesignator,
+                                            Identifiers.Action.ACTION_ID,
+                                            StringAttributeValue.IDENTIFIER)
+        self.assertRaises(AttributeError, designator.evaluate, request)
+        self.assertRaises(ValueError, request.getAttributeIndex, 'policies')
+
+    def test07ContextHandlerQueried(self):
+        request = self._createRequestCtx(self.__class__.RESOURCE_ID,
+                                         subjectRoles=('staff',))
+        request.ctxHandler = TestContextHandler()
+        designator = self._createDesignator(SubjectAttributeDesignator,
+                                            ROLE_ATTRIBUTE_ID,
+                                            StringAttributeValue.IDENTIFIER)
+        self.assertEqual([i.value for i in designator.evaluate(request)],
+                         ['staff', 'admin'])
+
+        # PIP values are not added to the request index
+        self.assertEqual(len(request.getAttributeIndex('subjects'
+                                ).getAttributeValueBag(
+                                        ROLE_ATTRIBUTE_ID,
+                                        StringAttributeValue.IDENTIFIER,
+                                        None,
+                                        StringAttributeValue)), 1)
+
+    def test08SameDecisions(self):
+        pdp = self._createPDPfromNdgTest1Policy()
+        for resourceId in (self.__class__.RESOURCE_ID,
+                           'http://localhost/private-resource',
+                           'http://localhost/unknown'):
+            for subjectRoles in (('staff',), ('admin',), ('student',)):
+                request = self._createRequestCtx(resourceId,
+                                                 subjectRoles=subjectRoles)
+                decision = pdp.evaluate(request).results[0].decision
+
+                # Repeat evaluation using the existing indexes
+                self.assertEqual(pdp.evaluate(request).results[0].decision,
+                                 decision)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+"""NDG XACML regular expression match function unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import logging
+import operator
+import re
+import unittest
+
+from ndg.xacml.core.apply import Apply
+from ndg.xacml.core.attributevalue import AttributeValueClassFactory
+from ndg.xacml.core.functions import functionMap
+from ndg.xacml.core.functions.v1.regexp_match import (RegexCache,
+                                                      RegexpMatchBase)
+from ndg.xacml.core.context.result import Decision
+from ndg.xacml.test.context import XacmlContextBaseTestCase
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class RegexpMatchTestCase(XacmlContextBaseTestCase):
+    """Test compiling constant patterns in advance and caching those only
+    known at evaluation time"""
+    FUNCTION_NS_PREFIX = 'urn:oasis:names:tc:xacml:2.0:function:'
+    V1_FUNCTION_NS_PREFIX = 'urn:oasis:names:tc:xacml:1.0:function:'
+    RESOURCE_ID = 'http://localhost/at-least-one-of-subject-role-restricted'
+    attributeValueClassFactory = AttributeValueClassFactory()
+
+    def setUp(self):
+        self.regexCache = RegexpMatchBase.regexCache
+        self.regexCache.clear()
+        self.regexCache.resetCounters()
+
+    def _getFunction(self, name):
+        return functionMap.get(self.__class__.FUNCTION_NS_PREFIX + name)()
+
+    def _getRegexpMatches(self, policy):
+        matches = []
+        for rule in policy.rules:
+            if rule.target is None:
+                continue
+            for targetChildren in (rule.target.subjects, rule.target.resources,
+                                   rule.target.actions,
+                                   rule.target.environments):
+                for targetChild in targetChildren:
+                    matches.extend([match for match in targetChild.matches
+                                    if isinstance(match.function,
+                                                  RegexpMatchBase)])
+        return matches
+
+    def test01RegexCache(self):
+        cache = RegexCache(maxSize=2)
+        cache.compile('a')
+        cache.compile('b')
+        self.assertIs(cache.compile('a'), cache.compile('a'))
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(cache.misses, 2)
+
+        # Least recently used pattern evicted
+        cache.compile('c')
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        cache.compile('b')
+        self.assertEqual(cache.misses, 4)
+
+        self.assertRaises(re.error, cache.compile, '(')
+        self.assertEqual(len(cache), 2)
+        self.assertRaises(ValueError, RegexCache, maxSize=0)
+
+        # Read-only view of the entries
+        self.assertEqual(list(cache.entries.keys()), ['c', 'b'])
+        self.assertRaises(TypeError, operator.setitem, cache.entries, 'd',
+                          None)
+
+    def test01_01CompiledRegexesAlias(self):
+        function = self._getFunction('string-regexp-match')
+        stringClass = self.attributeValueClassFactory(
+                                    'http://www.w3.org/2001/XMLSchema#string')
+        self.assertTrue(function.evaluate(stringClass('^a'), 
+                                          stringClass('abc')))
+        self.assertIs(RegexpMatchBase.compiled_regexes['^a'],
+                      self.regexCache.compile('^a'))
+        self.assertIn('^a', function.compiled_regexes)
+
+    def test02PolicyPatternsCompiled(self):
+        pdp = self._createPDPfromNdgTest1Policy()
+        matches = self._getRegexpMatches(pdp.policy)
+        self.assertTrue(len(matches) > 0)
+        for match in matches:
+            self.assertEqual(match.compiledPattern.pattern,
+                             match.attributeValue.value)
+
+        request = self._createRequestCtx(self.__class__.RESOURCE_ID,
+                                         subjectRoles=('staff',))
+        self.assertIs(pdp.evaluate(request).results[0].decision,
+                      Decision.PERMIT)
+        self.assertEqual(self.regexCache.hits + self.regexCache.misses, 0)
+
+        # A pattern modified in place is compiled on evaluation
+        match = [match for match in matches
+                 if match.compiledPattern.match(
+                                            self.__class__.RESOURCE_ID)][0]
+        match.attributeValue.value = match.attributeValue.value + '$'
+        self.assertIsNone(match.compiledPattern)
+        pdp.evaluate(request)
+        self.assertEqual(self.regexCache.misses, 1)
+
+    def test03ApplyPatternCompiled(self):
+        anyUriClass = self.attributeValueClassFactory(
+                                    'http://www.w3.org/2001/XMLSchema#anyURI')
+        applyObj = Apply()
+        applyObj.functionId = (self.__class__.FUNCTION_NS_PREFIX +
+                               'anyURI-regexp-match')
+        applyObj.expressions.append(anyUriClass('^http://localhost/.*$'))
+        applyObj.expressions.append(anyUriClass('http://localhost/a'))
+        applyObj.compilePattern()
+
+        self.assertTrue(applyObj.evaluate(None))
+        self.assertEqual(self.regexCache.misses, 0)
+
+        applyObj.expressions[1] = anyUriClass('http://example.com/')
+        self.assertFalse(applyObj.evaluate(None))
+
+        # Replaced patterns are treated as dynamic
+        applyObj.expressions[0] = anyUriClass('^http://example\\.com/')
+        self.assertTrue(applyObj.evaluate(None))
+        self.assertEqual(self.regexCache.misses, 1)
+
+    def test03_01ApplyFunctionChanged(self):
+        stringClass = self.attributeValueClassFactory(
+                                    'http://www.w3.org/2001/XMLSchema#string')
+        applyObj = Apply()
+        applyObj.functionId = (self.__class__.V1_FUNCTION_NS_PREFIX +
+                               'string-regexp-match')
+        applyObj.expressions.append(stringClass('abc'))
+        applyObj.expressions.append(stringClass('abc'))
+        applyObj.compilePattern()
+        self.assertTrue(applyObj.evaluate(None))
+
+        # The pattern compiled for the previous function is discarded
+        applyObj.loadFunctionFromId = False
+        applyObj.functionId = (self.__class__.V1_FUNCTION_NS_PREFIX +
+                               'string-equal')
+        applyObj.setFunctionFromMap(functionMap)
+        self.assertTrue(applyObj.evaluate(None))
+
+        applyObj.expressions[1] = stringClass('abcd')
+        self.assertFalse(applyObj.evaluate(None))
+
+    def test04V2FunctionsShareCache(self):
+        for name, dataType, pattern, value in (
+            ('ipAddress', 'urn:oasis:names:tc:xacml:2.0:data-type:ipAddress',
+             '^192\\.168\\.', '192.168.0.1'),
+            ('dnsName', 'urn:oasis:names:tc:xacml:2.0:data-type:dnsName',
+             '.*\\.ac\\.uk$', 'www.stfc.ac.uk')):
+            attributeValueClass = self.attributeValueClassFactory(dataType)
+            function = self._getFunction(name + '-regexp-match')
+            pat = attributeValueClass(pattern)
+            input = attributeValueClass(value)
+
+            compiledRegex = function.compilePattern(pat)
+            self.assertTrue(function.evaluateCompiled(compiledRegex, input))
+            self.assertTrue(function.evaluate(pat, input))
+            self.assertTrue(function.evaluate(pat, input))
+
+        self.assertEqual(self.regexCache.misses, 2)
+        self.assertEqual(self.regexCache.hits, 2)
+
+        # Patterns of the wrong type or which are invalid aren't compiled
+        function = self._getFunction('dnsName-regexp-match')
+        self.assertIsNone(function.compilePattern(
+                            self.attributeValueClassFactory(
+                            'http://www.w3.org/2001/XMLSchema#anyURI')('a')))
+        self.assertIsNone(function.compilePattern(attributeValueClass('(')))
+
+
+if __name__ == "__main__":
+    unittest.main()
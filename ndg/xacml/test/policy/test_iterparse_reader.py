@@ -0,0 +1,139 @@
+"""NDG XACML iterparse based policy reader unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import io
+import logging
+import tracemalloc
+import unittest
+
+from ndg.xacml import importElementTree
+from ndg.xacml.parsers import XMLParseError
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+from ndg.xacml.parsers.etree.iterparsereader import IterParseReaderFactory
+from ndg.xacml.core.policy import Policy
+from ndg.xacml.core.policyset import PolicySet
+from ndg.xacml.core.policybase import PolicyBase
+from ndg.xacml.core.context.pdp import PDP
+from ndg.xacml.finder.defaultfinder import getDefaultPolicyFinder
+from ndg.xacml.test import XACML_NDGTEST1_FILEPATH
+from ndg.xacml.test.context.test_compiled_pdp import DifferentialTestHarness
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class IterParseReaderTestCase(DifferentialTestHarness):
+    """Test reading policies incrementally with iterparse gives the same
+    policies as the standard reader"""
+    XACML_NS = "urn:oasis:names:tc:xacml:2.0:policy:schema:cd:04"
+    FIRST_APPLICABLE_ID = ("urn:oasis:names:tc:xacml:1.0:%s-combining-"
+                           "algorithm:first-applicable")
+
+    def _assertSamePolicies(self, policy, expectedPolicy):
+        self.assertEqual(type(policy), type(expectedPolicy))
+        self.assertEqual(policy.ident, expectedPolicy.ident)
+        self.assertEqual(policy.description, expectedPolicy.description)
+        self.assertEqual(policy.target is None, expectedPolicy.target is None)
+        if isinstance(policy, PolicySet):
+            self.assertEqual(policy.policyCombiningAlgId,
+                             expectedPolicy.policyCombiningAlgId)
+            self.assertEqual(len(policy.policies),
+                             len(expectedPolicy.policies))
+            for child, expectedChild in zip(policy.policies,
+                                            expectedPolicy.policies):
+                self._assertSamePolicies(child, expectedChild)
+        else:
+            self.assertEqual(policy.ruleCombiningAlgId,
+                             expectedPolicy.ruleCombiningAlgId)
+            self.assertEqual([rule.id for rule in policy.rules],
+                             [rule.id for rule in expectedPolicy.rules])
+
+    def test01SameDecisions(self):
+        for filePath in self.__class__.POLICY_FILEPATHS:
+            pdp = PDP.fromPolicySource(filePath, ReaderFactory)
+            iterParsePdp = PDP.fromPolicySource(filePath,
+                                                IterParseReaderFactory)
+            self._assertSamePolicies(iterParsePdp.policy, pdp.policy)
+            self._assertSameDecisions(pdp, iterParsePdp.evaluate)
+
+    def test02PolicyTypes(self):
+        policy = Policy.fromSource(XACML_NDGTEST1_FILEPATH,
+                                   IterParseReaderFactory)
+        self._assertSamePolicies(policy,
+                                 Policy.fromSource(XACML_NDGTEST1_FILEPATH,
+                                                   ReaderFactory))
+
+        # Root element type is checked
+        PolicySetReader = IterParseReaderFactory.getReader(PolicySet)
+        self.assertRaises(XMLParseError, PolicySetReader.parse,
+                          XACML_NDGTEST1_FILEPATH, None)
+        self.assertRaises(XMLParseError, PolicyBase.fromSource,
+                          io.BytesIO(b'<Rule xmlns="%s"/>' %
+                                     self.__class__.XACML_NS.encode()),
+                          IterParseReaderFactory,
+                          getDefaultPolicyFinder(None))
+
+    def test03ElementSource(self):
+        ElementTree = importElementTree()
+        elem = ElementTree.parse(XACML_NDGTEST1_FILEPATH).getroot()
+        policy = PolicyBase.fromSource(elem, IterParseReaderFactory,
+                                       getDefaultPolicyFinder(None))
+        self._assertSamePolicies(policy,
+                                 Policy.fromSource(XACML_NDGTEST1_FILEPATH,
+                                                   ReaderFactory))
+
+    def _createPolicySetDoc(self, nPolicies):
+        """Create a policy set document with copies of the NDG test policy
+
+        @param nPolicies: number of policies to include
+        @type nPolicies: int
+        @return: policy set document
+        @rtype: bytes
+        """
+        ElementTree = importElementTree()
+        policyElem = ElementTree.parse(XACML_NDGTEST1_FILEPATH).getroot()
+        policySetElem = ElementTree.Element(
+            '{%s}PolicySet' % self.__class__.XACML_NS,
+            PolicySetId='urn:ndg:test:iterparse',
+            PolicyCombiningAlgId=self.__class__.FIRST_APPLICABLE_ID % 'policy')
+        ElementTree.SubElement(policySetElem,
+                               '{%s}Target' % self.__class__.XACML_NS)
+        for i in range(nPolicies):
+            policyElem.set('PolicyId', 'urn:ndg:test:iterparse:%d' % i)
+            policySetElem.append(ElementTree.fromstring(
+                                            ElementTree.tostring(policyElem)))
+
+        return ElementTree.tostring(policySetElem)
+
+    def _read(self, doc, readerFactory):
+        """Read a policy document returning the policy and peak memory
+        allocated in reading it"""
+        tracemalloc.start()
+        try:
+            policy = PolicyBase.fromSource(io.BytesIO(doc), readerFactory,
+                                           getDefaultPolicyFinder(None))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return policy, peak
+
+    def test04PeakMemory(self):
+        doc = self._createPolicySetDoc(50)
+        policySet, peak = self._read(doc, ReaderFactory)
+        iterParsePolicySet, iterParsePeak = self._read(doc,
+                                                       IterParseReaderFactory)
+        self._assertSamePolicies(iterParsePolicySet, policySet)
+        self.assertEqual(len(iterParsePolicySet.policies), 50)
+        self.assertTrue(iterParsePeak < peak)
+
+
+if __name__ == "__main__":
+    unittest.main()
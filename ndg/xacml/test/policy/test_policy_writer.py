@@ -0,0 +1,159 @@
+"""NDG XACML ElementTree policy writer unit tests
+
+NERC DataGrid
+"""
+__author__ = "P J Kershaw"
+__date__ = "18/10/26"
+__copyright__ = "(C) 2026 Science and Technology Facilities Council"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__license__ = "BSD - see LICENSE file in top-level directory"
+__contact__ = "Philip.Kershaw@stfc.ac.uk"
+__revision__ = "$Id$"
+import io
+import logging
+import os
+import tempfile
+import unittest
+
+from ndg.xacml import importElementTree
+from ndg.xacml.parsers import XMLWriteError
+from ndg.xacml.parsers.etree.factory import ReaderFactory
+from ndg.xacml.parsers.etree.writer import PolicyWriter
+from ndg.xacml.core.policy import Policy
+from ndg.xacml.core.policyset import PolicySet
+from ndg.xacml.core.rule import Rule
+from ndg.xacml.core.target import Target
+from ndg.xacml.core.apply import Apply
+from ndg.xacml.core.context.pdp import PDP
+from ndg.xacml.test import (THIS_DIR, XACML_NDGTEST1_FILEPATH,
+                            GroupRoleAttributeValue)
+from ndg.xacml.test.context.test_compiled_pdp import DifferentialTestHarness
+
+
+logging.basicConfig(level=logging.ERROR)
+
+
+class RecordingStream(object):
+    """Stream recording the size of each write to it"""
+    def __init__(self):
+        self.buffer = io.BytesIO()
+        self.writeSizes = []
+
+    def write(self, data):
+        self.writeSizes.append(len(data))
+        self.buffer.write(data)
+
+
+class PolicyWriterTestCase(DifferentialTestHarness):
+    """Test policies written with the ElementTree writer read back as the
+    same policies"""
+    INTERNAL_REFERENCES_FILEPATH = os.path.join(
+                                THIS_DIR, 'policy_set_internal_references.xml')
+
+    def _roundTrip(self, policy):
+        doc = PolicyWriter.toString(policy)
+        return PDP.fromPolicySource(io.BytesIO(doc), ReaderFactory).policy
+
+    def test01SameDecisions(self):
+        for filePath in self.__class__.POLICY_FILEPATHS:
+            pdp = PDP.fromPolicySource(filePath, ReaderFactory)
+            writtenPdp = PDP(policy=self._roundTrip(pdp.policy))
+            self.assertEqual(writtenPdp.policy.ident, pdp.policy.ident)
+            self._assertSameDecisions(pdp, writtenPdp.evaluate)
+
+    def test02WriteFile(self):
+        policy = Policy.fromSource(XACML_NDGTEST1_FILEPATH, ReaderFactory)
+        tmpDir = tempfile.mkdtemp()
+        filePath = os.path.join(tmpDir, 'policy.xml')
+        try:
+            PolicyWriter.write(policy, filePath)
+            writtenPolicy = Policy.fromSource(filePath, ReaderFactory)
+        finally:
+            os.remove(filePath)
+            os.rmdir(tmpDir)
+
+        self.assertEqual(writtenPolicy.policyId, policy.policyId)
+        self.assertEqual([rule.id for rule in writtenPolicy.rules],
+                         [rule.id for rule in policy.rules])
+
+    def test03ElementRoundTrip(self):
+        ElementTree = importElementTree()
+        policy = Policy.fromSource(XACML_NDGTEST1_FILEPATH, ReaderFactory)
+        xacmlObjs = [policy.target]
+        for rule in policy.rules:
+            xacmlObjs.append(rule)
+            if rule.condition is not None:
+                xacmlObjs.append(rule.condition.expression)
+
+        for xacmlType in (Target, Rule, Apply):
+            self.assertTrue(any([isinstance(xacmlObj, xacmlType)
+                                 for xacmlObj in xacmlObjs]))
+
+        for xacmlObj in xacmlObjs:
+            elem = PolicyWriter.toElement(xacmlObj)
+            reader = ReaderFactory.getReader(type(xacmlObj))
+            readObj = reader.parse(elem, None)
+            self.assertEqual(
+                ElementTree.tostring(PolicyWriter.toElement(readObj)),
+                ElementTree.tostring(elem))
+
+    def test04PolicyReferences(self):
+        pdp = PDP.fromPolicySource(
+                            self.__class__.INTERNAL_REFERENCES_FILEPATH,
+                            ReaderFactory)
+        doc = PolicyWriter.toString(pdp.policy)
+        self.assertIn(PolicySet.POLICY_SET_ID_REFERENCE.encode(), doc)
+
+        # Each policy set is written once in documents and elements
+        elem = PolicyWriter.toElement(pdp.policy)
+        nPolicySets = len(elem.findall('.//' + PolicySet.ELEMENT_LOCAL_NAME))
+        self.assertEqual(nPolicySets + 1,
+                         doc.count(b'<%s ' %
+                                   PolicySet.ELEMENT_LOCAL_NAME.encode()))
+        self.assertEqual(len(elem.findall('.//' +
+                                          PolicySet.POLICY_SET_ID_REFERENCE)),
+                         doc.count(b'<%s>' %
+                                   PolicySet.POLICY_SET_ID_REFERENCE.encode()))
+
+    def test05Streaming(self):
+        policy = Policy.fromSource(XACML_NDGTEST1_FILEPATH, ReaderFactory)
+        policySet = PolicySet()
+        policySet.policySetId = 'urn:ndg:test:writer'
+        policySet.policyCombiningAlgId = ("urn:oasis:names:tc:xacml:1.0:"
+                                          "policy-combining-algorithm:"
+                                          "first-applicable")
+        for i in range(20):
+            childPolicy = Policy.fromSource(XACML_NDGTEST1_FILEPATH,
+                                            ReaderFactory)
+            childPolicy.policyId = 'urn:ndg:test:writer:%d' % i
+            policySet.policies.append(childPolicy)
+
+        stream = RecordingStream()
+        PolicyWriter.write(policySet, stream)
+        self.assertEqual(stream.buffer.getvalue(),
+                         PolicyWriter.toString(policySet))
+
+        # Output is written a rule at a time
+        self.assertTrue(len(stream.writeSizes) > 20 * len(policy.rules))
+        self.assertTrue(max(stream.writeSizes) <
+                        len(PolicyWriter.toString(policy)))
+
+        writtenPolicySet = self._roundTrip(policySet)
+        self.assertEqual([childPolicy.policyId
+                          for childPolicy in writtenPolicySet.policies],
+                         [childPolicy.policyId
+                          for childPolicy in policySet.policies])
+
+    def test06UnsupportedTypes(self):
+        policy = Policy.fromSource(XACML_NDGTEST1_FILEPATH, ReaderFactory)
+        self.assertRaises(XMLWriteError, PolicyWriter.toString, policy.target)
+        self.assertRaises(XMLWriteError, PolicyWriter.toElement, object())
+
+        # No writer is registered for the custom data type
+        match = policy.target.resources[0].matches[0]
+        match.attributeValue = GroupRoleAttributeValue()
+        self.assertRaises(XMLWriteError, PolicyWriter.toString, policy)
+
+
+if __name__ == "__main__":
+    unittest.main()
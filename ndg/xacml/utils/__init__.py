@@ -8,6 +8,7 @@ __copyright__ = ""
 __license__ = "BSD - see LICENSE file in top-level directory"
 __contact__ = "Philip.Kershaw@stfc.ac.uk"
 __revision__ = '$Id$'
+import itertools
 from collections.abc import MutableMapping
 
 
@@ -118,6 +119,224 @@ class TypedList(list):
         return super(TypedList, self).append(item)
 
 
+class ChangeCounter(object):
+    """Thread safe counter of changes made to a group of objects.  Data
+    derived from the objects, such as an index, can record the counter value
+    when it is made and compare it later to check whether it is still valid.
+    Each value is only ever issued once.
+    """
+    __slots__ = ('__counter', '__value')
+
+    def __init__(self):
+        self.__counter = itertools.count(1)
+        self.__value = 0
+
+    @property
+    def value(self):
+        """@return: current counter value
+        @rtype: int
+        """
+        return self.__value
+
+    def increment(self):
+        """Record a change"""
+        self.__value = next(self.__counter)
+
+    def __getstate__(self):
+        '''Enable pickling
+        
+        @return: current counter value
+        @rtype: int
+        '''
+        return self.__value
+
+    def __setstate__(self, value):
+        '''Restore the counter continuing from the pickled value
+        
+        @param value: counter value
+        @type value: int
+        '''
+        self.__counter = itertools.count(value + 1)
+        self.__value = value
+
+
+class ChangeCountedInterface(object):
+    """Interface for objects whose changes are recorded in the change counter
+    of the object owning them.  The owner passes its counter on when the 
+    object is added to it.
+    """
+    __slots__ = ()
+
+    def _setChangeCounter(self, changeCounter):
+        """Set the counter to record changes to this object and its contents
+        in.  Derived classes must implement this method.
+
+        @param changeCounter: counter or None to stop recording changes
+        @type changeCounter: ndg.xacml.utils.ChangeCounter / NoneType
+        """
+        raise NotImplementedError()
+
+
+class ChangeCountedTypedList(TypedList):
+    """TypedList which increments a change counter whenever it is modified.
+    The counter is set by the object owning the list and is passed on to the
+    items in the list which implement ChangeCountedInterface, so that changes
+    anywhere in an object tree such as a request context are recorded in 
+    the one counter for it.  Changes are not recorded until a counter is 
+    set.
+    """
+
+    def __init__(self, elementType, *arg, **kw):
+        """
+        @type elementType: type/tuple
+        @param elementType: object type or types which the list is allowed to
+        contain.  If more than one type, pass as a tuple
+        """
+        self.__changeCounter = None
+        super(ChangeCountedTypedList, self).__init__(elementType, *arg, **kw)
+
+    @property
+    def changeCounter(self):
+        """@return: counter changes are recorded in
+        @rtype: ndg.xacml.utils.ChangeCounter / NoneType
+        """
+        return self.__changeCounter
+
+    @changeCounter.setter
+    def changeCounter(self, value):
+        """@param value: counter to record changes in or None to stop 
+        recording changes
+        @type value: ndg.xacml.utils.ChangeCounter / NoneType
+        @raise TypeError: incorrect input type
+        """
+        if value is not None and not isinstance(value, ChangeCounter):
+            raise TypeError('Expecting %r type for "changeCounter" '
+                            'attribute; got %r' % (ChangeCounter, type(value)))
+        self.__changeCounter = value
+        self._setItemChangeCounters(self)
+
+    def _setItemChangeCounters(self, items):
+        """Pass the change counter on to items added to the list
+        @param items: items added
+        @type items: iterable
+        """
+        for item in items:
+            if isinstance(item, ChangeCountedInterface):
+                item._setChangeCounter(self.__changeCounter)
+
+    def _changed(self):
+        """Record a change in the change counter if one is set"""
+        if self.__changeCounter is not None:
+            self.__changeCounter.increment()
+
+    def extend(self, iter):
+        """Extend a list with input iterable
+        @param iter: iterable object
+        @type iter: iterable type
+        @raise TypeError: input item doesn't match list type
+        """
+        iter = list(iter)
+        result = super(ChangeCountedTypedList, self).extend(iter)
+        self._setItemChangeCounters(iter)
+        self._changed()
+        return result
+
+    def __iadd__(self, iter):
+        """Extend a list with input iterable
+        @param iter: iterable object
+        @type iter: iterable type
+        @raise TypeError: input item doesn't match list type
+        """
+        iter = list(iter)
+        result = super(ChangeCountedTypedList, self).__iadd__(iter)
+        self._setItemChangeCounters(iter)
+        self._changed()
+        return result
+
+    def append(self, item):
+        """Add an item to the list
+        @param iter: iterable object
+        @type iter: iterable type
+        @raise TypeError: input item doesn't match list type
+        """
+        result = super(ChangeCountedTypedList, self).append(item)
+        self._setItemChangeCounters((item,))
+        self._changed()
+        return result
+
+    def insert(self, index, item):
+        """Insert an item into the list
+        @param index: position to insert at
+        @type index: int
+        @param item: item to insert
+        @type item: any
+        @raise TypeError: input item doesn't match list type
+        """
+        if not isinstance(item, self.elementType):
+            raise TypeError("List items must be of type %s" %
+                            (self.elementType,))
+
+        super(ChangeCountedTypedList, self).insert(index, item)
+        self._setItemChangeCounters((item,))
+        self._changed()
+
+    def __setitem__(self, index, item):
+        """Set an item or slice of items
+        @param index: index or slice
+        @type index: int / slice
+        @param item: item or items
+        @type item: any
+        @raise TypeError: input item doesn't match list type
+        """
+        items = list(item) if isinstance(index, slice) else [item]
+        for i in items:
+            if not isinstance(i, self.elementType):
+                raise TypeError("List items must be of type %s" %
+                                (self.elementType,))
+
+        if isinstance(index, slice):
+            item = items
+        super(ChangeCountedTypedList, self).__setitem__(index, item)
+        self._setItemChangeCounters(items)
+        self._changed()
+
+    def __delitem__(self, index):
+        """@param index: index or slice of items to delete
+        @type index: int / slice
+        """
+        super(ChangeCountedTypedList, self).__delitem__(index)
+        self._changed()
+
+    def remove(self, item):
+        """@param item: item to remove
+        @type item: any
+        """
+        super(ChangeCountedTypedList, self).remove(item)
+        self._changed()
+
+    def pop(self, *arg):
+        """@return: item removed
+        @rtype: any
+        """
+        item = super(ChangeCountedTypedList, self).pop(*arg)
+        self._changed()
+        return item
+
+    def clear(self):
+        """Remove all items"""
+        super(ChangeCountedTypedList, self).clear()
+        self._changed()
+
+    def sort(self, *arg, **kw):
+        """Sort in place"""
+        super(ChangeCountedTypedList, self).sort(*arg, **kw)
+        self._changed()
+
+    def reverse(self):
+        """Reverse in place"""
+        super(ChangeCountedTypedList, self).reverse()
+        self._changed()
+
 class RestrictedKeyNamesDict(dict):
     """Utility class for holding a constrained list of key names
     """
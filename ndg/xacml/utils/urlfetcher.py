@@ -9,8 +9,13 @@ __contact__ = "Philip.Kershaw@stfc.ac.uk"
 __license__ = "BSD - see LICENSE file in top-level directory"
 __contact__ = "Philip.Kershaw@stfc.ac.uk"
 __revision__ = "$Id$"
+import hashlib
+import http.client
+import json
 import logging
 import os
+import tempfile
+import threading
 import urllib.request, urllib.error, urllib.parse
 import urllib.parse
 
@@ -96,3 +101,341 @@ def _should_use_proxy(url):
             return False
 
     return True
+
+
+class HTTPConnectionPool(object):
+    """Thread safe pool of keep-alive HTTP and HTTPS connections.  Idle
+    connections are kept for each scheme, host and port so that successive
+    requests to the same server avoid the cost of a new TCP connection and
+    TLS handshake.
+    """
+    DEFAULT_MAX_IDLE = 8
+    CONNECTION_CLASSES = {
+        'http': http.client.HTTPConnection,
+        'https': http.client.HTTPSConnection
+    }
+
+    def __init__(self, maxIdle=DEFAULT_MAX_IDLE, timeout=None):
+        """
+        @param maxIdle: maximum number of idle connections kept for each
+        server
+        @type maxIdle: int
+        @param timeout: connection timeout in seconds or None to use the
+        socket module default
+        @type timeout: float / NoneType
+        """
+        self.maxIdle = maxIdle
+        self.timeout = timeout
+        self.__idleConnections = {}
+        self.__lock = threading.Lock()
+
+    def getConnection(self, scheme, netloc):
+        """Get an idle connection to a server or make a new one
+        @param scheme: URL scheme, http or https
+        @type scheme: string
+        @param netloc: host and optional port
+        @type netloc: string
+        @return: connection and flag set to True if the connection has been
+        used before
+        @rtype: tuple
+        """
+        with self.__lock:
+            idleConnections = self.__idleConnections.get((scheme, netloc))
+            if idleConnections:
+                return idleConnections.pop(), True
+
+        return self.newConnection(scheme, netloc), False
+
+    def newConnection(self, scheme, netloc):
+        """Make a new connection to a server, ignoring idle connections
+        @param scheme: URL scheme, http or https
+        @type scheme: string
+        @param netloc: host and optional port
+        @type netloc: string
+        @return: connection
+        @rtype: http.client.HTTPConnection
+        """
+        connectionClass = self.__class__.CONNECTION_CLASSES[scheme]
+        if self.timeout is None:
+            return connectionClass(netloc)
+        else:
+            return connectionClass(netloc, timeout=self.timeout)
+
+    def releaseConnection(self, scheme, netloc, connection):
+        """Return a connection to the pool after its response has been read
+        @param scheme: URL scheme, http or https
+        @type scheme: string
+        @param netloc: host and optional port
+        @type netloc: string
+        @param connection: connection to keep for reuse
+        @type connection: http.client.HTTPConnection
+        """
+        with self.__lock:
+            idleConnections = self.__idleConnections.setdefault(
+                                                            (scheme, netloc), [])
+            if len(idleConnections) < self.maxIdle:
+                idleConnections.append(connection)
+                return
+
+        connection.close()
+
+    def close(self):
+        """Close all idle connections"""
+        with self.__lock:
+            idleConnections = self.__idleConnections
+            self.__idleConnections = {}
+
+        for connections in idleConnections.values():
+            for connection in connections:
+                connection.close()
+
+
+class UrlFetcher(object):
+    """Fetch data by URL reusing keep-alive connections for HTTP and HTTPS.
+    Responses may be kept in an on-disk cache.  Cached responses are
+    revalidated with the server using the ETag and Last-Modified headers
+    returned with them so that unchanged documents are not downloaded again.
+
+    Other URL schemes and URLs which are to be accessed via a proxy are
+    fetched with open_url.
+    """
+    HTTP_SCHEMES = ('http', 'https')
+    MAX_REDIRECTS = 5
+    REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+    CACHE_DATA_FILE_SUFFIX = '.data'
+    CACHE_METADATA_FILE_SUFFIX = '.json'
+
+    def __init__(self, cacheDir=None, connectionPool=None, debug=False):
+        """
+        @param cacheDir: directory for the on-disk cache or None to disable
+        caching.  It is created if it doesn't exist.
+        @type cacheDir: string / NoneType
+        @param connectionPool: pool of keep-alive connections.  A new one is
+        created if None.
+        @type connectionPool: HTTPConnectionPool / NoneType
+        @param debug: debug flag for open_url and HTTP connections
+        @type debug: bool
+        """
+        self.cacheDir = cacheDir
+        if cacheDir is not None and not os.path.isdir(cacheDir):
+            os.makedirs(cacheDir)
+
+        if connectionPool is None:
+            self.connectionPool = HTTPConnectionPool()
+        else:
+            self.connectionPool = connectionPool
+
+        self.debug = debug
+
+    def fetch(self, url):
+        """Returns data retrieved from a URL.
+        @param url: URL to fetch
+        @type url: str
+        @return: data retrieved from URL
+        @rtype: bytes
+        """
+        urlObj = urllib.parse.urlparse(url)
+        if (urlObj.scheme not in self.__class__.HTTP_SCHEMES or
+            self._isProxied(url, urlObj.scheme)):
+            return fetch_data_from_url(url, self.debug)
+
+        if self.cacheDir is None:
+            return self._fetchHttp(url, {})[1]
+
+        data, metadata = self._readCache(url)
+        headers = {}
+        if data is not None:
+            if metadata.get('etag'):
+                headers['If-None-Match'] = metadata['etag']
+            if metadata.get('last-modified'):
+                headers['If-Modified-Since'] = metadata['last-modified']
+
+        status, fetchedData, responseHeaders = self._fetchHttp(url, headers)
+        if status == http.client.NOT_MODIFIED:
+            log.debug("Using cached copy of %r", url)
+            return data
+
+        self._writeCache(url, fetchedData, responseHeaders)
+        return fetchedData
+
+    def close(self):
+        """Close idle connections"""
+        self.connectionPool.close()
+
+    @staticmethod
+    def _isProxied(url, scheme):
+        """Determine whether a proxy is set for a URL
+        @param url: URL
+        @type url: str
+        @param scheme: URL scheme
+        @type scheme: str
+        @return: True if the URL should be fetched via a proxy
+        @rtype: bool
+        """
+        return (scheme in urllib.request.getproxies() and
+                _should_use_proxy(url))
+
+    def _fetchHttp(self, url, headers):
+        """Make a GET request following any redirects
+        @param url: HTTP or HTTPS URL
+        @type url: str
+        @param headers: additional request headers
+        @type headers: dict
+        @return: status, response body and response headers
+        @rtype: tuple
+        @raise Exception: error status returned from the server
+        """
+        for i in range(self.__class__.MAX_REDIRECTS + 1):
+            urlObj = urllib.parse.urlparse(url)
+            path = urlObj.path or '/'
+            if urlObj.query:
+                path += '?' + urlObj.query
+
+            status, reason, data, responseHeaders = self._request(
+                                                            urlObj.scheme,
+                                                            urlObj.netloc,
+                                                            path,
+                                                            headers)
+            if status not in self.__class__.REDIRECT_STATUSES:
+                break
+
+            location = responseHeaders.get('location')
+            if location is None:
+                break
+
+            url = urllib.parse.urljoin(url, location)
+            if urllib.parse.urlparse(url).scheme not in \
+                                                self.__class__.HTTP_SCHEMES:
+                raise Exception("Redirect to unsupported URL %r" % url)
+        else:
+            raise Exception("Too many redirects fetching %r" % url)
+
+        # Re-raise errors in the same form as open_url
+        if status >= http.client.BAD_REQUEST or (
+                        status in self.__class__.REDIRECT_STATUSES):
+            raise Exception("HTTP Error %d: %s" % (status, reason))
+
+        return status, data, responseHeaders
+
+    def _request(self, scheme, netloc, path, headers):
+        """Make a request with a pooled connection.  If a reused connection
+        has been closed by the server, the request is retried once on a new
+        connection.  Other idle connections in the pool aren't tried as they
+        may have been closed too.
+        @return: status, reason, response body and headers with lower case
+        names
+        @rtype: tuple
+        @raise http.client.HTTPException: error making the request
+        @raise OSError: error making the request
+        """
+        connection, reused = self.connectionPool.getConnection(scheme, netloc)
+        try:
+            return self._requestWithConnection(scheme, netloc, connection,
+                                               path, headers)
+        except (http.client.HTTPException, OSError):
+            if not reused:
+                raise
+
+        log.debug("Retrying request for %r with a new connection", path)
+        connection = self.connectionPool.newConnection(scheme, netloc)
+        return self._requestWithConnection(scheme, netloc, connection, path,
+                                           headers)
+
+    def _requestWithConnection(self, scheme, netloc, connection, path,
+                               headers):
+        """Make a request with a given connection returning it to the pool
+        afterwards if it can be reused.  The connection is closed if the 
+        request fails.
+        @return: status, reason, response body and headers with lower case
+        names
+        @rtype: tuple
+        @raise http.client.HTTPException: error making the request
+        @raise OSError: error making the request
+        """
+        connection.set_debuglevel(1 if self.debug else 0)
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            raise
+
+        responseHeaders = dict([(name.lower(), value)
+                                for name, value in response.getheaders()])
+        if response.will_close:
+            connection.close()
+        else:
+            self.connectionPool.releaseConnection(scheme, netloc, connection)
+
+        return response.status, response.reason, data, responseHeaders
+
+    def _getCacheFilePaths(self, url):
+        """Get the cache data and metadata file paths for a URL
+        @param url: URL
+        @type url: str
+        @return: data and metadata file paths
+        @rtype: tuple
+        """
+        key = os.path.join(self.cacheDir,
+                           hashlib.sha256(url.encode('utf-8')).hexdigest())
+        return (key + self.__class__.CACHE_DATA_FILE_SUFFIX,
+                key + self.__class__.CACHE_METADATA_FILE_SUFFIX)
+
+    def _readCache(self, url):
+        """Read the cached data for a URL
+        @param url: URL
+        @type url: str
+        @return: cached data and metadata or None and an empty dict if the
+        URL is not cached
+        @rtype: tuple
+        """
+        dataFilePath, metadataFilePath = self._getCacheFilePaths(url)
+        try:
+            with open(metadataFilePath) as metadataFile:
+                metadata = json.load(metadataFile)
+
+            if metadata.get('url') != url:
+                return None, {}
+
+            with open(dataFilePath, 'rb') as dataFile:
+                data = dataFile.read()
+
+        except (IOError, ValueError):
+            return None, {}
+
+        return data, metadata
+
+    def _writeCache(self, url, data, responseHeaders):
+        """Cache data for a URL if the response can be revalidated
+        @param url: URL
+        @type url: str
+        @param data: response body
+        @type data: bytes
+        @param responseHeaders: response headers with lower case names
+        @type responseHeaders: dict
+        """
+        metadata = {'url': url}
+        for name in ('etag', 'last-modified'):
+            if name in responseHeaders:
+                metadata[name] = responseHeaders[name]
+
+        if len(metadata) == 1:
+            # Nothing to revalidate with
+            return
+
+        # Files are written under temporary names and renamed so that
+        # concurrent readers never see partly written files
+        dataFilePath, metadataFilePath = self._getCacheFilePaths(url)
+        for filePath, content in ((dataFilePath, data),
+                                  (metadataFilePath,
+                                   json.dumps(metadata).encode('utf-8'))):
+            fd, tmpFilePath = tempfile.mkstemp(dir=self.cacheDir)
+            try:
+                with os.fdopen(fd, 'wb') as tmpFile:
+                    tmpFile.write(content)
+                os.replace(tmpFilePath, filePath)
+            except Exception:
+                os.remove(tmpFilePath)
+                raise
@@ -50,6 +50,7 @@ setup(
         'ndg.xacml.test': ['*.xml', "urn*"],
         'ndg.xacml.test.faam_policyset': ['*.xml', "urn*"],
         'ndg.xacml.test.cmip5_policyset': ['*.xml', "urn*"],
+        'ndg.xacml.test.eo_policyset': ['*.xml', "urn*"],
         'ndg.xacml.test.functions': ['*.xml', "urn*"],
     },
     entry_points =          None,